@@ -1,6 +1,11 @@
 import json
 import re
-from typing import Any, Optional
+from typing import Any, List, Optional, Sequence
+
+import numpy as np
+
+from glmv_reward.utils.gui_action import box_iou, box_is_valid, to_float_array
+from glmv_reward.utils.similarity import lcs_similarity
 
 
 def extract_answer_obj(s: str):
@@ -28,56 +33,57 @@ def extract_answer_obj(s: str):
         return None
 
 
-def lcs(s1, s2):
-    m, n = len(s1), len(s2)
-    dp = [[0] * (n + 1) for _ in range(m + 1)]
-    for i in range(1, m + 1):
-        for j in range(1, n + 1):
-            if s1[i - 1] == s2[j - 1]:
-                dp[i][j] = dp[i - 1][j - 1] + 1
-            else:
-                dp[i][j] = max(dp[i - 1][j], dp[i][j - 1])
-    return dp[m][n]
-
-
-def iou(box1, box2):
-    ixmin = max(box1[0], box2[0])
-    iymin = max(box1[1], box2[1])
-    ixmax = min(box1[2], box2[2])
-    iymax = min(box1[3], box2[3])
-
-    iw = max(ixmax - ixmin, 0)
-    ih = max(iymax - iymin, 0)
-    inter_area = iw * ih
-
-    area1 = (box1[2] - box1[0]) * (box1[3] - box1[1])
-    area2 = (box2[2] - box2[0]) * (box2[3] - box2[1])
-    union_area = area1 + area2 - inter_area
-
-    if union_area == 0:
-        return 0.0
-
-    return inter_area / union_area
-
-
-def check_box_valid(box):
-    if not box:
-        return False
-    if not isinstance(box, list) or len(box) != 4:
-        return False
-    for x in box:
-        if not isinstance(x, int):
-            return False
-        if x < 0 or x > 999:
-            return False
+def extract_answer(response: str, question: Optional[str] = None) -> Optional[dict]:
+    return extract_answer_obj(response)
 
-    if box[0] > box[2] or box[1] > box[3]:
-        return False
-    return True
 
+def judge_batch(
+    extracted_answers: Sequence[Any],
+    ground_truths: Sequence[Any],
+    questions: Optional[Sequence[Optional[str]]] = None,
+    image_paths: Optional[Sequence[Any]] = None,
+) -> List[float]:
+    """Score a batch of action dicts; the IoUs of all `box_2d` pairs are computed as one array."""
+    scores = np.zeros(len(extracted_answers), dtype=np.float64)
+    # * the box pairs are scored after the loop, in one vectorized call
+    box_items, gt_boxes, pred_boxes = [], [], []
+
+    for idx, (ans, gt) in enumerate(zip(extracted_answers, ground_truths)):
+        # * a non-dict ground truth is a data error, and a different key set is
+        # * a format error or a different action type
+        if not isinstance(gt, dict) or not isinstance(ans, dict) or set(ans.keys()) != set(gt.keys()):
+            continue
 
-def extract_answer(response: str, question: Optional[str] = None) -> Optional[dict]:
-    return extract_answer_obj(response)
+        reward = 1.0
+        box_pair = None
+        for key in gt:
+            if ans[key] == gt[key]:
+                continue
+            if key == "text":
+                t1, t2 = gt[key], ans[key]
+                try:
+                    reward *= lcs_similarity(t1, t2)
+                except TypeError:
+                    reward = 0.0
+            elif key == "box_2d" and isinstance(gt[key], list) and isinstance(ans[key], list):
+                # box in [[xmin,ymin,xmax,ymax]] format
+                box_pair = (gt[key][0] if gt[key] else None, ans[key][0] if ans[key] else None)
+            else:  # It must be an enumeration type.
+                reward = 0.0
+
+        scores[idx] = reward
+        if box_pair is not None:
+            box_items.append(idx)
+            gt_boxes.append(box_pair[0])
+            pred_boxes.append(box_pair[1])
+
+    if box_items:
+        # * an invalid ground-truth box is a data error, an invalid predicted box a format error
+        valid = box_is_valid(gt_boxes) & box_is_valid(pred_boxes)
+        ious = box_iou(to_float_array(pred_boxes, 4), to_float_array(gt_boxes, 4))
+        scores[box_items] *= np.where(valid, ious, 0.0)
+
+    return scores.tolist()
 
 
 def judge(
@@ -86,42 +92,7 @@ def judge(
     question: Optional[str] = None,
     image_path=None,
 ) -> float:
-    assert isinstance(ground_truth, dict)
-
-    if not isinstance(extracted_answer, dict):
-        return 0.0
-
-    if set(extracted_answer.keys()) != set(ground_truth.keys()):
-        # maybe format error or different action type
-        return 0.0
-
-    key2scores = {}
-    for key in ground_truth:
-        if extracted_answer[key] == ground_truth[key]:
-            key2scores[key] = 1.0
-            continue
-
-        if key == "text":
-            t1 = ground_truth[key]
-            t2 = extracted_answer[key]
-            key2scores[key] = lcs(t1, t2) / max(len(t1), len(t2))
-        elif key == "box_2d":
-            # box in [[xmin,ymin,xmax,ymax]] format
-            box1 = ground_truth[key][0]
-            assert check_box_valid(box1)
-            box2 = extracted_answer[key][0]
-            if not check_box_valid(box2):
-                return 0.0
-
-            key2scores[key] = iou(box1, box2)
-        else:  # It must be an enumeration type.
-            key2scores[key] = 0.0
-
-    reward = 1
-    for sub_score in key2scores.values():
-        reward *= sub_score
-
-    return reward
+    return judge_batch([extracted_answer], [ground_truth], [question], [image_path])[0]
 
 
 if __name__ == "__main__":
@@ -1,5 +1,14 @@
 import re
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from glmv_reward.utils.action_grammar import parse_osworld_action
+from glmv_reward.utils.gui_action import coordinate_similarity, equal_mask, step_similarity, to_float_array
+from glmv_reward.utils.similarity import edit_distance_similarity
+
+_BOX_RE = re.compile(r"<\|begin_of_box\|>(.*?)<\|end_of_box\|>")
+_CLICK_ACTIONS = ("left_click", "left_double_click", "right_click", "middle_click", "hover")
 
 
 def is_properly_closed(text):
@@ -23,109 +32,9 @@ def is_properly_closed(text):
     return quote_count % 2 == 0 and len(bracket_stack) == 0
 
 
-def _extract_coordinates(params_str: str, param_name: str) -> Optional[List[int]]:
-    """
-    Helper function to extract coordinates from parameter string.
-
-    Args:
-        params_str: Parameter string to search in
-        param_name: Name of the parameter containing coordinates
-
-    Returns:
-        List of [x, y] coordinates or None if extraction fails
-    """
-    coord_match = re.search(rf"{param_name}='\[(\d+),\s*(\d+)\]'", params_str)
-    if coord_match:
-        return [int(coord_match.group(1)), int(coord_match.group(2))]
-    return None
-
-
 def parse_action(action_text: str) -> Optional[Dict[str, Any]]:
-    if not action_text:
-        return None
-
-    action_type_match = re.search(r"^(\w+)\(", action_text)
-    if not action_type_match:
-        return None
-
-    action_type = action_type_match.group(1)
-    params_str = re.search(r"\((.*)\)$", action_text)
-    params_str = params_str.group(1) if params_str else ""
-
-    result = {"action_type": action_type}
-
-    element_info_match = re.search(r"element_info='(.*?)'", params_str)
-    if element_info_match:
-        result["element_info"] = element_info_match.group(1)
-
-    if action_type in ["left_click", "left_double_click", "right_click", "middle_click", "hover"]:
-        coords = _extract_coordinates(params_str, "start_box")
-        if coords:
-            result["coordinates"] = coords
-
-    elif action_type == "left_drag":
-        start_coords = _extract_coordinates(params_str, "start_box")
-        end_coords = _extract_coordinates(params_str, "end_box")
-
-        if start_coords and end_coords:
-            result["start_coordinates"] = start_coords
-            result["end_coordinates"] = end_coords
-
-    elif action_type == "scroll":
-        coords = _extract_coordinates(params_str, "start_box")
-        direction_match = re.search(r"direction='(\w+)'", params_str)
-        step_match = re.search(r"step=(\d+)", params_str)
-
-        if coords and direction_match:
-            result["coordinates"] = coords
-            result["direction"] = direction_match.group(1)
-            if step_match:
-                result["step"] = int(step_match.group(1))
-
-    elif action_type == "type":
-        content_match = re.search(r"content='(.*?)'", params_str)
-        if content_match:
-            result["content"] = content_match.group(1)
-
-    elif action_type == "key":
-        key_match = re.search(r"keys='(.*?)'", params_str)
-        if key_match:
-            result["keys"] = key_match.group(1)
-
-    return result
-
-
-def calculate_coordinate_similarity(coord1: List[int], coord2: List[int], tolerance: int = 20) -> float:
-    if not coord1 or not coord2 or len(coord1) != 2 or len(coord2) != 2:
-        return 0.0
-    distance = ((coord1[0] - coord2[0]) ** 2 + (coord1[1] - coord2[1]) ** 2) ** 0.5
-    if distance <= tolerance:
-        return 1.0 - (distance / tolerance) * 0.2
-    else:
-        return max(0.0, 1.0 - (distance / 50))
-
-
-def _edit_distance_similarity(s1: str, s2: str) -> float:
-    def edit_distance(s1, s2):
-        m, n = len(s1), len(s2)
-        dp = [[0] * (n + 1) for _ in range(m + 1)]
-        for i in range(m + 1):
-            dp[i][0] = i
-        for j in range(n + 1):
-            dp[0][j] = j
-        for i in range(1, m + 1):
-            for j in range(1, n + 1):
-                if s1[i - 1] == s2[j - 1]:
-                    dp[i][j] = dp[i - 1][j - 1]
-                else:
-                    dp[i][j] = min(dp[i - 1][j], dp[i][j - 1], dp[i - 1][j - 1]) + 1
-        return dp[m][n]
-
-    max_len = max(len(s1), len(s2))
-    if max_len == 0:
-        return 1.0
-    ed = edit_distance(s1, s2)
-    return 1.0 - (ed / max_len)
+    action = parse_osworld_action(action_text)
+    return action.to_dict() if action is not None else None
 
 
 def _jaccard_similarity(s1: str, s2: str) -> float:
@@ -181,7 +90,7 @@ def calculate_text_similarity(s1: str, s2: str) -> float:
     if has_excessive_repetition(s1_norm) or has_excessive_repetition(s2_norm):
         repetition_penalty = 0.3
 
-    edit_sim = _edit_distance_similarity(s1_norm, s2_norm)
+    edit_sim = edit_distance_similarity(s1_norm, s2_norm)
     jaccard_sim = _jaccard_similarity(s1_norm, s2_norm)
     combined_sim = 0.6 * edit_sim + 0.4 * jaccard_sim
     final_score = combined_sim * length_penalty * repetition_penalty
@@ -190,7 +99,7 @@ def calculate_text_similarity(s1: str, s2: str) -> float:
 
 
 def extract_answer(response: str, question: Optional[str] = None) -> Optional[Dict]:
-    match = re.search(r"<\|begin_of_box\|>(.*?)<\|end_of_box\|>", response)
+    match = _BOX_RE.search(response)
     if not match:
         return None
     content = match.group(1).strip()
@@ -199,63 +108,76 @@ def extract_answer(response: str, question: Optional[str] = None) -> Optional[Di
     return parse_action(content)
 
 
+def judge_batch(
+    extracted_answers: Sequence[Any],
+    ground_truths: Sequence[Any],
+    questions: Optional[Sequence[Optional[str]]] = None,
+    image_paths: Optional[Sequence[Any]] = None,
+) -> List[float]:
+    """Score a batch of parsed actions, computing all coordinate-based sub-scores as arrays."""
+    scores = np.zeros(len(extracted_answers), dtype=np.float64)
+    groups: Dict[str, List[int]] = {"click": [], "left_drag": [], "scroll": [], "type": [], "key": []}
+
+    for idx, (ans, gt) in enumerate(zip(extracted_answers, ground_truths)):
+        if not isinstance(ans, dict) or not isinstance(gt, dict):
+            continue
+        action_type = ans.get("action_type")
+        if action_type is None or action_type != gt.get("action_type"):
+            continue
+
+        if action_type in _CLICK_ACTIONS:
+            groups["click"].append(idx)
+        elif action_type in ["left_drag", "scroll", "type"]:
+            groups[action_type].append(idx)
+        elif action_type in ["key", "hotkey"]:
+            groups["key"].append(idx)
+        elif action_type.upper() in ["WAIT", "DONE", "FAIL"] or action_type.lower() in ["wait", "finished"]:
+            scores[idx] = 1.0
+
+    def _points(items: Sequence[Dict], key: str) -> np.ndarray:
+        return to_float_array([item.get(key) for item in items], 2)
+
+    if groups["click"]:
+        idx = groups["click"]
+        answers, gts = [extracted_answers[i] for i in idx], [ground_truths[i] for i in idx]
+        scores[idx] = coordinate_similarity(_points(answers, "coordinates"), _points(gts, "coordinates"))
+
+    if groups["left_drag"]:
+        idx = groups["left_drag"]
+        answers, gts = [extracted_answers[i] for i in idx], [ground_truths[i] for i in idx]
+        start_sim = coordinate_similarity(_points(answers, "start_coordinates"), _points(gts, "start_coordinates"))
+        end_sim = coordinate_similarity(_points(answers, "end_coordinates"), _points(gts, "end_coordinates"))
+        scores[idx] = np.sqrt(start_sim * end_sim)
+
+    if groups["scroll"]:
+        idx = groups["scroll"]
+        answers, gts = [extracted_answers[i] for i in idx], [ground_truths[i] for i in idx]
+        coord_sim = coordinate_similarity(_points(answers, "coordinates"), _points(gts, "coordinates"))
+        direction_match = equal_mask([a.get("direction") for a in answers], [g.get("direction") for g in gts])
+        has_gt_step = np.array(["step" in g for g in gts], dtype=np.bool_)
+        step_sim = step_similarity(
+            [a.get("step", 5) if "step" in g else np.nan for a, g in zip(answers, gts)],
+            [g.get("step", np.nan) for g in gts],
+        )
+        scores[idx] = coord_sim * direction_match * np.where(has_gt_step, step_sim, 1.0)
+
+    for i in groups["type"]:
+        ans, gt = extracted_answers[i], ground_truths[i]
+        if "content" in ans and "content" in gt:
+            scores[i] = calculate_text_similarity(ans["content"], gt["content"])
+
+    if groups["key"]:
+        idx = groups["key"]
+        answers, gts = [extracted_answers[i] for i in idx], [ground_truths[i] for i in idx]
+        scores[idx] = equal_mask([a.get("keys") for a in answers], [g.get("keys") for g in gts], ignore_case=True)
+
+    return scores.tolist()
+
+
 def judge(
     extracted_answer: Any,
     ground_truth: Any,
     question: Optional[str] = None,
     image_path=None,
 ) -> float:
-    if not isinstance(extracted_answer, dict) or not isinstance(ground_truth, dict):
-        return 0.0
-
-    if extracted_answer.get("action_type") != ground_truth.get("action_type"):
-        return 0.0
-    action_type = extracted_answer["action_type"]
-
-    if action_type in ["left_click", "left_double_click", "right_click", "middle_click", "hover"]:
-        if "coordinates" not in extracted_answer or "coordinates" not in ground_truth:
-            return 0.0
-        else:
-            return calculate_coordinate_similarity(extracted_answer["coordinates"], ground_truth["coordinates"])
-
-    elif action_type == "left_drag":
-        if not all(k in extracted_answer and k in ground_truth for k in ["start_coordinates", "end_coordinates"]):
-            return 0.0
-        else:
-            start_sim = calculate_coordinate_similarity(
-                extracted_answer["start_coordinates"], ground_truth["start_coordinates"]
-            )
-            end_sim = calculate_coordinate_similarity(
-                extracted_answer["end_coordinates"], ground_truth["end_coordinates"]
-            )
-            return (start_sim * end_sim) ** 0.5
-
-    elif action_type == "scroll":
-        if not all(k in extracted_answer and k in ground_truth for k in ["coordinates", "direction"]):
-            return 0.0
-        else:
-            coord_sim = calculate_coordinate_similarity(extracted_answer["coordinates"], ground_truth["coordinates"])
-            direction_match = 1.0 if extracted_answer["direction"] == ground_truth["direction"] else 0.0
-            if "step" in ground_truth:
-                extracted_step = extracted_answer.get("step", 5)
-                step_diff = abs(extracted_step - ground_truth["step"])
-                step_sim = max(0.0, 1.0 - step_diff / (ground_truth["step"] * 2))
-            else:
-                step_sim = 1.0
-            return coord_sim * direction_match * step_sim
-
-    elif action_type == "type":
-        if "content" not in extracted_answer or "content" not in ground_truth:
-            return 0.0
-        else:
-            return calculate_text_similarity(extracted_answer["content"], ground_truth["content"])
-
-    elif action_type in ["key", "hotkey"]:
-        if "keys" not in extracted_answer or "keys" not in ground_truth:
-            return 0.0
-        return 1.0 if extracted_answer["keys"].lower() == ground_truth["keys"].lower() else 0.0
-
-    elif action_type.upper() in ["WAIT", "DONE", "FAIL"] or action_type.lower() in ["wait", "finished"]:
-        return 1.0
-
-    return 0.0
+    return judge_batch([extracted_answer], [ground_truth], [question], [image_path])[0]
@@ -2,22 +2,14 @@
 import re
 from typing import Any, Optional
 
+from glmv_reward.utils.action_grammar import parse_webvoyager_action
+from glmv_reward.utils.similarity import lcs_length as lcs
 
-def extract_answer(response: str, question: Optional[str] = None) -> Optional[str]:
-    return re.findall(r"<\|begin_of_box\|>(.*?)<\|end_of_box\|>", response, re.DOTALL)[0]
+_BOX_RE = re.compile(r"<\|begin_of_box\|>(.*?)<\|end_of_box\|>", re.DOTALL)
 
 
-def lcs(x, y):
-    m = len(x)
-    n = len(y)
-    dp = [[0] * (n + 1) for _ in range(m + 1)]
-    for i in range(1, m + 1):
-        for j in range(1, n + 1):
-            if x[i - 1] == y[j - 1]:
-                dp[i][j] = dp[i - 1][j - 1] + 1
-            else:
-                dp[i][j] = max(dp[i - 1][j], dp[i][j - 1])
-    return dp[m][n]
+def extract_answer(response: str, question: Optional[str] = None) -> Optional[str]:
+    return _BOX_RE.findall(response)[0]
 
 
 def judge(
@@ -26,97 +18,26 @@ def judge(
     question: Optional[str] = None,
     image_path=None,
 ) -> float:
-    def extract_information(text):
-        # New format patterns
-        new_patterns = {
-            "click": r"CLICK\(point=\((\d+),\s*(\d+)\)(?:,\s*box=\[\[([^\]]+)\]\])?(?:,\s*element_info='([^']*)')?\)",
-            "type": r"TYPE\(point=\((\d+),\s*(\d+)\)(?:,\s*text='([^']*)')?(?:,\s*box=\[\[([^\]]+)\]\])?(?:,\s*element_info='([^']*)')?\)",
-            "key": r"KEY_PRESS\(key='([^']*)'\)",
-            "scroll_down": r"SCROLL_DOWN\(point=\((\d+),\s*(\d+)\)(?:,\s*box=\[\[([^\]]+)\]\])?(?:,\s*distance=([^,\)]+))?(?:,\s*element_info='([^']*)')?\)",
-            "scroll_up": r"SCROLL_UP\(point=\((\d+),\s*(\d+)\)(?:,\s*box=\[\[([^\]]+)\]\])?(?:,\s*distance=([^,\)]+))?(?:,\s*element_info='([^']*)')?\)",
-            "answer": r"ANSWER\(content='([^']*)'\)",
-        }
-
-        # Try new format first
-        for key, pattern in new_patterns.items():
-            match = re.search(pattern, text, re.DOTALL)
-            if match:
-                if key == "click":
-                    x, y, box, element_info = match.groups()
-                    return "click", {"x": int(x), "y": int(y), "box": box, "element_info": element_info}
-                elif key == "type":
-                    x, y, text_content, box, element_info = match.groups()
-                    return "type", {
-                        "x": int(x),
-                        "y": int(y),
-                        "text": text_content or "",
-                        "box": box,
-                        "element_info": element_info,
-                    }
-                elif key == "key":
-                    key_name = match.group(1)
-                    return "key", {"key": key_name}
-                elif key in ["scroll_down", "scroll_up"]:
-                    x, y, box, distance, element_info = match.groups()
-                    return "scroll", {
-                        "x": int(x),
-                        "y": int(y),
-                        "box": box,
-                        "distance": distance,
-                        "element_info": element_info,
-                        "direction": key.split("_")[1],
-                    }
-                elif key == "answer":
-                    content = match.group(1)
-                    return "answer", {"content": content}
-
-        # Fall back to old format patterns
-        old_patterns = {
-            "click": r"Click \[?(\d+)\]?",
-            "type": r"Type \[?(\d+)\]?[; ]+\[?(.[^\]]*)\]?",
-            "key": r"Key[; ]+\[?(.[^\]]*)\]?",
-            "scroll": r"Scroll \[?(\d+|WINDOW)\]?[; ]+\[?(up|down)\]?",
-            "wait": r"^Wait",
-            "goback": r"^GoBack",
-            "google": r"^Google",
-            "bing": r"^Bing",
-            "answer": r"ANSWER[; ]+<content>(.*?)</content>",
-        }
-
-        for key, pattern in old_patterns.items():
-            match = re.search(pattern, text, re.DOTALL)
-            if match:
-                if key in ["click", "wait", "goback", "google", "bing"]:
-                    # no content
-                    return key, match.groups()
-                else:
-                    return key, {"number": match.group(1), "content": match.group(2)} if key in [
-                        "type",
-                        "scroll",
-                    ] else {"content": match.group(1)}
-        return None, None
-
-    action, info = extract_information(extracted_answer)
-    gt_action, gt_info = extract_information(ground_truth)
-    if action != gt_action:
+    info = parse_webvoyager_action(extracted_answer)
+    gt_info = parse_webvoyager_action(ground_truth)
+    if info is None or gt_info is None or info.action != gt_info.action:
         return 0.0
+    action = info.action
 
     if action == "click":
         # Handle new format
-        if isinstance(info, dict) and isinstance(gt_info, dict):
+        if not info.legacy and not gt_info.legacy:
             # New format: check point distance and element_info
-            if info.get("x") == gt_info.get("x") and info.get("y") == gt_info.get("y"):
+            if info.x == gt_info.x and info.y == gt_info.y:
                 return 1.0
-            elif info.get("element_info") == gt_info.get("element_info"):
+            elif info.element_info == gt_info.element_info:
                 # Same element but different position
                 return 0.05
             else:
                 return 0.0
         # Handle old format
-        elif isinstance(info, tuple) and isinstance(gt_info, tuple):
-            click_ele_number = int(info[0])
-            gt_click_ele_number = int(gt_info[0])
-            if click_ele_number == gt_click_ele_number:
+        elif info.legacy and gt_info.legacy:
+            if int(info.number) == int(gt_info.number):
                 return 1.0
             else:
                 return 0.0
@@ -125,9 +46,9 @@ def judge(
 
     elif action == "type":
         # Handle new format
-        if isinstance(info, dict) and isinstance(gt_info, dict) and "text" in info:
-            input_text = info.get("text", "")
-            gt_input_text = gt_info.get("text", "")
+        if not info.legacy:
+            input_text = info.text or ""
+            gt_input_text = gt_info.text or ""
 
             # Calculate text similarity
             if input_text == gt_input_text:
@@ -138,19 +59,17 @@ def judge(
                 text_similarity = 0.0
 
             # Check position match
-            if info.get("x") == gt_info.get("x") and info.get("y") == gt_info.get("y"):
+            if info.x == gt_info.x and info.y == gt_info.y:
                 # Same position, return text similarity
                 return text_similarity
             else:
                 # Different position, return text similarity with small penalty
                 return text_similarity * 0.95 if text_similarity > 0.05 else 0.05
         # Handle old format
-        elif isinstance(info, dict) and isinstance(gt_info, dict) and "number" in info:
-            type_ele_number = int(info["number"])
-            gt_type_ele_number = int(gt_info["number"])
-            input_text = info["content"]
-            gt_input_text = gt_info["content"]
-            if type_ele_number == gt_type_ele_number:
+        elif gt_info.legacy:
+            input_text = info.content
+            gt_input_text = gt_info.content
+            if int(info.number) == int(gt_info.number):
                 return lcs(input_text, gt_input_text) / max(len(input_text), len(gt_input_text))
             else:
                 return 0.0
@@ -159,9 +78,9 @@ def judge(
 
     elif action == "key":
         # Handle new format
-        if isinstance(info, dict) and isinstance(gt_info, dict) and "key" in info:
-            key_name = info["key"].lower()
-            gt_key_name = gt_info["key"].lower()
+        if not info.legacy and not gt_info.legacy:
+            key_name = info.key.lower()
+            gt_key_name = gt_info.key.lower()
             if key_name == gt_key_name:
                 return 1.0
             # Handle equivalent keys
@@ -170,10 +89,8 @@ def judge(
             else:
                 return 0.0
         # Handle old format
-        elif isinstance(info, dict) and isinstance(gt_info, dict) and "content" in info:
-            key_name = info["content"].lower()
-            gt_key_name = gt_info["content"].lower()
-            if key_name == gt_key_name:
+        elif info.legacy and gt_info.legacy:
+            if info.content.lower() == gt_info.content.lower():
                 return 1.0
             else:
                 return 0.0
@@ -182,16 +99,12 @@ def judge(
 
     elif action == "scroll":
         # Handle new format
-        if isinstance(info, dict) and isinstance(gt_info, dict) and "distance" in info:
-            if (
-                info.get("x") == gt_info.get("x")
-                and info.get("y") == gt_info.get("y")
-                and info.get("direction") == gt_info.get("direction")
-            ):
+        if not info.legacy:
+            if info.x == gt_info.x and info.y == gt_info.y and info.direction == gt_info.direction:
                 # Same position and direction, compare distance
                 try:
-                    distance = float(info.get("distance", 0))
-                    gt_distance = float(gt_info.get("distance", 0))
+                    distance = float(info.distance)
+                    gt_distance = float(gt_info.distance)
                     if distance == gt_distance:
                         return 1.0
                     else:
@@ -206,39 +119,23 @@ def judge(
             else:
                 return 0.0
         # Handle old format
-        elif isinstance(info, dict) and isinstance(gt_info, dict) and "number" in info:
-            scroll_ele_number = info["number"]
-            scroll_content = info["content"]
-            gt_scroll_ele_number = gt_info["number"]
-            gt_scroll_content = gt_info["content"]
-            if scroll_ele_number == gt_scroll_ele_number:
-                if scroll_content == gt_scroll_content:
-                    return 1.0
-                else:
-                    return 0.0
+        elif gt_info.legacy:
+            if info.number == gt_info.number and info.content == gt_info.content:
+                return 1.0
             else:
                 return 0.0
         else:
             return 0.0
 
-    elif action == "wait":
-        return 1.0
-    elif action == "goback":
-        return 1.0
-    elif action == "google":
-        return 1.0
-    elif action == "bing":
+    elif action in ("wait", "goback", "google", "bing"):
         return 1.0
     elif action == "answer":
-        if isinstance(info, dict) and isinstance(gt_info, dict):
-            answer_content = info.get("content", "")
-            gt_answer_content = gt_info.get("content", "")
-            if answer_content == gt_answer_content:
-                return 1.0
-            elif len(answer_content) > 0 and len(gt_answer_content) > 0:
-                return lcs(answer_content, gt_answer_content) / max(len(answer_content), len(gt_answer_content))
-            else:
-                return 0.0
+        answer_content = info.content
+        gt_answer_content = gt_info.content
+        if answer_content == gt_answer_content:
+            return 1.0
+        elif len(answer_content) > 0 and len(gt_answer_content) > 0:
+            return lcs(answer_content, gt_answer_content) / max(len(answer_content), len(gt_answer_content))
         else:
             return 0.0
     else:
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+
+
+from .mock_judge import MockJudgeServer, MockJudgeStats
+from .runner import BenchmarkReport, WorkloadReport, run_benchmark
+from .workloads import DEFAULT_DATASOURCES, WORKLOADS, make_batch
+
+__all__ = [
+    "DEFAULT_DATASOURCES",
+    "WORKLOADS",
+    "BenchmarkReport",
+    "MockJudgeServer",
+    "MockJudgeStats",
+    "WorkloadReport",
+    "make_batch",
+    "run_benchmark",
+]
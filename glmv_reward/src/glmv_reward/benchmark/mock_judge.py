@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import TracebackType
+from typing import Any, Optional
+
+import msgspec
+
+from glmv_reward.utils.logging import get_logger
+
+_logger = get_logger(__name__)
+
+# * parsed as a pass by every LLM judge: the score verifiers look for "1.0", geoquest reads the JSON
+DEFAULT_REPLY = '{"analysis": "mock judge", "score": 1.0}'
+
+
+class MockJudgeStats(msgspec.Struct):
+    """Counters of a `MockJudgeServer`, including the rejected requests."""
+
+    num_requests: int = 0
+    num_errors: int = 0
+    num_rate_limited: int = 0
+
+    def __sub__(self, other: "MockJudgeStats") -> "MockJudgeStats":
+        return MockJudgeStats(
+            num_requests=self.num_requests - other.num_requests,
+            num_errors=self.num_errors - other.num_errors,
+            num_rate_limited=self.num_rate_limited - other.num_rate_limited,
+        )
+
+
+class MockJudgeServer(object):
+    def __init__(
+        self,
+        latency_ms: float = 50.0,
+        latency_jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        reply: str = DEFAULT_REPLY,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: Optional[int] = None,
+    ) -> None:
+        """
+        A local stand-in for the OpenAI / Zhipu chat completion endpoint used by the LLM judges.
+
+        Every POST is answered with a chat completion whose content is `reply`, after sleeping
+        `latency_ms` ± `latency_jitter_ms`. A `rate_limit_rate` fraction of the requests is rejected at
+        once with HTTP 429, and an `error_rate` fraction fails with HTTP 500 after the usual latency.
+
+        Args:
+            latency_ms (float): Mean response latency.
+            latency_jitter_ms (float): Half-width of the uniform jitter added to the latency.
+            error_rate (float): Fraction of requests answered with HTTP 500.
+            rate_limit_rate (float): Fraction of requests answered with HTTP 429.
+            reply (str): The content of every completion.
+            host (str): The interface to listen on.
+            port (int): The port to listen on, 0 to pick a free one.
+            seed (Optional[int]): Seed of the latency and failure draws.
+        """
+        if not (0.0 <= error_rate <= 1.0 and 0.0 <= rate_limit_rate <= 1.0):
+            err_msg = (
+                f"`error_rate` and `rate_limit_rate` should be in [0, 1], but got {error_rate} and {rate_limit_rate}."
+            )
+            raise ValueError(err_msg)
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.reply = reply
+        self.host = host
+        self.port = port
+
+        self._rng = random.Random(seed)  # noqa: S311
+        self._stats = MockJudgeStats()
+        self._lock = threading.Lock()
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/api/paas/v4/chat/completions"
+
+    @property
+    def stats(self) -> MockJudgeStats:
+        with self._lock:
+            return msgspec.structs.replace(self._stats)
+
+    def start(self) -> "MockJudgeServer":
+        if self._httpd is not None:
+            return self
+        self._httpd = ThreadingHTTPServer((self.host, self.port), _make_handler(self))
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-judge", daemon=True)
+        self._thread.start()
+        _logger.info("> Mock judge listening on %s", self.url)
+        return self
+
+    def close(self) -> None:
+        if self._httpd is None:
+            return
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+        self._httpd = None
+        self._thread = None
+
+    def __enter__(self) -> "MockJudgeServer":
+        return self.start()
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    def respond(self, body: bytes) -> tuple[int, dict[str, str], bytes]:
+        """Build the (status, headers, payload) answer to one request body; sleeps for the simulated latency."""
+        with self._lock:
+            self._stats.num_requests += 1
+            request_id = self._stats.num_requests
+            draw = self._rng.random()
+            latency = max(0.0, self.latency_ms + self._rng.uniform(-self.latency_jitter_ms, self.latency_jitter_ms))
+            if draw < self.rate_limit_rate:
+                self._stats.num_rate_limited += 1
+            elif draw < self.rate_limit_rate + self.error_rate:
+                self._stats.num_errors += 1
+
+        if draw < self.rate_limit_rate:
+            error = {"error": {"code": "1302", "message": "mock judge: rate limit reached"}}
+            return 429, {"Retry-After": "1"}, msgspec.json.encode(error)
+
+        time.sleep(latency / 1000)
+        if draw < self.rate_limit_rate + self.error_rate:
+            error = {"error": {"code": "500", "message": "mock judge: injected error"}}
+            return 500, {}, msgspec.json.encode(error)
+
+        try:
+            model = msgspec.json.decode(body, type=dict[str, Any]).get("model", "mock")
+        except msgspec.DecodeError:
+            model = "mock"
+        completion = {
+            "id": f"mock-{request_id}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": self.reply}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(body) // 4, "completion_tokens": len(self.reply) // 4},
+        }
+        return 200, {}, msgspec.json.encode(completion)
+
+
+def _make_handler(mock: MockJudgeServer) -> type[BaseHTTPRequestHandler]:
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self) -> None:  # noqa: N802
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            status, headers, payload = mock.respond(body)
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+            del format, args
+
+    return _Handler
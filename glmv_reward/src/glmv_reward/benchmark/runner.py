@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+
+
+import contextlib
+import functools
+import itertools
+import platform
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Callable, Iterator, Sequence
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional, TypeVar, Union
+
+import msgspec
+
+from glmv_reward.reward_system import RewardSystem
+from glmv_reward.utils import llm
+from glmv_reward.utils.logging import get_logger
+from glmv_reward.utils.serialization import load_yaml
+from glmv_reward.verifiers import Verifier
+
+from .mock_judge import MockJudgeServer, MockJudgeStats
+from .workloads import DEFAULT_DATASOURCES, WORKLOADS, make_batch
+
+_logger = get_logger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# * verifier instances are cached per datasource, so each run scores under datasource names of its own
+_RUN_IDS = itertools.count()
+
+
+class LatencySummary(msgspec.Struct):
+    """Latency percentiles in milliseconds."""
+
+    count: int
+    mean: float
+    p50: float
+    p99: float
+    max: float
+
+
+class CpuBreakdown(msgspec.Struct):
+    """
+    CPU seconds spent by the scoring threads in each stage.
+
+    `rules` is the CPU time of `judge` minus the nested LLM calls; `process` is the CPU time of the
+    whole process, which also includes the format checks, thread pools and the in-process mock judge.
+    """
+
+    extraction: float = 0.0
+    rules: float = 0.0
+    llm: float = 0.0
+    llm_wall: float = 0.0
+    process: float = 0.0
+
+
+class WorkloadReport(msgspec.Struct):
+    workload: str
+    datasource: str
+    num_items: int
+    num_batches: int
+    wall_time_s: float
+    items_per_sec: float
+    mean_reward: float
+    batch_latency_ms: LatencySummary
+    item_latency_ms: Optional[LatencySummary]
+    cpu_s: CpuBreakdown
+    judge_calls: int
+    judge_calls_per_item: float
+    judge_server: MockJudgeStats
+
+
+class BenchmarkReport(msgspec.Struct):
+    created_at: str
+    python_version: str
+    platform: str
+    config_file: str
+    batch_size: int
+    num_batches: int
+    judge_latency_ms: float
+    judge_error_rate: float
+    judge_rate_limit_rate: float
+    workloads: list[WorkloadReport]
+
+
+def _percentile(sorted_values: Sequence[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * q
+    lower = int(pos)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (pos - lower)
+
+
+def summarize_latencies(latencies_s: Sequence[float]) -> LatencySummary:
+    values = sorted(latency * 1000 for latency in latencies_s)
+    return LatencySummary(
+        count=len(values),
+        mean=sum(values) / len(values) if values else 0.0,
+        p50=_percentile(values, 0.5),
+        p99=_percentile(values, 0.99),
+        max=values[-1] if values else 0.0,
+    )
+
+
+class _StageRecorder(object):
+    """Accumulates per-stage thread CPU time from the scoring threads."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.cpu = CpuBreakdown()
+        self.judge_cpu = 0.0
+        self.judge_calls = 0
+        self.item_latencies: list[float] = []
+
+    def timed(self, stage: str, func: F) -> F:
+        @functools.wraps(func)
+        def _wrapper(*args: Any, **kwargs: Any) -> Any:
+            start_cpu, start_wall = time.thread_time(), time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(stage, time.thread_time() - start_cpu, time.perf_counter() - start_wall)
+
+        return _wrapper  # type: ignore[return-value]
+
+    def add(self, stage: str, cpu: float, wall: float) -> None:
+        with self._lock:
+            if stage == "extraction":
+                self.cpu.extraction += cpu
+            elif stage == "judge":
+                self.judge_cpu += cpu
+            elif stage == "llm":
+                self.cpu.llm += cpu
+                self.cpu.llm_wall += wall
+                self.judge_calls += 1
+            elif stage == "item":
+                self.item_latencies.append(wall)
+
+
+@contextlib.contextmanager
+def _record_llm_calls(recorder: _StageRecorder) -> Iterator[None]:
+    """Time every `post_query_llm` call made by the verifiers, which import it by name."""
+    original = llm.post_query_llm
+    timed = recorder.timed("llm", original)
+    patched = [
+        module
+        for name, module in list(sys.modules.items())
+        if name.startswith("glmv_reward.verifiers.") and getattr(module, "post_query_llm", None) is original
+    ]
+    for module in patched:
+        module.post_query_llm = timed  # type: ignore[attr-defined]
+    try:
+        yield
+    finally:
+        for module in patched:
+            module.post_query_llm = original  # type: ignore[attr-defined]
+
+
+@contextlib.contextmanager
+def _instrument(reward_system: RewardSystem, verifier: Verifier, recorder: _StageRecorder) -> Iterator[None]:
+    """
+    Time the extraction and judge methods of `verifier` and the items of `reward_system`.
+
+    Verifier instances are shared process-wide (see `get_verifier_from_config`), so the timed wrappers are
+    removed on exit instead of stacking up on every run.
+    """
+    targets = [
+        (verifier, "extract_answer", "extraction"),
+        (verifier, "extract_answer_batch", "extraction"),
+        (verifier, "judge", "judge"),
+        (verifier, "judge_batch", "judge"),
+        (reward_system, "_process_single_item", "item"),
+    ]
+    missing = object()
+    originals = [(obj, name, vars(obj).get(name, missing)) for obj, name, _ in targets]
+    try:
+        for obj, name, stage in targets:
+            setattr(obj, name, recorder.timed(stage, getattr(obj, name)))
+        yield
+    finally:
+        for obj, name, original in originals:
+            if original is missing:
+                vars(obj).pop(name, None)
+            else:
+                setattr(obj, name, original)
+
+
+def _write_benchmark_config(
+    config_file: Union[str, Path], judge_url: str, datasources: dict[str, str], output_dir: Path
+) -> Path:
+    """Copy a reward system config with every LLM judge pointed at `judge_url` and `datasources` renamed."""
+    config = load_yaml(config_file)
+    mapping = config.get("datasource_reward_config_mapping")
+    reward_configs = config.get("reward_configs")
+    if not isinstance(mapping, dict) or not isinstance(reward_configs, dict):
+        err_msg = f"Invalid reward system config: {config_file}"
+        raise TypeError(err_msg)
+
+    renamed = {}
+    for datasource, alias in datasources.items():
+        if datasource not in mapping:
+            err_msg = f"No reward config found for datasource: {datasource}"
+            raise ValueError(err_msg)
+        renamed[alias] = mapping[datasource]
+    config["datasource_reward_config_mapping"] = renamed
+
+    for reward_config in reward_configs.values():
+        for key, value in (("llm_judge_url", judge_url), ("llm_api_key", "mock-judge-key")):
+            if key in reward_config:
+                current = reward_config[key]
+                reward_config[key] = [value] * len(current) if isinstance(current, list) else value
+
+    benchmark_config = output_dir / "benchmark_config.yaml"
+    # * YAML is a superset of JSON, which round-trips the long prompt templates exactly
+    benchmark_config.write_bytes(msgspec.json.encode(config))
+    return benchmark_config
+
+
+def _run_workload(
+    reward_system: RewardSystem,
+    recorder: _StageRecorder,
+    judge: MockJudgeServer,
+    workload: str,
+    datasource: str,
+    alias: str,
+    batch_size: int,
+    num_batches: int,
+    warmup_batches: int,
+    seed: int,
+    think_length: int,
+    correct_rate: float,
+) -> WorkloadReport:
+    verifier = reward_system.get_verifier_from_datasource(alias)
+    with _instrument(reward_system, verifier, recorder):
+        batches = [
+            make_batch(workload, batch_size, seed=seed + idx, think_length=think_length, correct_rate=correct_rate)
+            for idx in range(warmup_batches + num_batches)
+        ]
+        for batch in batches[:warmup_batches]:
+            reward_system.get_reward(**msgspec.structs.asdict(batch), datasources=[alias] * batch_size)
+
+        recorder.reset()
+        judge_before = judge.stats
+        batch_latencies = []
+        rewards: list[float] = []
+        start_cpu, start_wall = time.process_time(), time.perf_counter()
+        for batch in batches[warmup_batches:]:
+            batch_start = time.perf_counter()
+            result = reward_system.get_reward(**msgspec.structs.asdict(batch), datasources=[alias] * batch_size)
+            batch_latencies.append(time.perf_counter() - batch_start)
+            rewards.extend(result[0] if isinstance(result, tuple) else result)
+        wall_time = time.perf_counter() - start_wall
+        recorder.cpu.process = time.process_time() - start_cpu
+
+    num_items = batch_size * num_batches
+    recorder.cpu.rules = max(0.0, recorder.judge_cpu - recorder.cpu.llm)
+    return WorkloadReport(
+        workload=workload,
+        datasource=datasource,
+        num_items=num_items,
+        num_batches=num_batches,
+        wall_time_s=wall_time,
+        items_per_sec=num_items / wall_time if wall_time > 0 else 0.0,
+        mean_reward=sum(rewards) / len(rewards) if rewards else 0.0,
+        batch_latency_ms=summarize_latencies(batch_latencies),
+        item_latency_ms=summarize_latencies(recorder.item_latencies) if recorder.item_latencies else None,
+        cpu_s=recorder.cpu,
+        judge_calls=recorder.judge_calls,
+        judge_calls_per_item=recorder.judge_calls / num_items if num_items else 0.0,
+        judge_server=judge.stats - judge_before,
+    )
+
+
+def run_benchmark(
+    config_file: Union[str, Path],
+    workloads: Sequence[str] = WORKLOADS,
+    datasources: Optional[dict[str, str]] = None,
+    batch_size: int = 64,
+    num_batches: int = 4,
+    warmup_batches: int = 1,
+    seed: int = 0,
+    think_length: int = 2000,
+    correct_rate: float = 0.5,
+    judge: Optional[MockJudgeServer] = None,
+) -> BenchmarkReport:
+    """
+    Benchmark the reward path on synthetic rollouts, with every LLM judge served by a `MockJudgeServer`.
+
+    Each workload is scored as the datasource it maps to in `config_file` (see `DEFAULT_DATASOURCES`),
+    `warmup_batches` unmeasured batches first, then `num_batches` measured batches of `batch_size` items.
+
+    Args:
+        config_file (Union[str, Path]): The reward system config; its judge URLs and API keys are replaced.
+        workloads (Sequence[str]): Names from `WORKLOADS`.
+        datasources (Optional[dict[str, str]]): Overrides of `DEFAULT_DATASOURCES`.
+        batch_size (int): Items per `get_reward` call.
+        num_batches (int): Measured batches per workload.
+        warmup_batches (int): Unmeasured batches per workload, absorbing lazy imports and caches.
+        seed (int): Seed of the synthetic batches.
+        think_length (int): Mean length of the synthetic `<think>` parts.
+        correct_rate (float): Fraction of synthetic responses matching their ground truth.
+        judge (Optional[MockJudgeServer]): The mock judge, a default one (50 ms, no failures) if None.
+
+    Returns:
+        BenchmarkReport: One report per workload, serializable with `msgspec.json.encode`.
+    """
+    if batch_size <= 0 or num_batches <= 0:
+        err_msg = f"`batch_size` and `num_batches` should be positive, but got {batch_size} and {num_batches}."
+        raise ValueError(err_msg)
+    datasource_map = {**DEFAULT_DATASOURCES, **(datasources or {})}
+    unknown = [workload for workload in workloads if workload not in datasource_map]
+    if unknown:
+        err_msg = f"Unknown workloads {unknown}, expected names from {', '.join(WORKLOADS)}."
+        raise ValueError(err_msg)
+
+    run_id = next(_RUN_IDS)
+    aliases = {datasource_map[workload]: f"{datasource_map[workload]}@benchmark{run_id}" for workload in workloads}
+    judge = judge or MockJudgeServer()
+    recorder = _StageRecorder()
+    reports = []
+    with judge, tempfile.TemporaryDirectory() as tmp_dir, _record_llm_calls(recorder):
+        reward_system = RewardSystem(_write_benchmark_config(config_file, judge.url, aliases, Path(tmp_dir)))
+        for workload in workloads:
+            datasource = datasource_map[workload]
+            _logger.info("> Benchmarking workload `%s` as datasource `%s`", workload, datasource)
+            report = _run_workload(
+                reward_system,
+                recorder,
+                judge,
+                workload,
+                datasource,
+                aliases[datasource],
+                batch_size=batch_size,
+                num_batches=num_batches,
+                warmup_batches=warmup_batches,
+                seed=seed,
+                think_length=think_length,
+                correct_rate=correct_rate,
+            )
+            _logger.info(
+                "> %s: %.1f items/s, batch p50 %.1f ms, p99 %.1f ms, %.2f judge calls/item",
+                workload,
+                report.items_per_sec,
+                report.batch_latency_ms.p50,
+                report.batch_latency_ms.p99,
+                report.judge_calls_per_item,
+            )
+            reports.append(report)
+
+    return BenchmarkReport(
+        created_at=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        python_version=platform.python_version(),
+        platform=platform.platform(),
+        config_file=str(config_file),
+        batch_size=batch_size,
+        num_batches=num_batches,
+        judge_latency_ms=judge.latency_ms,
+        judge_error_rate=judge.error_rate,
+        judge_rate_limit_rate=judge.rate_limit_rate,
+        workloads=reports,
+    )
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+
+import json
+import random
+from collections.abc import Callable
+
+import msgspec
+
+# * the datasource of `configs/full_config.yaml` each workload is scored as by default; the `chart` datasource
+# * extracts from the raw `</think>` tail, which the `<answer>` tags required by the format check never pass
+DEFAULT_DATASOURCES = {
+    "math": "math",
+    "chart": "vqa",
+    "ocr": "ocr",
+    "gui": "WebVoyager",
+    "geoquest": "geoguess",
+}
+WORKLOADS = tuple(DEFAULT_DATASOURCES)
+
+_WORDS = (
+    "the value of each term is computed from the previous step so we first check the constraint "
+    "then substitute it back into the equation and compare both sides carefully before moving on "
+    "looking at the image the bar for march is slightly taller than february while the legend maps "
+    "colors to regions and the axis starts at zero which means the reading is reliable"
+).split()
+
+_CHART_LABELS = ("January", "February", "March", "April", "May", "June", "Q3 2021", "North America", "Retail")
+
+_PLACES = (
+    ("颐和园", "19 Xin Jian Gong Men Lu, Hai Dian Qu, China, 100091"),
+    ("National Japanese American Memorial", "Washington, DC 20001, USA"),
+    ("The Georgian House", "7 Charlotte Square, Edinburgh EH2 4DR, UK"),
+    ("东钱湖", "中国宁波市鄞州区东钱湖"),
+    ("上党门", "中国山西省长治市潞州区天晚集北路"),
+)
+
+
+class SyntheticBatch(msgspec.Struct):
+    """The `RewardSystem.get_reward` inputs of one synthetic rollout batch."""
+
+    prompts: list[str]
+    answers: list[str]
+    gt_answers: list[str]
+    image_files: list[None]
+
+
+def _text(rng: random.Random, length: int) -> str:
+    words: list[str] = []
+    size = 0
+    while size < length:
+        word = rng.choice(_WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)
+
+
+def _response(rng: random.Random, think_length: int, answer: str, prefix: str = "") -> str:
+    think = _text(rng, rng.randint(think_length // 2, think_length * 3 // 2))
+    return f"<think>{think}</think><answer>{prefix}<|begin_of_box|>{answer}<|end_of_box|></answer>"
+
+
+def _gt(answer: str) -> str:
+    return f"<think></think><answer><|begin_of_box|>{answer}<|end_of_box|></answer>"
+
+
+def _math(rng: random.Random, think_length: int, correct: bool) -> tuple[str, str, str]:
+    lhs, rhs = rng.randint(10, 999), rng.randint(10, 999)
+    result = lhs * rhs
+    # * a wrong answer fails the symbolic check and falls back to the LLM judge
+    answer = str(result if correct else result + rng.randint(1, 9))
+    return f"Compute {lhs} \\times {rhs}.", _response(rng, think_length, answer), _gt(str(result))
+
+
+def _chart(rng: random.Random, think_length: int, correct: bool) -> tuple[str, str, str]:
+    if rng.random() < 0.5:
+        value = str(round(rng.uniform(1, 500), 1))
+        answer = value if correct else str(round(float(value) * rng.uniform(1.2, 2.0), 1))
+        return "What is the value of the highest bar?", _response(rng, think_length, answer), _gt(value)
+    # * labels are not numbers, so mismatches go to the LLM judge
+    label, other = rng.sample(_CHART_LABELS, 2)
+    answer = label if correct else other
+    return "Which category has the highest value?", _response(rng, think_length, answer), _gt(label)
+
+
+def _ocr(rng: random.Random, think_length: int, correct: bool) -> tuple[str, str, str]:
+    text = _text(rng, rng.randint(200, 1500))
+    answer = text
+    if not correct:
+        chars = list(text)
+        for _ in range(rng.randint(1, max(1, len(chars) // 50))):
+            chars[rng.randrange(len(chars))] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+        answer = "".join(chars)
+    return "Transcribe all the text in the image.", _response(rng, think_length // 4, answer), _gt(text)
+
+
+def _gui_action(rng: random.Random) -> str:
+    x, y = rng.randint(0, 1280), rng.randint(0, 720)
+    box = f"[[{x - 20},{y - 8},{x + 20},{y + 8}]]"
+    return rng.choice(
+        (
+            f"CLICK(point=({x}, {y}), box={box}, element_info='Search')",
+            f"TYPE(point=({x}, {y}), text='cheap flights to tokyo', box={box}, element_info='Search box')",
+            f"SCROLL_DOWN(point=({x}, {y}), box={box}, distance=0.5, element_info='Results')",
+            "KEY_PRESS(key='Enter')",
+        )
+    )
+
+
+def _gui(rng: random.Random, think_length: int, correct: bool) -> tuple[str, str, str]:
+    gt_action = _gui_action(rng)
+    answer = gt_action if correct else _gui_action(rng)
+    prompt = "Task: book the cheapest flight to Tokyo. What is the next action?"
+    return prompt, _response(rng, think_length // 2, answer), _gt(gt_action)
+
+
+def _geoquest(rng: random.Random, think_length: int, correct: bool) -> tuple[str, str, str]:
+    place_name, address = rng.choice(_PLACES)
+    answer = place_name if correct else rng.choice(_PLACES)[0]
+    gt_answer = json.dumps({"place_name": place_name, "address": address}, ensure_ascii=False)
+    response = _response(rng, think_length, answer, prefix="这里可能是")
+    return "这张照片是在哪里拍的？", response, _gt(gt_answer)
+
+
+_GENERATORS: dict[str, Callable[[random.Random, int, bool], tuple[str, str, str]]] = {
+    "math": _math,
+    "chart": _chart,
+    "ocr": _ocr,
+    "gui": _gui,
+    "geoquest": _geoquest,
+}
+
+
+def make_batch(
+    workload: str,
+    batch_size: int,
+    seed: int = 0,
+    think_length: int = 2000,
+    correct_rate: float = 0.5,
+) -> SyntheticBatch:
+    """
+    Generate a deterministic batch of synthetic rollouts.
+
+    Args:
+        workload (str): One of `WORKLOADS`.
+        batch_size (int): Number of rollouts.
+        seed (int): Seed of the generator; the same seed always gives the same batch.
+        think_length (int): Mean length in characters of the `<think>` part of the responses.
+        correct_rate (float): Fraction of responses matching their ground truth; for the rule-based
+            verifiers with an LLM fallback, the others exercise the fallback.
+
+    Returns:
+        SyntheticBatch: The batch.
+    """
+    if workload not in _GENERATORS:
+        err_msg = f"Unknown workload `{workload}`, expected one of {', '.join(WORKLOADS)}."
+        raise ValueError(err_msg)
+    generator = _GENERATORS[workload]
+    rng = random.Random(f"{workload}-{seed}")  # noqa: S311
+    batch = SyntheticBatch(prompts=[], answers=[], gt_answers=[], image_files=[])
+    for _ in range(batch_size):
+        prompt, answer, gt_answer = generator(rng, think_length, rng.random() < correct_rate)
+        batch.prompts.append(prompt)
+        batch.answers.append(answer)
+        batch.gt_answers.append(gt_answer)
+        batch.image_files.append(None)
+    return batch
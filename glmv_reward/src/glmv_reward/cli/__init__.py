@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+
+
+import argparse
+import logging
+from collections.abc import Sequence
+from typing import Optional
+
+from . import bench, score, serve
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Entry point of the `glmv-reward` command."""
+    parser = argparse.ArgumentParser(prog="glmv-reward", description="GLM-V reward system tools.")
+    parser.add_argument("--log-level", default="INFO", help="Logging level (default: INFO).")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    score.add_parser(subparsers)
+    serve.add_parser(subparsers)
+    bench.add_parser(subparsers)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    return int(args.func(args))
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+
+import argparse
+import sys
+from typing import Any
+
+import msgspec
+
+from glmv_reward.benchmark import WORKLOADS, MockJudgeServer, run_benchmark
+from glmv_reward.utils.path import resolve_path
+
+
+def _parse_workload(value: str) -> tuple[str, str]:
+    workload, _, datasource = value.partition("=")
+    if workload not in WORKLOADS:
+        err_msg = f"invalid workload `{value}`, expected `<{'|'.join(WORKLOADS)}>[=<datasource>]`"
+        raise argparse.ArgumentTypeError(err_msg)
+    return workload, datasource
+
+
+def add_parser(subparsers: Any) -> None:
+    parser = subparsers.add_parser(
+        "bench",
+        help="Benchmark the reward path against a local mock LLM judge.",
+        description="Score synthetic rollout batches with every LLM judge served by a local mock, and report "
+        "throughput, latency, CPU time per stage and judge calls per item as JSON.",
+    )
+    parser.add_argument("--config", required=True, help="Reward system YAML config.")
+    parser.add_argument(
+        "--workload",
+        type=_parse_workload,
+        action="append",
+        default=[],
+        metavar="NAME[=DATASOURCE]",
+        help=f"Workload to run (one of {', '.join(WORKLOADS)}), optionally scored as DATASOURCE; "
+        "repeatable, all workloads by default.",
+    )
+    parser.add_argument("--batch-size", type=int, default=64, help="Items per reward call (default: 64).")
+    parser.add_argument("--num-batches", type=int, default=4, help="Measured batches per workload (default: 4).")
+    parser.add_argument("--warmup-batches", type=int, default=1, help="Unmeasured batches first (default: 1).")
+    parser.add_argument("--think-length", type=int, default=2000, help="Mean <think> length (default: 2000).")
+    parser.add_argument("--correct-rate", type=float, default=0.5, help="Fraction of correct responses (default: 0.5).")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic batches (default: 0).")
+    parser.add_argument("--judge-latency-ms", type=float, default=50.0, help="Mock judge latency (default: 50).")
+    parser.add_argument("--judge-jitter-ms", type=float, default=10.0, help="Mock judge jitter (default: 10).")
+    parser.add_argument("--judge-error-rate", type=float, default=0.0, help="Fraction of HTTP 500 (default: 0).")
+    parser.add_argument("--judge-429-rate", type=float, default=0.0, help="Fraction of HTTP 429 (default: 0).")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout.")
+    parser.set_defaults(func=run)
+
+
+def run(args: argparse.Namespace) -> int:
+    judge = MockJudgeServer(
+        latency_ms=args.judge_latency_ms,
+        latency_jitter_ms=args.judge_jitter_ms,
+        error_rate=args.judge_error_rate,
+        rate_limit_rate=args.judge_429_rate,
+        seed=args.seed,
+    )
+    workloads = [workload for workload, _ in args.workload] or list(WORKLOADS)
+    report = run_benchmark(
+        args.config,
+        workloads=workloads,
+        datasources={workload: datasource for workload, datasource in args.workload if datasource},
+        batch_size=args.batch_size,
+        num_batches=args.num_batches,
+        warmup_batches=args.warmup_batches,
+        seed=args.seed,
+        think_length=args.think_length,
+        correct_rate=args.correct_rate,
+        judge=judge,
+    )
+    payload = msgspec.json.format(msgspec.json.encode(report), indent=2)
+    if args.output:
+        output = resolve_path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_bytes(payload + b"\n")
+    else:
+        sys.stdout.buffer.write(payload + b"\n")
+    return 0
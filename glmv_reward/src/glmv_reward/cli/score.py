@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+
+
+import argparse
+import os
+import threading
+from collections import defaultdict
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Optional, Union
+
+import msgspec
+
+from glmv_reward.reward_system import RewardSystem
+from glmv_reward.utils.logging import get_logger
+from glmv_reward.utils.path import resolve_path
+
+_logger = get_logger(__name__)
+
+# * the record field each `RewardSystem.get_reward` argument is read from, overridable with `--field`
+DEFAULT_FIELDS = {
+    "uuid": "uuid",
+    "datasource": "datasource",
+    "prompt": "prompt",
+    "answer": "answer",
+    "gt_answer": "gt_answer",
+    "image_file": "image_file",
+}
+# * the position of each input record, written to the output so that interrupted runs can be resumed
+INDEX_FIELD = "record_index"
+
+_PARQUET_SUFFIXES = (".parquet", ".pq")
+
+
+class ScoreSummary(msgspec.Struct):
+    """Counters of a `score_file` run."""
+
+    num_scored: int = 0
+    num_skipped: int = 0
+    num_failed: int = 0
+    reward_sums: dict[str, float] = msgspec.field(default_factory=dict)
+    reward_counts: dict[str, int] = msgspec.field(default_factory=dict)
+
+
+def iter_records(path: Union[str, Path], parquet_batch_size: int = 1024) -> Iterator[dict[str, Any]]:
+    """
+    Lazily read the records of a JSONL or Parquet file.
+
+    Args:
+        path (Union[str, Path]): The input file; `.parquet` / `.pq` files are read with `pyarrow`,
+            anything else as one JSON object per line.
+        parquet_batch_size (int): Number of rows decoded at once from Parquet files.
+
+    Yields:
+        dict[str, Any]: One record per row.
+    """
+    pobj = resolve_path(path)
+    if pobj.suffix.lower() in _PARQUET_SUFFIXES:
+        try:
+            import pyarrow.parquet as pq  # noqa: PLC0415
+        except ImportError as e:
+            err_msg = "Reading Parquet files requires `pyarrow`, please install it first."
+            raise ImportError(err_msg) from e
+        for batch in pq.ParquetFile(pobj).iter_batches(batch_size=parquet_batch_size):
+            yield from batch.to_pylist()
+        return
+
+    decoder = msgspec.json.Decoder(dict[str, Any])
+    with open(pobj, "rb") as fobj:
+        for line in fobj:
+            if line.strip():
+                yield decoder.decode(line)
+
+
+def _load_checkpoint(output_path: Path) -> set[int]:
+    """
+    Collect the indices of the records already scored in `output_path`.
+
+    A trailing partial line, left by an interrupted write, is truncated so that appending can resume.
+    Records that failed to score (with a `reward_error`) are removed from the file, so that they are
+    scored again and every index appears once in the output.
+    """
+    done: set[int] = set()
+    if not output_path.is_file():
+        return done
+
+    decoder = msgspec.json.Decoder(dict[str, Any])
+    valid_size = 0
+    num_failed = 0
+    with open(output_path, "rb") as fobj:
+        for line in fobj:
+            try:
+                record = decoder.decode(line)
+            except msgspec.DecodeError:
+                break
+            if "reward_error" in record:
+                num_failed += 1
+            else:
+                done.add(record[INDEX_FIELD])
+            valid_size += len(line)
+
+    if num_failed > 0:
+        _logger.warning("> Dropping %d failed records from %s, to score them again.", num_failed, output_path)
+        tmp_path = output_path.with_name(f".{output_path.name}.tmp")
+        with open(output_path, "rb") as src, open(tmp_path, "wb") as dst:
+            read_size = 0
+            for line in src:
+                read_size += len(line)
+                if read_size > valid_size:
+                    break
+                if "reward_error" not in decoder.decode(line):
+                    dst.write(line)
+        os.replace(tmp_path, output_path)
+    elif valid_size != output_path.stat().st_size:
+        _logger.warning("> Truncating the incomplete tail of %s at byte %d.", output_path, valid_size)
+        os.truncate(output_path, valid_size)
+    return done
+
+
+class _OutputWriter(object):
+    """Appends scored batches to a JSONL file, one `write` + flush per batch, from any thread."""
+
+    def __init__(self, output_path: Path, fsync: bool) -> None:
+        self._fobj = open(output_path, "ab")  # noqa: SIM115
+        self._fsync = fsync
+        self._encoder = msgspec.json.Encoder(enc_hook=repr)
+        self._lock = threading.Lock()
+
+    def write(self, records: list[dict[str, Any]]) -> None:
+        payload = b"".join(self._encoder.encode(record) + b"\n" for record in records)
+        with self._lock:
+            self._fobj.write(payload)
+            self._fobj.flush()
+            if self._fsync:
+                os.fsync(self._fobj.fileno())
+
+    def close(self) -> None:
+        self._fobj.close()
+
+
+def _score_batch(
+    reward_system: RewardSystem,
+    datasource: str,
+    records: list[dict[str, Any]],
+    fields: dict[str, str],
+    return_extracted_answers: bool,
+) -> tuple[list[dict[str, Any]], bool]:
+    def _column(name: str) -> list[Any]:
+        return [record.get(fields[name]) for record in records]
+
+    try:
+        result = reward_system.get_reward(
+            prompts=_column("prompt"),
+            answers=_column("answer"),
+            gt_answers=_column("gt_answer"),
+            uuids=_column("uuid"),
+            image_files=_column("image_file"),
+            datasources=[datasource] * len(records),
+            return_extracted_answers=return_extracted_answers,
+        )
+    except Exception as e:
+        _logger.warning("> Failed to score %d records of datasource `%s`: %s", len(records), datasource, repr(e))
+        for record in records:
+            record["reward"] = None
+            record["reward_error"] = repr(e)
+        return records, False
+
+    rewards = result
+    if isinstance(result, tuple) and len(result) == 3:
+        rewards, extracted_ans, extracted_gt = result
+        for record, ans, gt in zip(records, extracted_ans, extracted_gt, strict=True):
+            record["extracted_answer"] = ans
+            record["extracted_gt"] = gt
+    for record, reward in zip(records, rewards, strict=True):
+        record["reward"] = reward
+    return records, True
+
+
+def score_file(
+    config_file: Union[str, Path],
+    input_path: Union[str, Path],
+    output_path: Union[str, Path],
+    batch_size: int = 256,
+    num_workers: int = 4,
+    fields: Optional[dict[str, str]] = None,
+    resume: bool = True,
+    return_extracted_answers: bool = False,
+    fsync: bool = False,
+) -> ScoreSummary:
+    """
+    Stream the records of `input_path` through a `RewardSystem` and append them, with their rewards, to `output_path`.
+
+    Records are grouped by datasource into batches of `batch_size`, which are scored by `num_workers`
+    threads; at most `2 * num_workers` batches are in flight, so memory stays bounded whatever the input
+    size. Every output record carries its input position in `record_index`, and output is written as soon
+    as a batch is scored, so with `resume` an interrupted run continues where it stopped.
+
+    Args:
+        config_file (Union[str, Path]): The reward system config.
+        input_path (Union[str, Path]): JSONL or Parquet file of rollouts.
+        output_path (Union[str, Path]): JSONL file the scored records are appended to.
+        batch_size (int): Maximum number of records per `get_reward` call.
+        num_workers (int): Number of batches scored concurrently.
+        fields (Optional[dict[str, str]]): Overrides of `DEFAULT_FIELDS`.
+        resume (bool): Skip the records already present in `output_path` instead of overwriting it.
+        return_extracted_answers (bool): Also write the extracted answer and ground truth of each record.
+        fsync (bool): `fsync` the output after every batch.
+
+    Returns:
+        ScoreSummary: Counters and per-datasource reward sums of this run.
+    """
+    if batch_size <= 0 or num_workers <= 0:
+        err_msg = f"`batch_size` and `num_workers` should be positive, but got {batch_size} and {num_workers}."
+        raise ValueError(err_msg)
+    field_map = {**DEFAULT_FIELDS, **(fields or {})}
+    output_pobj = resolve_path(output_path)
+    output_pobj.parent.mkdir(parents=True, exist_ok=True)
+    if not resume and output_pobj.exists():
+        output_pobj.unlink()
+    done = _load_checkpoint(output_pobj)
+    if done:
+        _logger.info("> Resuming: %d records of %s are already scored.", len(done), output_pobj)
+
+    reward_system = RewardSystem(config_file)
+    summary = ScoreSummary()
+    writer = _OutputWriter(output_pobj, fsync=fsync)
+    buffers: dict[str, list[dict[str, Any]]] = defaultdict(list)
+    in_flight: set[Future] = set()
+
+    def _collect(futures: set[Future]) -> None:
+        for future in futures:
+            records, ok = future.result()
+            writer.write(records)
+            if not ok:
+                summary.num_failed += len(records)
+                continue
+            summary.num_scored += len(records)
+            for record in records:
+                datasource = record[field_map["datasource"]]
+                summary.reward_sums[datasource] = summary.reward_sums.get(datasource, 0.0) + record["reward"]
+                summary.reward_counts[datasource] = summary.reward_counts.get(datasource, 0) + 1
+
+    def _submit(executor: ThreadPoolExecutor, datasource: str) -> None:
+        nonlocal in_flight
+        if len(in_flight) >= 2 * num_workers:
+            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            _collect(finished)
+        batch = buffers.pop(datasource)
+        in_flight.add(
+            executor.submit(_score_batch, reward_system, datasource, batch, field_map, return_extracted_answers)
+        )
+
+    try:
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            for idx, record in enumerate(iter_records(input_path)):
+                if idx in done:
+                    summary.num_skipped += 1
+                    continue
+                record[INDEX_FIELD] = idx
+                datasource = record.get(field_map["datasource"]) or "default"
+                record[field_map["datasource"]] = datasource
+                buffers[datasource].append(record)
+                if len(buffers[datasource]) >= batch_size:
+                    _submit(executor, datasource)
+            for datasource in list(buffers):
+                _submit(executor, datasource)
+            _collect(set(wait(in_flight).done))
+    finally:
+        writer.close()
+
+    for datasource, count in sorted(summary.reward_counts.items()):
+        _logger.info("> %s: %d records, mean reward %.4f", datasource, count, summary.reward_sums[datasource] / count)
+    _logger.info(
+        "> Scored %d records (%d skipped, %d failed), written to %s.",
+        summary.num_scored,
+        summary.num_skipped,
+        summary.num_failed,
+        output_pobj,
+    )
+    return summary
+
+
+def _parse_field(value: str) -> tuple[str, str]:
+    name, sep, key = value.partition("=")
+    if not sep or name not in DEFAULT_FIELDS:
+        err_msg = f"invalid field mapping `{value}`, expected `<{'|'.join(DEFAULT_FIELDS)}>=<record key>`"
+        raise argparse.ArgumentTypeError(err_msg)
+    return name, key
+
+
+def add_parser(subparsers: Any) -> None:
+    parser = subparsers.add_parser(
+        "score",
+        help="Score a JSONL/Parquet file of rollouts offline.",
+        description="Stream a JSONL/Parquet file of rollouts through the reward system and write the rewards.",
+    )
+    parser.add_argument("--config", required=True, help="Reward system YAML config.")
+    parser.add_argument("--input", required=True, help="JSONL or Parquet file of rollout records.")
+    parser.add_argument("--output", required=True, help="JSONL file the scored records are appended to.")
+    parser.add_argument("--batch-size", type=int, default=256, help="Records per reward call (default: 256).")
+    parser.add_argument("--num-workers", type=int, default=4, help="Batches scored concurrently (default: 4).")
+    parser.add_argument(
+        "--field",
+        type=_parse_field,
+        action="append",
+        default=[],
+        metavar="NAME=KEY",
+        help=f"Read NAME (one of {', '.join(DEFAULT_FIELDS)}) from the record key KEY; repeatable.",
+    )
+    parser.add_argument("--no-resume", action="store_true", help="Overwrite the output instead of resuming.")
+    parser.add_argument(
+        "--extracted-answers", action="store_true", help="Also write the extracted answer and ground truth."
+    )
+    parser.add_argument("--fsync", action="store_true", help="fsync the output after every batch.")
+    parser.set_defaults(func=run)
+
+
+def run(args: argparse.Namespace) -> int:
+    summary = score_file(
+        args.config,
+        args.input,
+        args.output,
+        batch_size=args.batch_size,
+        num_workers=args.num_workers,
+        fields=dict(args.field),
+        resume=not args.no_resume,
+        return_extracted_answers=args.extracted_answers,
+        fsync=args.fsync,
+    )
+    return 1 if summary.num_failed else 0
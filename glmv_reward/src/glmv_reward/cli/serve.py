@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+
+import argparse
+import signal
+from types import FrameType
+from typing import Any, Optional
+
+import msgspec
+
+from glmv_reward.serving import RewardServer
+from glmv_reward.utils.logging import get_logger
+from glmv_reward.utils.tracing import get_judge_tracer
+
+_logger = get_logger(__name__)
+
+
+def add_parser(subparsers: Any) -> None:
+    parser = subparsers.add_parser(
+        "serve",
+        help="Serve the reward system over a socket.",
+        description="Serve the reward system to RewardClient instances, batching concurrent requests together.",
+    )
+    parser.add_argument("--config", required=True, help="Reward system YAML config.")
+    parser.add_argument(
+        "--address",
+        default="unix:/tmp/glmv_reward.sock",
+        help="`unix:<path>` or `[tcp://]<host>:<port>` (default: unix:/tmp/glmv_reward.sock).",
+    )
+    parser.add_argument(
+        "--batch-window-ms",
+        type=float,
+        default=5.0,
+        help="How long a request waits for others of the same datasource (default: 5).",
+    )
+    parser.add_argument(
+        "--max-batch-size", type=int, default=1024, help="Items at which a batch is scored at once (default: 1024)."
+    )
+    parser.add_argument("--num-workers", type=int, default=8, help="Batches scored concurrently (default: 8).")
+    parser.add_argument(
+        "--judge-trace-dump",
+        default=None,
+        help="On SIGUSR1, write the recent judge call traces to this JSONL file and log the per-verifier aggregates.",
+    )
+    parser.set_defaults(func=run)
+
+
+def _install_trace_dump(path: str) -> None:
+    def _dump(signum: int, frame: Optional[FrameType]) -> None:
+        del signum, frame
+        tracer = get_judge_tracer()
+        tracer.dump(path)
+        for aggregate in tracer.aggregate():
+            _logger.info("> Judge calls: %s", msgspec.json.encode(aggregate).decode("utf-8"))
+
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, _dump)
+    else:
+        _logger.warning("> SIGUSR1 is not available on this platform, `--judge-trace-dump` is ignored")
+
+
+def run(args: argparse.Namespace) -> int:
+    server = RewardServer(
+        args.config,
+        args.address,
+        batch_window_ms=args.batch_window_ms,
+        max_batch_size=args.max_batch_size,
+        num_workers=args.num_workers,
+    )
+    if args.judge_trace_dump is not None:
+        _install_trace_dump(args.judge_trace_dump)
+    server.run()
+    return 0
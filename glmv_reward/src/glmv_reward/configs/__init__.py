@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 
 
-from .reward_system import RewardSystemConfig
+from .reward_system import JudgeTracingConfig, RewardSystemConfig
 
-__all__ = ["RewardSystemConfig"]
+__all__ = ["JudgeTracingConfig", "RewardSystemConfig"]
@@ -2,14 +2,22 @@
 
 
 from collections.abc import Mapping
+from typing import Optional
 
 import msgspec
 
 from .verifiers import VerifierConfig
 
 
+class JudgeTracingConfig(msgspec.Struct, frozen=True):
+    sample_rate: float = 1.0
+    capacity: int = 1024
+    record_payloads: bool = False
+
+
 class RewardSystemConfig(msgspec.Struct, frozen=True):
     datasource_reward_config_mapping: Mapping[str, str]
     reward_configs: Mapping[str, VerifierConfig]
     enable_mix_verifier: bool = True
     reward_log_dir: str = "logs"
+    judge_tracing: Optional[JudgeTracingConfig] = None
@@ -16,3 +16,5 @@ class CountingVerifierConfig(msgspec.Struct, frozen=True, tag_field="verifier_ty
     llm_max_tokens: int = 10
     llm_temperature: float = 0.1
     llm_top_p: float = 1.0
+    llm_judge_with_image: bool = False
+    llm_image_max_side: Optional[int] = 1024
@@ -11,4 +11,10 @@ class FileBasedVerifierConfig(msgspec.Struct, frozen=True, tag_field="verifier_t
     extract_answer_func_name: str
     judge_func_path: str
     judge_func_name: str
+    extract_answer_batch_func_name: Optional[str] = None
+    judge_batch_func_name: Optional[str] = None
     load_once: bool = True
+    execution_mode: str = "in_process"
+    num_workers: Optional[int] = None
+    worker_timeout: Optional[float] = None
+    worker_start_method: Optional[str] = None
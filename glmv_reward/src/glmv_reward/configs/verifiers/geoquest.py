@@ -15,4 +15,6 @@ class GeoQuestVerifierConfig(msgspec.Struct, frozen=True, tag_field="verifier_ty
     llm_max_tokens: int = 4096
     llm_temperature: float = 0.8
     llm_top_p: float = 0.6
+    llm_judge_with_image: bool = False
+    llm_image_max_side: Optional[int] = 1024
     strict_boxed_extraction: bool = True
@@ -18,3 +18,5 @@ class MathVerifierConfig(msgspec.Struct, frozen=True, tag_field="verifier_type",
     llm_max_tokens: int = 10
     llm_temperature: float = 0.1
     llm_top_p: float = 1.0
+    llm_judge_with_image: bool = False
+    llm_image_max_side: Optional[int] = 1024
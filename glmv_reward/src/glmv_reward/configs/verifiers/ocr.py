@@ -20,3 +20,8 @@ class OCRVerifierConfig(msgspec.Struct, frozen=True, tag_field="verifier_type",
     llm_max_tokens: int = 10
     llm_temperature: float = 0.1
     llm_top_p: float = 1.0
+    llm_judge_with_image: bool = False
+    llm_image_max_side: Optional[int] = 1024
+    long_document_mode: bool = False
+    long_document_min_length: int = 2000
+    long_document_max_block_length: int = 256
@@ -1,26 +1,36 @@
 # -*- coding: utf-8 -*-
 
 
+import contextlib
 import json
 import re
-from collections.abc import Sequence
+import time
+from collections.abc import Iterator, Sequence
 from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Optional, Union
+from typing import Any, Literal, Optional, Union, overload
 
 import msgspec
 
 from .configs import RewardSystemConfig
 from .configs.verifiers import VerifierConfig
 from .utils.logging import get_logger
+from .utils.metrics import BatchRecorder, BatchStats, RewardMetrics, thread_llm_usage
 from .utils.misc import ensure_list
 from .utils.path import mkdir
 from .utils.serialization import load_yaml
+from .utils.tracing import get_judge_tracer, judge_trace_scope
 from .verifiers import LanguageMixVerifier, Verifier, get_verifier_from_config
 
 _logger = get_logger(__name__)
 
 
+def _check_batch_size(results: Sequence[Any], num_items: int, func_name: str) -> None:
+    if len(results) != num_items:
+        err_msg = f"`{func_name}` should return {num_items} results, but got {len(results)}."
+        raise ValueError(err_msg)
+
+
 class RewardSystem(object):
     def __init__(self, config_file: Union[Path, str]) -> None:
         """
@@ -58,6 +68,17 @@ class RewardSystem(object):
         if reward_config.enable_mix_verifier:
             self.language_mix_verifier = LanguageMixVerifier()
 
+        # * stage histograms and outcome counters of every batch, published with `metrics.add_exporter`
+        self.metrics = RewardMetrics()
+        # * process-wide, as `post_query_llm` reports to it
+        self.judge_tracer = get_judge_tracer()
+        if reward_config.judge_tracing is not None:
+            self.judge_tracer.configure(
+                sample_rate=reward_config.judge_tracing.sample_rate,
+                capacity=reward_config.judge_tracing.capacity,
+                record_payloads=reward_config.judge_tracing.record_payloads,
+            )
+
         self.think_answer_pattern = re.compile(
             r"^<think>(.*?)</think>\s*<answer>(.*?)</answer>$", re.DOTALL | re.IGNORECASE
         )
@@ -69,35 +90,32 @@ class RewardSystem(object):
         gt_answer: Any,
         image_file: Optional[str],
         verifier: Verifier,
+        recorder: BatchRecorder,
         debug: bool = False,
     ) -> tuple[float, Any, Any]:
         min_reward = getattr(verifier, "min_reward", float("-inf"))
 
         try:
-            # if it is not a correct answer format, return -inf
-            if isinstance(answer, str) and not self.check_answer_format(answer):
-                return min_reward, None, None
-
-            # if it is not a correct gt_answer format, return -inf
-            if isinstance(gt_answer, str) and not self.check_answer_format(gt_answer):
-                _logger.warning("> Receive bad format gt_answer: %s, please check your data", gt_answer)
-                return min_reward, None, None
-
-            if self.language_mix_verifier is not None and not self.language_mix_verifier.judge(answer, gt_answer):
+            if not self._check_item_format(answer, gt_answer, recorder):
                 return min_reward, None, None
 
             # Extract ground truth
-            extracted_gt = verifier.extract_answer(gt_answer, question=prompt)
+            with recorder.stage("extract_gt"):
+                extracted_gt = verifier.extract_answer(gt_answer, question=prompt)
             if extracted_gt is None:
+                recorder.count("gt_extraction_failures")
                 _logger.warning(f"> Receive bad gt_answer: {gt_answer}, please check your data")
                 return min_reward, None, None
 
             # Extract and judge answer
-            extracted_ans = verifier.extract_answer(answer, question=prompt)
+            with recorder.stage("extract_answer"):
+                extracted_ans = verifier.extract_answer(answer, question=prompt)
             if extracted_ans is None or not isinstance(extracted_ans, (str, list, dict)):
+                recorder.count("extraction_failures")
                 return min_reward, extracted_ans, extracted_gt
 
         except Exception as e:
+            recorder.count("extraction_failures")
             _logger.warning("> Error in verifier extract_answer due to exception: %s", repr(e))
             return min_reward, None, None
         else:
@@ -113,19 +131,175 @@ class RewardSystem(object):
 
             try:
                 # Get reward
-                reward = verifier.judge(extracted_ans, extracted_gt, question=prompt, image_file=image_file)
+                with self._judge_stage(recorder, verifier):
+                    reward = verifier.judge(extracted_ans, extracted_gt, question=prompt, image_file=image_file)
             except Exception as e:
+                recorder.count("judge_errors")
                 _logger.warning("> Error in verifier judge: %s", repr(e))
                 reward = min_reward
 
             try:
                 reward = float(reward)
             except Exception:
+                recorder.count("judge_errors")
                 _logger.warning("> reward from verifier judge should be able to convert to float, but got: %s.", reward)
                 reward = min_reward
 
             return reward, extracted_ans, extracted_gt
 
+    @contextlib.contextmanager
+    def _judge_stage(self, recorder: BatchRecorder, verifier: Verifier) -> Iterator[None]:
+        """
+        Time a judge call, splitting the rule-based part from the LLM judge calls it makes, which are
+        traced as calls of `verifier`.
+        """
+        calls_before, seconds_before = thread_llm_usage()
+        start = time.perf_counter()
+        try:
+            with recorder.activate(), judge_trace_scope(type(verifier).__name__):
+                yield
+        finally:
+            elapsed = time.perf_counter() - start
+            calls_after, seconds_after = thread_llm_usage()
+            recorder.observe("rule_judge", max(0.0, elapsed - (seconds_after - seconds_before)))
+            if calls_after > calls_before:
+                recorder.count("llm_fallbacks")
+
+    def _check_item_format(self, answer: Any, gt_answer: Any, recorder: BatchRecorder) -> bool:
+        with recorder.stage("format_check"):
+            # if it is not a correct answer format, return -inf
+            answer_ok = not isinstance(answer, str) or self.check_answer_format(answer)
+            # if it is not a correct gt_answer format, return -inf
+            gt_answer_ok = not answer_ok or not isinstance(gt_answer, str) or self.check_answer_format(gt_answer)
+        if not answer_ok:
+            recorder.count("format_failures")
+            return False
+        if not gt_answer_ok:
+            recorder.count("format_failures")
+            _logger.warning("> Receive bad format gt_answer: %s, please check your data", gt_answer)
+            return False
+
+        if self.language_mix_verifier is not None:
+            with recorder.stage("language_mix"):
+                language_ok = self.language_mix_verifier.judge(answer, gt_answer)
+            if not language_ok:
+                recorder.count("language_mix_failures")
+                return False
+
+        return True
+
+    def _process_batch(
+        self,
+        prompts: list[str],
+        answers: list[Any],
+        gt_answers: list[Any],
+        image_files: list[Optional[str]],
+        verifier: Verifier,
+        recorder: BatchRecorder,
+    ) -> tuple[list[float], list, list]:
+        """
+        Batch counterpart of `_process_single_item` for verifiers with `is_batch_verifier` set.
+
+        Applies the same per-item format gates, then extracts and judges all remaining items
+        with one `extract_answer_batch` / `judge_batch` call each. When a batch call fails, its
+        items are processed one by one, so that a failing item only costs its own reward.
+        """
+        min_reward = getattr(verifier, "min_reward", float("-inf"))
+        num_items = len(prompts)
+        rewards: list[float] = [min_reward] * num_items
+        extracted_ans_lst: list[Any] = [None] * num_items
+        extracted_gt_lst: list[Any] = [None] * num_items
+
+        indices = []
+        for idx, (answer, gt_answer) in enumerate(zip(answers, gt_answers, strict=True)):
+            try:
+                if self._check_item_format(answer, gt_answer, recorder):
+                    indices.append(idx)
+            except Exception as e:
+                recorder.count("extraction_failures")
+                _logger.warning("> Error in verifier extract_answer due to exception: %s", repr(e))
+        if len(indices) == 0:
+            return rewards, extracted_ans_lst, extracted_gt_lst
+
+        questions = [prompts[idx] for idx in indices]
+        try:
+            with recorder.stage("extract_gt"):
+                batch_extracted_gt = verifier.extract_answer_batch([gt_answers[idx] for idx in indices], questions)
+            with recorder.stage("extract_answer"):
+                batch_extracted_ans = verifier.extract_answer_batch([answers[idx] for idx in indices], questions)
+            _check_batch_size(batch_extracted_gt, len(indices), "extract_answer_batch")
+            _check_batch_size(batch_extracted_ans, len(indices), "extract_answer_batch")
+        except Exception as e:
+            _logger.warning("> Error in verifier extract_answer_batch, extracting item by item: %s", repr(e))
+            batch_extracted_gt, batch_extracted_ans = [], []
+            extracted_indices = []
+            for idx, question in zip(indices, questions, strict=True):
+                try:
+                    with recorder.stage("extract_gt"):
+                        extracted_gt = verifier.extract_answer(gt_answers[idx], question=question)
+                    with recorder.stage("extract_answer"):
+                        extracted_ans = verifier.extract_answer(answers[idx], question=question)
+                except Exception as item_e:
+                    recorder.count("extraction_failures")
+                    _logger.warning("> Error in verifier extract_answer due to exception: %s", repr(item_e))
+                    continue
+                extracted_indices.append(idx)
+                batch_extracted_gt.append(extracted_gt)
+                batch_extracted_ans.append(extracted_ans)
+            indices = extracted_indices
+
+        judge_indices = []
+        for idx, extracted_ans, extracted_gt in zip(indices, batch_extracted_ans, batch_extracted_gt, strict=True):
+            if extracted_gt is None:
+                recorder.count("gt_extraction_failures")
+                _logger.warning(f"> Receive bad gt_answer: {gt_answers[idx]}, please check your data")
+                continue
+            extracted_ans_lst[idx] = extracted_ans
+            extracted_gt_lst[idx] = extracted_gt
+            if extracted_ans is None or not isinstance(extracted_ans, (str, list, dict)):
+                recorder.count("extraction_failures")
+                continue
+            judge_indices.append(idx)
+        if len(judge_indices) == 0:
+            return rewards, extracted_ans_lst, extracted_gt_lst
+
+        try:
+            with self._judge_stage(recorder, verifier):
+                batch_rewards = verifier.judge_batch(
+                    [extracted_ans_lst[idx] for idx in judge_indices],
+                    [extracted_gt_lst[idx] for idx in judge_indices],
+                    [prompts[idx] for idx in judge_indices],
+                    [image_files[idx] for idx in judge_indices],
+                )
+            _check_batch_size(batch_rewards, len(judge_indices), "judge_batch")
+        except Exception as e:
+            _logger.warning("> Error in verifier judge_batch, judging item by item: %s", repr(e))
+            batch_rewards = []
+            for idx in judge_indices:
+                try:
+                    with self._judge_stage(recorder, verifier):
+                        batch_rewards.append(
+                            verifier.judge(
+                                extracted_ans_lst[idx],
+                                extracted_gt_lst[idx],
+                                question=prompts[idx],
+                                image_file=image_files[idx],
+                            )
+                        )
+                except Exception as item_e:
+                    recorder.count("judge_errors")
+                    _logger.warning("> Error in verifier judge: %s", repr(item_e))
+                    batch_rewards.append(min_reward)
+
+        for idx, reward in zip(judge_indices, batch_rewards, strict=True):
+            try:
+                rewards[idx] = float(reward)
+            except Exception:
+                recorder.count("judge_errors")
+                _logger.warning("> reward from verifier judge should be able to convert to float, but got: %s.", reward)
+
+        return rewards, extracted_ans_lst, extracted_gt_lst
+
     @classmethod
     def from_yaml(cls, config_file: Union[Path, str]) -> "RewardSystem":
         """
@@ -186,6 +360,82 @@ class RewardSystem(object):
         reward_config = self.get_reward_config_from_datasource(datasource)
         return get_verifier_from_config(reward_config, datasource)
 
+    @overload
+    def get_reward(
+        self,
+        prompts: Union[Sequence[str], str],
+        answers: Union[Sequence[str], str],
+        gt_answers: Union[Sequence[str], str],
+        uuids: Optional[Union[Sequence[str], str]] = None,
+        image_files: Optional[Union[Sequence[str], str]] = None,
+        answer_lengths: Optional[Union[Sequence[int], int]] = None,
+        datasources: Optional[Sequence[str] | str] = None,
+        log_reward_judge: bool = False,
+        save_dir: Optional[str] = None,
+        current_iteration: int = 0,
+        debug: bool = False,
+        return_extracted_answers: Literal[False] = False,
+        return_stats: Literal[False] = False,
+    ) -> list[float]: ...
+
+    @overload
+    def get_reward(
+        self,
+        prompts: Union[Sequence[str], str],
+        answers: Union[Sequence[str], str],
+        gt_answers: Union[Sequence[str], str],
+        uuids: Optional[Union[Sequence[str], str]] = None,
+        image_files: Optional[Union[Sequence[str], str]] = None,
+        answer_lengths: Optional[Union[Sequence[int], int]] = None,
+        datasources: Optional[Sequence[str] | str] = None,
+        log_reward_judge: bool = False,
+        save_dir: Optional[str] = None,
+        current_iteration: int = 0,
+        debug: bool = False,
+        *,
+        return_extracted_answers: Literal[True],
+        return_stats: Literal[False] = False,
+    ) -> tuple[list[float], list, list]: ...
+
+    @overload
+    def get_reward(
+        self,
+        prompts: Union[Sequence[str], str],
+        answers: Union[Sequence[str], str],
+        gt_answers: Union[Sequence[str], str],
+        uuids: Optional[Union[Sequence[str], str]] = None,
+        image_files: Optional[Union[Sequence[str], str]] = None,
+        answer_lengths: Optional[Union[Sequence[int], int]] = None,
+        datasources: Optional[Sequence[str] | str] = None,
+        log_reward_judge: bool = False,
+        save_dir: Optional[str] = None,
+        current_iteration: int = 0,
+        debug: bool = False,
+        return_extracted_answers: Literal[False] = False,
+        *,
+        return_stats: Literal[True],
+    ) -> tuple[list[float], BatchStats]: ...
+
+    @overload
+    def get_reward(
+        self,
+        prompts: Union[Sequence[str], str],
+        answers: Union[Sequence[str], str],
+        gt_answers: Union[Sequence[str], str],
+        uuids: Optional[Union[Sequence[str], str]] = None,
+        image_files: Optional[Union[Sequence[str], str]] = None,
+        answer_lengths: Optional[Union[Sequence[int], int]] = None,
+        datasources: Optional[Sequence[str] | str] = None,
+        log_reward_judge: bool = False,
+        save_dir: Optional[str] = None,
+        current_iteration: int = 0,
+        debug: bool = False,
+        *,
+        return_extracted_answers: Literal[True],
+        return_stats: Literal[True],
+    ) -> tuple[list[float], list, list, BatchStats]: ...
+
+    @overload
     def get_reward(
         self,
         prompts: Union[Sequence[str], str],
@@ -200,7 +450,35 @@ class RewardSystem(object):
         current_iteration: int = 0,
         debug: bool = False,
         return_extracted_answers: bool = False,
-    ) -> Union[list[float], tuple[list[float], list, list]]:
+        return_stats: bool = False,
+    ) -> Union[
+        list[float],
+        tuple[list[float], list, list],
+        tuple[list[float], BatchStats],
+        tuple[list[float], list, list, BatchStats],
+    ]: ...
+
+    def get_reward(
+        self,
+        prompts: Union[Sequence[str], str],
+        answers: Union[Sequence[str], str],
+        gt_answers: Union[Sequence[str], str],
+        uuids: Optional[Union[Sequence[str], str]] = None,
+        image_files: Optional[Union[Sequence[str], str]] = None,
+        answer_lengths: Optional[Union[Sequence[int], int]] = None,
+        datasources: Optional[Sequence[str] | str] = None,
+        log_reward_judge: bool = False,
+        save_dir: Optional[str] = None,
+        current_iteration: int = 0,
+        debug: bool = False,
+        return_extracted_answers: bool = False,
+        return_stats: bool = False,
+    ) -> Union[
+        list[float],
+        tuple[list[float], list, list],
+        tuple[list[float], BatchStats],
+        tuple[list[float], list, list, BatchStats],
+    ]:
         # TODO: revises the typing hints in the docstring
         """
         Get reward from reward model.
@@ -218,10 +496,11 @@ class RewardSystem(object):
             current_iteration (int): Current iteration number
             debug (bool): Whether to enable debug mode
             return_extracted_answers (bool): If True, returns tuple (rewards, extracted_ans_list, extracted_gt_list)
+            return_stats (bool): If True, also returns the `BatchStats` of this call as the last tuple element
 
         Returns:
             A list of rewards or a tuple of consisting of a list of rewards, a list of extracted answers,
-            and a list of extracted ground truth.
+            and a list of extracted ground truth, followed by the batch stats if `return_stats` is set.
         """
         if debug:
             breakpoint()
@@ -251,31 +530,88 @@ class RewardSystem(object):
             raise ValueError(err_msg)
         datasource = datasource_lst[0]
 
-        # Process each prompt-answer-gt triplet using threads
-        all_rewards: list[float] = []
-        all_extracted_ans = []
-        all_extracted_gt = []
-
         reward_config = self.get_reward_config_from_datasource(datasource)
         verifier = get_verifier_from_config(reward_config, datasource)
+        recorder = BatchRecorder(datasource, num_items=len(prompt_lst))
+        all_rewards, all_extracted_ans, all_extracted_gt = self._score_items(
+            prompt_lst, answer_lst, gt_answer_lst, image_file_lst, verifier, recorder, debug=debug
+        )
+        recorder.count("inf_rewrites", all_rewards.count(float("-inf")))
+        all_rewards = self._replace_inf_rewards(all_rewards)
 
-        if verifier.is_batch_verifier:
-            # ! mypy issue, invalid signature and return type
-            batch_rewards = verifier.judge(
-                prompts=prompt_lst, answers=answer_lst, gt_answers=gt_answer_lst, image_files=image_file_lst
-            )
+        if log_reward_judge:
+            if not (
+                len(prompt_lst)
+                == len(image_file_lst)
+                == len(answer_lst)
+                == len(gt_answer_lst)
+                == len(datasource_lst)
+                == len(all_rewards)
+                == len(answer_length_lst)
+                == len(uuid_lst)
+            ):
+                err_msg = (
+                    "The length of prompts, image_files, answers, gt_answers, datasources, all_rewards, "
+                    "answer_lengths, and uuids should be the same."
+                )
+                raise ValueError(err_msg)
 
-            all_rewards = batch_rewards
+            with recorder.stage("log"):
+                self._log_reward_judge(
+                    log_save_dir,
+                    datasource,
+                    prompt_lst,
+                    image_file_lst,
+                    answer_lst,
+                    gt_answer_lst,
+                    all_rewards,
+                    answer_length_lst,
+                    uuid_lst,
+                    current_iteration,
+                )
 
-            for answer, gt_answer, prompt in zip(answer_lst, gt_answer_lst, prompt_lst):  # noqa: B905
-                extracted_ans = verifier.extract_answer(answer, question=prompt)
-                extracted_gt = verifier.extract_answer(gt_answer, question=prompt)
-                all_extracted_ans.append(extracted_ans)
-                all_extracted_gt.append(extracted_gt)
+        recorder.observe("batch", time.perf_counter() - recorder.start)
+        self.metrics.record(recorder)
+        self.metrics.export()
+
+        if return_extracted_answers and return_stats:
+            return all_rewards, all_extracted_ans, all_extracted_gt, recorder.to_stats()
+        if return_extracted_answers:
+            return all_rewards, all_extracted_ans, all_extracted_gt
+        if return_stats:
+            return all_rewards, recorder.to_stats()
+
+        return all_rewards
+
+    def _score_items(
+        self,
+        prompt_lst: list[str],
+        answer_lst: list[Any],
+        gt_answer_lst: list[Any],
+        image_file_lst: list[Optional[str]],
+        verifier: Verifier,
+        recorder: BatchRecorder,
+        debug: bool = False,
+    ) -> tuple[list[float], list[Any], list[Any]]:
+        """
+        Score prompt-answer-gt triplets of a single datasource, without post-processing the rewards.
+
+        Batch verifiers get the whole batch at once, other verifiers are called per item from a thread pool.
+        Stage timings and outcome counters are collected in `recorder`.
+        """
+        recorder.count("items", len(prompt_lst))
+        all_rewards: list[float] = []
+        all_extracted_ans: list[Any] = []
+        all_extracted_gt: list[Any] = []
+
+        if verifier.is_batch_verifier:
+            all_rewards, all_extracted_ans, all_extracted_gt = self._process_batch(
+                prompt_lst, answer_lst, gt_answer_lst, image_file_lst, verifier, recorder
+            )
 
         else:
             # Create thread pool
-            with ThreadPoolExecutor(max_workers=min(128, len(prompts))) as executor:
+            with ThreadPoolExecutor(max_workers=min(128, len(prompt_lst))) as executor:
                 # Submit all tasks and store futures in order
                 futures = []
                 for prompt, answer, gt_answer, image_file in zip(prompt_lst, answer_lst, gt_answer_lst, image_file_lst):  # noqa: B905
@@ -286,6 +622,7 @@ class RewardSystem(object):
                         gt_answer,
                         image_file,
                         verifier,
+                        recorder,
                         debug=debug,
                     )
                     futures.append(future)
@@ -295,102 +632,100 @@ class RewardSystem(object):
                     all_extracted_ans.append(extracted_ans)
                     all_extracted_gt.append(extracted_gt)
 
+        return all_rewards, all_extracted_ans, all_extracted_gt
+
+    @staticmethod
+    def _replace_inf_rewards(rewards: list[float]) -> list[float]:
         # Check if there are any -inf rewards
         # make -inf rewards to min reward
         # if all -inf, make all rewards to 0
-        if any(reward == float("-inf") for reward in all_rewards):
-            non_inf_rewards = [r for r in all_rewards if r != float("-inf")]
+        if any(reward == float("-inf") for reward in rewards):
+            non_inf_rewards = [r for r in rewards if r != float("-inf")]
             if len(non_inf_rewards) > 0:
                 min_non_inf = min(non_inf_rewards)
-                all_rewards = [min_non_inf if r == float("-inf") else r for r in all_rewards]
+                rewards = [min_non_inf if r == float("-inf") else r for r in rewards]
             else:
-                all_rewards = [0.0 if r == float("-inf") else r for r in all_rewards]
-
-        if log_reward_judge:
-            if not (
-                len(prompt_lst)
-                == len(image_file_lst)
-                == len(answer_lst)
-                == len(gt_answer_lst)
-                == len(datasource_lst)
-                == len(all_rewards)
-                == len(answer_length_lst)
-                == len(uuid_lst)
-            ):
-                err_msg = (
-                    "The length of prompts, image_files, answers, gt_answers, datasources, all_rewards, "
-                    "answer_lengths, and uuids should be the same."
-                )
-                raise ValueError(err_msg)
+                rewards = [0.0 if r == float("-inf") else r for r in rewards]
+        return rewards
 
-            save_pobj = mkdir(log_save_dir)
-            datasource_dir = save_pobj / datasource
-            _ = mkdir(datasource_dir)
-
-            reward_status = "pass@k" if any(reward > 0.75 for reward in all_rewards) else "not_pass@k"
-            # Log each reward data pair
-            for prompt, image_file, answer, gt_answer, reward, answer_length, uuid in zip(
-                prompt_lst,
-                image_file_lst,
-                answer_lst,
-                gt_answer_lst,
-                all_rewards,
-                answer_length_lst,
-                uuid_lst,
-                strict=True,
-            ):
-                # Setup save directory and path
-                rollout_save_pobj = datasource_dir / f"rollout_reward_{reward_status}.jsonl"
-
-                # Write reward data to file
-                reward_data = {
-                    "current_iteration": current_iteration,
-                    "prompt": prompt,
-                    "image_file": image_file,
-                    "answer": answer,
-                    "gt_answer": gt_answer,
-                    "reward": reward,
-                    "answer_token_length": answer_length,
-                    "reward_sum_of_this_prompt": sum(all_rewards),
-                    "uuid": uuid,
-                }
-                with open(rollout_save_pobj, "a") as f:
-                    f.write(json.dumps(reward_data, ensure_ascii=False) + "\n")
-
-            for prompt, image_file, answer, gt_answer, reward, answer_length, uuid in zip(
-                prompt_lst,
-                image_file_lst,
-                answer_lst,
-                gt_answer_lst,
-                all_rewards,
-                answer_length_lst,
-                uuid_lst,
-                strict=True,
-            ):
-                reward_status = "correct" if reward > 0 else "incorrect"
-                rollout_save_pobj = datasource_dir / f"rollout_reward_{reward_status}.jsonl"
-                with open(rollout_save_pobj, "a") as f:
-                    f.write(
-                        json.dumps(
-                            {
-                                "current_iteration": current_iteration,
-                                "prompt": prompt,
-                                "image_file": image_file,
-                                "answer": answer,
-                                "answer_token_length": answer_length,
-                                "gt_answer": gt_answer,
-                                "reward": reward,
-                                "reward_sum_of_this_prompt": sum(all_rewards),
-                                "uuid": uuid,
-                            },
-                            ensure_ascii=False,
-                        )
-                        + "\n"
+    def _log_reward_judge(
+        self,
+        log_save_dir: str,
+        datasource: str,
+        prompt_lst: list[str],
+        image_file_lst: list[Optional[str]],
+        answer_lst: list[str],
+        gt_answer_lst: list[str],
+        all_rewards: list[float],
+        answer_length_lst: list[int],
+        uuid_lst: list[Optional[str]],
+        current_iteration: int,
+    ) -> None:
+        """Append the rewards of one `get_reward` batch to the per-datasource judge logs under `log_save_dir`."""
+        save_pobj = mkdir(log_save_dir)
+        datasource_dir = save_pobj / datasource
+        _ = mkdir(datasource_dir)
+
+        reward_status = "pass@k" if any(reward > 0.75 for reward in all_rewards) else "not_pass@k"
+        # Log each reward data pair
+        for prompt, image_file, answer, gt_answer, reward, answer_length, uuid in zip(
+            prompt_lst,
+            image_file_lst,
+            answer_lst,
+            gt_answer_lst,
+            all_rewards,
+            answer_length_lst,
+            uuid_lst,
+            strict=True,
+        ):
+            # Setup save directory and path
+            rollout_save_pobj = datasource_dir / f"rollout_reward_{reward_status}.jsonl"
+
+            # Write reward data to file
+            reward_data = {
+                "current_iteration": current_iteration,
+                "prompt": prompt,
+                "image_file": image_file,
+                "answer": answer,
+                "gt_answer": gt_answer,
+                "reward": reward,
+                "answer_token_length": answer_length,
+                "reward_sum_of_this_prompt": sum(all_rewards),
+                "uuid": uuid,
+            }
+            with open(rollout_save_pobj, "a") as f:
+                f.write(json.dumps(reward_data, ensure_ascii=False) + "\n")
+
+        for prompt, image_file, answer, gt_answer, reward, answer_length, uuid in zip(
+            prompt_lst,
+            image_file_lst,
+            answer_lst,
+            gt_answer_lst,
+            all_rewards,
+            answer_length_lst,
+            uuid_lst,
+            strict=True,
+        ):
+            reward_status = "correct" if reward > 0 else "incorrect"
+            rollout_save_pobj = datasource_dir / f"rollout_reward_{reward_status}.jsonl"
+            with open(rollout_save_pobj, "a") as f:
+                f.write(
+                    json.dumps(
+                        {
+                            "current_iteration": current_iteration,
+                            "prompt": prompt,
+                            "image_file": image_file,
+                            "answer": answer,
+                            "answer_token_length": answer_length,
+                            "gt_answer": gt_answer,
+                            "reward": reward,
+                            "reward_sum_of_this_prompt": sum(all_rewards),
+                            "uuid": uuid,
+                        },
+                        ensure_ascii=False,
                     )
-        if return_extracted_answers:
-            return all_rewards, all_extracted_ans, all_extracted_gt
-
-        return all_rewards
+                    + "\n"
+                )
 
     def extract_answer_from_response(
         self, answers: Union[Sequence[str], str], datasources: Union[Sequence[str], str]
@@ -399,7 +734,7 @@ class RewardSystem(object):
         answer_lst: list[str] = ensure_list(answers)
         datasource_lst: list[str] = ensure_list(datasources)
 
-        all_extracted_ans = []
+        all_extracted_ans: list[Any] = []
 
         for answer, datasource in zip(answer_lst, datasource_lst, strict=True):
             reward_config = self.get_reward_config_from_datasource(datasource)
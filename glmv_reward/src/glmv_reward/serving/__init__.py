@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+
+
+from .client import RewardClient
+from .server import RewardServer, ServerStats
+
+__all__ = ["RewardClient", "RewardServer", "ServerStats"]
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+
+
+import itertools
+import socket
+import threading
+from types import TracebackType
+from typing import Any, Literal, Optional, Union, overload
+
+import msgspec
+
+from glmv_reward.utils.logging import get_logger
+from glmv_reward.utils.metrics import BatchStats
+from glmv_reward.utils.misc import ensure_list
+
+from .protocol import RewardRequest, RewardResponse, encode_frame, parse_address, recv_frame
+
+_logger = get_logger(__name__)
+
+
+class RewardClient(object):
+    def __init__(self, address: str, timeout: Optional[float] = None) -> None:
+        """
+        A blocking client of a `RewardServer`, with the same `get_reward` signature as `RewardSystem`.
+
+        The connection is opened on first use and re-opened once if it turns out to be stale. One client
+        may be shared by several threads; their calls are serialized, so use one client per thread to let
+        the server batch them together.
+
+        Args:
+            address (str): The server address, see `glmv_reward.serving.protocol.parse_address`.
+            timeout (Optional[float]): Socket timeout in seconds, None to wait forever.
+        """
+        self.address = address
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._lock = threading.Lock()
+        self._request_ids = itertools.count()
+        self._encoder = msgspec.msgpack.Encoder(enc_hook=repr)
+        self._decoder = msgspec.msgpack.Decoder(RewardResponse)
+
+    def _connect(self) -> socket.socket:
+        _, address = parse_address(self.address)
+        if isinstance(address, str):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(address)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _send(self, payload: bytes) -> socket.socket:
+        if self._sock is not None:
+            try:
+                self._sock.sendall(payload)
+            except OSError as e:
+                _logger.warning("> Reconnecting to reward server %s: %s", self.address, repr(e))
+                self.close()
+            else:
+                return self._sock
+        self._sock = self._connect()
+        self._sock.sendall(payload)
+        return self._sock
+
+    def _call(self, request: RewardRequest) -> RewardResponse:
+        payload = encode_frame(self._encoder.encode(request))
+        with self._lock:
+            try:
+                sock = self._send(payload)
+                response = self._decoder.decode(recv_frame(sock))
+            except BaseException:
+                # * the stream is out of sync after a partial exchange
+                self.close()
+                raise
+        if response.request_id != request.request_id:
+            err_msg = f"Reward server answered request {response.request_id} instead of {request.request_id}."
+            raise RuntimeError(err_msg)
+        return response
+
+    @overload
+    def get_reward(
+        self,
+        prompts: Union[list[Any], Any],
+        answers: Union[list[Any], Any],
+        gt_answers: Union[list[Any], Any],
+        uuids: Optional[Union[list[Any], Any]] = None,
+        image_files: Optional[Union[list[Any], Any]] = None,
+        answer_lengths: Optional[Union[list[Any], Any]] = None,
+        datasources: Optional[list[str]] = None,
+        log_reward_judge: bool = False,
+        save_dir: Optional[str] = None,
+        current_iteration: int = 0,
+        debug: bool = False,
+        return_extracted_answers: Literal[False] = False,
+        return_stats: Literal[False] = False,
+    ) -> list[float]: ...
+
+    @overload
+    def get_reward(
+        self,
+        prompts: Union[list[Any], Any],
+        answers: Union[list[Any], Any],
+        gt_answers: Union[list[Any], Any],
+        uuids: Optional[Union[list[Any], Any]] = None,
+        image_files: Optional[Union[list[Any], Any]] = None,
+        answer_lengths: Optional[Union[list[Any], Any]] = None,
+        datasources: Optional[list[str]] = None,
+        log_reward_judge: bool = False,
+        save_dir: Optional[str] = None,
+        current_iteration: int = 0,
+        debug: bool = False,
+        *,
+        return_extracted_answers: Literal[True],
+        return_stats: Literal[False] = False,
+    ) -> tuple[list[float], list[Any], list[Any]]: ...
+
+    @overload
+    def get_reward(
+        self,
+        prompts: Union[list[Any], Any],
+        answers: Union[list[Any], Any],
+        gt_answers: Union[list[Any], Any],
+        uuids: Optional[Union[list[Any], Any]] = None,
+        image_files: Optional[Union[list[Any], Any]] = None,
+        answer_lengths: Optional[Union[list[Any], Any]] = None,
+        datasources: Optional[list[str]] = None,
+        log_reward_judge: bool = False,
+        save_dir: Optional[str] = None,
+        current_iteration: int = 0,
+        debug: bool = False,
+        return_extracted_answers: Literal[False] = False,
+        *,
+        return_stats: Literal[True],
+    ) -> tuple[list[float], BatchStats]: ...
+
+    @overload
+    def get_reward(
+        self,
+        prompts: Union[list[Any], Any],
+        answers: Union[list[Any], Any],
+        gt_answers: Union[list[Any], Any],
+        uuids: Optional[Union[list[Any], Any]] = None,
+        image_files: Optional[Union[list[Any], Any]] = None,
+        answer_lengths: Optional[Union[list[Any], Any]] = None,
+        datasources: Optional[list[str]] = None,
+        log_reward_judge: bool = False,
+        save_dir: Optional[str] = None,
+        current_iteration: int = 0,
+        debug: bool = False,
+        *,
+        return_extracted_answers: Literal[True],
+        return_stats: Literal[True],
+    ) -> tuple[list[float], list[Any], list[Any], BatchStats]: ...
+
+    @overload
+    def get_reward(
+        self,
+        prompts: Union[list[Any], Any],
+        answers: Union[list[Any], Any],
+        gt_answers: Union[list[Any], Any],
+        uuids: Optional[Union[list[Any], Any]] = None,
+        image_files: Optional[Union[list[Any], Any]] = None,
+        answer_lengths: Optional[Union[list[Any], Any]] = None,
+        datasources: Optional[list[str]] = None,
+        log_reward_judge: bool = False,
+        save_dir: Optional[str] = None,
+        current_iteration: int = 0,
+        debug: bool = False,
+        return_extracted_answers: bool = False,
+        return_stats: bool = False,
+    ) -> Union[
+        list[float],
+        tuple[list[float], list[Any], list[Any]],
+        tuple[list[float], BatchStats],
+        tuple[list[float], list[Any], list[Any], BatchStats],
+    ]: ...
+
+    def get_reward(
+        self,
+        prompts: Union[list[Any], Any],
+        answers: Union[list[Any], Any],
+        gt_answers: Union[list[Any], Any],
+        uuids: Optional[Union[list[Any], Any]] = None,
+        image_files: Optional[Union[list[Any], Any]] = None,
+        answer_lengths: Optional[Union[list[Any], Any]] = None,
+        datasources: Optional[list[str]] = None,
+        log_reward_judge: bool = False,
+        save_dir: Optional[str] = None,
+        current_iteration: int = 0,
+        debug: bool = False,
+        return_extracted_answers: bool = False,
+        return_stats: bool = False,
+    ) -> Union[
+        list[float],
+        tuple[list[float], list[Any], list[Any]],
+        tuple[list[float], BatchStats],
+        tuple[list[float], list[Any], list[Any], BatchStats],
+    ]:
+        """
+        Score a batch on the server; see `RewardSystem.get_reward` for the arguments.
+
+        `save_dir` is a directory on the server; when it is None the server's `reward_log_dir` is used.
+        `debug` is not supported remotely and is ignored. The stats returned with `return_stats` are those
+        of the server batch the request was scored in, which may include the items of other requests.
+
+        Raises:
+            RuntimeError: If the server failed to score the batch.
+        """
+        if debug:
+            _logger.warning("> `debug` is not supported by the reward server and is ignored.")
+        request = RewardRequest(
+            request_id=next(self._request_ids),
+            prompts=ensure_list(prompts),
+            answers=ensure_list(answers),
+            gt_answers=ensure_list(gt_answers),
+            uuids=ensure_list(uuids) if uuids is not None else None,
+            image_files=ensure_list(image_files) if image_files is not None else None,
+            answer_lengths=ensure_list(answer_lengths) if answer_lengths is not None else None,
+            datasources=datasources,
+            log_reward_judge=log_reward_judge,
+            save_dir=save_dir,
+            current_iteration=current_iteration,
+            return_extracted_answers=return_extracted_answers,
+            return_stats=return_stats,
+        )
+        response = self._call(request)
+        if response.error is not None:
+            err_msg = f"Reward server failed to score the batch: {response.error}"
+            raise RuntimeError(err_msg)
+
+        stats = response.stats or BatchStats(datasource=(datasources or ["default"])[0])
+        if return_extracted_answers and return_stats:
+            return response.rewards, response.extracted_answers or [], response.extracted_gts or [], stats
+        if return_extracted_answers:
+            return response.rewards, response.extracted_answers or [], response.extracted_gts or []
+        if return_stats:
+            return response.rewards, stats
+        return response.rewards
+
+    def close(self) -> None:
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def __enter__(self) -> "RewardClient":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+
+import asyncio
+import socket
+import struct
+from typing import Any, Optional, Union
+
+import msgspec
+
+from glmv_reward.utils.metrics import BatchStats
+
+# * every message is a msgpack payload prefixed with its length as a big-endian uint32
+_HEADER = struct.Struct(">I")
+MAX_FRAME_SIZE = 1 << 30
+
+Address = Union[str, tuple[str, int]]
+
+
+class RewardRequest(msgspec.Struct, frozen=True):
+    """The arguments of one `RewardSystem.get_reward` call."""
+
+    request_id: int
+    prompts: list[Any]
+    answers: list[Any]
+    gt_answers: list[Any]
+    uuids: Optional[list[Optional[str]]] = None
+    image_files: Optional[list[Optional[str]]] = None
+    answer_lengths: Optional[list[int]] = None
+    datasources: Optional[list[str]] = None
+    log_reward_judge: bool = False
+    save_dir: Optional[str] = None
+    current_iteration: int = 0
+    return_extracted_answers: bool = False
+    return_stats: bool = False
+
+
+class RewardResponse(msgspec.Struct, frozen=True):
+    """The result of a `RewardRequest`; `error` is set instead of the rewards if the request failed."""
+
+    request_id: int
+    rewards: list[float] = msgspec.field(default_factory=list)
+    extracted_answers: Optional[list[Any]] = None
+    extracted_gts: Optional[list[Any]] = None
+    stats: Optional[BatchStats] = None
+    error: Optional[str] = None
+
+
+def parse_address(address: str) -> tuple[str, Address]:
+    """
+    Parse a server address.
+
+    `unix:/path/to.sock`, `unix:///path/to.sock` and any string containing a `/` are Unix socket paths,
+    `tcp://host:port` and `host:port` are TCP endpoints.
+
+    Returns:
+        tuple[str, Address]: `("unix", path)` or `("tcp", (host, port))`.
+    """
+    if address.startswith("unix:"):
+        return "unix", address.removeprefix("unix:").removeprefix("//")
+    if address.startswith("tcp://"):
+        address = address.removeprefix("tcp://")
+    elif "/" in address:
+        return "unix", address
+
+    host, sep, port = address.rpartition(":")
+    if not sep or not port.isdigit():
+        err_msg = f"Invalid address `{address}`, expected `unix:<path>` or `[tcp://]<host>:<port>`."
+        raise ValueError(err_msg)
+    return "tcp", (host or "127.0.0.1", int(port))
+
+
+def _check_frame_size(size: int) -> None:
+    if size > MAX_FRAME_SIZE:
+        err_msg = f"Frame of {size} bytes exceeds the maximum of {MAX_FRAME_SIZE} bytes."
+        raise ValueError(err_msg)
+
+
+def encode_frame(payload: bytes) -> bytes:
+    _check_frame_size(len(payload))
+    return _HEADER.pack(len(payload)) + payload
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Optional[bytes]:
+    """Read one frame from an asyncio stream, or return None at a clean end of stream."""
+    try:
+        header = await reader.readexactly(_HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise
+        return None
+    (size,) = _HEADER.unpack(header)
+    _check_frame_size(size)
+    return await reader.readexactly(size)
+
+
+def recv_frame(sock: socket.socket) -> bytes:
+    """Read one frame from a blocking socket."""
+    (size,) = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))
+    _check_frame_size(size)
+    return _recv_exactly(sock, size)
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        num_bytes = sock.recv_into(view[received:], size - received)
+        if num_bytes == 0:
+            err_msg = "Connection closed by the reward server."
+            raise ConnectionError(err_msg)
+        received += num_bytes
+    return bytes(buffer)
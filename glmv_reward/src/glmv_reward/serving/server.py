@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+
+
+import asyncio
+import contextlib
+import functools
+import time
+from collections.abc import Hashable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Optional, Union
+
+import msgspec
+
+from glmv_reward.reward_system import RewardSystem
+from glmv_reward.utils.logging import get_logger
+from glmv_reward.utils.metrics import BatchRecorder, BatchStats
+
+from .protocol import RewardRequest, RewardResponse, encode_frame, parse_address, read_frame
+
+_logger = get_logger(__name__)
+
+_BatchResult = tuple[list[float], list[Any], list[Any], BatchStats]
+
+
+class ServerStats(msgspec.Struct):
+    """Counters of a `RewardServer`; `num_items - num_scored_items` items were served by deduplication."""
+
+    num_requests: int = 0
+    num_failed_requests: int = 0
+    num_batches: int = 0
+    num_items: int = 0
+    num_scored_items: int = 0
+
+
+class _PendingRequest(object):
+    __slots__ = ("future", "request")
+
+    def __init__(self, request: RewardRequest, future: "asyncio.Future[_BatchResult]") -> None:
+        self.request = request
+        self.future = future
+
+
+class _DatasourceQueue(object):
+    """Requests of one datasource waiting for the current batching window to close."""
+
+    __slots__ = ("num_items", "pending", "timer")
+
+    def __init__(self) -> None:
+        self.pending: list[_PendingRequest] = []
+        self.num_items = 0
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class RewardServer(object):
+    def __init__(
+        self,
+        reward_system: Union[RewardSystem, Path, str],
+        address: str,
+        batch_window_ms: float = 5.0,
+        max_batch_size: int = 1024,
+        num_workers: int = 8,
+    ) -> None:
+        """
+        Serve `RewardSystem.get_reward` over a Unix or TCP socket.
+
+        Requests are length-prefixed msgpack messages (see `glmv_reward.serving.protocol`). Requests of
+        the same datasource arriving within `batch_window_ms` of each other are merged into one batch of
+        at most `max_batch_size` items, identical (prompt, answer, gt_answer, image_file) items are only
+        scored once, and the batch is scored on one of `num_workers` threads. The `-inf` reward rewrite
+        and the judge logs are still applied per request, exactly like a local `get_reward` call.
+
+        Args:
+            reward_system (Union[RewardSystem, Path, str]): A reward system, or the path of its config.
+            address (str): `unix:<path>` or `[tcp://]<host>:<port>`, see `parse_address`.
+            batch_window_ms (float): How long the first request of a batch waits for others to join.
+            max_batch_size (int): Number of items at which a batch is scored without waiting.
+            num_workers (int): Number of batches scored concurrently.
+        """
+        if not isinstance(reward_system, RewardSystem):
+            reward_system = RewardSystem(reward_system)
+        self.reward_system = reward_system
+        self.address = address
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.stats = ServerStats()
+
+        self._executor = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="reward-server")
+        self._queues: dict[str, _DatasourceQueue] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._decoder = msgspec.msgpack.Decoder(RewardRequest)
+        self._encoder = msgspec.msgpack.Encoder(enc_hook=repr)
+
+    async def start(self) -> asyncio.AbstractServer:
+        _, address = parse_address(self.address)
+        if isinstance(address, str):
+            socket_path = Path(address)
+            if socket_path.is_socket():
+                # * left behind by a server that was not shut down cleanly
+                socket_path.unlink()
+            self._server = await asyncio.start_unix_server(self._handle_connection, path=socket_path)
+        else:
+            host, port = address
+            self._server = await asyncio.start_server(self._handle_connection, host=host, port=port)
+        _logger.info("> Reward server listening on %s", self.address)
+        return self._server
+
+    async def serve_forever(self) -> None:
+        server = self._server or await self.start()
+        try:
+            await server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def run(self) -> None:
+        """Serve until interrupted."""
+        with contextlib.suppress(KeyboardInterrupt):
+            asyncio.run(self.serve_forever())
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        write_lock = asyncio.Lock()
+        tasks: set[asyncio.Task] = set()
+        try:
+            while (frame := await read_frame(reader)) is not None:
+                request = self._decoder.decode(frame)
+                task = asyncio.create_task(self._serve_request(request, writer, write_lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except (ConnectionError, asyncio.IncompleteReadError, msgspec.DecodeError, ValueError) as e:
+            _logger.warning("> Dropping reward client connection: %s", repr(e))
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def _serve_request(
+        self, request: RewardRequest, writer: asyncio.StreamWriter, write_lock: asyncio.Lock
+    ) -> None:
+        self.stats.num_requests += 1
+        try:
+            response = await self._score_request(request)
+        except Exception as e:
+            _logger.warning("> Reward request %d failed: %s", request.request_id, repr(e))
+            self.stats.num_failed_requests += 1
+            response = RewardResponse(request_id=request.request_id, error=repr(e))
+
+        payload = encode_frame(self._encoder.encode(response))
+        async with write_lock:
+            writer.write(payload)
+            await writer.drain()
+
+    async def _score_request(self, request: RewardRequest) -> RewardResponse:
+        num_items = len(request.prompts)
+        datasources = request.datasources or ["default"] * num_items
+        optional_fields = (request.uuids, request.image_files, request.answer_lengths)
+        if any(len(values) != num_items for values in (request.answers, request.gt_answers, datasources)) or any(
+            values is not None and len(values) != num_items for values in optional_fields
+        ):
+            err_msg = (
+                "The length of prompts, answers, gt_answers, datasources, uuids, image_files and answer_lengths "
+                "should be the same."
+            )
+            raise ValueError(err_msg)
+        if num_items == 0:
+            return RewardResponse(request_id=request.request_id)
+        if len(set(datasources)) != 1:
+            err_msg = "all datasources should be the same"
+            raise ValueError(err_msg)
+        datasource = datasources[0]
+        # * fails fast on unknown datasources, before waiting for a batch
+        self.reward_system.get_reward_config_from_datasource(datasource)
+
+        recorder = BatchRecorder(datasource, num_items=num_items)
+        future: asyncio.Future[_BatchResult] = asyncio.get_running_loop().create_future()
+        self._enqueue(datasource, _PendingRequest(request, future))
+        rewards, extracted_ans, extracted_gt, batch_stats = await future
+        recorder.count("inf_rewrites", rewards.count(float("-inf")))
+        rewards = self.reward_system._replace_inf_rewards(rewards)
+
+        if request.log_reward_judge:
+            log_reward_judge = functools.partial(
+                self.reward_system._log_reward_judge,
+                request.save_dir if request.save_dir else self.reward_system.reward_log_dir,
+                datasource,
+                request.prompts,
+                request.image_files or [None] * num_items,
+                request.answers,
+                request.gt_answers,
+                rewards,
+                request.answer_lengths or [-1] * num_items,
+                request.uuids or [None] * num_items,
+                request.current_iteration,
+            )
+            start = time.perf_counter()
+            await asyncio.get_running_loop().run_in_executor(self._executor, log_reward_judge)
+            recorder.observe("log", time.perf_counter() - start)
+        self.reward_system.metrics.record(recorder)
+
+        stats = None
+        if request.return_stats:
+            # * the scoring stages are those of the whole server batch, other requests included
+            stats = recorder.to_stats()
+            for stage, seconds in batch_stats.stage_seconds.items():
+                stats.stage_seconds[stage] = stats.stage_seconds.get(stage, 0.0) + seconds
+            for stage, count in batch_stats.stage_counts.items():
+                stats.stage_counts[stage] = stats.stage_counts.get(stage, 0) + count
+            for name, value in batch_stats.counters.items():
+                stats.counters[name] = stats.counters.get(name, 0) + value
+        if request.return_extracted_answers:
+            return RewardResponse(
+                request_id=request.request_id,
+                rewards=rewards,
+                extracted_answers=extracted_ans,
+                extracted_gts=extracted_gt,
+                stats=stats,
+            )
+        return RewardResponse(request_id=request.request_id, rewards=rewards, stats=stats)
+
+    def _enqueue(self, datasource: str, pending: _PendingRequest) -> None:
+        queue = self._queues.setdefault(datasource, _DatasourceQueue())
+        queue.pending.append(pending)
+        queue.num_items += len(pending.request.prompts)
+        if queue.num_items >= self.max_batch_size:
+            self._flush(datasource)
+        elif queue.timer is None:
+            queue.timer = asyncio.get_running_loop().call_later(self.batch_window, self._flush, datasource)
+
+    def _flush(self, datasource: str) -> None:
+        queue = self._queues.pop(datasource, None)
+        if queue is None:
+            return
+        if queue.timer is not None:
+            queue.timer.cancel()
+        task = asyncio.create_task(self._score_batch(datasource, queue.pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _score_batch(self, datasource: str, batch: list[_PendingRequest]) -> None:
+        prompts: list[Any] = []
+        answers: list[Any] = []
+        gt_answers: list[Any] = []
+        image_files: list[Optional[str]] = []
+        item_index: dict[Hashable, int] = {}
+        positions_per_request = []
+        for pending in batch:
+            request = pending.request
+            positions = []
+            for prompt, answer, gt_answer, image_file in zip(
+                request.prompts,
+                request.answers,
+                request.gt_answers,
+                request.image_files or [None] * len(request.prompts),
+                strict=True,
+            ):
+                key = (prompt, answer, gt_answer, image_file)
+                try:
+                    position = item_index.setdefault(key, len(prompts))
+                except TypeError:
+                    # * unhashable items are never deduplicated
+                    position = len(prompts)
+                if position == len(prompts):
+                    prompts.append(prompt)
+                    answers.append(answer)
+                    gt_answers.append(gt_answer)
+                    image_files.append(image_file)
+                positions.append(position)
+            positions_per_request.append(positions)
+
+        self.stats.num_batches += 1
+        self.stats.num_items += sum(len(positions) for positions in positions_per_request)
+        self.stats.num_scored_items += len(prompts)
+        recorder = BatchRecorder(datasource, num_items=len(prompts))
+        try:
+            verifier = self.reward_system.get_verifier_from_datasource(datasource)
+            rewards, extracted_ans, extracted_gt = await asyncio.get_running_loop().run_in_executor(
+                self._executor,
+                self.reward_system._score_items,
+                prompts,
+                answers,
+                gt_answers,
+                image_files,
+                verifier,
+                recorder,
+            )
+        except Exception as e:
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+            return
+
+        recorder.observe("batch", time.perf_counter() - recorder.start)
+        self.reward_system.metrics.record(recorder)
+        self.reward_system.metrics.export()
+        batch_stats = recorder.to_stats()
+        for pending, positions in zip(batch, positions_per_request, strict=True):
+            if not pending.future.done():
+                pending.future.set_result(
+                    (
+                        [rewards[pos] for pos in positions],
+                        [extracted_ans[pos] for pos in positions],
+                        [extracted_gt[pos] for pos in positions],
+                        batch_stats,
+                    )
+                )
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+
+
+import functools
+import re
+from typing import Any, Optional
+
+import msgspec
+
+# * parsed actions are immutable, so identical action strings (e.g. the ground truth shared by the k rollouts
+# * of a prompt) are parsed once and served from these caches afterwards
+_PARSE_CACHE_SIZE = 65536
+
+
+# ============================================================================
+# WebVoyager: `CLICK(point=(x, y), ...)` style actions, plus the legacy `Click [3]` style
+# ============================================================================
+
+
+class WebVoyagerAction(msgspec.Struct, frozen=True, omit_defaults=True):
+    """
+    A parsed WebVoyager action.
+
+    `action` is one of click / type / key / scroll / answer / wait / goback / google / bing,
+    `legacy` is True for actions written in the old `Click [3]` style grammar.
+    """
+
+    action: str
+    legacy: bool = False
+    x: Optional[int] = None
+    y: Optional[int] = None
+    box: Optional[str] = None
+    element_info: Optional[str] = None
+    text: Optional[str] = None
+    key: Optional[str] = None
+    distance: Optional[str] = None
+    direction: Optional[str] = None
+    number: Optional[str] = None
+    content: Optional[str] = None
+
+
+_POINT = r"point=\((?P<x>\d+),\s*(?P<y>\d+)\)"
+_BOX = r"(?:,\s*box=\[\[(?P<box>[^\]]+)\]\])?"
+_ELEMENT_INFO = r"(?:,\s*element_info='(?P<element_info>[^']*)')?"
+_SCROLL = rf"\({_POINT}{_BOX}(?:,\s*distance=(?P<distance>[^,\)]+))?{_ELEMENT_INFO}\)"
+
+# * (kind, keyword, pattern) in the order in which the grammar resolves ambiguous strings: every action
+# * of the new grammar takes precedence over the legacy one, and the first matching kind wins
+_WEBVOYAGER_RULES: tuple[tuple[str, str, re.Pattern[str]], ...] = (
+    ("click", "CLICK(", re.compile(rf"CLICK\({_POINT}{_BOX}{_ELEMENT_INFO}\)", re.DOTALL)),
+    (
+        "type",
+        "TYPE(",
+        re.compile(rf"TYPE\({_POINT}(?:,\s*text='(?P<text>[^']*)')?{_BOX}{_ELEMENT_INFO}\)", re.DOTALL),
+    ),
+    ("key", "KEY_PRESS(", re.compile(r"KEY_PRESS\(key='(?P<key>[^']*)'\)", re.DOTALL)),
+    ("scroll_down", "SCROLL_DOWN(", re.compile(rf"SCROLL_DOWN{_SCROLL}", re.DOTALL)),
+    ("scroll_up", "SCROLL_UP(", re.compile(rf"SCROLL_UP{_SCROLL}", re.DOTALL)),
+    ("answer", "ANSWER(", re.compile(r"ANSWER\(content='(?P<content>[^']*)'\)", re.DOTALL)),
+    ("legacy_click", "Click ", re.compile(r"Click \[?(?P<number>\d+)\]?", re.DOTALL)),
+    (
+        "legacy_type",
+        "Type ",
+        re.compile(r"Type \[?(?P<number>\d+)\]?[; ]+\[?(?P<content>.[^\]]*)\]?", re.DOTALL),
+    ),
+    ("legacy_key", "Key", re.compile(r"Key[; ]+\[?(?P<content>.[^\]]*)\]?", re.DOTALL)),
+    (
+        "legacy_scroll",
+        "Scroll ",
+        re.compile(r"Scroll \[?(?P<number>\d+|WINDOW)\]?[; ]+\[?(?P<content>up|down)\]?", re.DOTALL),
+    ),
+    ("wait", "", re.compile(r"^Wait")),
+    ("goback", "", re.compile(r"^GoBack")),
+    ("google", "", re.compile(r"^Google")),
+    ("bing", "", re.compile(r"^Bing")),
+    ("legacy_answer", "ANSWER", re.compile(r"ANSWER[; ]+<content>(?P<content>.*?)</content>", re.DOTALL)),
+)
+
+# * one pass over the text finds which keywords occur, so only the rules that can match are tried;
+# * no keyword can start inside another one, hence non-overlapping scanning sees every occurrence
+_WEBVOYAGER_KEYWORD_RE = re.compile(
+    r"CLICK\(|TYPE\(|KEY_PRESS\(|SCROLL_DOWN\(|SCROLL_UP\(|ANSWER\(|Click |Type |Key[; ]|Scroll |ANSWER[; ]"
+)
+# * legacy keywords are followed by a separator which belongs to the rule itself
+_WEBVOYAGER_KEYWORD_ALIASES = {"Key;": "Key", "Key ": "Key", "ANSWER;": "ANSWER", "ANSWER ": "ANSWER"}
+
+
+def _webvoyager_keywords(text: str) -> set[str]:
+    return {
+        _WEBVOYAGER_KEYWORD_ALIASES.get(keyword, keyword)
+        for keyword in (match.group(0) for match in _WEBVOYAGER_KEYWORD_RE.finditer(text))
+    }
+
+
+def _build_webvoyager_action(kind: str, match: re.Match[str]) -> WebVoyagerAction:
+    groups = match.groupdict()
+    if kind in ("click", "type", "scroll_down", "scroll_up"):
+        action = "scroll" if kind.startswith("scroll") else kind
+        return WebVoyagerAction(
+            action=action,
+            x=int(groups["x"]),
+            y=int(groups["y"]),
+            box=groups["box"],
+            element_info=groups["element_info"],
+            text=(groups["text"] or "") if kind == "type" else None,
+            distance=groups.get("distance"),
+            direction=kind.split("_")[1] if action == "scroll" else None,
+        )
+    if kind == "key":
+        return WebVoyagerAction(action="key", key=groups["key"])
+    if kind == "answer":
+        return WebVoyagerAction(action="answer", content=groups["content"])
+    if kind in ("wait", "goback", "google", "bing"):
+        return WebVoyagerAction(action=kind, legacy=True)
+    return WebVoyagerAction(
+        action=kind.removeprefix("legacy_"),
+        legacy=True,
+        number=groups.get("number"),
+        content=groups.get("content"),
+    )
+
+
+@functools.lru_cache(maxsize=_PARSE_CACHE_SIZE)
+def parse_webvoyager_action(text: Optional[str]) -> Optional[WebVoyagerAction]:
+    """
+    Parse a WebVoyager action string such as `CLICK(point=(12, 34), element_info='OK')` or `Type [3]; hello`.
+
+    Returns:
+        Optional[WebVoyagerAction]: The parsed action, or None if no rule of the grammar matches.
+    """
+    if not isinstance(text, str):
+        return None
+
+    keywords = _webvoyager_keywords(text)
+    for kind, keyword, pattern in _WEBVOYAGER_RULES:
+        if keyword and keyword not in keywords:
+            continue
+        match = pattern.search(text)
+        if match is not None:
+            return _build_webvoyager_action(kind, match)
+    return None
+
+
+# ============================================================================
+# OSWorld: `left_click(start_box='[x, y]', element_info='...')` style actions
+# ============================================================================
+
+
+class OSWorldAction(msgspec.Struct, frozen=True, omit_defaults=True):
+    """A parsed OSWorld action, see `to_dict` for the dictionary layout consumed by the OSWorld judge."""
+
+    action_type: str
+    element_info: Optional[str] = None
+    coordinates: Optional[tuple[int, int]] = None
+    start_coordinates: Optional[tuple[int, int]] = None
+    end_coordinates: Optional[tuple[int, int]] = None
+    direction: Optional[str] = None
+    step: Optional[int] = None
+    content: Optional[str] = None
+    keys: Optional[str] = None
+
+    def to_dict(self) -> dict[str, Any]:
+        out: dict[str, Any] = {}
+        for name in self.__struct_fields__:
+            value = getattr(self, name)
+            if value is not None:
+                out[name] = list(value) if isinstance(value, tuple) else value
+        return out
+
+
+_OSWORLD_CLICK_ACTIONS = frozenset(["left_click", "left_double_click", "right_click", "middle_click", "hover"])
+_OSWORLD_CALL_RE = re.compile(r"^(?P<action_type>\w+)\((?P<params>.*)\)$")
+_OSWORLD_ACTION_TYPE_RE = re.compile(r"^(\w+)\(")
+_OSWORLD_PARAMS_RE = re.compile(r"\((.*)\)$")
+# * every `name='value'` or `name=123` parameter in a single left-to-right scan
+_OSWORLD_PARAM_RE = re.compile(r"(?P<name>\w+)=(?:'(?P<quoted>[^']*)'|(?P<number>\d+))")
+_OSWORLD_POINT_RE = re.compile(r"\[(\d+),\s*(\d+)\]")
+_OSWORLD_WORD_RE = re.compile(r"\w+")
+
+
+def _osworld_point(values: list[str]) -> Optional[tuple[int, int]]:
+    for value in values:
+        match = _OSWORLD_POINT_RE.fullmatch(value)
+        if match is not None:
+            return int(match.group(1)), int(match.group(2))
+    return None
+
+
+@functools.lru_cache(maxsize=_PARSE_CACHE_SIZE)
+def parse_osworld_action(text: Optional[str]) -> Optional[OSWorldAction]:
+    """
+    Parse an OSWorld action string such as `scroll(start_box='[200, 200]', direction='down', step=3)`.
+
+    Returns:
+        Optional[OSWorldAction]: The parsed action, or None if `text` is not a function-call-like string.
+    """
+    if not text:
+        return None
+
+    match = _OSWORLD_CALL_RE.match(text)
+    if match is not None:
+        action_type, params_str = match.group("action_type"), match.group("params")
+    else:
+        # * slow path for multi-line strings, which `.` does not cross
+        type_match = _OSWORLD_ACTION_TYPE_RE.search(text)
+        if type_match is None:
+            return None
+        action_type = type_match.group(1)
+        params_match = _OSWORLD_PARAMS_RE.search(text)
+        params_str = params_match.group(1) if params_match else ""
+
+    quoted: dict[str, list[str]] = {}
+    numbers: dict[str, str] = {}
+    for param in _OSWORLD_PARAM_RE.finditer(params_str):
+        if param.group("quoted") is not None:
+            quoted.setdefault(param.group("name"), []).append(param.group("quoted"))
+        else:
+            numbers.setdefault(param.group("name"), param.group("number"))
+
+    fields: dict[str, Any] = {}
+    if "element_info" in quoted:
+        fields["element_info"] = quoted["element_info"][0]
+
+    if action_type in _OSWORLD_CLICK_ACTIONS:
+        fields["coordinates"] = _osworld_point(quoted.get("start_box", []))
+    elif action_type == "left_drag":
+        start_coords = _osworld_point(quoted.get("start_box", []))
+        end_coords = _osworld_point(quoted.get("end_box", []))
+        if start_coords and end_coords:
+            fields["start_coordinates"] = start_coords
+            fields["end_coordinates"] = end_coords
+    elif action_type == "scroll":
+        coords = _osworld_point(quoted.get("start_box", []))
+        direction = next((v for v in quoted.get("direction", []) if _OSWORLD_WORD_RE.fullmatch(v)), None)
+        if coords and direction:
+            fields["coordinates"] = coords
+            fields["direction"] = direction
+            if "step" in numbers:
+                fields["step"] = int(numbers["step"])
+    elif action_type == "type":
+        if "content" in quoted:
+            fields["content"] = quoted["content"][0]
+    elif action_type == "key" and "keys" in quoted:
+        fields["keys"] = quoted["keys"][0]
+
+    return OSWorldAction(action_type=action_type, **fields)
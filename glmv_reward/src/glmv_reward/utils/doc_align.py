@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+
+
+import difflib
+import re
+from collections.abc import Sequence
+from typing import Optional
+
+import editdistance
+import msgspec
+
+# * sentence ends at which over-long lines are split, so that a single-line page still yields alignable blocks
+_SENTENCE_END_RE = re.compile(r"(?<=[。！？；!?;])|(?<=\.)(?=\s)")
+# * half width of the diagonal band in which the blocks of a `replace` region are paired up
+_PAIRING_BAND = 4
+
+
+class BlockScore(msgspec.Struct, frozen=True):
+    """
+    Edit distance of one aligned region of two block sequences.
+
+    `op` is the `difflib` opcode of the region (equal / replace / delete / insert; a `replace` region covers
+    one pair of blocks), the spans are `[start, end)` block indices into the answer and the ground truth,
+    and `length` is the character length of the longer side of the region.
+    """
+
+    op: str
+    answer_span: tuple[int, int]
+    gt_span: tuple[int, int]
+    distance: int
+    length: int
+
+    @property
+    def similarity(self) -> float:
+        return 1.0 - self.distance / self.length if self.length > 0 else 1.0
+
+
+class DocumentScore(msgspec.Struct, frozen=True):
+    """Page-level result of `score_aligned_blocks`, with the per-region breakdown in `blocks`."""
+
+    similarity: float
+    distance: int
+    length: int
+    blocks: list[BlockScore]
+
+
+def split_blocks(text: str, max_block_length: int = 256) -> list[str]:
+    """
+    Split a document into blocks: one per line, with lines longer than `max_block_length` further split
+    at sentence ends and, failing that, into fixed-size chunks.
+
+    Returns:
+        list[str]: The blocks, in document order (empty lines included).
+    """
+    blocks = []
+    for line in text.splitlines():
+        if len(line) <= max_block_length:
+            blocks.append(line)
+            continue
+        for sentence in _SENTENCE_END_RE.split(line):
+            blocks.extend(sentence[i : i + max_block_length] for i in range(0, len(sentence), max_block_length))
+    return blocks
+
+
+def _pair_blocks(
+    answer_blocks: Sequence[str], gt_blocks: Sequence[str], a_offset: int, g_offset: int
+) -> list[BlockScore]:
+    """
+    Split a `replace` region into pairs of blocks and unpaired blocks, minimizing the summed distances.
+
+    A dynamic programming alignment over the blocks, restricted to a band around the diagonal of the
+    region: each cell costs one block-to-block distance (blocks are at most `max_block_length` long, see
+    `split_blocks`), so a page where every line has a small error costs about `2 * _PAIRING_BAND + 1` short
+    distances per line instead of one quadratic page distance.
+    """
+    num_answer, num_gt = len(answer_blocks), len(gt_blocks)
+    # * wide enough for the band of consecutive rows to overlap, whatever the shape of the region
+    width = _PAIRING_BAND + -(-num_gt // num_answer)
+    # * cell -> (cost, previous cell, pair distance or None when a single block is skipped)
+    cells: dict[tuple[int, int], tuple[int, tuple[int, int], Optional[int]]] = {(0, 0): (0, (0, 0), None)}
+    for i in range(num_answer + 1):
+        center = i * num_gt // num_answer
+        for j in range(max(0, center - width), min(num_gt, center + width) + 1):
+            candidates: list[tuple[int, tuple[int, int], Optional[int]]] = []
+            if i > 0 and (i - 1, j) in cells:
+                candidates.append((cells[i - 1, j][0] + len(answer_blocks[i - 1]), (i - 1, j), None))
+            if j > 0 and (i, j - 1) in cells:
+                candidates.append((cells[i, j - 1][0] + len(gt_blocks[j - 1]), (i, j - 1), None))
+            if i > 0 and j > 0 and (i - 1, j - 1) in cells:
+                distance = editdistance.eval(answer_blocks[i - 1], gt_blocks[j - 1])
+                candidates.append((cells[i - 1, j - 1][0] + distance, (i - 1, j - 1), distance))
+            if candidates:
+                cells[i, j] = min(candidates, key=lambda candidate: candidate[0])
+
+    blocks = []
+    cell = (num_answer, num_gt)
+    while cell != (0, 0):
+        _, previous, pair_distance = cells[cell]
+        (a_start, g_start), (a_end, g_end) = previous, cell
+        answer_text = "".join(answer_blocks[a_start:a_end])
+        gt_text = "".join(gt_blocks[g_start:g_end])
+        length = max(len(answer_text), len(gt_text))
+        if pair_distance is None:
+            op, distance = ("delete" if a_end > a_start else "insert"), length
+        else:
+            op, distance = ("replace" if pair_distance > 0 else "equal"), pair_distance
+        blocks.append(
+            BlockScore(
+                op=op,
+                answer_span=(a_offset + a_start, a_offset + a_end),
+                gt_span=(g_offset + g_start, g_offset + g_end),
+                distance=distance,
+                length=length,
+            )
+        )
+        cell = previous
+    return blocks[::-1]
+
+
+def score_aligned_blocks(
+    answer_blocks: Sequence[str], gt_blocks: Sequence[str], lower_bound: float = 0.0
+) -> DocumentScore:
+    """
+    Approximate the edit-distance similarity of two long documents given as block sequences.
+
+    Identical blocks are used as anchors (`difflib` hashes the blocks and recursively matches the longest
+    common runs), and the blocks of the regions between anchors are paired up with a banded alignment, so
+    that only pairs of blocks are compared character by character. The cost stays close to linear in the
+    page length, whether a few lines are wrong or every line has a small error. The page distance is the
+    sum of the block distances: an upper bound of the distance between the joined documents, i.e. the
+    similarity is never more lenient than the exact one.
+
+    Args:
+        answer_blocks (Sequence[str]): The normalized blocks of the answer.
+        gt_blocks (Sequence[str]): The normalized blocks of the ground truth.
+        lower_bound (float): Stop scoring regions once the similarity is at or below it; the returned
+            similarity is then at or below `lower_bound` too, and `blocks` ends at the last scored region.
+
+    Returns:
+        DocumentScore: The page similarity in [0, 1] (1.0 if both documents are empty) and the per-region scores.
+    """
+    total_length = max(sum(map(len, answer_blocks)), sum(map(len, gt_blocks)))
+    if total_length == 0:
+        return DocumentScore(similarity=1.0, distance=0, length=0, blocks=[])
+
+    matcher = difflib.SequenceMatcher(None, answer_blocks, gt_blocks, autojunk=False)
+    blocks: list[BlockScore] = []
+    total_distance = 0
+    for op, a_start, a_end, g_start, g_end in matcher.get_opcodes():
+        if op == "replace":
+            region = _pair_blocks(answer_blocks[a_start:a_end], gt_blocks[g_start:g_end], a_start, g_start)
+        else:
+            length = max(sum(map(len, answer_blocks[a_start:a_end])), sum(map(len, gt_blocks[g_start:g_end])))
+            region = [
+                BlockScore(
+                    op=op,
+                    answer_span=(a_start, a_end),
+                    gt_span=(g_start, g_end),
+                    distance=0 if op == "equal" else length,
+                    length=length,
+                )
+            ]
+        blocks.extend(region)
+        total_distance += sum(block.distance for block in region)
+        if 1.0 - total_distance / total_length <= lower_bound:
+            break
+
+    similarity = max(0.0, 1.0 - total_distance / total_length)
+    return DocumentScore(similarity=similarity, distance=total_distance, length=total_length, blocks=blocks)
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+
+from collections.abc import Sequence
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+
+# * bounds of the normalized [0, 999] coordinate space used by the GUI-agent datasets
+_MAX_NORMALIZED_COORD = 999
+
+
+def to_float_array(values: Sequence[Any], width: int) -> npt.NDArray[np.float64]:
+    """
+    Pack a batch of optional fixed-width numeric records (points, boxes) into a float array.
+
+    Records that are missing, of the wrong length or not numeric become rows of NaN, which every
+    scoring kernel in this module maps to a score of 0.0.
+
+    Args:
+        values (Sequence[Any]): One record per item, e.g. `[x, y]`, `(x0, y0, x1, y1)` or None.
+        width (int): The expected record length.
+
+    Returns:
+        An array of shape `(len(values), width)`.
+    """
+    out = np.full((len(values), width), np.nan, dtype=np.float64)
+    for idx, value in enumerate(values):
+        if not isinstance(value, (list, tuple)) or len(value) != width:
+            continue
+        if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in value):
+            out[idx] = value
+    return out
+
+
+def coordinate_similarity(
+    pred_points: npt.ArrayLike, gt_points: npt.ArrayLike, tolerance: float = 20.0
+) -> npt.NDArray[np.float64]:
+    """
+    Batched point similarity.
+
+    Within `tolerance` the score decays linearly from 1.0 to 0.8, beyond it the score is
+    `max(0, 1 - distance / 50)`.
+
+    Args:
+        pred_points: Array of shape `(N, 2)`.
+        gt_points: Array of shape `(N, 2)`.
+        tolerance (float): Distance (in normalized coordinates) considered a near hit.
+
+    Returns:
+        An array of shape `(N,)`, 0.0 for rows containing NaN.
+    """
+    pred = np.asarray(pred_points, dtype=np.float64).reshape(-1, 2)
+    gt = np.asarray(gt_points, dtype=np.float64).reshape(-1, 2)
+    distance = np.hypot(pred[:, 0] - gt[:, 0], pred[:, 1] - gt[:, 1])
+    score = np.where(distance <= tolerance, 1.0 - (distance / tolerance) * 0.2, np.maximum(0.0, 1.0 - distance / 50))
+    return np.nan_to_num(score, nan=0.0)
+
+
+def box_iou(pred_boxes: npt.ArrayLike, gt_boxes: npt.ArrayLike) -> npt.NDArray[np.float64]:
+    """
+    Batched intersection-over-union of `[x_min, y_min, x_max, y_max]` boxes.
+
+    Returns:
+        An array of shape `(N,)`, 0.0 for an empty union and for rows containing NaN.
+    """
+    pred = np.asarray(pred_boxes, dtype=np.float64).reshape(-1, 4)
+    gt = np.asarray(gt_boxes, dtype=np.float64).reshape(-1, 4)
+
+    inter_w = np.maximum(np.minimum(pred[:, 2], gt[:, 2]) - np.maximum(pred[:, 0], gt[:, 0]), 0.0)
+    inter_h = np.maximum(np.minimum(pred[:, 3], gt[:, 3]) - np.maximum(pred[:, 1], gt[:, 1]), 0.0)
+    inter_area = inter_w * inter_h
+    union_area = (
+        (pred[:, 2] - pred[:, 0]) * (pred[:, 3] - pred[:, 1]) + (gt[:, 2] - gt[:, 0]) * (gt[:, 3] - gt[:, 1])
+    ) - inter_area
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        iou = np.where(union_area != 0, inter_area / union_area, 0.0)
+    return np.nan_to_num(iou, nan=0.0)
+
+
+def box_is_valid(boxes: Sequence[Any], upper_bound: int = _MAX_NORMALIZED_COORD) -> npt.NDArray[np.bool_]:
+    """
+    Batched validity check of normalized boxes.
+
+    A box is valid if it is a list of four integers in `[0, upper_bound]` with `x_min <= x_max`
+    and `y_min <= y_max`.
+
+    Returns:
+        A boolean array of shape `(N,)`.
+    """
+    valid = np.array(
+        [isinstance(box, list) and len(box) == 4 and all(isinstance(v, int) for v in box) for box in boxes],
+        dtype=np.bool_,
+    )
+    arr = to_float_array([box if ok else None for box, ok in zip(boxes, valid, strict=True)], 4)
+    with np.errstate(invalid="ignore"):
+        in_range = np.all((arr >= 0) & (arr <= upper_bound), axis=1)
+        ordered = (arr[:, 0] <= arr[:, 2]) & (arr[:, 1] <= arr[:, 3])
+    return valid & in_range & ordered
+
+
+def step_similarity(pred_steps: npt.ArrayLike, gt_steps: npt.ArrayLike) -> npt.NDArray[np.float64]:
+    """
+    Batched scroll-step similarity, `max(0, 1 - |pred - gt| / (2 * gt))`.
+
+    Returns:
+        An array of shape `(N,)`, 0.0 where the ground-truth step is 0 or NaN.
+    """
+    pred = np.asarray(pred_steps, dtype=np.float64).reshape(-1)
+    gt = np.asarray(gt_steps, dtype=np.float64).reshape(-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        score = np.maximum(0.0, 1.0 - np.abs(pred - gt) / (gt * 2))
+    return np.nan_to_num(score, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def equal_mask(
+    pred_values: Sequence[Any], gt_values: Sequence[Any], ignore_case: bool = False
+) -> npt.NDArray[np.bool_]:
+    """
+    Batched equality of categorical fields such as scroll directions or key names.
+
+    Returns:
+        A boolean array of shape `(N,)`; None never matches.
+    """
+
+    def _normalize(value: Any) -> Any:
+        return value.lower() if ignore_case and isinstance(value, str) else value
+
+    return np.array(
+        [
+            pred is not None and gt is not None and _normalize(pred) == _normalize(gt)
+            for pred, gt in zip(pred_values, gt_values, strict=True)
+        ],
+        dtype=np.bool_,
+    )
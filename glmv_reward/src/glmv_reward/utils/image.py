@@ -2,25 +2,204 @@
 
 
 import base64
+import collections
+import hashlib
 import io
+import mmap
+import threading
+from collections.abc import Callable
+from pathlib import Path
+from typing import BinaryIO, Optional, Union
 
+import msgspec
 from PIL import Image
 
+from .logging import get_logger
+from .path import read_tar_member, split_tar_member
 
-def encode_image(image_file: str, prefix: bool = False) -> str:
+_logger = get_logger(__name__)
+
+# * formats and modes judge endpoints accept as-is, passed through without decoding
+_PASSTHROUGH = {
+    "JPEG": ("image/jpeg", frozenset({"RGB", "L"})),
+    "PNG": ("image/png", frozenset({"RGB", "RGBA", "L", "LA", "P"})),
+}
+
+
+class EncodedImage(msgspec.Struct, frozen=True):
+    """A base64 encoded image, ready to be sent to a multimodal judge."""
+
+    mime_type: str
+    data: str
+
+    @property
+    def data_url(self) -> str:
+        return f"data:{self.mime_type};base64,{self.data}"
+
+
+class ImageCacheStats(msgspec.Struct):
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    num_entries: int = 0
+    num_bytes: int = 0
+
+
+class ImageCache(object):
+    def __init__(self, max_bytes: int = 256 << 20) -> None:
+        """
+        LRU cache of encoded images keyed by the hash of the source bytes, so the k rollouts of a prompt
+        sharing a screenshot only encode it once, whatever its path.
+
+        Args:
+            max_bytes (int): Budget of the cached base64 payloads; 0 disables the cache.
+        """
+        self.max_bytes = max_bytes
+        self._entries: collections.OrderedDict[tuple[str, Optional[int]], EncodedImage] = collections.OrderedDict()
+        self._stats = ImageCacheStats()
+        self._lock = threading.Lock()
+        self._pending: dict[tuple[str, Optional[int]], threading.Lock] = {}
+
+    @property
+    def stats(self) -> ImageCacheStats:
+        with self._lock:
+            return msgspec.structs.replace(self._stats)
+
+    def get(self, key: tuple[str, Optional[int]]) -> Optional[EncodedImage]:
+        with self._lock:
+            image = self._entries.get(key)
+            if image is None:
+                self._stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return image
+
+    def put(self, key: tuple[str, Optional[int]], image: EncodedImage) -> None:
+        size = len(image.data)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._stats.num_bytes -= len(previous.data)
+            self._entries[key] = image
+            self._stats.num_bytes += size
+            while self._stats.num_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._stats.num_bytes -= len(evicted.data)
+                self._stats.evictions += 1
+            self._stats.num_entries = len(self._entries)
+
+    def get_or_create(self, key: tuple[str, Optional[int]], create: Callable[[], EncodedImage]) -> EncodedImage:
+        """Look `key` up, calling `create` on a miss; concurrent misses on the same key only create it once."""
+        image = self.get(key)
+        if image is not None:
+            return image
+        with self._lock:
+            pending = self._pending.setdefault(key, threading.Lock())
+        with pending:
+            # * another thread may have created it while this one was waiting
+            with self._lock:
+                image = self._entries.get(key)
+            if image is None:
+                try:
+                    image = create()
+                    # * cached before the pending lock goes away, so a thread arriving in between hits it
+                    self.put(key, image)
+                finally:
+                    with self._lock:
+                        self._pending.pop(key, None)
+        return image
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._stats = ImageCacheStats()
+
+
+_IMAGE_CACHE = ImageCache()
+
+
+def get_image_cache() -> ImageCache:
+    """The process-wide cache used by `load_image` by default."""
+    return _IMAGE_CACHE
+
+
+def _encode(f: BinaryIO, buffer: Union[bytes, mmap.mmap, memoryview], max_side: Optional[int]) -> EncodedImage:
+    f.seek(0)
+    with Image.open(f) as img:
+        # * only the header is read so far
+        passthrough = _PASSTHROUGH.get(img.format or "")
+        if passthrough is not None and img.mode in passthrough[1] and (max_side is None or max(img.size) <= max_side):
+            return EncodedImage(mime_type=passthrough[0], data=base64.b64encode(buffer).decode("ascii"))
+
+        if max_side is not None:
+            # * lets the JPEG decoder skip DCT scales that would be thrown away anyway
+            img.draft("RGB", (max_side, max_side))
+            img.thumbnail((max_side, max_side))
+        img_io = io.BytesIO()
+        img.convert("RGB").save(img_io, format="JPEG")
+    return EncodedImage(mime_type="image/jpeg", data=base64.b64encode(img_io.getbuffer()).decode("ascii"))
+
+
+def load_image(
+    image_file: Union[str, Path],
+    max_side: Optional[int] = None,
+    cache: Optional[ImageCache] = None,
+) -> EncodedImage:
+    """
+    Encode an image for a multimodal judge call.
+
+    JPEG and PNG files that need no resizing are base64 encoded as-is; other images are downscaled so
+    that their longest side is at most `max_side`, converted to RGB and re-encoded as JPEG. The file is
+    memory-mapped, so hashing and pass-through encoding never copy it.
+
+    Args:
+        image_file (Union[str, Path]): Path to the image file, or a `<shard>.tar:<member>` reference
+        max_side (Optional[int]): Maximum length in pixels of the longest side
+        cache (Optional[ImageCache]): Cache of encoded images, `get_image_cache()` by default
+
+    Returns:
+        EncodedImage: The encoded image
+    """
+    if max_side is not None and max_side <= 0:
+        err_msg = f"`max_side` should be positive, but got {max_side}."
+        raise ValueError(err_msg)
+    cache = _IMAGE_CACHE if cache is None else cache
+
+    if split_tar_member(image_file) is not None:
+        member = read_tar_member(image_file)
+        key = (hashlib.blake2b(member, digest_size=16).hexdigest(), max_side)
+        return cache.get_or_create(key, lambda: _encode(io.BytesIO(member), member, max_side))
+
+    with open(image_file, "rb") as f:
+        # * empty files cannot be mapped, PIL rejects them below anyway
+        buffer: Union[bytes, mmap.mmap] = b""
+        if f.seek(0, io.SEEK_END) > 0:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            key = (hashlib.blake2b(buffer, digest_size=16).hexdigest(), max_side)
+            image = cache.get_or_create(key, lambda: _encode(f, buffer, max_side))
+        finally:
+            if isinstance(buffer, mmap.mmap):
+                buffer.close()
+    return image
+
+
+def encode_image(image_file: str, prefix: bool = False, max_side: Optional[int] = None) -> str:
     """
     Encode an image to base64 string.
 
     Args:
         image_file (str): Path to the image file
         prefix (bool): Whether to add data URL prefix
+        max_side (Optional[int]): Maximum length in pixels of the longest side, see `load_image`
 
     Returns:
         str: Base64 encoded image string
     """
-    img = Image.open(image_file)
-    img_io = io.BytesIO()
-    img.convert("RGB").save(img_io, format="JPEG")
+    image = load_image(image_file, max_side=max_side)
     if prefix:
-        return "data:image/jpeg;base64," + base64.b64encode(img_io.getvalue()).decode("utf-8")
-    return base64.b64encode(img_io.getvalue()).decode("utf-8")
+        return image.data_url
+    return image.data
@@ -2,11 +2,16 @@
 
 
 import json
-from typing import Optional, cast
+import time
+from collections.abc import Sequence
+from typing import Optional, Union, cast
 
 import requests
 
+from .image import load_image
 from .logging import get_logger
+from .metrics import record_llm_call
+from .tracing import JudgeCallTrace, current_verifier, get_judge_tracer
 
 _logger = get_logger(__name__)
 
@@ -16,36 +21,108 @@ def post_query_llm(
     api_key: str,
     url: str = "https://open.bigmodel.cn/api/paas/v4/chat/completions",
     model: str = "glm-4-flash",
-    image_file: Optional[str] = None,
+    image_file: Optional[Union[str, Sequence[str]]] = None,
     max_tokens: Optional[int] = 10,
     temperature: Optional[float] = 0.1,
     top_p: Optional[float] = 1.0,
     timeout: Optional[int] = 120,
+    image_max_side: Optional[int] = None,
 ) -> str:
     """
     Sends a query to Zhipu AI API endpoint.
 
+    The call is recorded in the metrics of the reward batch running on this thread, if any, and traced
+    by `get_judge_tracer()`.
+
     Args:
         prompt: The prompt to generate completions for.
         api_key: The API key used for authentication.
         url: The chat completion API endpoint (default: https://open.bigmodel.cn/api/paas/v4/chat/completions).
         model: Model name used to generate the response (default: glm-4-flash).
-        image_file: The image file to generation completions for (not currently supported).
+        image_file: The image file(s) to generation completions for, attached as `image_url` contents;
+          the judge model should support vision inputs.
         max_tokens: The maximum number of tokens that can be generated.
         temperature: The sampling temperature used for the generation.
         top_p: The parameter for nucleus sampling, where the model considers the
           results of the tokens with top_p probability mass.
         timeout: The timeout value for the LLM request.
+        image_max_side: Downscale the images so their longest side is at most this many pixels.
 
     Returns:
-        The response content from the API.
+        The response content from the API, or an empty string if the call failed.
 
     """
-    del image_file  # Not currently supported
+    tracer = get_judge_tracer()
+    trace = JudgeCallTrace(timestamp=time.time(), verifier=current_verifier(), endpoint=url, model=model)
+    content = ""
+    start = time.perf_counter()
+    try:
+        content = _post_query_llm(
+            prompt,
+            api_key,
+            trace,
+            url=url,
+            model=model,
+            image_file=image_file,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            top_p=top_p,
+            timeout=timeout,
+            image_max_side=image_max_side,
+        )
+    except Exception:
+        trace.status = "error"
+        raise
+    finally:
+        trace.latency = time.perf_counter() - start
+        if tracer.record_payloads:
+            trace.prompt = prompt
+            trace.response = content
+        tracer.record(trace)
+        record_llm_call(trace.latency, ok=len(content) > 0)
+    return content
+
+
+def _build_content(
+    prompt: str,
+    image_file: Optional[Union[str, Sequence[str]]],
+    image_max_side: Optional[int],
+) -> Union[str, list[dict[str, object]]]:
+    if not image_file:
+        return prompt
+    image_files = [image_file] if isinstance(image_file, str) else list(image_file)
 
-    # Get API key from environment
+    content: list[dict[str, object]] = []
+    for path in image_files:
+        try:
+            # * cached by content, the k rollouts of a prompt share the encoding of its images
+            image = load_image(path, max_side=image_max_side)
+        except Exception as e:
+            _logger.warning("Failed to load image `%s` in `post_query_llm`, it is not sent: %s", path, repr(e))
+        else:
+            content.append({"type": "image_url", "image_url": {"url": image.data_url}})
+    if not content:
+        return prompt
+    content.append({"type": "text", "text": prompt})
+    return content
 
-    messages: list[dict[str, object]] = [{"role": "user", "content": prompt}]
+
+def _post_query_llm(
+    prompt: str,
+    api_key: str,
+    trace: JudgeCallTrace,
+    url: str = "https://open.bigmodel.cn/api/paas/v4/chat/completions",
+    model: str = "glm-4-flash",
+    image_file: Optional[Union[str, Sequence[str]]] = None,
+    max_tokens: Optional[int] = 10,
+    temperature: Optional[float] = 0.1,
+    top_p: Optional[float] = 1.0,
+    timeout: Optional[int] = 120,
+    image_max_side: Optional[int] = None,
+) -> str:
+    messages: list[dict[str, object]] = [
+        {"role": "user", "content": _build_content(prompt, image_file, image_max_side)}
+    ]
 
     payload = {
         "model": model,
@@ -63,21 +140,39 @@ def post_query_llm(
 
     try:
         response = requests.post(url, headers=headers, data=json.dumps(payload), timeout=timeout)
+        trace.http_status = response.status_code
         response.raise_for_status()
         response_data = response.json()
+    except requests.exceptions.Timeout as e:
+        trace.status = "timeout"
+        _logger.warning("HTTP request error in `post_query_llm`: %s", e)
+        return ""
+    except requests.exceptions.HTTPError as e:
+        trace.status = "http_error"
+        _logger.warning("HTTP request error in `post_query_llm`: %s", e)
+        return ""
     except requests.exceptions.RequestException as e:
+        # * includes invalid JSON bodies
+        trace.status = "bad_response" if trace.http_status is not None else "connection_error"
         _logger.warning("HTTP request error in `post_query_llm`: %s", e)
         return ""
     except KeyError as e:
+        trace.status = "bad_response"
         _logger.warning("Response parsing error in `post_query_llm`: %s", e)
         return ""
     except Exception as e:
+        trace.status = "error"
         _logger.warning("Unexpected error in `post_query_llm` due to exception: %s", repr(e))
         return ""
     else:
+        usage = response_data.get("usage") if isinstance(response_data, dict) else None
+        if isinstance(usage, dict):
+            trace.prompt_tokens = usage.get("prompt_tokens")
+            trace.completion_tokens = usage.get("completion_tokens")
         # Extract content from Zhipu AI response format
         if "choices" in response_data and len(response_data["choices"]) > 0:
             content = response_data["choices"][0]["message"]["content"]
             return cast(str, content)
+        trace.status = "bad_response"
         _logger.error("Unexpected response format from Zhipu AI API: %s", response_data)
         return ""
@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+
+
+import bisect
+import contextlib
+import threading
+import time
+from collections.abc import Callable, Iterator, Sequence
+from pathlib import Path
+from typing import Optional, Union
+
+import msgspec
+
+from .logging import get_logger
+from .path import resolve_path
+
+_logger = get_logger(__name__)
+
+# * upper bounds in seconds, from regex extraction (~10us) to slow LLM judges (~1min)
+DEFAULT_BUCKETS = (
+    1e-5,
+    5e-5,
+    1e-4,
+    5e-4,
+    1e-3,
+    5e-3,
+    1e-2,
+    5e-2,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+# * stages timed by `RewardSystem`
+STAGES = (
+    "format_check",
+    "language_mix",
+    "extract_gt",
+    "extract_answer",
+    "rule_judge",
+    "llm",
+    "log",
+    "batch",
+)
+# * outcome counters maintained by `RewardSystem`
+COUNTERS = (
+    "items",
+    "format_failures",
+    "language_mix_failures",
+    "gt_extraction_failures",
+    "extraction_failures",
+    "judge_errors",
+    "llm_fallbacks",
+    "llm_calls",
+    "llm_errors",
+    "inf_rewrites",
+)
+
+MetricsExporter = Callable[["MetricsSnapshot"], None]
+
+_active = threading.local()
+
+
+class BatchStats(msgspec.Struct):
+    """What one `get_reward` batch spent its time on, returned by `get_reward(..., return_stats=True)`."""
+
+    datasource: str
+    num_items: int = 0
+    wall_time: float = 0.0
+    stage_seconds: dict[str, float] = msgspec.field(default_factory=dict)
+    stage_counts: dict[str, int] = msgspec.field(default_factory=dict)
+    counters: dict[str, int] = msgspec.field(default_factory=dict)
+
+
+class HistogramSnapshot(msgspec.Struct):
+    """`counts[i]` observations fell in `(buckets[i - 1], buckets[i]]`; the last count is above the last bucket."""
+
+    buckets: list[float]
+    counts: list[int]
+    count: int
+    sum: float
+
+
+class MetricsSnapshot(msgspec.Struct):
+    """Point-in-time copy of `RewardMetrics`, keyed by datasource then by stage / counter name."""
+
+    timestamp: float
+    stages: dict[str, dict[str, HistogramSnapshot]]
+    counters: dict[str, dict[str, int]]
+
+
+class BatchRecorder(object):
+    """Collects the stage timings and outcome counters of one batch, from any number of scoring threads."""
+
+    __slots__ = ("_lock", "counters", "datasource", "num_items", "observations", "start")
+
+    def __init__(self, datasource: str, num_items: int = 0) -> None:
+        self.datasource = datasource
+        self.num_items = num_items
+        self.start = time.perf_counter()
+        self.observations: list[tuple[str, float]] = []
+        self.counters: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        # * list.append is atomic, no lock needed
+        self.observations.append((stage, seconds))
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextlib.contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    @contextlib.contextmanager
+    def activate(self) -> Iterator[None]:
+        """Attribute the LLM calls of the current thread (see `record_llm_call`) to this batch."""
+        previous = getattr(_active, "recorder", None)
+        _active.recorder = self
+        try:
+            yield
+        finally:
+            _active.recorder = previous
+
+    def to_stats(self) -> BatchStats:
+        stats = BatchStats(
+            datasource=self.datasource,
+            num_items=self.num_items,
+            wall_time=time.perf_counter() - self.start,
+            counters=dict(self.counters),
+        )
+        for stage, seconds in self.observations:
+            stats.stage_seconds[stage] = stats.stage_seconds.get(stage, 0.0) + seconds
+            stats.stage_counts[stage] = stats.stage_counts.get(stage, 0) + 1
+        return stats
+
+
+class _ScheduledExporter(object):
+    __slots__ = ("exporter", "interval", "last_export")
+
+    def __init__(self, exporter: MetricsExporter, interval: float) -> None:
+        self.exporter = exporter
+        self.interval = interval
+        self.last_export = float("-inf")
+
+
+def record_llm_call(seconds: float, ok: bool) -> None:
+    """Record one LLM judge call in the batch active on the current thread, if any."""
+    recorder: Optional[BatchRecorder] = getattr(_active, "recorder", None)
+    _active.llm_calls = getattr(_active, "llm_calls", 0) + 1
+    _active.llm_seconds = getattr(_active, "llm_seconds", 0.0) + seconds
+    if recorder is None:
+        return
+    recorder.observe("llm", seconds)
+    recorder.count("llm_calls")
+    if not ok:
+        recorder.count("llm_errors")
+
+
+def thread_llm_usage() -> tuple[int, float]:
+    """
+    Number of LLM judge calls made so far by the current thread, and the seconds spent in them.
+
+    Taken before and after a stage, the difference is the share of the stage spent waiting for judges.
+    """
+    return getattr(_active, "llm_calls", 0), getattr(_active, "llm_seconds", 0.0)
+
+
+class _Histogram(object):
+    __slots__ = ("buckets", "count", "counts", "sum")
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self) -> HistogramSnapshot:
+        return HistogramSnapshot(buckets=list(self.buckets), counts=list(self.counts), count=self.count, sum=self.sum)
+
+
+class RewardMetrics(object):
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        """
+        Per-datasource stage histograms and outcome counters, aggregated over all batches.
+
+        Batches are merged once each, so the scoring threads never contend on this object. Exporters
+        added with `add_exporter` receive a `MetricsSnapshot` after every batch, at most once per
+        `interval` seconds each.
+
+        Args:
+            buckets (Sequence[float]): Sorted histogram bucket upper bounds, in seconds.
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._histograms: dict[tuple[str, str], _Histogram] = {}
+        self._counters: dict[tuple[str, str], int] = {}
+        self._exporters: list[_ScheduledExporter] = []
+        self._lock = threading.Lock()
+
+    def record(self, recorder: BatchRecorder) -> None:
+        with self._lock:
+            for stage, seconds in recorder.observations:
+                key = (recorder.datasource, stage)
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = _Histogram(self.buckets)
+                histogram.observe(seconds)
+            for name, value in recorder.counters.items():
+                key = (recorder.datasource, name)
+                self._counters[key] = self._counters.get(key, 0) + value
+
+    def snapshot(self) -> MetricsSnapshot:
+        stages: dict[str, dict[str, HistogramSnapshot]] = {}
+        counters: dict[str, dict[str, int]] = {}
+        with self._lock:
+            for (datasource, stage), histogram in sorted(self._histograms.items()):
+                stages.setdefault(datasource, {})[stage] = histogram.snapshot()
+            for (datasource, name), value in sorted(self._counters.items()):
+                counters.setdefault(datasource, {})[name] = value
+        return MetricsSnapshot(timestamp=time.time(), stages=stages, counters=counters)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def add_exporter(self, exporter: MetricsExporter, interval: float = 0.0) -> None:
+        """
+        Register an exporter, e.g. `PrometheusFileExporter`, `JsonFileExporter` or any callable.
+
+        Args:
+            exporter (MetricsExporter): Called with a `MetricsSnapshot`.
+            interval (float): Minimum number of seconds between two calls.
+        """
+        with self._lock:
+            self._exporters.append(_ScheduledExporter(exporter, interval))
+
+    def export(self, force: bool = False) -> None:
+        """Call the exporters that are due, or all of them with `force`."""
+        now = time.monotonic()
+        with self._lock:
+            due = []
+            for scheduled in self._exporters:
+                if force or now - scheduled.last_export >= scheduled.interval:
+                    scheduled.last_export = now
+                    due.append(scheduled.exporter)
+        if not due:
+            return
+        snapshot = self.snapshot()
+        for exporter in due:
+            try:
+                exporter(snapshot)
+            except Exception as e:
+                _logger.warning("> Metrics exporter %r failed: %s", exporter, repr(e))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus(snapshot: MetricsSnapshot, prefix: str = "glmv_reward") -> str:
+    """Render a snapshot in the Prometheus text exposition format."""
+    lines = [
+        f"# HELP {prefix}_stage_seconds Time spent in each reward stage.",
+        f"# TYPE {prefix}_stage_seconds histogram",
+    ]
+    for datasource, stages in snapshot.stages.items():
+        for stage, histogram in stages.items():
+            labels = f'datasource="{_escape_label(datasource)}",stage="{_escape_label(stage)}"'
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts, strict=False):
+                cumulative += count
+                lines.append(f'{prefix}_stage_seconds_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"{prefix}_stage_seconds_sum{{{labels}}} {histogram.sum!r}")
+            lines.append(f"{prefix}_stage_seconds_count{{{labels}}} {histogram.count}")
+
+    lines += [
+        f"# HELP {prefix}_events_total Reward outcome counters.",
+        f"# TYPE {prefix}_events_total counter",
+    ]
+    for datasource, counters in snapshot.counters.items():
+        for name, value in counters.items():
+            labels = f'datasource="{_escape_label(datasource)}",event="{_escape_label(name)}"'
+            lines.append(f"{prefix}_events_total{{{labels}}} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def _write_atomic(path: Path, payload: bytes) -> None:
+    # * readers such as the node_exporter textfile collector never see a partial file
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_bytes(payload)
+    tmp_path.replace(path)
+
+
+class PrometheusFileExporter(object):
+    """Writes snapshots in the Prometheus text format, e.g. for the node_exporter textfile collector."""
+
+    def __init__(self, path: Union[str, Path], prefix: str = "glmv_reward") -> None:
+        self.path = resolve_path(path)
+        self.prefix = prefix
+
+    def __call__(self, snapshot: MetricsSnapshot) -> None:
+        _write_atomic(self.path, render_prometheus(snapshot, self.prefix).encode("utf-8"))
+
+
+class JsonFileExporter(object):
+    """Writes snapshots as JSON."""
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = resolve_path(path)
+
+    def __call__(self, snapshot: MetricsSnapshot) -> None:
+        _write_atomic(self.path, msgspec.json.encode(snapshot))
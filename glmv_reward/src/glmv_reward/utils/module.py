@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+
+import hashlib
+import importlib.util
+import os
+import re
+import sys
+import threading
+from pathlib import Path
+from types import ModuleType
+from typing import NamedTuple, Union
+
+from .logging import get_logger
+from .path import resolve_path
+
+_logger = get_logger(__name__)
+
+
+class _ModuleRecord(NamedTuple):
+    module: ModuleType
+    mtime_ns: int
+    size: int
+    digest: str
+
+
+_MODULE_CACHE: dict[str, _ModuleRecord] = {}
+_MODULE_CACHE_LOCK = threading.Lock()
+
+
+def _unique_module_name(pobj: Path) -> str:
+    """Derive a stable module name that is unique per source path."""
+    path_digest = hashlib.sha1(os.fspath(pobj).encode("utf-8")).hexdigest()[:12]  # noqa: S324
+    stem = re.sub(r"\W", "_", pobj.stem)
+    return f"glmv_reward_user_module_{stem}_{path_digest}"
+
+
+def _exec_module(pobj: Path, source: bytes) -> ModuleType:
+    module_name = _unique_module_name(pobj)
+    spec = importlib.util.spec_from_file_location(module_name, pobj)
+    if spec is None:
+        err_msg = f"Cannot create a module spec from file '{os.fspath(pobj)}'."
+        raise ImportError(err_msg)
+
+    module = importlib.util.module_from_spec(spec)
+    # * registers the module before executing it so that pickling, dataclasses and
+    # * `typing.get_type_hints` can resolve objects defined in the user file.
+    sys.modules[module_name] = module
+    try:
+        exec(compile(source, os.fspath(pobj), "exec"), module.__dict__)  # noqa: S102
+    except BaseException:
+        sys.modules.pop(module_name, None)
+        raise
+    return module
+
+
+def load_module_from_file(file_path: Union[str, Path], check_for_updates: bool = True) -> ModuleType:
+    """
+    Load a Python source file as a module, re-executing it only when its content changes.
+
+    Modules are cached per resolved path. A cache hit costs a single `stat` call: the file is
+    re-read only when its mtime or size differs from the cached record, and re-executed only
+    when the SHA-256 digest of its content differs as well (e.g. a `touch` does not trigger a reload).
+
+    Args:
+        file_path (Union[str, Path]): Path to the Python source file.
+        check_for_updates (bool): If False, a cached module is returned without touching the file system.
+
+    Returns:
+        ModuleType: The loaded module, registered in `sys.modules` under a name unique to `file_path`.
+    """
+    pobj = resolve_path(file_path)
+    cache_key = os.fspath(pobj)
+
+    record = _MODULE_CACHE.get(cache_key)
+    if record is not None and not check_for_updates:
+        return record.module
+
+    stat = pobj.stat()
+    if record is not None and record.mtime_ns == stat.st_mtime_ns and record.size == stat.st_size:
+        return record.module
+
+    with _MODULE_CACHE_LOCK:
+        # * another thread may have reloaded the module while we were waiting for the lock
+        record = _MODULE_CACHE.get(cache_key)
+        if record is not None and record.mtime_ns == stat.st_mtime_ns and record.size == stat.st_size:
+            return record.module
+
+        source = pobj.read_bytes()
+        digest = hashlib.sha256(source).hexdigest()
+        if record is not None and record.digest == digest:
+            _MODULE_CACHE[cache_key] = record._replace(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            return record.module
+
+        _logger.info("Loading module from file '%s'.", cache_key)
+        module = _exec_module(pobj, source)
+        _MODULE_CACHE[cache_key] = _ModuleRecord(module, stat.st_mtime_ns, stat.st_size, digest)
+        return module
@@ -3,15 +3,23 @@
 
 import mmap
 import os
+import re
 import struct
+import tarfile
+import threading
 from collections import namedtuple
 from pathlib import Path
 from typing import Optional, Union
 
+import msgspec
+
 from .logging import get_logger
 
 _logger = get_logger(__name__)
 
+# * `<shard>.tar:<member>` image references
+_TAR_MEMBER_PATTERN = re.compile(r"^(.+?\.tar):(.+)$")
+
 TarHeader = namedtuple(
     "TarHeader",
     [
@@ -75,13 +83,136 @@ def extract_data_from_tarfile(tar_path: Union[str, Path], offset: int) -> tuple[
     """
     tar_pobj = resolve_path(tar_path)
     try:
-        with open(tar_pobj, "rb") as stream:
-            mmap_obj = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
-            header = parse_tar_header(mmap_obj[offset : offset + 500])
-            name = header.name.decode("utf-8").strip("\x00")
-            start = offset + 512
-            end = start + int(header.size.decode("utf-8")[:-1], 8)
-            return name, mmap_obj[start:end]
+        # * the mapping is shared with every other lookup in the same shard
+        mmap_obj = get_tar_shard(tar_pobj).mmap
+        header = parse_tar_header(mmap_obj[offset : offset + 500])
+        name = header.name.decode("utf-8").strip("\x00")
+        start = offset + 512
+        end = start + int(header.size.decode("utf-8")[:-1], 8)
+        return name, mmap_obj[start:end]
     except Exception:
         _logger.exception("Failed to extract data from file '%s'.", os.fspath(tar_pobj))
         return None, None
+
+
+class TarIndex(msgspec.Struct):
+    """Sidecar index of a tar shard, valid as long as the shard size and mtime match."""
+
+    shard_size: int
+    shard_mtime_ns: int
+    # * member name -> (data offset, data size)
+    members: dict[str, tuple[int, int]]
+
+
+class TarShard(object):
+    def __init__(self, tar_path: Union[str, Path], build_index: bool = True) -> None:
+        """
+        Read-only view of a tar shard, memory-mapped once and shared by all the threads.
+
+        Members are looked up by name through a `<shard>.tar.index` sidecar file, which is built with
+        `tarfile` the first time the shard is opened, and rebuilt whenever the shard changes. If the
+        sidecar cannot be written, the index is only kept in memory.
+
+        Args:
+            tar_path (Union[str, Path]): Path to the tar file
+            build_index (bool): Build the member index now rather than on the first lookup
+        """
+        self.path = resolve_path(tar_path)
+        self.index_path = self.path.with_name(self.path.name + ".index")
+        with open(self.path, "rb") as stream:
+            self.mmap = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+            stat = os.fstat(stream.fileno())
+        # * (size, mtime) of the mapped shard, to tell when the file on disk has changed
+        self.signature = (stat.st_size, stat.st_mtime_ns)
+        self._members: Optional[dict[str, tuple[int, int]]] = None
+        self._lock = threading.Lock()
+        if build_index:
+            self.members()
+
+    def members(self) -> dict[str, tuple[int, int]]:
+        """Map of member name to (data offset, data size), regular files only."""
+        if self._members is None:
+            with self._lock:
+                if self._members is None:
+                    self._members = self._load_index()
+        return self._members
+
+    def _load_index(self) -> dict[str, tuple[int, int]]:
+        try:
+            index = msgspec.json.decode(self.index_path.read_bytes(), type=TarIndex)
+        except (OSError, msgspec.DecodeError):
+            pass
+        else:
+            if (index.shard_size, index.shard_mtime_ns) == self.signature:
+                return index.members
+            _logger.info("> Tar index '%s' is stale, rebuilding it.", os.fspath(self.index_path))
+
+        members: dict[str, tuple[int, int]] = {}
+        with tarfile.open(self.path, mode="r:") as tar:
+            for info in tar:
+                if info.isfile():
+                    members[info.name] = (info.offset_data, info.size)
+        index = TarIndex(shard_size=self.signature[0], shard_mtime_ns=self.signature[1], members=members)
+        tmp_path = self.index_path.with_name(f".{self.index_path.name}.{os.getpid()}.tmp")
+        try:
+            tmp_path.write_bytes(msgspec.json.encode(index))
+            tmp_path.replace(self.index_path)
+        except OSError as e:
+            _logger.debug("Failed to write tar index '%s': %s", os.fspath(self.index_path), repr(e))
+        return members
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.members()
+
+    def read(self, name: str) -> memoryview:
+        """
+        Get the content of a member without copying it.
+
+        Args:
+            name (str): Member name, as stored in the tar
+
+        Returns:
+            memoryview: A read-only view into the shard mapping
+        """
+        member = self.members().get(name)
+        if member is None:
+            err_msg = f"Member '{name}' not found in tar shard '{os.fspath(self.path)}'."
+            raise KeyError(err_msg)
+        offset, size = member
+        return memoryview(self.mmap)[offset : offset + size]
+
+
+_TAR_SHARDS: dict[Path, TarShard] = {}
+_TAR_SHARDS_LOCK = threading.Lock()
+
+
+def get_tar_shard(tar_path: Union[str, Path]) -> TarShard:
+    """The process-wide `TarShard` of `tar_path`, opened on first use and reopened when the file changes."""
+    pobj = resolve_path(tar_path)
+    stat = pobj.stat()
+    signature = (stat.st_size, stat.st_mtime_ns)
+    shard = _TAR_SHARDS.get(pobj)
+    if shard is None or shard.signature != signature:
+        with _TAR_SHARDS_LOCK:
+            shard = _TAR_SHARDS.get(pobj)
+            if shard is None or shard.signature != signature:
+                # * the previous mapping is left to the views still reading from it
+                shard = _TAR_SHARDS[pobj] = TarShard(pobj, build_index=False)
+    return shard
+
+
+def split_tar_member(path: Union[str, Path]) -> Optional[tuple[str, str]]:
+    """Split a `<shard>.tar:<member>` reference into the shard path and member name, None for plain paths."""
+    match = _TAR_MEMBER_PATTERN.match(os.fspath(path))
+    if match is None or os.path.exists(path):
+        return None
+    return match.group(1), match.group(2)
+
+
+def read_tar_member(path: Union[str, Path]) -> memoryview:
+    """Read a `<shard>.tar:<member>` reference without copying, see `TarShard.read`."""
+    parts = split_tar_member(path)
+    if parts is None:
+        err_msg = f"'{os.fspath(path)}' is not a `<shard>.tar:<member>` reference."
+        raise ValueError(err_msg)
+    return get_tar_shard(parts[0]).read(parts[1])
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+
+
+from collections import Counter
+from collections.abc import Hashable, Iterable, Sequence
+from typing import Optional
+
+import editdistance
+
+
+def lcs_length(seq1: Sequence[Hashable], seq2: Sequence[Hashable]) -> int:
+    """
+    Length of the longest common subsequence of two sequences.
+
+    Uses the bit-parallel algorithm of Allison & Dix (Hyyrö's formulation) on Python integers:
+    the DP column of the longer sequence is packed into one arbitrary-precision integer, so the cost
+    is O(len(shorter) * len(longer) / word_size) instead of building an O(m * n) table.
+
+    Args:
+        seq1 (Sequence[Hashable]): The first sequence, e.g. a string.
+        seq2 (Sequence[Hashable]): The second sequence.
+
+    Returns:
+        int: The LCS length.
+    """
+    if len(seq1) < len(seq2):
+        seq1, seq2 = seq2, seq1
+    if len(seq2) == 0:
+        return 0
+
+    # * bit i of `match_masks[c]` is set iff seq1[i] == c
+    match_masks: dict[Hashable, int] = {}
+    for idx, item in enumerate(seq1):
+        match_masks[item] = match_masks.get(item, 0) | (1 << idx)
+
+    full_mask = (1 << len(seq1)) - 1
+    row = full_mask
+    for item in seq2:
+        matched = row & match_masks.get(item, 0)
+        row = ((row + matched) | (row - matched)) & full_mask
+    return len(seq1) - row.bit_count()
+
+
+def lcs_similarity(seq1: Sequence[Hashable], seq2: Sequence[Hashable]) -> float:
+    """LCS length normalized by the length of the longer sequence (1.0 if both are empty)."""
+    max_len = max(len(seq1), len(seq2))
+    if max_len == 0:
+        return 1.0
+    return lcs_length(seq1, seq2) / max_len
+
+
+def edit_distance_similarity(seq1: Sequence[Hashable], seq2: Sequence[Hashable]) -> float:
+    """`1 - levenshtein / max_len`, computed with the `editdistance` C extension (1.0 if both are empty)."""
+    max_len = max(len(seq1), len(seq2))
+    if max_len == 0:
+        return 1.0
+    return 1.0 - editdistance.eval(seq1, seq2) / max_len
+
+
+def _strip_common_affixes(
+    seq1: Sequence[Hashable], seq2: Sequence[Hashable]
+) -> tuple[Sequence[Hashable], Sequence[Hashable]]:
+    """Drop the common prefix and suffix, which never contribute to the edit distance."""
+    limit = min(len(seq1), len(seq2))
+    start = 0
+    while start < limit and seq1[start] == seq2[start]:
+        start += 1
+    end = 0
+    while end < limit - start and seq1[len(seq1) - 1 - end] == seq2[len(seq2) - 1 - end]:
+        end += 1
+    return seq1[start : len(seq1) - end], seq2[start : len(seq2) - end]
+
+
+def edit_distance_lower_bound(seq1: Sequence[Hashable], seq2: Sequence[Hashable]) -> int:
+    """
+    A cheap lower bound of the Levenshtein distance.
+
+    Every edit fixes at most one surplus item on each side, so the distance is at least the larger of
+    the two multiset differences (which is itself at least the length difference).
+    """
+    counts1, counts2 = Counter(seq1), Counter(seq2)
+    return max((counts1 - counts2).total(), (counts2 - counts1).total())
+
+
+def _banded_edit_distance(seq1: Sequence[Hashable], seq2: Sequence[Hashable], max_distance: int) -> int:
+    """
+    Levenshtein distance restricted to the diagonal band `|i - j| <= max_distance` (Ukkonen's cutoff).
+
+    Bit-parallel (Myers / Hyyrö) column updates on a window of at most `2 * max_distance + 1` rows:
+    rows leaving the band above are folded into `top`, the value of the row right above the window, and
+    rows entering it below start with vertical deltas of +1. Both are upper bounds of the true DP values,
+    so every distance `<= max_distance` is exact and every larger one is reported as something larger.
+    Requires `len(seq1) <= len(seq2) <= len(seq1) + max_distance` and `max_distance >= 1`.
+    """
+    len1 = len(seq1)
+    match_masks: dict[Hashable, int] = {}
+    for idx, item in enumerate(seq1):
+        match_masks[item] = match_masks.get(item, 0) | (1 << idx)
+
+    # * the window holds rows `lo..hi` (1-based) of the DP column as bits `0..hi-lo`; `top` is D[lo - 1][j]
+    lo, hi, top = 1, min(len1, max_distance), 0
+    pv, mv = (1 << hi) - 1, 0
+    for col, item in enumerate(seq2, start=1):
+        if col - max_distance > lo:
+            top += (pv & 1) - (mv & 1)
+            pv >>= 1
+            mv >>= 1
+            lo += 1
+        if hi < min(len1, col + max_distance):
+            pv |= 1 << (hi + 1 - lo)
+            hi += 1
+
+        mask = (1 << (hi - lo + 1)) - 1
+        eq = (match_masks.get(item, 0) >> (lo - 1)) & mask
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        # * the row above the window grows by one per column: exact for row 0, an upper bound otherwise
+        ph = (ph << 1) | 1
+        mh <<= 1
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv & mask
+        top += 1
+    return top + pv.bit_count() - mv.bit_count()
+
+
+# * the `editdistance` C extension beats the pure Python banded computation on short sequences and wide bands
+_BANDED_MIN_LENGTH = 1024
+_BANDED_MAX_WIDTH_RATIO = 0.5
+
+
+def bounded_edit_distance(seq1: Sequence[Hashable], seq2: Sequence[Hashable], max_distance: int) -> Optional[int]:
+    """
+    The Levenshtein distance of two sequences if it is at most `max_distance`, else None.
+
+    Pairs whose lower bound (see `edit_distance_lower_bound`) already exceeds the cutoff are rejected
+    without any DP. Otherwise long pairs are only evaluated inside the diagonal band of width
+    `2 * max_distance + 1`, i.e. in O(len * max_distance / word_size) instead of O(len ** 2 / word_size).
+
+    Args:
+        seq1 (Sequence[Hashable]): The first sequence, e.g. a string.
+        seq2 (Sequence[Hashable]): The second sequence.
+        max_distance (int): The cutoff.
+
+    Returns:
+        Optional[int]: The exact distance, or None if it exceeds `max_distance`.
+    """
+    if max_distance < 0 or abs(len(seq1) - len(seq2)) > max_distance:
+        return None
+    seq1, seq2 = _strip_common_affixes(seq1, seq2)
+    if len(seq1) > len(seq2):
+        seq1, seq2 = seq2, seq1
+    if len(seq1) == 0:
+        return len(seq2) if len(seq2) <= max_distance else None
+    if max_distance == 0 or edit_distance_lower_bound(seq1, seq2) > max_distance:
+        return None
+
+    if len(seq2) < _BANDED_MIN_LENGTH or 2 * max_distance > _BANDED_MAX_WIDTH_RATIO * len(seq2):
+        distance = editdistance.eval(seq1, seq2)
+    else:
+        distance = _banded_edit_distance(seq1, seq2, max_distance)
+    return distance if distance <= max_distance else None
+
+
+def thresholded_edit_similarity(
+    seq1: Sequence[Hashable],
+    seq2: Sequence[Hashable],
+    lower_bound: float = 0.0,
+    upper_bound: float = 1.0,
+) -> float:
+    """
+    `edit_distance_similarity` snapped to 1.0 at or above `upper_bound` and to 0.0 at or below `lower_bound`.
+
+    Only similarities strictly between the two bounds are computed exactly: the distance is first bounded
+    by the largest value that still reaches `upper_bound`, then by the largest value that stays above
+    `lower_bound`, so near-identical and clearly different pairs both finish early.
+
+    Returns:
+        float: The snapped similarity (1.0 if both sequences are empty).
+    """
+    max_len = max(len(seq1), len(seq2))
+    if max_len == 0:
+        return 1.0
+
+    def _similarity(distance: int) -> float:
+        return 1.0 - distance / max_len
+
+    # * largest distances whose similarity is still >= upper_bound (accept) and > lower_bound (undecided)
+    accept = min(max(int((1.0 - upper_bound) * max_len), -1), max_len)
+    while accept < max_len and _similarity(accept + 1) >= upper_bound:
+        accept += 1
+    while accept >= 0 and _similarity(accept) < upper_bound:
+        accept -= 1
+    undecided = min(max(int((1.0 - lower_bound) * max_len), -1), max_len)
+    while undecided < max_len and _similarity(undecided + 1) > lower_bound:
+        undecided += 1
+    while undecided >= 0 and _similarity(undecided) <= lower_bound:
+        undecided -= 1
+
+    if accept >= 0 and bounded_edit_distance(seq1, seq2, accept) is not None:
+        return 1.0
+    distance = bounded_edit_distance(seq1, seq2, undecided)
+    if distance is None:
+        return 0.0
+    similarity = _similarity(distance)
+    if similarity >= upper_bound:
+        return 1.0
+    return similarity
+
+
+def thresholded_edit_similarity_batch(
+    pairs: Iterable[tuple[Sequence[Hashable], Sequence[Hashable]]],
+    lower_bound: float = 0.0,
+    upper_bound: float = 1.0,
+) -> list[float]:
+    """Batched `thresholded_edit_similarity`; identical pairs of strings are only evaluated once."""
+    memo: dict[tuple[str, str], float] = {}
+    scores = []
+    for seq1, seq2 in pairs:
+        key = (seq1, seq2) if isinstance(seq1, str) and isinstance(seq2, str) else None
+        if key is not None and key in memo:
+            scores.append(memo[key])
+            continue
+        score = thresholded_edit_similarity(seq1, seq2, lower_bound, upper_bound)
+        if key is not None:
+            memo[key] = score
+        scores.append(score)
+    return scores
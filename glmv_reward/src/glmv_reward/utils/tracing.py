@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+
+
+import collections
+import contextlib
+import random
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Optional, Union
+
+import msgspec
+
+from .logging import get_logger
+from .path import resolve_path
+
+_logger = get_logger(__name__)
+
+# * outcome of a judge call, see `JudgeCallTrace.status`
+STATUSES = ("ok", "timeout", "http_error", "connection_error", "bad_response", "error")
+
+_scope = threading.local()
+
+
+class JudgeCallTrace(msgspec.Struct):
+    """One LLM judge call, as made by `post_query_llm`. Credentials are never recorded."""
+
+    timestamp: float
+    verifier: str
+    endpoint: str
+    model: str
+    latency: float = 0.0
+    status: str = "ok"
+    http_status: Optional[int] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    # * only filled when the tracer records payloads
+    prompt: Optional[str] = None
+    response: Optional[str] = None
+
+
+class JudgeAggregate(msgspec.Struct):
+    """All the calls of one verifier to one endpoint and model; latencies are in seconds."""
+
+    verifier: str
+    endpoint: str
+    model: str
+    num_calls: int
+    statuses: dict[str, int]
+    latency_mean: float
+    latency_p50: float
+    latency_p90: float
+    latency_p99: float
+    latency_max: float
+    prompt_tokens: int
+    completion_tokens: int
+
+
+class _Aggregate(object):
+    __slots__ = (
+        "completion_tokens",
+        "latencies",
+        "latency_max",
+        "latency_sum",
+        "num_calls",
+        "prompt_tokens",
+        "statuses",
+    )
+
+    def __init__(self, window: int) -> None:
+        self.num_calls = 0
+        self.statuses: dict[str, int] = {}
+        # * percentiles are computed over the most recent calls only
+        self.latencies: collections.deque[float] = collections.deque(maxlen=window)
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def add(self, trace: JudgeCallTrace) -> None:
+        self.num_calls += 1
+        self.statuses[trace.status] = self.statuses.get(trace.status, 0) + 1
+        self.latencies.append(trace.latency)
+        self.latency_sum += trace.latency
+        self.latency_max = max(self.latency_max, trace.latency)
+        self.prompt_tokens += trace.prompt_tokens or 0
+        self.completion_tokens += trace.completion_tokens or 0
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class JudgeTracer(object):
+    def __init__(
+        self,
+        sample_rate: float = 1.0,
+        capacity: int = 1024,
+        record_payloads: bool = False,
+        window: int = 4096,
+        seed: Optional[int] = None,
+    ) -> None:
+        """
+        Structured tracing of the LLM judge calls.
+
+        Every call is counted in the per-verifier aggregates; a `sample_rate` fraction of them is also
+        kept in a ring buffer of the `capacity` most recent calls, which `dump` writes out on demand.
+
+        Args:
+            sample_rate (float): Fraction of the calls kept in the ring buffer.
+            capacity (int): Size of the ring buffer.
+            record_payloads (bool): Keep the prompt and response text of the sampled calls.
+            window (int): Number of recent calls the aggregate latency percentiles are computed over.
+            seed (Optional[int]): Seed of the sampling draws.
+        """
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)  # noqa: S311
+        self._aggregates: dict[tuple[str, str, str], _Aggregate] = {}
+        self.window = window
+        self.configure(sample_rate=sample_rate, capacity=capacity, record_payloads=record_payloads)
+
+    def configure(
+        self,
+        sample_rate: Optional[float] = None,
+        capacity: Optional[int] = None,
+        record_payloads: Optional[bool] = None,
+    ) -> None:
+        """Change the sampling settings; resizing the ring buffer keeps its most recent calls."""
+        if sample_rate is not None and not 0.0 <= sample_rate <= 1.0:
+            err_msg = f"`sample_rate` should be in [0, 1], but got {sample_rate}."
+            raise ValueError(err_msg)
+        if capacity is not None and capacity < 0:
+            err_msg = f"`capacity` should be non-negative, but got {capacity}."
+            raise ValueError(err_msg)
+        with self._lock:
+            if sample_rate is not None:
+                self.sample_rate = sample_rate
+            if record_payloads is not None:
+                self.record_payloads = record_payloads
+            if capacity is not None:
+                previous = getattr(self, "_buffer", ())
+                self._buffer: collections.deque[JudgeCallTrace] = collections.deque(previous, maxlen=capacity)
+
+    @property
+    def capacity(self) -> int:
+        return self._buffer.maxlen or 0
+
+    def record(self, trace: JudgeCallTrace) -> None:
+        with self._lock:
+            key = (trace.verifier, trace.endpoint, trace.model)
+            aggregate = self._aggregates.get(key)
+            if aggregate is None:
+                aggregate = self._aggregates[key] = _Aggregate(self.window)
+            aggregate.add(trace)
+            if self.sample_rate >= 1.0 or self._rng.random() < self.sample_rate:
+                if not self.record_payloads:
+                    trace.prompt = trace.response = None
+                self._buffer.append(trace)
+
+    def recent(self, limit: Optional[int] = None) -> list[JudgeCallTrace]:
+        """The sampled calls still in the ring buffer, oldest first."""
+        with self._lock:
+            traces = list(self._buffer)
+        if limit is not None:
+            traces = traces[max(0, len(traces) - limit) :]
+        return traces
+
+    def aggregate(self) -> list[JudgeAggregate]:
+        """Per verifier, endpoint and model view of all the traced calls, slowest p99 first."""
+        with self._lock:
+            result = [
+                JudgeAggregate(
+                    verifier=verifier,
+                    endpoint=endpoint,
+                    model=model,
+                    num_calls=aggregate.num_calls,
+                    statuses=dict(aggregate.statuses),
+                    latency_mean=aggregate.latency_sum / aggregate.num_calls,
+                    latency_p50=_percentile(latencies, 0.5),
+                    latency_p90=_percentile(latencies, 0.9),
+                    latency_p99=_percentile(latencies, 0.99),
+                    latency_max=aggregate.latency_max,
+                    prompt_tokens=aggregate.prompt_tokens,
+                    completion_tokens=aggregate.completion_tokens,
+                )
+                for (verifier, endpoint, model), aggregate in self._aggregates.items()
+                for latencies in (sorted(aggregate.latencies),)
+            ]
+        result.sort(key=lambda x: x.latency_p99, reverse=True)
+        return result
+
+    def dump(self, path: Union[str, Path]) -> int:
+        """
+        Write the ring buffer as JSON lines.
+
+        Args:
+            path (Union[str, Path]): The output file, overwritten.
+
+        Returns:
+            int: The number of calls written.
+        """
+        traces = self.recent()
+        path = resolve_path(path)
+        encoder = msgspec.json.Encoder()
+        with path.open("wb") as f:
+            for trace in traces:
+                f.write(encoder.encode(trace) + b"\n")
+        _logger.info("> Dumped %d judge call traces to %s", len(traces), path)
+        return len(traces)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buffer.clear()
+            self._aggregates.clear()
+
+
+_JUDGE_TRACER = JudgeTracer()
+
+
+def get_judge_tracer() -> JudgeTracer:
+    """The process-wide tracer `post_query_llm` reports to."""
+    return _JUDGE_TRACER
+
+
+@contextlib.contextmanager
+def judge_trace_scope(verifier: str) -> Iterator[None]:
+    """Attribute the judge calls made by the current thread to `verifier`."""
+    previous = getattr(_scope, "verifier", None)
+    _scope.verifier = verifier
+    try:
+        yield
+    finally:
+        _scope.verifier = previous
+
+
+def current_verifier() -> str:
+    """The verifier of the innermost `judge_trace_scope` of the current thread."""
+    return getattr(_scope, "verifier", None) or "unknown"
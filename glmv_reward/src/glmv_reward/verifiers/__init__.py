@@ -83,7 +83,13 @@ def get_verifier_from_config(config: VerifierConfig, datasource: str) -> Verifie
                 "extract_answer_func_name",
                 "judge_func_path",
                 "judge_func_name",
+                "extract_answer_batch_func_name",
+                "judge_batch_func_name",
                 "load_once",
+                "execution_mode",
+                "num_workers",
+                "worker_timeout",
+                "worker_start_method",
             ]:
                 try:
                     value = get_struct_attr(config, key)
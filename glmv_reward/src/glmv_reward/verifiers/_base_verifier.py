@@ -2,6 +2,7 @@
 
 
 from abc import ABC, abstractmethod
+from collections.abc import Sequence
 from typing import Any, Optional
 
 
@@ -50,10 +51,53 @@ class Verifier(ABC):
         """
         pass
 
+    def extract_answer_batch(self, responses: Sequence[str], questions: Sequence[Optional[str]]) -> list[Any]:
+        """
+        Extracts answers from a batch of responses.
+
+        The default implementation calls `extract_answer` once per item. Batch verifiers
+        (see `is_batch_verifier`) may override it to process the whole batch at once.
+
+        Args:
+            responses (Sequence[str]): The full response strings from the model.
+            questions (Sequence[Optional[str]]): The questions/prompts, aligned with `responses`.
+
+        Returns:
+            list[Any]: One extracted answer (or None) per response.
+        """
+        return [
+            self.extract_answer(response, question=question)
+            for response, question in zip(responses, questions, strict=True)
+        ]
+
+    def judge_batch(
+        self,
+        extracted_answers: Sequence[Any],
+        ground_truths: Sequence[Any],
+        questions: Sequence[Optional[str]],
+        image_files: Sequence[Optional[str]],
+    ) -> list[float]:
+        """
+        Judges a batch of extracted answers against their (extracted) ground truths.
+
+        The default implementation calls `judge` once per item. Batch verifiers
+        (see `is_batch_verifier`) may override it to score the whole batch at once.
+
+        Returns:
+            list[float]: One score per item.
+        """
+        return [
+            self.judge(extracted_answer, ground_truth, question=question, image_file=image_file)
+            for extracted_answer, ground_truth, question, image_file in zip(
+                extracted_answers, ground_truths, questions, image_files, strict=True
+            )
+        ]
+
     @property
     def min_reward(self) -> float:
         return 0.0
 
     @property
     def is_batch_verifier(self) -> bool:
+        """Whether `RewardSystem` should score a whole batch through `extract_answer_batch` and `judge_batch`."""
         return False
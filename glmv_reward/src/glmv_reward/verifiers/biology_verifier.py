@@ -132,10 +132,11 @@ class BiologyVerifier(MathVerifier):
                 api_key,
                 url=reward_url,
                 model=model,
-                image_file=image_file,
+                image_file=image_file if self.llm_judge_with_image else None,
                 max_tokens=self.llm_max_tokens,
                 temperature=self.llm_temperature,
                 top_p=self.llm_top_p,
+                image_max_side=self.llm_image_max_side,
             )
 
             # Initialize content with a default value to avoid referencing it later
@@ -27,6 +27,8 @@ class ChartVerifier(Verifier):
         llm_max_tokens: int = 10,
         llm_temperature: float = 0.1,
         llm_top_p: float = 1.0,
+        llm_judge_with_image: bool = False,
+        llm_image_max_side: Optional[int] = 1024,
     ) -> None:
         self.extraction_pattern = re.compile(rf"{answer_extraction_regex}", re.DOTALL | re.IGNORECASE)
 
@@ -40,6 +42,8 @@ class ChartVerifier(Verifier):
         self.llm_max_tokens = llm_max_tokens
         self.llm_temperature = llm_temperature
         self.llm_top_p = llm_top_p
+        self.llm_judge_with_image = llm_judge_with_image
+        self.llm_image_max_side = llm_image_max_side
 
     def extract_answer(self, response: str, question: Optional[str] = None) -> Any:
         del question  # unused
@@ -179,10 +183,11 @@ class ChartVerifier(Verifier):
                 self.llm_api_key,
                 url=self.llm_judge_url,
                 model=self.llm_model,
-                image_file=image_file,
+                image_file=image_file if self.llm_judge_with_image else None,
                 max_tokens=self.llm_max_tokens,
                 temperature=self.llm_temperature,
                 top_p=self.llm_top_p,
+                image_max_side=self.llm_image_max_side,
             )
             if response_json:
                 content = response_json.strip()
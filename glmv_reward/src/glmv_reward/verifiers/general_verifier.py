@@ -23,6 +23,8 @@ class GeneralVerifier(Verifier):
         llm_max_tokens: int = 10,
         llm_temperature: float = 0.1,
         llm_top_p: float = 1.0,
+        llm_judge_with_image: bool = False,
+        llm_image_max_side: Optional[int] = 1024,
         answer_extraction_regex: Optional[str] = None,
     ) -> None:
         self.llm_api_key = llm_api_key
@@ -32,6 +34,8 @@ class GeneralVerifier(Verifier):
         self.llm_max_tokens = llm_max_tokens
         self.llm_temperature = llm_temperature
         self.llm_top_p = llm_top_p
+        self.llm_judge_with_image = llm_judge_with_image
+        self.llm_image_max_side = llm_image_max_side
 
         self.extraction_pattern = None
         if answer_extraction_regex is not None:
@@ -113,10 +117,11 @@ class GeneralVerifier(Verifier):
                 self.llm_api_key,
                 url=self.llm_judge_url,
                 model=self.llm_model,
-                image_file=image_file,
+                image_file=image_file if self.llm_judge_with_image else None,
                 max_tokens=self.llm_max_tokens,
                 temperature=self.llm_temperature,
                 top_p=self.llm_top_p,
+                image_max_side=self.llm_image_max_side,
             )
 
             if len(response_json) > 0:
@@ -26,6 +26,8 @@ class GeoQuestVerifier(Verifier):
         llm_max_tokens: int = 4096,
         llm_temperature: float = 0.8,
         llm_top_p: float = 0.6,
+        llm_judge_with_image: bool = False,
+        llm_image_max_side: Optional[int] = 1024,
         strict_boxed_extraction: bool = True,
     ):
         self.llm_api_key = llm_api_key
@@ -35,6 +37,8 @@ class GeoQuestVerifier(Verifier):
         self.llm_max_tokens = llm_max_tokens
         self.llm_temperature = llm_temperature
         self.llm_top_p = llm_top_p
+        self.llm_judge_with_image = llm_judge_with_image
+        self.llm_image_max_side = llm_image_max_side
         self.strict_boxed = strict_boxed_extraction
         self.think_answer_pattern = re.compile(r"^<think>(.*?)</think>(.*)$", re.DOTALL | re.IGNORECASE)
 
@@ -100,8 +104,8 @@ class GeoQuestVerifier(Verifier):
             raise ValueError(err_msg)
 
         # Ensure all required placeholders exist before formatting
-        if not all(k in verifier_template for k in ("{question}", "{predict}", "{label}")):
-            err_msg = "Template missing required placeholders: {question}, {predict}, {label}"
+        if not all(k in verifier_template for k in ("{predict}", "{place_name}", "{address}")):
+            err_msg = "Template missing required placeholders: {predict}, {place_name}, {address}"
             raise ValueError(err_msg)
 
         # Protect any unintended format tokens before applying .format()
@@ -139,10 +143,11 @@ class GeoQuestVerifier(Verifier):
                 api_key,
                 url=reward_url,
                 model=model,
-                image_file=image_file,
+                image_file=image_file if self.llm_judge_with_image else None,
                 max_tokens=self.llm_max_tokens,
                 temperature=self.llm_temperature,
                 top_p=self.llm_top_p,
+                image_max_side=self.llm_image_max_side,
             )
             # Initialize content with a default value to avoid referencing it later
             if response_text and type(response_text) is str:
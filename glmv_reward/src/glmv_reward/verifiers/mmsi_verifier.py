@@ -26,6 +26,8 @@ class MmsiVerifier(Verifier):
         llm_max_tokens: int = 10,
         llm_temperature: float = 0.1,
         llm_top_p: float = 1.0,
+        llm_judge_with_image: bool = False,
+        llm_image_max_side: Optional[int] = 1024,
     ) -> None:
         self.sympy_tolerance = sympy_tolerance
         self.strict_boxed = strict_boxed_extraction  # If true, only boxed answer is valid
@@ -39,6 +41,8 @@ class MmsiVerifier(Verifier):
         self.llm_max_tokens = llm_max_tokens
         self.llm_temperature = llm_temperature
         self.llm_top_p = llm_top_p
+        self.llm_judge_with_image = llm_judge_with_image
+        self.llm_image_max_side = llm_image_max_side
 
         self.think_answer_pattern = re.compile(r"^<think>(.*?)</think>(.*)$", re.DOTALL | re.IGNORECASE)
 
@@ -200,10 +204,11 @@ class MmsiVerifier(Verifier):
             self.llm_api_key,
             url=self.llm_judge_url,
             model=self.llm_model,
-            image_file=image_file,
+            image_file=image_file if self.llm_judge_with_image else None,
             max_tokens=self.llm_max_tokens,
             temperature=self.llm_temperature,
             top_p=self.llm_top_p,
+            image_max_side=self.llm_image_max_side,
         )
         # Initialize content with a default value to avoid referencing it later
         content = None
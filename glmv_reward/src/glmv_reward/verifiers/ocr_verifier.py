@@ -5,11 +5,11 @@ import re
 from collections.abc import Sequence
 from typing import Any, Optional, Union, cast
 
-import editdistance
-
+from glmv_reward.utils.doc_align import DocumentScore, score_aligned_blocks, split_blocks
 from glmv_reward.utils.llm import post_query_llm
 from glmv_reward.utils.logging import get_logger
 from glmv_reward.utils.misc import ensure_list
+from glmv_reward.utils.similarity import thresholded_edit_similarity, thresholded_edit_similarity_batch
 from glmv_reward.utils.text import find_boxed_content, protect_template
 
 from ._base_verifier import Verifier
@@ -32,6 +32,11 @@ class OCRVerifier(Verifier):
         llm_max_tokens: int = 10,
         llm_temperature: float = 0.1,
         llm_top_p: float = 1.0,
+        llm_judge_with_image: bool = False,
+        llm_image_max_side: Optional[int] = 1024,
+        long_document_mode: bool = False,
+        long_document_min_length: int = 2000,
+        long_document_max_block_length: int = 256,
     ) -> None:
         self.strict_boxed = strict_boxed_extraction
         # >= upper bound, score will be 1.0
@@ -47,6 +52,12 @@ class OCRVerifier(Verifier):
         self.llm_max_tokens = llm_max_tokens
         self.llm_temperature = llm_temperature
         self.llm_top_p = llm_top_p
+        self.llm_judge_with_image = llm_judge_with_image
+        self.llm_image_max_side = llm_image_max_side
+        # score documents of at least `long_document_min_length` characters block by block
+        self.long_document_mode = long_document_mode
+        self.long_document_min_length = long_document_min_length
+        self.long_document_max_block_length = long_document_max_block_length
 
         self.think_answer_pattern = re.compile(r"^<think>(.*?)</think>(.*)$", re.DOTALL | re.IGNORECASE)
 
@@ -99,17 +110,100 @@ class OCRVerifier(Verifier):
             )
             return self.min_reward
 
-        if self.ignore_case:
-            extracted_answer = extracted_answer.lower()
-            ground_truth = ground_truth.lower()
+        long_document = self._is_long_document(extracted_answer, ground_truth)
+        if long_document:
+            similarity = self.score_long_document(extracted_answer, ground_truth).similarity
+
+        extracted_answer = self._normalize(extracted_answer)
+        ground_truth = self._normalize(ground_truth)
+        if not long_document:
+            if not extracted_answer and not ground_truth:
+                return self.min_reward
+            similarity = thresholded_edit_similarity(
+                extracted_answer, ground_truth, self.edit_distance_lower_bound, self.edit_distance_upper_bound
+            )
+        return self._finalize_similarity(similarity, extracted_answer, ground_truth, question, image_file)
+
+    def judge_batch(
+        self,
+        extracted_answers: Sequence[Any],
+        ground_truths: Sequence[Any],
+        questions: Sequence[Optional[str]],
+        image_files: Sequence[Optional[str]],
+    ) -> list[float]:
+        """
+        Score a batch of OCR pairs, computing all edit-distance similarities in one call.
+
+        Only the pairs left undecided by the edit-distance bounds go through the LLM judge fallback.
+        """
+        rewards = [self.min_reward] * len(extracted_answers)
+        indices, pairs = [], []
+        long_document_indices = []
+        for idx, (extracted_answer, ground_truth) in enumerate(zip(extracted_answers, ground_truths, strict=True)):
+            if not isinstance(extracted_answer, str) or not isinstance(ground_truth, str):
+                _logger.warning(
+                    "%s: Judge expects string inputs, but got `%s` and `%s`.",
+                    self.__class__.__name__,
+                    type(extracted_answer),
+                    type(ground_truth),
+                )
+                continue
+            if self._is_long_document(extracted_answer, ground_truth):
+                long_document_indices.append(idx)
+                continue
+            pair = (self._normalize(extracted_answer), self._normalize(ground_truth))
+            if pair[0] or pair[1]:
+                indices.append(idx)
+                pairs.append(pair)
+
+        similarities = thresholded_edit_similarity_batch(
+            pairs, self.edit_distance_lower_bound, self.edit_distance_upper_bound
+        )
+        for idx, (extracted_answer, ground_truth), similarity in zip(indices, pairs, similarities, strict=True):
+            rewards[idx] = self._finalize_similarity(
+                similarity, extracted_answer, ground_truth, questions[idx], image_files[idx]
+            )
+        for idx in long_document_indices:
+            rewards[idx] = self.judge(extracted_answers[idx], ground_truths[idx], questions[idx], image_files[idx])
+        return rewards
+
+    def score_long_document(self, extracted_answer: str, ground_truth: str) -> DocumentScore:
+        """
+        Score a long OCR document block by block.
 
-        extracted_answer = extracted_answer.strip().replace("\n", " ").replace(" ", "")
-        ground_truth = ground_truth.strip().replace("\n", " ").replace(" ", "")
+        Both texts are split into lines (over-long lines into sentences), normalized like in `judge`, and
+        aligned on identical blocks; only the unmatched regions are compared with edit distance.
 
-        similarity = 1 - editdistance.eval(extracted_answer, ground_truth) / max(
-            len(extracted_answer), len(ground_truth)
+        Returns:
+            DocumentScore: The page similarity and the per-region breakdown, for diagnostics.
+        """
+        answer_blocks = self._normalized_blocks(extracted_answer)
+        gt_blocks = self._normalized_blocks(ground_truth)
+        return score_aligned_blocks(answer_blocks, gt_blocks, self.edit_distance_lower_bound)
+
+    def _is_long_document(self, extracted_answer: str, ground_truth: str) -> bool:
+        return (
+            self.long_document_mode and max(len(extracted_answer), len(ground_truth)) >= self.long_document_min_length
         )
 
+    def _normalized_blocks(self, text: str) -> list[str]:
+        blocks = (self._normalize(block) for block in split_blocks(text, self.long_document_max_block_length))
+        return [block for block in blocks if block]
+
+    def _normalize(self, text: str) -> str:
+        if self.ignore_case:
+            text = text.lower()
+        return text.strip().replace("\n", " ").replace(" ", "")
+
+    def _finalize_similarity(
+        self,
+        similarity: float,
+        extracted_answer: str,
+        ground_truth: str,
+        question: Optional[str],
+        image_file: Optional[str],
+    ) -> float:
+        # * `similarity` is already snapped to 1.0 / 0.0 outside of the (lower, upper) edit-distance bounds
         if similarity >= self.edit_distance_upper_bound:
             return 1.0
         if similarity <= self.edit_distance_lower_bound:
@@ -174,10 +268,11 @@ class OCRVerifier(Verifier):
                     api_key,
                     url=reward_url,
                     model=model,
-                    image_file=image_file,
+                    image_file=image_file if self.llm_judge_with_image else None,
                     max_tokens=self.llm_max_tokens,
                     temperature=self.llm_temperature,
                     top_p=self.llm_top_p,
+                    image_max_side=self.llm_image_max_side,
                 )
 
                 if response_json:
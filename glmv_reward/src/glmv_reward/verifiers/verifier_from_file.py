@@ -1,61 +1,338 @@
-# reward_hook/base_verifier.py
-import importlib.util
-from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional
+# -*- coding: utf-8 -*-
+
+
+import multiprocessing
+import os
+import signal
+import threading
+import weakref
+from collections.abc import Callable, Sequence
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Optional
+
+from glmv_reward.utils.logging import get_logger
+from glmv_reward.utils.module import load_module_from_file
 
 from ._base_verifier import Verifier
 
+_logger = get_logger(__name__)
+
+_EXECUTION_MODES = ("in_process", "subprocess")
+
+
+def _load_function(file_path: str, func_name: str, check_for_updates: bool = True) -> Callable[..., Any]:
+    module = load_module_from_file(file_path, check_for_updates=check_for_updates)
+    func = getattr(module, func_name, None)
+    if func is None:
+        err_msg = f"File '{file_path}' does not define `{func_name}`."
+        raise AttributeError(err_msg)
+    if not callable(func):
+        err_msg = f"`{func_name}` defined in file '{file_path}' is not callable."
+        raise TypeError(err_msg)
+    return func
+
+
+def _has_function(file_path: str, func_name: str) -> bool:
+    return callable(getattr(load_module_from_file(file_path), func_name, None))
+
+
+def _init_worker(file_paths: tuple[str, ...], pid_queue: Any) -> None:
+    # * reports the worker to the parent, which has to kill it by PID when user code hangs
+    pid_queue.put(os.getpid())
+    # * pre-loads the user files so that the first call in each worker does not pay the import cost
+    for file_path in file_paths:
+        load_module_from_file(file_path)
+
+
+def _warmup_worker() -> int:
+    return os.getpid()
+
+
+def _call_in_worker(file_path: str, func_name: str, check_for_updates: bool, args: tuple) -> Any:
+    return _load_function(file_path, func_name, check_for_updates=check_for_updates)(*args)
+
 
 class FileBasedVerifier(Verifier):
     """
-    Abstract Base Class for all verifiers.
-    Each verifier is responsible for extracting an answer from a response
-    and judging its correctness against a ground truth.
+    Verifier whose `extract_answer` and `judge` are plain functions defined in user-supplied Python files.
+
+    With `execution_mode: "in_process"` (default), the functions are called in the current process.
+    With `execution_mode: "subprocess"`, they run in a pool of pre-started worker processes, which isolates
+    untrusted code from the trainer and lets CPU-bound judges scale past the GIL. Arguments and results
+    must be picklable in that mode.
+
+    In both modes, `load_once: false` makes every call check whether the file changed on disk; the module
+    is re-executed only when its content actually differs. With `load_once: true` (default), the functions
+    loaded at initialization are kept, even if another verifier reloads the same file.
+
+    A call exceeding `worker_timeout` raises `TimeoutError` and kills the worker pool, which is restarted on
+    the next call, so that hung user code does not hold on to the workers. Calls sharing one `_map` run
+    `num_workers` at a time and share a single deadline of `worker_timeout` per such round.
+
+    A file may additionally define batch versions of its functions, named `<extract_answer_func_name>_batch`
+    and `<judge_func_name>_batch` unless configured otherwise:
+
+        def extract_answer_batch(responses: list[str], questions: list[Optional[str]]) -> list[Any]
+        def judge_batch(extracted_answers: list, ground_truths: list, questions: list, image_paths: list) -> list
+
+    When either exists the verifier reports itself as a batch verifier, and `RewardSystem` scores a whole
+    rollout batch with one call instead of one call per item.
     """
 
-    def __init__(self, config: Optional[Dict[str, Any]] = None):
+    def __init__(self, config: Optional[dict[str, Any]] = None) -> None:
         self.config = config if config is not None else {}
 
-        self.extract_answer_file_path = self.config.get("extract_answer_file_path", None)
-        self.extract_answer_func_name = self.config.get("extract_answer_func_name", None)
-        self.judge_func_path = self.config.get("judge_func_path", None)
-        self.judge_func_name = self.config.get("judge_func_name", None)
-        self.load_once = self.config.get("load_once", True)
+        self.extract_answer_file_path: str = self.config["extract_answer_file_path"]
+        self.extract_answer_func_name: str = self.config["extract_answer_func_name"]
+        self.judge_func_path: str = self.config["judge_func_path"]
+        self.judge_func_name: str = self.config["judge_func_name"]
+        self.load_once: bool = self.config.get("load_once", True)
+        self.execution_mode: str = self.config.get("execution_mode", "in_process")
+        self.num_workers: Optional[int] = self.config.get("num_workers")
+        self.worker_timeout: Optional[float] = self.config.get("worker_timeout")
+        self.worker_start_method: Optional[str] = self.config.get("worker_start_method")
+        self._num_workers: int = self.num_workers or os.cpu_count() or 1
 
-        print("INITIALIZING FILE BASED VERIFIER from", self.extract_answer_file_path, "&", self.judge_func_path)
+        if self.execution_mode not in _EXECUTION_MODES:
+            err_msg = f"`execution_mode` should be one of {_EXECUTION_MODES}, but got '{self.execution_mode}'."
+            raise ValueError(err_msg)
 
-        self.extract_answer_func = None
-        self.judge_func = None
-        if self.load_once:
+        _logger.info(
+            "Initializing file based verifier from '%s' & '%s' (execution mode: %s).",
+            self.extract_answer_file_path,
+            self.judge_func_path,
+            self.execution_mode,
+        )
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._worker_pids: dict[ProcessPoolExecutor, tuple[Any, set[int]]] = {}
+        self._pinned_functions: dict[tuple[str, str], Callable[..., Any]] = {}
+        if self.execution_mode == "subprocess":
+            self._start_pool()
+        else:
+            # * fails fast on a bad path or function name
             self.load_extract_answer_function()
             self.load_judge_function()
 
-    def load_extract_answer_function(self):
-        # print('loading extract answer function from file: ')
-        spec = importlib.util.spec_from_file_location("tool_module", self.extract_answer_file_path)
-        module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
-        self.extract_answer_func = getattr(module, self.extract_answer_func_name)
+        self.extract_answer_batch_func_name = self._resolve_batch_func_name(
+            self.extract_answer_file_path,
+            self.extract_answer_func_name,
+            self.config.get("extract_answer_batch_func_name"),
+        )
+        self.judge_batch_func_name = self._resolve_batch_func_name(
+            self.judge_func_path, self.judge_func_name, self.config.get("judge_batch_func_name")
+        )
+
+        if self.execution_mode == "in_process" and self.load_once:
+            # * the module cache is shared by all verifiers of a file, so a reload triggered by a
+            # * `load_once: false` verifier would otherwise be picked up here as well
+            for file_path, func_name in (
+                (self.extract_answer_file_path, self.extract_answer_func_name),
+                (self.extract_answer_file_path, self.extract_answer_batch_func_name),
+                (self.judge_func_path, self.judge_func_name),
+                (self.judge_func_path, self.judge_batch_func_name),
+            ):
+                if func_name is not None:
+                    self._pinned_functions[(file_path, func_name)] = _load_function(
+                        file_path, func_name, check_for_updates=False
+                    )
 
-    def load_judge_function(self):
-        # print('loading judge function from file: ')
-        spec = importlib.util.spec_from_file_location("tool_module", self.judge_func_path)
-        module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
-        self.judge_func = getattr(module, self.judge_func_name)
+    def load_extract_answer_function(self) -> Callable[..., Any]:
+        return self._get_function(self.extract_answer_file_path, self.extract_answer_func_name)
+
+    def load_judge_function(self) -> Callable[..., Any]:
+        return self._get_function(self.judge_func_path, self.judge_func_name)
+
+    def _get_function(self, file_path: str, func_name: str) -> Callable[..., Any]:
+        func = self._pinned_functions.get((file_path, func_name))
+        if func is not None:
+            return func
+        return _load_function(file_path, func_name, check_for_updates=not self.load_once)
+
+    def _call_in_process(self, file_path: str, func_name: str, _check_for_updates: bool, args: tuple) -> Any:
+        # * same signature as `_call_in_worker`, whose `check_for_updates` is implied by `load_once` here
+        return self._get_function(file_path, func_name)(*args)
+
+    def _resolve_batch_func_name(self, file_path: str, func_name: str, batch_func_name: Optional[str]) -> Optional[str]:
+        # * user code is never executed in the parent process in `subprocess` mode, so we ask a worker
+        if batch_func_name is None:
+            # * the conventional name is optional, the per-item function is used when it is absent
+            batch_func_name = f"{func_name}_batch"
+            return batch_func_name if self._call(_has_function, file_path, batch_func_name) else None
+
+        if not self._call(_has_function, file_path, batch_func_name):
+            err_msg = f"File '{file_path}' does not define the configured batch function `{batch_func_name}`."
+            raise AttributeError(err_msg)
+        return batch_func_name
+
+    def _start_pool(self) -> None:
+        mp_context = multiprocessing.get_context(self.worker_start_method)
+        pid_queue = mp_context.SimpleQueue()
+        pool = ProcessPoolExecutor(
+            max_workers=self._num_workers,
+            mp_context=mp_context,
+            initializer=_init_worker,
+            initargs=(tuple(dict.fromkeys([self.extract_answer_file_path, self.judge_func_path])), pid_queue),
+        )
+        self._worker_pids[pool] = (pid_queue, set())
+        # * starts every worker now instead of lazily on the first rollout batch
+        for future in [pool.submit(_warmup_worker) for _ in range(self._num_workers)]:
+            future.result()
+        self._pool = pool
+        weakref.finalize(self, pool.shutdown, wait=False, cancel_futures=True)
+
+    def _submit_all(self, fn: Callable[..., Any], args_lst: Sequence[tuple]) -> tuple[ProcessPoolExecutor, list]:
+        with self._pool_lock:
+            if self._pool is None:
+                self._start_pool()
+            pool = self._pool
+            if pool is None:
+                err_msg = f"Failed to start the worker pool of `{self.__class__.__name__}`."
+                raise RuntimeError(err_msg)
+            return pool, [pool.submit(fn, *args) for args in args_lst]
+
+    def _discard_pool(self, pool: ProcessPoolExecutor, kill: bool = False) -> None:
+        with self._pool_lock:
+            if self._pool is pool:
+                self._pool = None
+            worker_pids = self._worker_pids.pop(pool, None)
+        if kill and worker_pids is not None:
+            # * a hung worker never returns its process to the pool, `shutdown` alone would not free it
+            pid_queue, pids = worker_pids
+            while not pid_queue.empty():
+                pids.add(pid_queue.get())
+            for pid in pids:
+                try:
+                    os.kill(pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+                except OSError:
+                    # * the worker already exited
+                    pass
+        if kill:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _collect(self, pool: ProcessPoolExecutor, futures: list) -> list[Any]:
+        timeout = None
+        if self.worker_timeout is not None:
+            # * the calls run `num_workers` at a time, each round being allowed `worker_timeout`
+            timeout = self.worker_timeout * -(-len(futures) // self._num_workers)
+        _, not_done = wait(futures, timeout=timeout)
+        if not_done:
+            _logger.warning(
+                "%d call(s) to `%s` exceeded %s seconds, killing its worker pool.",
+                len(not_done),
+                self.__class__.__name__,
+                timeout,
+            )
+            self._discard_pool(pool, kill=True)
+            err_msg = f"{len(not_done)} call(s) to `{self.__class__.__name__}` exceeded {timeout} seconds."
+            raise TimeoutError(err_msg)
+        return [future.result() for future in futures]
+
+    def _map(self, fn: Callable[..., Any], args_lst: Sequence[tuple]) -> list[Any]:
+        """Apply `fn` to every argument tuple, in worker processes when running in `subprocess` mode."""
+        if self.execution_mode == "in_process":
+            if fn is _call_in_worker:
+                # * resolves the pinned functions of a `load_once` verifier
+                fn = self._call_in_process
+            return [fn(*args) for args in args_lst]
+
+        pool, futures = self._submit_all(fn, args_lst)
+        try:
+            return self._collect(pool, futures)
+        except BrokenProcessPool:
+            # * a worker died (e.g. segfault or `os._exit` in user code), restarts the pool and retries once
+            _logger.warning("Worker pool of `%s` is broken, restarting it.", self.__class__.__name__)
+            self._discard_pool(pool)
+            pool, futures = self._submit_all(fn, args_lst)
+            return self._collect(pool, futures)
+
+    def _call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        return self._map(fn, [args])[0]
+
+    def _run(self, file_path: str, func_name: str, args: tuple) -> Any:
+        return self._call(_call_in_worker, file_path, func_name, not self.load_once, args)
+
+    def _run_batch(self, file_path: str, func_name: str, columns: Sequence[Sequence[Any]]) -> list[Any]:
+        """Call a batch function, splitting the batch into one chunk per worker in `subprocess` mode."""
+        num_items = len(columns[0])
+        if num_items == 0:
+            return []
+
+        num_chunks = 1
+        if self.execution_mode == "subprocess":
+            num_chunks = min(num_items, self._num_workers)
+        chunk_size = -(-num_items // num_chunks)
+
+        args_lst = [
+            (file_path, func_name, not self.load_once, tuple(list(col[start : start + chunk_size]) for col in columns))
+            for start in range(0, num_items, chunk_size)
+        ]
+        results: list[Any] = []
+        for chunk_results in self._map(_call_in_worker, args_lst):
+            results.extend(chunk_results)
+        if len(results) != num_items:
+            err_msg = f"`{func_name}` should return {num_items} results, but got {len(results)}."
+            raise ValueError(err_msg)
+        return results
+
+    def close(self) -> None:
+        """Shut down the worker pool, if any."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._worker_pids.pop(self._pool, None)
+                self._pool = None
+
+    @property
+    def is_batch_verifier(self) -> bool:
+        return self.extract_answer_batch_func_name is not None or self.judge_batch_func_name is not None
 
     def extract_answer(self, response: str, question: Optional[str] = None) -> Any:
-        if not self.load_once:
-            self.load_extract_answer_function()
-        return self.extract_answer_func(response, question)
+        return self._run(self.extract_answer_file_path, self.extract_answer_func_name, (response, question))
+
+    def extract_answer_batch(self, responses: Sequence[str], questions: Sequence[Optional[str]]) -> list[Any]:
+        if self.extract_answer_batch_func_name is not None:
+            return self._run_batch(
+                self.extract_answer_file_path, self.extract_answer_batch_func_name, [responses, questions]
+            )
+        return self._map(
+            _call_in_worker,
+            [
+                (self.extract_answer_file_path, self.extract_answer_func_name, not self.load_once, (response, question))
+                for response, question in zip(responses, questions, strict=True)
+            ],
+        )
 
     def judge(
         self,
         extracted_answer: Any,
         ground_truth: Any,  # This will also be an "extracted" ground truth
         question: Optional[str] = None,
-        image_path: Optional[List[str]] = None,
+        image_file: Optional[str] = None,
     ) -> float:
-        if not self.load_once:
-            self.load_judge_function()
-        return self.judge_func(extracted_answer, ground_truth, question, image_path)
+        return self._run(
+            self.judge_func_path, self.judge_func_name, (extracted_answer, ground_truth, question, image_file)
+        )
+
+    def judge_batch(
+        self,
+        extracted_answers: Sequence[Any],
+        ground_truths: Sequence[Any],
+        questions: Sequence[Optional[str]],
+        image_files: Sequence[Optional[str]],
+    ) -> list[float]:
+        if self.judge_batch_func_name is not None:
+            return self._run_batch(
+                self.judge_func_path,
+                self.judge_batch_func_name,
+                [extracted_answers, ground_truths, questions, image_files],
+            )
+        return self._map(
+            _call_in_worker,
+            [
+                (self.judge_func_path, self.judge_func_name, not self.load_once, args)
+                for args in zip(extracted_answers, ground_truths, questions, image_files, strict=True)
+            ],
+        )
@@ -27,6 +27,8 @@ class VQAVerifier(Verifier):
         llm_max_tokens: int = 10,
         llm_temperature: float = 0.1,
         llm_top_p: float = 1.0,
+        llm_judge_with_image: bool = False,
+        llm_image_max_side: Optional[int] = 1024,
     ) -> None:
         # assert "llm_judge_url" in self.config, "llm_judge_url is required for VQAVerifier"
 
@@ -43,6 +45,8 @@ class VQAVerifier(Verifier):
         self.llm_max_tokens = llm_max_tokens
         self.llm_temperature = llm_temperature
         self.llm_top_p = llm_top_p
+        self.llm_judge_with_image = llm_judge_with_image
+        self.llm_image_max_side = llm_image_max_side
 
     def extract_answer(self, response: str, question: Optional[str] = None) -> Any:
         del question
@@ -154,10 +158,11 @@ class VQAVerifier(Verifier):
                 api_key,
                 url=reward_url,
                 model=model,
-                image_file=image_file,
+                image_file=image_file if self.llm_judge_with_image else None,
                 max_tokens=self.llm_max_tokens,
                 temperature=self.llm_temperature,
                 top_p=self.llm_top_p,
+                image_max_side=self.llm_image_max_side,
             )
 
             # Initialize content with a default value to avoid referencing it later
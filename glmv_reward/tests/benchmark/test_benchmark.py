@@ -0,0 +1,88 @@
+import msgspec
+import pytest
+
+from glmv_reward import RewardSystem
+from glmv_reward.benchmark import WORKLOADS, MockJudgeServer, make_batch, run_benchmark
+from glmv_reward.benchmark.mock_judge import DEFAULT_REPLY
+from glmv_reward.cli import main
+from glmv_reward.utils.llm import post_query_llm
+from glmv_reward.verifiers import _VERIFIER_INSTANCE_REGISTRY, math_verifier
+
+
+def test_mock_judge():
+    with MockJudgeServer(latency_ms=0) as judge:
+        assert post_query_llm("1 + 1 = 2?", "key", url=judge.url) == DEFAULT_REPLY
+    assert judge.stats.num_requests == 1
+
+    with MockJudgeServer(latency_ms=0, rate_limit_rate=0.5, error_rate=0.5, seed=0) as judge:
+        assert all(post_query_llm("q", "key", url=judge.url) == "" for _ in range(10))
+    stats = judge.stats
+    assert stats.num_requests == stats.num_rate_limited + stats.num_errors == 10
+    assert stats.num_rate_limited > 0 and stats.num_errors > 0
+
+    with pytest.raises(ValueError):
+        MockJudgeServer(error_rate=1.5)
+
+
+@pytest.mark.parametrize("workload", WORKLOADS)
+def test_make_batch(reward_system_instance, workload):
+    batch = make_batch(workload, 8, seed=3, think_length=200)
+    assert batch == make_batch(workload, 8, seed=3, think_length=200)
+    assert batch != make_batch(workload, 8, seed=4, think_length=200)
+    assert len(batch.prompts) == len(batch.answers) == len(batch.gt_answers) == 8
+    assert all(map(reward_system_instance.check_answer_format, batch.answers + batch.gt_answers))
+
+
+def test_run_benchmark():
+    report = run_benchmark(
+        "configs/full_config.yaml",
+        workloads=["math", "gui"],
+        batch_size=8,
+        num_batches=2,
+        think_length=200,
+        judge=MockJudgeServer(latency_ms=0),
+    )
+    math_report, gui_report = report.workloads
+    assert (math_report.datasource, gui_report.datasource) == ("math", "WebVoyager")
+    assert math_report.num_items == gui_report.num_items == 16
+    assert math_report.batch_latency_ms.count == 2
+    assert math_report.item_latency_ms is not None and math_report.item_latency_ms.count == 16
+    # wrong math answers fall back to the (always approving) mock judge
+    assert 0 < math_report.judge_calls == math_report.judge_server.num_requests
+    assert math_report.mean_reward == 1.0
+    assert gui_report.judge_calls == 0
+    assert gui_report.cpu_s.extraction > 0
+    assert msgspec.json.decode(msgspec.json.encode(report))["workloads"][1]["workload"] == "gui"
+
+    # the real judge URL of the shared verifier instances is left untouched
+    assert "bigmodel" in str(
+        RewardSystem("configs/full_config.yaml").get_verifier_from_datasource("math").llm_judge_url
+    )
+    # and so are their methods, and the `post_query_llm` of the verifier modules
+    for name, verifier in _VERIFIER_INSTANCE_REGISTRY.items():
+        if "@benchmark" in name:
+            assert not {"extract_answer", "extract_answer_batch", "judge", "judge_batch"} & set(vars(verifier))
+    assert math_verifier.post_query_llm is post_query_llm
+
+
+def test_default_workloads_reach_the_verifiers():
+    # * ocr and gui are scored by rules only, the other workloads fall back to the LLM judge
+    rule_based = {"ocr", "gui"}
+    kwargs = {"batch_size": 8, "num_batches": 1, "warmup_batches": 0, "think_length": 200}
+    report = run_benchmark("configs/full_config.yaml", judge=MockJudgeServer(latency_ms=0), **kwargs)
+    assert [workload.workload for workload in report.workloads] == list(WORKLOADS)
+    for workload in report.workloads:
+        assert (workload.judge_calls > 0) == (workload.workload not in rule_based), workload.workload
+
+    correct = run_benchmark("configs/full_config.yaml", correct_rate=1.0, judge=MockJudgeServer(latency_ms=0), **kwargs)
+    assert all(workload.mean_reward > 0 for workload in correct.workloads)
+
+
+def test_cli(tmp_path):
+    output = tmp_path / "bench.json"
+    argv = ["bench", "--config", "configs/full_config.yaml", "--workload", "ocr", "--batch-size", "4"]
+    assert main([*argv, "--num-batches", "1", "--judge-latency-ms", "0", "--output", str(output)]) == 0
+    report = msgspec.json.decode(output.read_bytes())
+    assert [workload["workload"] for workload in report["workloads"]] == ["ocr"]
+    with pytest.raises(SystemExit):
+        main(["bench", "--config", "configs/full_config.yaml", "--workload", "unknown"])
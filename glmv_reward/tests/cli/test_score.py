@@ -0,0 +1,117 @@
+import json
+
+import pytest
+
+from glmv_reward.cli import main
+from glmv_reward.cli.score import INDEX_FIELD, score_file
+
+JUDGE_SOURCE = """
+def extract_answer(response, question=None):
+    return response.split("<answer>")[-1].split("</answer>")[0].strip() or None
+
+
+def judge(extracted_answer, ground_truth, question=None, image_file=None):
+    return float(extracted_answer == ground_truth)
+"""
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    judge_path = tmp_path / "judge.py"
+    judge_path.write_text(JUDGE_SOURCE)
+    config_file = tmp_path / "config.yaml"
+    lines = ["datasource_reward_config_mapping:"]
+    lines += [f"  {name}: exact_match" for name in ("a", "b")]
+    lines += [
+        "reward_configs:",
+        "  exact_match:",
+        "    verifier_type: file_based",
+        f'    extract_answer_file_path: "{judge_path}"',
+        "    extract_answer_func_name: extract_answer",
+        f'    judge_func_path: "{judge_path}"',
+        "    judge_func_name: judge",
+        "enable_mix_verifier: false",
+    ]
+    config_file.write_text("\n".join(lines) + "\n")
+    return config_file
+
+
+def _write_rollouts(path, num_records):
+    with open(path, "w") as f:
+        for idx in range(num_records):
+            answer = str(idx % 3)
+            record = {
+                "uuid": f"u{idx // 4}",
+                "datasource": "ab"[idx % 2],
+                "question": f"q{idx}",
+                "answer": f"<think>t</think><answer>{answer}</answer>",
+                "gt_answer": f"<think>t</think><answer>0</answer>",
+            }
+            f.write(json.dumps(record) + "\n")
+
+
+def _read_output(path):
+    with open(path) as f:
+        return sorted((json.loads(line) for line in f), key=lambda record: record[INDEX_FIELD])
+
+
+def test_score_file(tmp_path, config_file):
+    input_path, output_path = tmp_path / "rollouts.jsonl", tmp_path / "out" / "scored.jsonl"
+    _write_rollouts(input_path, 50)
+
+    summary = score_file(
+        config_file, input_path, output_path, batch_size=4, num_workers=2, fields={"prompt": "question"}
+    )
+    records = _read_output(output_path)
+    assert [record[INDEX_FIELD] for record in records] == list(range(50))
+    assert [record["reward"] for record in records] == [float(idx % 3 == 0) for idx in range(50)]
+    assert (summary.num_scored, summary.num_skipped, summary.num_failed) == (50, 0, 0)
+    assert summary.reward_counts == {"a": 25, "b": 25}
+
+
+def test_score_file_resumes(tmp_path, config_file):
+    input_path, output_path = tmp_path / "rollouts.jsonl", tmp_path / "scored.jsonl"
+    _write_rollouts(input_path, 20)
+    score_file(config_file, input_path, output_path, batch_size=8)
+
+    # simulate a crash: drop the last records and leave a partially written line
+    lines = output_path.read_bytes().splitlines(keepends=True)
+    output_path.write_bytes(b"".join(lines[:12]) + lines[12][:10])
+
+    summary = score_file(config_file, input_path, output_path, batch_size=8)
+    assert (summary.num_scored, summary.num_skipped) == (8, 12)
+    assert [record[INDEX_FIELD] for record in _read_output(output_path)] == list(range(20))
+
+
+def test_cli(tmp_path, config_file):
+    input_path, output_path = tmp_path / "rollouts.jsonl", tmp_path / "scored.jsonl"
+    _write_rollouts(input_path, 6)
+    with open(input_path, "a") as f:
+        f.write(json.dumps({"datasource": "unknown", "prompt": "q", "answer": "a", "gt_answer": "a"}) + "\n")
+
+    argv = ["score", "--config", str(config_file), "--input", str(input_path), "--output", str(output_path)]
+    assert main([*argv, "--field", "prompt=question", "--extracted-answers"]) == 1
+    records = _read_output(output_path)
+    assert records[0]["extracted_answer"] == records[0]["extracted_gt"] == "0"
+    assert records[-1]["reward"] is None
+    assert "unknown" in records[-1]["reward_error"]
+
+    with pytest.raises(SystemExit):
+        main([*argv, "--field", "bogus=key"])
+
+
+def test_score_file_retries_failed_records(tmp_path, config_file):
+    input_path, output_path = tmp_path / "rollouts.jsonl", tmp_path / "scored.jsonl"
+    _write_rollouts(input_path, 8)
+    with open(input_path, "a") as f:
+        f.write(json.dumps({"datasource": "c", "prompt": "q", "answer": "a", "gt_answer": "a"}) + "\n")
+    summary = score_file(config_file, input_path, output_path, batch_size=4)
+    assert summary.num_failed == 1
+
+    # the datasource gets configured, the resumed run scores the failed record only
+    config_file.write_text(config_file.read_text().replace("  b: exact_match", "  b: exact_match\n  c: exact_match"))
+    summary = score_file(config_file, input_path, output_path, batch_size=4)
+    assert (summary.num_scored, summary.num_skipped, summary.num_failed) == (1, 8, 0)
+    records = _read_output(output_path)
+    assert [record[INDEX_FIELD] for record in records] == list(range(9))
+    assert all("reward_error" not in record for record in records)
@@ -0,0 +1,54 @@
+from glmv_reward.utils.action_grammar import OSWorldAction, parse_osworld_action, parse_webvoyager_action
+
+
+def test_webvoyager_grammar():
+    action = parse_webvoyager_action("CLICK(point=(12, 34), box=[[1,2,3,4]], element_info='OK')")
+    assert (action.action, action.x, action.y, action.box, action.element_info) == ("click", 12, 34, "1,2,3,4", "OK")
+    assert not action.legacy
+
+    action = parse_webvoyager_action("SCROLL_UP(point=(5,6), distance=300)")
+    assert (action.action, action.direction, action.distance) == ("scroll", "up", "300")
+
+    action = parse_webvoyager_action("Type [3]; hello")
+    assert (action.action, action.legacy, action.number, action.content) == ("type", True, "3", "hello")
+    assert parse_webvoyager_action("GoBack").action == "goback"
+    assert parse_webvoyager_action("ANSWER; <content>42</content>").content == "42"
+    assert parse_webvoyager_action("nothing to see") is None
+    assert parse_webvoyager_action(None) is None
+
+    # the new grammar wins over the legacy one, whatever the position in the text
+    assert parse_webvoyager_action("ANSWER; <content>x</content> KEY_PRESS(key='Enter')").action == "key"
+    # parsed actions are cached by content
+    assert parse_webvoyager_action("Click [3]") is parse_webvoyager_action("Click [3]")
+
+
+def test_osworld_grammar():
+    action = parse_osworld_action("scroll(start_box='[200, 200]', direction='down', step=3)")
+    assert action == OSWorldAction(action_type="scroll", coordinates=(200, 200), direction="down", step=3)
+    assert action.to_dict() == {"action_type": "scroll", "coordinates": [200, 200], "direction": "down", "step": 3}
+
+    action = parse_osworld_action("left_drag(start_box='[1, 2]', end_box='[3,4]', element_info='bar')")
+    assert action.to_dict() == {
+        "action_type": "left_drag",
+        "element_info": "bar",
+        "start_coordinates": [1, 2],
+        "end_coordinates": [3, 4],
+    }
+    assert parse_osworld_action("left_click(start_box='[a, 2]')").to_dict() == {"action_type": "left_click"}
+    assert parse_osworld_action("type(content='multi\nline')").to_dict() == {"action_type": "type"}
+    assert parse_osworld_action("WAIT()").to_dict() == {"action_type": "WAIT"}
+    assert parse_osworld_action("not an action") is None
+
+
+def test_webvoyager_judge_with_grammar(webvoyager_verifier):
+    def box(action):
+        return f"<|begin_of_box|>{action}<|end_of_box|>"
+
+    def score(answer, gt):
+        return webvoyager_verifier.judge(webvoyager_verifier.extract_answer(box(answer)), box(gt))
+
+    assert score("CLICK(point=(1, 2), element_info='a')", "CLICK(point=(1, 2), element_info='b')") == 1.0
+    assert score("CLICK(point=(1, 3), element_info='a')", "CLICK(point=(1, 2), element_info='a')") == 0.05
+    assert score("Click [3]", "CLICK(point=(1, 2))") == 0.0
+    assert score("KEY_PRESS(key='Return')", "KEY_PRESS(key='enter')") == 0.05
+    assert score("SCROLL_DOWN(point=(1, 2), distance=150)", "SCROLL_DOWN(point=(1, 2), distance=300)") == 0.5
@@ -0,0 +1,304 @@
+import os
+import time
+
+import pytest
+
+from glmv_reward.utils.module import load_module_from_file
+from glmv_reward.verifiers import FileBasedVerifier
+
+JUDGE_SOURCE = """
+import os
+
+LOADED_IN = os.getpid()
+
+
+def extract_answer(response, question=None):
+    return response.strip()
+
+
+def judge(extracted_answer, ground_truth, question=None, image_path=None):
+    return {score} if extracted_answer == ground_truth else 0.0
+
+
+def whoami(response, question=None):
+    return os.getpid()
+"""
+
+
+def _write_judge(path, score):
+    path.write_text(JUDGE_SOURCE.format(score=score))
+
+
+def _config(path, **kwargs):
+    return {
+        "extract_answer_file_path": str(path),
+        "extract_answer_func_name": "extract_answer",
+        "judge_func_path": str(path),
+        "judge_func_name": "judge",
+        **kwargs,
+    }
+
+
+def test_module_is_cached_until_content_changes(tmp_path):
+    path = tmp_path / "judge.py"
+    _write_judge(path, 1.0)
+
+    module = load_module_from_file(path)
+    assert load_module_from_file(path) is module
+
+    # same content, new mtime: no re-execution
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000))
+    assert load_module_from_file(path) is module
+
+    _write_judge(path, 0.5)
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 20_000_000))
+    assert load_module_from_file(path) is not module
+    assert load_module_from_file(path).judge("a", "a") == 0.5
+
+
+def test_module_names_are_unique_per_file(tmp_path):
+    first, second = tmp_path / "a" / "judge.py", tmp_path / "b" / "judge.py"
+    for path in (first, second):
+        path.parent.mkdir()
+        _write_judge(path, 1.0)
+    assert load_module_from_file(first).__name__ != load_module_from_file(second).__name__
+
+
+def test_reload_only_when_not_load_once(tmp_path):
+    path = tmp_path / "judge.py"
+    _write_judge(path, 1.0)
+    static_verifier = FileBasedVerifier(_config(path, load_once=True))
+    dynamic_verifier = FileBasedVerifier(_config(path, load_once=False))
+    assert static_verifier.judge("a", "a") == 1.0
+
+    _write_judge(path, 0.25)
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000))
+    assert dynamic_verifier.judge(dynamic_verifier.extract_answer(" a "), "a") == 0.25
+    # the reload triggered by the dynamic verifier does not leak into the static one
+    assert static_verifier.judge("a", "a") == 1.0
+
+
+def test_subprocess_execution(tmp_path):
+    path = tmp_path / "judge.py"
+    _write_judge(path, 1.0)
+    verifier = FileBasedVerifier(
+        _config(path, execution_mode="subprocess", num_workers=2, worker_start_method="spawn", worker_timeout=60)
+    )
+    try:
+        assert verifier.judge(verifier.extract_answer("answer "), "answer") == 1.0
+        assert verifier.judge("x", "y") == 0.0
+        assert verifier._run(str(path), "whoami", ("", None)) != os.getpid()
+    finally:
+        verifier.close()
+
+
+HANGING_JUDGE_SOURCE = """
+import time
+
+
+def extract_answer(response, question=None):
+    return response
+
+
+def judge(extracted_answer, ground_truth, question=None, image_path=None):
+    if extracted_answer == "hang":
+        time.sleep(600)
+    if extracted_answer == "slow":
+        time.sleep(1.5)
+    return 1.0
+"""
+
+
+def test_subprocess_timeout_kills_the_pool(tmp_path):
+    path = tmp_path / "hanging_judge.py"
+    path.write_text(HANGING_JUDGE_SOURCE)
+    verifier = FileBasedVerifier(
+        _config(path, execution_mode="subprocess", num_workers=1, worker_start_method="spawn", worker_timeout=2)
+    )
+    try:
+        pool = verifier._pool
+        processes = list(pool._processes.values())
+        with pytest.raises(TimeoutError):
+            verifier.judge("hang", "x")
+        assert verifier._pool is None
+        for process in processes:
+            process.join(timeout=10)
+            assert not process.is_alive()
+        # the single worker is free again
+        assert verifier.judge("a", "a") == 1.0
+    finally:
+        verifier.close()
+
+
+def test_subprocess_timeout_is_one_deadline_per_batch(tmp_path):
+    path = tmp_path / "hanging_judge.py"
+    path.write_text(HANGING_JUDGE_SOURCE)
+    verifier = FileBasedVerifier(
+        _config(path, execution_mode="subprocess", num_workers=2, worker_start_method="spawn", worker_timeout=2)
+    )
+    try:
+        start = time.monotonic()
+        with pytest.raises(TimeoutError):
+            verifier.judge_batch(["slow", "hang"], ["x", "x"], [None] * 2, [None] * 2)
+        # * the hanging call gets what is left of the deadline, not a fresh `worker_timeout` after the slow one
+        assert time.monotonic() - start < 3
+    finally:
+        verifier.close()
+
+
+def test_invalid_config(tmp_path):
+    path = tmp_path / "judge.py"
+    _write_judge(path, 1.0)
+    with pytest.raises(ValueError, match="execution_mode"):
+        FileBasedVerifier(_config(path, execution_mode="threads"))
+    with pytest.raises(AttributeError, match="missing"):
+        FileBasedVerifier(_config(path, judge_func_name="missing"))
+
+
+BATCH_JUDGE_SOURCE = """
+CALLS = []
+
+
+def extract_answer(response, question=None):
+    raise AssertionError("per-item extraction should not be used")
+
+
+def extract_answer_batch(responses, questions):
+    CALLS.append(len(responses))
+    return [r.split("<answer>")[-1].split("</answer>")[0] or None for r in responses]
+
+
+def judge(extracted_answer, ground_truth, question=None, image_path=None):
+    raise AssertionError("per-item judge should not be used")
+
+
+def judge_batch(extracted_answers, ground_truths, questions, image_paths):
+    CALLS.append(len(extracted_answers))
+    return [float(a == g) for a, g in zip(extracted_answers, ground_truths)]
+"""
+
+
+def _response(answer):
+    return f"<think>t</think><answer>{answer}</answer>"
+
+
+def test_batch_functions_are_detected(tmp_path):
+    path = tmp_path / "batch_judge.py"
+    path.write_text(BATCH_JUDGE_SOURCE)
+    verifier = FileBasedVerifier(_config(path))
+    assert verifier.is_batch_verifier
+    assert verifier.extract_answer_batch([_response("a"), _response("b")], [None, None]) == ["a", "b"]
+    assert verifier.judge_batch(["a", "b"], ["a", "c"], [None, None], [None, None]) == [1.0, 0.0]
+
+    per_item = tmp_path / "judge.py"
+    _write_judge(per_item, 1.0)
+    verifier = FileBasedVerifier(_config(per_item))
+    assert not verifier.is_batch_verifier
+    assert verifier.judge_batch(["a", "b"], ["a", "c"], [None, None], [None, None]) == [1.0, 0.0]
+
+    with pytest.raises(AttributeError, match="judge_in_bulk"):
+        FileBasedVerifier(_config(per_item, judge_batch_func_name="judge_in_bulk"))
+
+
+def test_subprocess_batch_is_split_across_workers(tmp_path):
+    path = tmp_path / "batch_judge.py"
+    path.write_text(BATCH_JUDGE_SOURCE)
+    verifier = FileBasedVerifier(
+        _config(path, execution_mode="subprocess", num_workers=2, worker_start_method="spawn", worker_timeout=60)
+    )
+    try:
+        answers = [str(i) for i in range(5)]
+        assert verifier.judge_batch(answers, answers, [None] * 5, [None] * 5) == [1.0] * 5
+    finally:
+        verifier.close()
+
+
+def test_reward_system_routes_batch_verifier(tmp_path):
+    from glmv_reward import RewardSystem
+
+    path = tmp_path / "batch_judge.py"
+    path.write_text(BATCH_JUDGE_SOURCE)
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(
+        f"""
+datasource_reward_config_mapping:
+  batch_gui: batch_config
+reward_configs:
+  batch_config:
+    verifier_type: file_based
+    extract_answer_file_path: "{path}"
+    extract_answer_func_name: extract_answer
+    judge_func_path: "{path}"
+    judge_func_name: judge
+enable_mix_verifier: false
+"""
+    )
+    reward_system = RewardSystem(config_file)
+    verifier = reward_system.get_verifier_from_datasource("batch_gui")
+    module = load_module_from_file(path)
+
+    rewards, extracted_ans, extracted_gt = reward_system.get_reward(
+        prompts=["q"] * 4,
+        answers=[_response("a"), _response("b"), "bad format", _response("")],
+        gt_answers=[_response("a")] * 4,
+        datasources=["batch_gui"] * 4,
+        return_extracted_answers=True,
+    )
+    assert verifier.is_batch_verifier
+    assert rewards == [1.0, 0.0, 0.0, 0.0]
+    assert extracted_ans == ["a", "b", None, None]
+    assert extracted_gt == ["a", "a", None, "a"]
+    # one call to extract the gts, one for the answers, one to judge
+    assert module.CALLS == [3, 3, 2]
+
+
+JUDGE_BATCH_ONLY_SOURCE = """
+def extract_answer(response, question=None):
+    answer = response.split("<answer>")[-1].split("</answer>")[0]
+    if answer == "boom":
+        raise RuntimeError("cannot parse")
+    return answer
+
+
+def judge(extracted_answer, ground_truth, question=None, image_path=None):
+    raise AssertionError("per-item judge should not be used")
+
+
+def judge_batch(extracted_answers, ground_truths, questions, image_paths):
+    return [float(a == g) for a, g in zip(extracted_answers, ground_truths)]
+"""
+
+
+def test_reward_system_isolates_failing_items(tmp_path):
+    from glmv_reward import RewardSystem
+
+    path = tmp_path / "judge_batch_only.py"
+    path.write_text(JUDGE_BATCH_ONLY_SOURCE)
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(
+        f"""
+datasource_reward_config_mapping:
+  isolated_gui: batch_config
+reward_configs:
+  batch_config:
+    verifier_type: file_based
+    extract_answer_file_path: "{path}"
+    extract_answer_func_name: extract_answer
+    judge_func_path: "{path}"
+    judge_func_name: judge
+enable_mix_verifier: false
+"""
+    )
+    reward_system = RewardSystem(config_file)
+    rewards, stats = reward_system.get_reward(
+        prompts=["q"] * 3,
+        answers=[_response("a"), _response("boom"), _response("b")],
+        gt_answers=[_response("a")] * 3,
+        datasources=["isolated_gui"] * 3,
+        return_stats=True,
+    )
+    assert rewards == [1.0, 0.0, 0.0]
+    assert stats.counters["extraction_failures"] == 1
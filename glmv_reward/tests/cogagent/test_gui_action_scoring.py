@@ -0,0 +1,85 @@
+import random
+
+import numpy as np
+import pytest
+
+from glmv_reward.utils.gui_action import box_iou, box_is_valid, coordinate_similarity, step_similarity, to_float_array
+from glmv_reward.utils.similarity import edit_distance_similarity, lcs_length, lcs_similarity
+
+
+def _naive_lcs(x, y):
+    dp = [[0] * (len(y) + 1) for _ in range(len(x) + 1)]
+    for i in range(1, len(x) + 1):
+        for j in range(1, len(y) + 1):
+            dp[i][j] = dp[i - 1][j - 1] + 1 if x[i - 1] == y[j - 1] else max(dp[i - 1][j], dp[i][j - 1])
+    return dp[-1][-1]
+
+
+def test_bit_parallel_lcs_matches_dp():
+    rng = random.Random(0)
+    for _ in range(500):
+        x = "".join(rng.choice("abcd") for _ in range(rng.randint(0, 90)))
+        y = "".join(rng.choice("abcde") for _ in range(rng.randint(0, 90)))
+        assert lcs_length(x, y) == _naive_lcs(x, y)
+    assert lcs_length("个人财务", "个人记账") == 2
+    assert lcs_similarity("", "") == 1.0
+    assert edit_distance_similarity("kitten", "sitting") == pytest.approx(1 - 3 / 7)
+
+
+def test_coordinate_similarity():
+    scores = coordinate_similarity([[100, 200], [110, 190], [100, 300], [np.nan, np.nan]], [[100, 200]] * 4)
+    assert scores[0] == 1.0
+    assert 0.8 < scores[1] < 1.0
+    assert scores[2] == 0.0
+    assert scores[3] == 0.0
+
+
+def test_box_iou_and_validity():
+    boxes = [[0, 0, 10, 10], [5, 5, 15, 15], [0, 0, 0, 0], [1000, 0, 1001, 1], [1.5, 0, 2, 2], None]
+    assert box_is_valid(boxes).tolist() == [True, True, True, False, False, False]
+
+    ious = box_iou(to_float_array(boxes[:3], 4), to_float_array([[0, 0, 10, 10]] * 3, 4))
+    assert ious.tolist() == pytest.approx([1.0, 25 / 175, 0.0])
+    assert box_iou([[0, 0, 0, 0]], [[0, 0, 0, 0]]).tolist() == [0.0]
+
+
+def test_step_similarity():
+    assert step_similarity([3, 5, 10, 1], [3, 3, 3, 0]).tolist() == pytest.approx([1.0, 1 - 2 / 6, 0.0, 0.0])
+
+
+def test_osworld_batch_matches_single(osworld_verifier):
+    actions = [
+        "left_click(start_box='[100, 200]')",
+        "left_click(start_box='[108, 195]')",
+        "left_drag(start_box='[100, 100]', end_box='[300, 300]')",
+        "scroll(start_box='[200, 200]', direction='down', step=3)",
+        "scroll(start_box='[198, 202]', direction='down')",
+        "type(content='Hello World!')",
+        "key(keys='ctrl+C')",
+        "WAIT()",
+    ]
+    parsed = [osworld_verifier.extract_answer(f"<|begin_of_box|>{a}<|end_of_box|>") for a in actions]
+    answers = [a for a in parsed for _ in parsed]
+    gts = [g for _ in parsed for g in parsed]
+    batch = osworld_verifier.judge_batch(answers, gts, [None] * len(answers), [None] * len(answers))
+    assert batch == [osworld_verifier.judge(a, g) for a, g in zip(answers, gts)]
+    assert osworld_verifier.is_batch_verifier
+
+
+def test_android_world_batch_matches_single(android_world_verifier):
+    actions = [
+        {"action_type": "click", "box_2d": [[503, 580, 718, 702]]},
+        {"action_type": "click", "box_2d": [[503, 480, 718, 602]]},
+        {"action_type": "click", "box_2d": [[550, 580, 550, 702]]},
+        {"action_type": "click", "box_2d": [[1200, 580, 1300, 702]]},
+        {"action_type": "input_text", "text": "Personal Finance Tracker", "box_2d": [[38, 115, 961, 140]]},
+        {"action_type": "input_text", "text": "Finance Tracker", "box_2d": [[38, 115, 960, 141]]},
+        {"action_type": "wait"},
+    ]
+    answers = [a for a in actions for _ in actions]
+    gts = [g for _ in actions for g in actions]
+    batch = android_world_verifier.judge_batch(answers, gts, [None] * len(answers), [None] * len(answers))
+    assert batch == pytest.approx([android_world_verifier.judge(a, g) for a, g in zip(answers, gts)])
+    # the invalid boxes score 0 whichever side they are on
+    assert batch[2 * len(actions)] == batch[2] == 0.0
+    assert batch[3 * len(actions)] == batch[3] == 0.0
@@ -0,0 +1,101 @@
+import msgspec
+
+from glmv_reward.benchmark import MockJudgeServer, make_batch
+from glmv_reward.utils.metrics import (
+    BatchRecorder,
+    JsonFileExporter,
+    MetricsSnapshot,
+    PrometheusFileExporter,
+    RewardMetrics,
+    render_prometheus,
+)
+
+
+def _score(reward_system, batch, datasource="math"):
+    return reward_system.get_reward(
+        prompts=batch.prompts,
+        answers=batch.answers,
+        gt_answers=batch.gt_answers,
+        uuids=[str(i) for i in range(len(batch.prompts))],
+        image_files=batch.image_files,
+        datasources=[datasource] * len(batch.prompts),
+        return_stats=True,
+    )
+
+
+def test_batch_stats(reward_system_instance):
+    batch = make_batch("math", 6, think_length=100, correct_rate=1.0)
+    batch.answers[0] = "no answer tags"
+    rewards, stats = _score(reward_system_instance, batch)
+    assert rewards == [0.0] + [1.0] * 5
+    assert (stats.datasource, stats.num_items) == ("math", 6)
+    assert stats.counters["items"] == 6
+    assert stats.counters["format_failures"] == 1
+    assert "llm_fallbacks" not in stats.counters
+    assert stats.stage_counts["format_check"] == 6
+    assert stats.stage_counts["rule_judge"] == 5
+    assert stats.stage_counts["batch"] == 1
+    assert 0 < stats.stage_seconds["rule_judge"] <= stats.wall_time
+
+    rewards, ans, gt, stats = reward_system_instance.get_reward(
+        prompts=batch.prompts,
+        answers=batch.answers,
+        gt_answers=batch.gt_answers,
+        uuids=None,
+        image_files=batch.image_files,
+        datasources=["math"] * 6,
+        return_extracted_answers=True,
+        return_stats=True,
+    )
+    assert len(rewards) == len(ans) == len(gt) == stats.num_items == 6
+
+
+def test_llm_fallback_is_counted(reward_system_instance, monkeypatch):
+    verifier = reward_system_instance.get_verifier_from_datasource("math")
+    batch = make_batch("math", 4, think_length=100, correct_rate=0.0)
+    with MockJudgeServer(latency_ms=20) as judge:
+        monkeypatch.setattr(verifier, "llm_judge_url", [judge.url])
+        monkeypatch.setattr(verifier, "llm_api_key", ["key"])
+        rewards, stats = _score(reward_system_instance, batch)
+    assert rewards == [1.0] * 4
+    assert stats.counters["llm_fallbacks"] == 4
+    assert stats.counters["llm_calls"] == judge.stats.num_requests
+    assert stats.stage_seconds["llm"] >= 0.02 * stats.counters["llm_calls"]
+    assert stats.stage_counts["llm"] == stats.counters["llm_calls"]
+
+
+def test_reward_metrics_and_exporters(tmp_path):
+    metrics = RewardMetrics(buckets=(0.1, 1.0))
+    snapshots: list[MetricsSnapshot] = []
+    metrics.add_exporter(snapshots.append)
+    metrics.add_exporter(PrometheusFileExporter(tmp_path / "reward.prom"))
+    metrics.add_exporter(JsonFileExporter(tmp_path / "reward.json"), interval=3600)
+
+    for seconds in (0.05, 0.5, 5.0):
+        recorder = BatchRecorder('chart "v2"', num_items=2)
+        recorder.observe("llm", seconds)
+        recorder.count("llm_calls")
+        metrics.record(recorder)
+        metrics.export()
+
+    assert len(snapshots) == 3
+    histogram = snapshots[-1].stages['chart "v2"']["llm"]
+    assert (histogram.counts, histogram.count, histogram.sum) == ([1, 1, 1], 3, 5.55)
+    assert snapshots[-1].counters['chart "v2"']["llm_calls"] == 3
+
+    prom = (tmp_path / "reward.prom").read_text()
+    assert prom == render_prometheus(snapshots[-1])
+    labels = 'datasource="chart \\"v2\\"",stage="llm"'
+    assert f'glmv_reward_stage_seconds_bucket{{{labels},le="1"}} 2' in prom
+    assert f'glmv_reward_stage_seconds_bucket{{{labels},le="+Inf"}} 3' in prom
+    assert 'glmv_reward_events_total{datasource="chart \\"v2\\"",event="llm_calls"} 3' in prom
+
+    # the json exporter is rate limited, it only saw the first batch
+    first = msgspec.json.decode((tmp_path / "reward.json").read_bytes(), type=MetricsSnapshot)
+    assert first.counters['chart "v2"']["llm_calls"] == 1
+    metrics.export(force=True)
+    last = msgspec.json.decode((tmp_path / "reward.json").read_bytes(), type=MetricsSnapshot)
+    assert last.counters['chart "v2"']["llm_calls"] == 3
+
+    metrics.reset()
+    assert metrics.snapshot().stages == {}
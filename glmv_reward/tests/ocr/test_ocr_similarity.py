@@ -0,0 +1,119 @@
+import random
+
+import editdistance
+import pytest
+
+from glmv_reward.utils.similarity import (
+    bounded_edit_distance,
+    edit_distance_lower_bound,
+    thresholded_edit_similarity,
+    thresholded_edit_similarity_batch,
+)
+from glmv_reward.verifiers import OCRVerifier
+
+
+def _mutate(rng, text, num_edits):
+    chars = list(text)
+    for _ in range(num_edits):
+        idx = rng.randrange(len(chars) + 1)
+        op = rng.random()
+        if op < 0.3 and idx < len(chars):
+            chars.pop(idx)
+        elif op < 0.6:
+            chars.insert(idx, rng.choice("xyz文"))
+        elif idx < len(chars):
+            chars[idx] = rng.choice("xyz文")
+    return "".join(chars)
+
+
+def test_bounded_edit_distance_matches_full_distance():
+    rng = random.Random(0)
+    for _ in range(2000):
+        text = "".join(rng.choice("abc文字") for _ in range(rng.randint(0, 50)))
+        other = _mutate(rng, text, rng.randint(0, 10))
+        distance = editdistance.eval(text, other)
+        assert edit_distance_lower_bound(text, other) <= distance
+        for max_distance in (0, 1, 3, 8, 20):
+            assert bounded_edit_distance(text, other, max_distance) == (distance if distance <= max_distance else None)
+
+    # long pages go through the banded computation
+    for _ in range(10):
+        page = "".join(rng.choice("abcdefgh文字识别") for _ in range(rng.randint(1500, 2500)))
+        other = _mutate(rng, page, rng.randint(1, 150))
+        distance = editdistance.eval(page, other)
+        for max_distance in (distance - 1, distance, distance + 10, 200):
+            assert bounded_edit_distance(page, other, max_distance) == (distance if distance <= max_distance else None)
+
+
+def test_thresholded_edit_similarity():
+    assert thresholded_edit_similarity("", "") == 1.0
+    assert thresholded_edit_similarity("kitten", "sitting") == pytest.approx(1 - 3 / 7)
+    assert thresholded_edit_similarity("kitten", "sitting", upper_bound=0.5) == 1.0
+    assert thresholded_edit_similarity("kitten", "sitting", lower_bound=0.6) == 0.0
+    assert thresholded_edit_similarity("abc", "xyz") == 0.0
+    assert thresholded_edit_similarity_batch([("abcd", "abce"), ("abcd", "abcd"), ("abcd", "abce")], 0.2, 0.9) == [
+        0.75,
+        1.0,
+        0.75,
+    ]
+
+
+def test_ocr_judge_batch_matches_judge():
+    verifier = OCRVerifier(edit_distance_upper_bound=0.9, edit_distance_lower_bound=0.3, ignore_case=True)
+    answers = ["Hello World", "hello  world", "Hel1o Wor1d", "something else", "", 3]
+    ground_truths = ["hello world"] * len(answers)
+    expected = [verifier.judge(a, g) for a, g in zip(answers, ground_truths)]
+    assert verifier.judge_batch(answers, ground_truths, [None] * len(answers), [None] * len(answers)) == expected
+    assert expected[:2] == [1.0, 1.0]
+    assert expected[2] == pytest.approx(0.8)
+    assert expected[3:] == [0.0, 0.0, 0.0]
+
+
+def test_long_document_mode():
+    rng = random.Random(1)
+    lines = ["".join(rng.choice("abcdefgh文字识别 ") for _ in range(rng.randint(20, 60))) for _ in range(80)]
+    ground_truth = "\n".join(lines)
+    noisy_lines = list(lines)
+    noisy_lines[10] = _mutate(rng, noisy_lines[10], 3)
+    del noisy_lines[40]
+    answer = "\n".join(noisy_lines)
+
+    verifier = OCRVerifier(long_document_mode=True, long_document_min_length=1000)
+    document_score = verifier.score_long_document(answer, ground_truth)
+    assert [block.op for block in document_score.blocks] == ["equal", "replace", "equal", "insert", "equal"]
+    assert document_score.blocks[1].answer_span == document_score.blocks[1].gt_span == (10, 11)
+
+    # the alignment only constrains the edit script, so it is never more lenient than the full distance
+    exact = thresholded_edit_similarity(verifier._normalize(answer), verifier._normalize(ground_truth))
+    assert exact - 0.01 < document_score.similarity <= exact
+    assert verifier.judge(answer, ground_truth) == document_score.similarity
+    assert verifier.judge(ground_truth, ground_truth) == 1.0
+    assert verifier.judge_batch([answer, "short"], [ground_truth, "short"], [None] * 2, [None] * 2) == [
+        document_score.similarity,
+        1.0,
+    ]
+
+
+def test_long_document_pairs_lines_of_replace_regions():
+    rng = random.Random(2)
+    lines = ["".join(rng.choice("abcdefgh文字识别") for _ in range(rng.randint(20, 60))) for _ in range(60)]
+    ground_truth = "\n".join(lines)
+    # a small error on every line leaves no identical line to anchor on, and one line is split in two
+    noisy_lines = [_mutate(rng, line, 2) for line in lines]
+    noisy_lines[30:31] = [noisy_lines[30][:10], noisy_lines[30][10:]]
+    answer = "\n".join(noisy_lines)
+
+    verifier = OCRVerifier(long_document_mode=True, long_document_min_length=1000)
+    document_score = verifier.score_long_document(answer, ground_truth)
+    assert len(document_score.blocks) == 61
+    assert sum(block.op == "insert" or block.op == "delete" for block in document_score.blocks) == 1
+    exact = thresholded_edit_similarity(verifier._normalize(answer), verifier._normalize(ground_truth))
+    assert exact - 0.01 < document_score.similarity <= exact
+
+    # scoring stops once the page cannot get above the lower bound
+    answer = "\n".join(line if idx % 10 == 0 else _mutate(rng, line, 2) for idx, line in enumerate(lines))
+    verifier = OCRVerifier(long_document_mode=True, long_document_min_length=1000, edit_distance_lower_bound=0.995)
+    document_score = verifier.score_long_document(answer, ground_truth)
+    assert document_score.similarity <= 0.995
+    assert document_score.blocks[-1].gt_span[1] < len(lines)
+    assert verifier.judge(answer, ground_truth) == 0.0
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from glmv_reward import RewardSystem
+from glmv_reward.serving import RewardClient, RewardServer
+from glmv_reward.serving.protocol import parse_address
+
+JUDGE_SOURCE = """
+def extract_answer(response, question=None):
+    return response.split("<answer>")[-1].split("</answer>")[0].strip() or None
+
+
+def judge(extracted_answer, ground_truth, question=None, image_file=None):
+    return float(extracted_answer == ground_truth)
+"""
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    judge_path = tmp_path / "judge.py"
+    judge_path.write_text(JUDGE_SOURCE)
+    config_file = tmp_path / "config.yaml"
+    lines = [
+        "datasource_reward_config_mapping:",
+        "  a: exact_match",
+        "reward_configs:",
+        "  exact_match:",
+        "    verifier_type: file_based",
+        f'    extract_answer_file_path: "{judge_path}"',
+        "    extract_answer_func_name: extract_answer",
+        f'    judge_func_path: "{judge_path}"',
+        "    judge_func_name: judge",
+        "enable_mix_verifier: false",
+    ]
+    config_file.write_text("\n".join(lines) + "\n")
+    return config_file
+
+
+@pytest.fixture
+def server(tmp_path, config_file):
+    server = RewardServer(config_file, f"unix:{tmp_path / 'reward.sock'}", batch_window_ms=50)
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(server.start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield server
+    asyncio.run_coroutine_threadsafe(server.close(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+def _batch(num_items):
+    return {
+        "prompts": [f"q{idx}" for idx in range(num_items)],
+        "answers": [f"<think>t</think><answer>{idx % 3}</answer>" for idx in range(num_items)],
+        "gt_answers": ["<think>t</think><answer>0</answer>"] * num_items,
+        "datasources": ["a"] * num_items,
+    }
+
+
+def test_parse_address():
+    assert parse_address("unix:/tmp/reward.sock") == ("unix", "/tmp/reward.sock")
+    assert parse_address("unix:///tmp/reward.sock") == ("unix", "/tmp/reward.sock")
+    assert parse_address("tcp://0.0.0.0:8000") == ("tcp", ("0.0.0.0", 8000))
+    assert parse_address(":8000") == ("tcp", ("127.0.0.1", 8000))
+    with pytest.raises(ValueError):
+        parse_address("localhost")
+
+
+def test_concurrent_clients_are_batched(server, config_file):
+    expected = RewardSystem(config_file).get_reward(**_batch(10), return_extracted_answers=True)
+
+    def _request(_):
+        with RewardClient(server.address) as client:
+            return client.get_reward(**_batch(10), return_extracted_answers=True)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(_request, range(8)))
+
+    assert all(result == expected for result in results)
+    assert server.stats.num_requests == 8
+    assert server.stats.num_batches < 8
+    assert server.stats.num_items == 80
+    # identical items of different requests are only scored once per batch
+    assert server.stats.num_scored_items == 10 * server.stats.num_batches
+
+
+def test_client_errors(server):
+    with RewardClient(server.address) as client:
+        with pytest.raises(RuntimeError, match="No reward config found for datasource"):
+            client.get_reward(**{**_batch(2), "datasources": ["unknown"] * 2})
+        with pytest.raises(RuntimeError, match="all datasources should be the same"):
+            client.get_reward(**{**_batch(2), "datasources": ["a", "b"]})
+        # the connection stays usable after a failed request
+        assert client.get_reward(**_batch(3)) == [1.0, 0.0, 0.0]
+        assert client.get_reward(prompts=[], answers=[], gt_answers=[]) == []
+    assert server.stats.num_failed_requests == 2
+
+
+def test_client_returns_stats(server):
+    with RewardClient(server.address) as client:
+        rewards, stats = client.get_reward(**_batch(3), return_stats=True)
+        assert rewards == [1.0, 0.0, 0.0]
+        assert (stats.datasource, stats.num_items) == ("a", 3)
+        assert stats.counters["items"] == 3
+        assert stats.stage_counts["extract_answer"] == 3
+
+        rewards, extracted_ans, extracted_gt, stats = client.get_reward(
+            **_batch(3), return_extracted_answers=True, return_stats=True
+        )
+        assert extracted_ans == ["0", "1", "2"]
+        assert stats.counters["inf_rewrites"] == 0
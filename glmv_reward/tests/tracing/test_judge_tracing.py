@@ -0,0 +1,89 @@
+import msgspec
+import pytest
+
+from glmv_reward.benchmark import MockJudgeServer, make_batch
+from glmv_reward.benchmark.mock_judge import DEFAULT_REPLY
+from glmv_reward.utils.llm import post_query_llm
+from glmv_reward.utils.tracing import JudgeCallTrace, JudgeTracer, get_judge_tracer, judge_trace_scope
+
+
+@pytest.fixture
+def tracer():
+    tracer = get_judge_tracer()
+    tracer.reset()
+    yield tracer
+    tracer.configure(sample_rate=1.0, capacity=1024, record_payloads=False)
+    tracer.reset()
+
+
+def test_post_query_llm_is_traced(tracer):
+    tracer.configure(record_payloads=True)
+    with MockJudgeServer(latency_ms=10) as judge, judge_trace_scope("MyVerifier"):
+        assert post_query_llm("1 + 1 = 2?", "secret-key", url=judge.url, model="glm-x") == DEFAULT_REPLY
+    with MockJudgeServer(latency_ms=0, error_rate=1.0) as failing:
+        assert post_query_llm("q", "secret-key", url=failing.url) == ""
+
+    ok, failed = tracer.recent()
+    assert (ok.verifier, ok.endpoint, ok.model, ok.status, ok.http_status) == (
+        "MyVerifier",
+        judge.url,
+        "glm-x",
+        "ok",
+        200,
+    )
+    assert ok.latency >= 0.01
+    assert ok.prompt_tokens > 0 and ok.completion_tokens == len(DEFAULT_REPLY) // 4
+    assert (ok.prompt, ok.response) == ("1 + 1 = 2?", DEFAULT_REPLY)
+    assert (failed.verifier, failed.status, failed.http_status) == ("unknown", "http_error", 500)
+    assert "secret-key" not in msgspec.json.encode(tracer.recent()).decode()
+
+    # nothing is listening on the port of the closed mock judge
+    assert post_query_llm("q", "key", url=judge.url, timeout=5) == ""
+    assert tracer.recent(1)[0].status == "connection_error"
+
+
+def test_sampling_and_aggregate(tmp_path):
+    tracer = JudgeTracer(sample_rate=0.25, capacity=8, seed=0)
+    for i in range(100):
+        verifier = "MathVerifier" if i % 2 else "ChartVerifier"
+        trace = JudgeCallTrace(timestamp=i, verifier=verifier, endpoint="http://judge", model="m", latency=i / 100)
+        trace.status = "ok" if i % 10 else "timeout"
+        trace.prompt_tokens, trace.completion_tokens = 10, 1
+        trace.prompt = "payload"
+        tracer.record(trace)
+
+    recent = tracer.recent()
+    assert len(recent) == 8 and recent == sorted(recent, key=lambda x: x.timestamp)
+    assert all(trace.prompt is None for trace in recent)
+    assert tracer.recent(3) == recent[-3:] and tracer.recent(0) == [] and tracer.recent(100) == recent
+
+    math, chart = tracer.aggregate()
+    assert (math.verifier, chart.verifier) == ("MathVerifier", "ChartVerifier")
+    assert math.num_calls == chart.num_calls == 50
+    assert chart.statuses == {"timeout": 10, "ok": 40}
+    assert math.prompt_tokens == 500 and math.completion_tokens == 50
+    assert math.latency_p50 == pytest.approx(0.51) and math.latency_max == pytest.approx(0.99)
+
+    assert tracer.dump(tmp_path / "traces.jsonl") == 8
+    lines = (tmp_path / "traces.jsonl").read_bytes().splitlines()
+    assert [msgspec.json.decode(line, type=JudgeCallTrace) for line in lines] == recent
+
+    tracer.configure(capacity=2)
+    assert tracer.recent() == recent[-2:]
+    with pytest.raises(ValueError):
+        tracer.configure(sample_rate=2.0)
+
+
+def test_llm_fallback_is_attributed_to_verifier(tracer, reward_system_instance, monkeypatch):
+    assert reward_system_instance.judge_tracer is tracer
+    verifier = reward_system_instance.get_verifier_from_datasource("math")
+    batch = make_batch("math", 4, think_length=100, correct_rate=0.0)
+    with MockJudgeServer(latency_ms=0) as judge:
+        monkeypatch.setattr(verifier, "llm_judge_url", [judge.url])
+        monkeypatch.setattr(verifier, "llm_api_key", ["key"])
+        reward_system_instance.get_reward(batch.prompts, batch.answers, batch.gt_answers, datasources=["math"] * 4)
+
+    (aggregate,) = tracer.aggregate()
+    assert (aggregate.verifier, aggregate.endpoint) == ("MathVerifier", judge.url)
+    assert aggregate.num_calls == judge.stats.num_requests >= 4
+    assert aggregate.statuses == {"ok": aggregate.num_calls}
@@ -0,0 +1,96 @@
+import base64
+import io
+import threading
+
+import pytest
+from PIL import Image
+
+from glmv_reward.utils.image import EncodedImage, ImageCache, encode_image, load_image
+
+
+def _save(path, mode="RGB", size=(64, 48), fmt=None):
+    Image.new(mode, size, color=0).save(path, format=fmt)
+    return path
+
+
+def _decode(image):
+    return Image.open(io.BytesIO(base64.b64decode(image.data)))
+
+
+def test_passthrough(tmp_path):
+    for name, fmt, mime in (("a.jpg", "JPEG", "image/jpeg"), ("a.png", "PNG", "image/png")):
+        path = _save(tmp_path / name, fmt=fmt)
+        image = load_image(path, cache=ImageCache())
+        assert image.mime_type == mime
+        assert base64.b64decode(image.data) == path.read_bytes()
+        assert image.data_url == f"data:{mime};base64,{image.data}"
+
+
+def test_transcode_and_downscale(tmp_path):
+    cache = ImageCache()
+    for path in (_save(tmp_path / "a.webp", fmt="WEBP"), _save(tmp_path / "cmyk.jpg", mode="CMYK", fmt="JPEG")):
+        image = load_image(path, cache=cache)
+        assert image.mime_type == "image/jpeg"
+        assert _decode(image).mode == "RGB"
+
+    path = _save(tmp_path / "big.png", size=(400, 100), fmt="PNG")
+    image = load_image(path, max_side=100, cache=cache)
+    assert image.mime_type == "image/jpeg"
+    assert _decode(image).size == (100, 25)
+    assert load_image(path, max_side=400, cache=cache).mime_type == "image/png"
+    with pytest.raises(ValueError):
+        load_image(path, max_side=0)
+
+
+def test_cache_is_keyed_by_content(tmp_path):
+    cache = ImageCache()
+    first = load_image(_save(tmp_path / "a.webp", fmt="WEBP"), cache=cache)
+    second = load_image(_save(tmp_path / "b.webp", fmt="WEBP"), cache=cache)
+    assert second is first
+    assert load_image(tmp_path / "a.webp", max_side=10, cache=cache) is not first
+    stats = cache.stats
+    assert (stats.hits, stats.misses, stats.num_entries) == (1, 2, 2)
+
+    # the least recently used entry is evicted first
+    sizes = []
+    for color in (1, 2, 3):
+        Image.new("RGB", (64, 48), color=(color * 80, 0, 0)).save(tmp_path / f"{color}.webp")
+        sizes.append(len(load_image(tmp_path / f"{color}.webp", cache=ImageCache()).data))
+    small = ImageCache(max_bytes=sum(sizes) - 1)
+    for color in (1, 2, 1, 3, 1):
+        load_image(tmp_path / f"{color}.webp", cache=small)
+    stats = small.stats
+    assert (stats.hits, stats.evictions, stats.num_entries, stats.num_bytes) == (2, 1, 2, sizes[0] + sizes[2])
+
+    disabled = ImageCache(max_bytes=0)
+    load_image(tmp_path / "a.webp", cache=disabled)
+    assert disabled.stats.num_entries == 0
+
+
+def test_get_or_create_creates_once():
+    cache = ImageCache()
+    calls = []
+
+    def create():
+        calls.append(None)
+        return EncodedImage(mime_type="image/png", data="AAAA")
+
+    put = cache.put
+    waiter = threading.Thread(target=cache.get_or_create, args=(("key", None), create))
+
+    def slow_put(key, image):
+        # a thread arriving while the created image is being cached must wait for it, not create it again
+        waiter.start()
+        waiter.join(timeout=0.2)
+        put(key, image)
+
+    cache.put = slow_put
+    cache.get_or_create(("key", None), create)
+    waiter.join(timeout=10)
+    assert len(calls) == 1
+
+
+def test_encode_image(tmp_path):
+    path = _save(tmp_path / "a.png", fmt="PNG")
+    assert encode_image(str(path)) == base64.b64encode(path.read_bytes()).decode()
+    assert encode_image(str(path), prefix=True).startswith("data:image/png;base64,")
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+from PIL import Image
+
+from glmv_reward.benchmark.mock_judge import DEFAULT_REPLY
+from glmv_reward.utils import llm
+from glmv_reward.utils.image import get_image_cache
+from glmv_reward.verifiers import ChartVerifier, MathVerifier
+
+
+class _Response(object):
+    status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"choices": [{"message": {"content": DEFAULT_REPLY}}]}
+
+
+@pytest.fixture
+def payloads(monkeypatch):
+    payloads = []
+
+    def post(url, headers, data, timeout):
+        payloads.append(json.loads(data))
+        return _Response()
+
+    monkeypatch.setattr(llm.requests, "post", post)
+    return payloads
+
+
+def test_image_url_contents(tmp_path, payloads):
+    Image.new("RGB", (2000, 500)).save(tmp_path / "a.png")
+    Image.new("RGB", (20, 20)).save(tmp_path / "b.jpg")
+
+    assert llm.post_query_llm("text only", "key") == DEFAULT_REPLY
+    assert payloads[-1]["messages"][0]["content"] == "text only"
+
+    get_image_cache().clear()
+    for _ in range(3):
+        llm.post_query_llm(
+            "q", "key", image_file=[str(tmp_path / "a.png"), str(tmp_path / "b.jpg")], image_max_side=500
+        )
+    first_image, second_image, text = payloads[-1]["messages"][0]["content"]
+    assert first_image["image_url"]["url"].startswith("data:image/jpeg;base64,")
+    assert second_image["image_url"]["url"].startswith("data:image/jpeg;base64,")
+    assert text == {"type": "text", "text": "q"}
+    # each image is only encoded once across the calls
+    assert get_image_cache().stats.misses == 2
+
+    # unreadable images are left out
+    llm.post_query_llm("q", "key", image_file=str(tmp_path / "missing.png"))
+    assert payloads[-1]["messages"][0]["content"] == "q"
+
+
+def test_verifier_judge_with_image(tmp_path, payloads):
+    Image.new("RGB", (20, 20)).save(tmp_path / "chart.png")
+    kwargs = {
+        "answer_extraction_regex": r"<\|begin_of_box\|>(.*?)<\|end_of_box\|>",
+        "llm_api_key": "key",
+        "llm_judge_url": "http://judge",
+        "llm_judge_prompt_template": "{question} {predict} {label}",
+    }
+    for llm_judge_with_image, expected_type in ((False, str), (True, list)):
+        verifier = ChartVerifier(**kwargs, llm_judge_with_image=llm_judge_with_image)
+        assert verifier.judge("Retail", "North America", "Which?", image_file=str(tmp_path / "chart.png")) == 1.0
+        assert isinstance(payloads[-1]["messages"][0]["content"], expected_type)
+
+
+def test_text_judges_do_not_send_images_by_default(tmp_path, payloads):
+    Image.new("RGB", (20, 20)).save(tmp_path / "figure.png")
+    kwargs = {
+        "llm_api_key": ["key"],
+        "llm_judge_url": ["http://judge"],
+        "llm_judge_prompt_template": "{question} {predict} {label}",
+    }
+    for llm_judge_with_image, expected_type in ((False, str), (True, list)):
+        verifier = MathVerifier(**kwargs, llm_judge_with_image=llm_judge_with_image)
+        verifier.judge("x + 1", "1 + x", "Simplify", image_file=str(tmp_path / "figure.png"))
+        assert isinstance(payloads[-1]["messages"][0]["content"], expected_type)
@@ -0,0 +1,92 @@
+import io
+import tarfile
+import threading
+
+import pytest
+from PIL import Image
+
+from glmv_reward.utils.image import ImageCache, load_image
+from glmv_reward.utils.path import (
+    TarShard,
+    extract_data_from_tarfile,
+    get_tar_shard,
+    read_tar_member,
+    split_tar_member,
+)
+
+
+def _make_shard(path, members):
+    with tarfile.open(path, "w") as tar:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return path
+
+
+def test_tar_shard(tmp_path):
+    long_name = "images/" + "x" * 150 + ".png"
+    members = {"a.jpg": b"jpeg bytes", "b/c.png": b"", long_name: b"long" * 1000}
+    shard = TarShard(_make_shard(tmp_path / "shard.tar", members))
+
+    for name, data in members.items():
+        view = shard.read(name)
+        assert isinstance(view, memoryview) and view.readonly
+        assert view == data
+    assert "missing" not in shard
+    with pytest.raises(KeyError):
+        shard.read("missing")
+
+    # the sidecar index is reused, and rebuilt when the shard changes
+    assert shard.index_path.is_file()
+    assert TarShard(tmp_path / "shard.tar").members() == shard.members()
+    _make_shard(tmp_path / "shard.tar", {"d.jpg": b"new"})
+    assert TarShard(tmp_path / "shard.tar").read("d.jpg") == b"new"
+
+
+def test_shared_shard(tmp_path):
+    _make_shard(tmp_path / "shard.tar", {f"{i}.txt": str(i).encode() for i in range(100)})
+    ref = f"{tmp_path}/shard.tar:7.txt"
+    assert split_tar_member(ref) == (f"{tmp_path}/shard.tar", "7.txt")
+    assert split_tar_member(tmp_path / "shard.tar") is None
+
+    shards, errors = [], []
+
+    def read_all():
+        try:
+            shards.append(get_tar_shard(tmp_path / "shard.tar"))
+            for i in range(100):
+                assert read_tar_member(f"{tmp_path}/shard.tar:{i}.txt") == str(i).encode()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=read_all) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert all(shard is shards[0] for shard in shards)
+
+    offset = shards[0].members()["7.txt"][0] - 512
+    assert extract_data_from_tarfile(tmp_path / "shard.tar", offset) == ("7.txt", b"7")
+
+    # a rewritten shard is mapped again, not read through the stale mapping
+    _make_shard(tmp_path / "shard.tar", {"7.txt": b"seven", "8.txt": b"eight"})
+    assert get_tar_shard(tmp_path / "shard.tar") is not shards[0]
+    assert read_tar_member(f"{tmp_path}/shard.tar:7.txt") == b"seven"
+    assert get_tar_shard(tmp_path / "shard.tar") is get_tar_shard(tmp_path / "shard.tar")
+
+
+def test_load_image_from_shard(tmp_path):
+    png = io.BytesIO()
+    Image.new("RGB", (8, 8)).save(png, format="PNG")
+    _make_shard(tmp_path / "images.tar", {"frames/0.png": png.getvalue()})
+    image = load_image(f"{tmp_path}/images.tar:frames/0.png", cache=ImageCache())
+    assert image.mime_type == "image/png"
+    assert image == load_image(_write(tmp_path / "0.png", png.getvalue()), cache=ImageCache())
+
+
+def _write(path, data):
+    path.write_bytes(data)
+    return path
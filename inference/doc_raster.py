@@ -0,0 +1,243 @@
+"""
+Rasterization of PDF and PPT uploads into page images for the multimodal demos.
+
+`DocumentRasterizer.iter_pages(path)` yields the PNG file of each page, in page order,
+as soon as it is rendered: pages are rendered in a process pool, so the first pages are
+available before the whole document is done. Rendered pages are cached on disk, keyed by
+the content hash of the document and the rendering settings, so re-uploading a document
+(under any name, from any session) is free; the cache is evicted least recently used
+first beyond `max_cache_bytes`. Entries are content-addressed and written atomically, so
+concurrent sessions never overwrite each other's pages. A session that keeps referring to
+its pages passes its own `out_dir`, where the pages are hard-linked, so that they outlive
+the eviction of their cache entry.
+
+The resolution follows the visual-token budget of the model: pages are rendered at
+`dpi`, but never above `max_pixels` per page, nor above `max_visual_tokens` tokens for
+the whole document, in which case the resolution is lowered down to `min_dpi`, then
+pages beyond the budget are dropped.
+
+Usage:
+    rasterizer = DocumentRasterizer("/tmp/glmv_doc_cache", max_visual_tokens=16384)
+    for page_path in rasterizer.iter_pages("slides.pptx"):
+        ...
+"""
+
+import hashlib
+import math
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import fitz
+
+PPT_SUFFIXES = (".ppt", ".pptx")
+# GLM-4.1V merges 2x2 patches of 14 pixels into one visual token
+PIXELS_PER_TOKEN = 28 * 28
+
+
+def _render_page(pdf_path, index, dpi, out_path):
+    with fitz.open(pdf_path) as doc:
+        pix = doc.load_page(index).get_pixmap(dpi=dpi)
+    tmp_path = f"{out_path}.{os.getpid()}.tmp.png"
+    pix.save(tmp_path)
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def file_hash(path):
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class DocumentRasterizer:
+    def __init__(
+        self,
+        cache_dir,
+        max_cache_bytes=2 << 30,
+        dpi=180,
+        min_dpi=72,
+        max_pages=None,
+        max_pixels=None,
+        max_visual_tokens=None,
+        num_workers=None,
+    ):
+        self.cache_dir = Path(cache_dir).expanduser()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_cache_bytes = max_cache_bytes
+        self.dpi = dpi
+        self.min_dpi = min_dpi
+        self.max_pages = max_pages
+        self.max_pixels = max_pixels
+        self.max_visual_tokens = max_visual_tokens
+        self.num_workers = num_workers or min(4, os.cpu_count() or 1)
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self):
+        with self._lock:
+            if self._pool is None:
+                # fork, so that workers do not re-import the (model loading) main script
+                self._pool = ProcessPoolExecutor(
+                    self.num_workers, mp_context=multiprocessing.get_context("fork")
+                )
+            return self._pool
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+    def iter_pages(self, path, out_dir=None):
+        """
+        Yield the page images of a PDF or PPT document, in order, once ready: the cached
+        files, or their links under `out_dir` if given.
+        """
+        path = Path(path)
+        if path.suffix.lower() in PPT_SUFFIXES:
+            path = self.ppt_to_pdf(path)
+        for page_path in self._iter_pdf_pages(path):
+            yield page_path if out_dir is None else self._export(page_path, out_dir)
+
+    def pages(self, path, out_dir=None):
+        return list(self.iter_pages(path, out_dir))
+
+    @staticmethod
+    def _export(page_path, out_dir):
+        """Link a cached page under `out_dir`, copying it across file systems."""
+        page_path = Path(page_path)
+        out_path = Path(out_dir, page_path.parent.name, page_path.name)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        staged = out_path.with_name(f".{out_path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            os.link(page_path, staged)
+        except OSError:
+            shutil.copyfile(page_path, staged)
+        os.replace(staged, out_path)
+        return os.fspath(out_path)
+
+    def ppt_to_pdf(self, ppt_path):
+        """Convert a deck with LibreOffice, once per deck content."""
+        pdf_path = self.cache_dir / f"{file_hash(ppt_path)}.pdf"
+        if pdf_path.is_file():
+            pdf_path.touch()
+            return pdf_path
+        with tempfile.TemporaryDirectory() as tmp:
+            # Concurrent conversions sharing a profile would lock each other out
+            profile = Path(tmp, "profile").as_uri()
+            subprocess.run(
+                [
+                    "libreoffice",
+                    f"-env:UserInstallation={profile}",
+                    "--headless",
+                    "--convert-to",
+                    "pdf",
+                    "--outdir",
+                    tmp,
+                    os.fspath(ppt_path),
+                ],
+                check=True,
+            )
+            staged = pdf_path.with_name(f".{pdf_path.name}.{uuid.uuid4().hex}.tmp")
+            shutil.move(Path(tmp, Path(ppt_path).stem + ".pdf"), staged)
+            os.replace(staged, pdf_path)
+        return pdf_path
+
+    def _plan(self, doc):
+        """Per-page DPI of the pages fitting the pixel and visual-token budgets."""
+        num_pages = doc.page_count
+        if self.max_pages is not None:
+            num_pages = min(num_pages, self.max_pages)
+        areas = [doc.load_page(i).rect.get_area() for i in range(num_pages)]
+
+        def pixels(i, dpi):
+            return areas[i] * (dpi / 72) ** 2
+
+        if self.max_visual_tokens is not None:
+            total_pixels = self.max_visual_tokens * PIXELS_PER_TOKEN
+            # Pages beyond the budget at the lowest resolution are dropped
+            while (
+                num_pages > 1
+                and sum(pixels(i, self.min_dpi) for i in range(num_pages))
+                > total_pixels
+            ):
+                num_pages -= 1
+        dpis = []
+        for i in range(num_pages):
+            dpi = self.dpi
+            budget = self.max_pixels
+            if self.max_visual_tokens is not None:
+                page_budget = (
+                    self.max_visual_tokens
+                    * PIXELS_PER_TOKEN
+                    * areas[i]
+                    / sum(areas[:num_pages])
+                )
+                budget = page_budget if budget is None else min(budget, page_budget)
+            if budget is not None and areas[i] > 0 and pixels(i, dpi) > budget:
+                dpi = max(self.min_dpi, int(72 * math.sqrt(budget / areas[i])))
+            dpis.append(dpi)
+        return dpis
+
+    def _iter_pdf_pages(self, pdf_path):
+        with fitz.open(pdf_path) as doc:
+            dpis = self._plan(doc)
+        key = hashlib.sha256(
+            f"{file_hash(pdf_path)}\n{dpis}".encode("utf-8")
+        ).hexdigest()
+        entry = self.cache_dir / key
+        page_paths = [entry / f"page_{i:04d}.png" for i in range(len(dpis))]
+        if (entry / "complete").is_file():
+            entry.touch()
+            yield from map(os.fspath, page_paths)
+            return
+
+        entry.mkdir(exist_ok=True)
+        futures = [
+            None
+            if page_path.is_file()
+            else self.pool.submit(_render_page, os.fspath(pdf_path), i, dpi, page_path)
+            for i, (dpi, page_path) in enumerate(zip(dpis, page_paths, strict=True))
+        ]
+        try:
+            for future, page_path in zip(futures, page_paths, strict=True):
+                if future is not None:
+                    future.result()
+                yield os.fspath(page_path)
+        finally:
+            for future in futures:
+                if future is not None:
+                    future.cancel()
+        (entry / "complete").touch()
+        self.evict(keep=entry)
+
+    def evict(self, keep=None):
+        """Remove the least recently used entries beyond `max_cache_bytes`."""
+        entries = []
+        for path in self.cache_dir.iterdir():
+            if path.name.endswith(".tmp"):
+                continue
+            files = list(path.iterdir()) if path.is_dir() else [path]
+            size = sum(f.stat().st_size for f in files if f.is_file())
+            entries.append((path.stat().st_mtime, size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda x: x[0]):
+            if total <= self.max_cache_bytes:
+                break
+            if path == keep:
+                continue
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+            total -= size
@@ -1,6 +1,41 @@
 import re
 import time
 from dataclasses import dataclass
+from typing import Iterable, List
+
+# Earliest place HTML can start: a doctype or any tag
+HTML_START_PATTERN = re.compile(r"<!DOCTYPE\s+html|<[a-zA-Z]", re.IGNORECASE)
+# Documents and layout blocks, only when the text opens with them
+HTML_OPENING_PATTERN = re.compile(
+    r"<!DOCTYPE\s+html"
+    r"|<(?:html|head|body|div|section|article|main|header|footer|nav)[\s>]",
+    re.IGNORECASE,
+)
+HTML_FEATURES_PATTERN = re.compile(
+    r"(?:<!DOCTYPE|<html|<head|<body|<div|class=|id=|href=|src=)", re.IGNORECASE
+)
+TAG_START_PATTERN = re.compile(r"<[a-zA-Z]")
+CLOSING_TAG_PATTERN = re.compile(r"</[a-zA-Z]+>")
+ESCAPE_PATTERN = re.compile(r"\\([n\"'])")
+UNESCAPED = {"n": "\n", '"': '"', "'": "'"}
+
+
+def find_tag_end(text: str) -> int:
+    """
+    End of the first `<[a-zA-Z][^>]*>` tag of `text`, -1 if there is none. The first tag
+    start decides: when no `>` follows it, none follows the later ones either, so this is
+    linear where the regex would rescan the rest of the text from every `<`.
+    """
+    match = TAG_START_PATTERN.search(text)
+    if match is None:
+        return -1
+    end = text.find(">", match.end())
+    return -1 if end == -1 else end + 1
+
+
+def unescape(text: str) -> str:
+    """Undo the `\\n`, `\\"` and `\\'` escapes of the model output, in a single pass."""
+    return ESCAPE_PATTERN.sub(lambda m: UNESCAPED[m.group(1)], text)
 
 
 @dataclass
@@ -19,80 +54,76 @@ class HTMLDetector:
         self.html_prefix_added = False
         self.detection_threshold = 50
         self.chunk_count = 0
-        self.html_start_patterns = [
-            re.compile(r"^<!DOCTYPE\s+html", re.IGNORECASE),
-            re.compile(r"^<html[\s>]", re.IGNORECASE),
-            re.compile(r"^<head[\s>]", re.IGNORECASE),
-            re.compile(
-                r"^<bod"
-                r"y[\s>]",
-                re.IGNORECASE,
-            ),
-            re.compile(r"^<div[\s>]", re.IGNORECASE),
-            re.compile(r"^<section[\s>]", re.IGNORECASE),
-            re.compile(r"^<article[\s>]", re.IGNORECASE),
-            re.compile(r"^<main[\s>]", re.IGNORECASE),
-            re.compile(r"^<header[\s>]", re.IGNORECASE),
-            re.compile(r"^<footer[\s>]", re.IGNORECASE),
-            re.compile(r"^<nav[\s>]", re.IGNORECASE),
-        ]
-
-        self.html_structure_pattern = re.compile(
-            r"<[a-zA-Z][^>]*>.*</[a-zA-Z]+>", re.DOTALL
-        )
-        self.html_features_pattern = re.compile(
-            r"(?:<!DOCTYPE|<html|<head|<body|<div|class=|id=|href=|src=)", re.IGNORECASE
-        )
 
     def count_occurrences(self, text: str, substring: str) -> int:
         return text.count(substring)
 
     def find_html_start_position(self, text: str) -> int:
-        positions = []
-        html_patterns = [
-            r"<!DOCTYPE\s+html",
-            r"<html\b",
-            r"<head\b",
-            r"<body\b",
-            r"<div\b",
-            r"<section\b",
-            r"<article\b",
-            r"<main\b",
-            r"<header\b",
-            r"<footer\b",
-            r"<nav\b",
-            r"<[a-zA-Z]+",
-        ]
-        for pat in html_patterns:
-            for match in re.finditer(pat, text, re.IGNORECASE):
-                positions.append(match.start())
-        return min(positions) if positions else 0
+        match = HTML_START_PATTERN.search(text)
+        return match.start() if match else 0
 
     def is_html_content(self, text: str) -> bool:
+        return self._is_html(text, self.streaming_mode)
+
+    def _is_html(self, text: str, streaming_mode: bool) -> bool:
         trimmed = text.strip()
         if "```" in trimmed:
             return False
 
-        if any(p.search(trimmed) for p in self.html_start_patterns):
+        if HTML_OPENING_PATTERN.match(trimmed):
             return True
 
-        has_html_features = bool(self.html_features_pattern.search(trimmed))
-
-        has_tag_like_structure = bool(re.search(r"<[a-zA-Z][^>]*>", trimmed))
+        tag_end = find_tag_end(trimmed)
 
-        has_html_structure = bool(self.html_structure_pattern.search(trimmed))
+        def has_html_structure():
+            # A tag, then a closing tag after it; the earliest tag ends first
+            return tag_end != -1 and bool(CLOSING_TAG_PATTERN.search(trimmed, tag_end))
 
         escaped_newlines = self.count_occurrences(text, "\\n")
         actual_newlines = self.count_occurrences(text, "\n")
 
-        if self.streaming_mode:
-            if has_html_features or has_tag_like_structure:
+        if streaming_mode:
+            if tag_end != -1 or HTML_FEATURES_PATTERN.search(trimmed):
                 return True
 
-            return has_html_structure and (escaped_newlines > 0 or actual_newlines > 0)
+            return (
+                escaped_newlines > 0 or actual_newlines > 0
+            ) and has_html_structure()
         else:
             has_multiple_lines = escaped_newlines > 2 or actual_newlines > 2
-            return has_html_structure and has_html_features and has_multiple_lines
+            return (
+                has_multiple_lines
+                and has_html_structure()
+                and bool(HTML_FEATURES_PATTERN.search(trimmed))
+            )
+
+    def classify_batch(self, texts: Iterable[str]) -> List[bool]:
+        """Whether each complete (non-streamed) output is HTML."""
+        return [self._is_html(text, streaming_mode=False) for text in texts]
+
+    def process_batch(self, texts: Iterable[str]) -> List[str]:
+        """
+        Fix complete outputs as the streaming path would: unescape them, and wrap the HTML
+        ones in a markdown code block starting at their first tag.
+        """
+        outputs = []
+        for text in texts:
+            if self._is_html(text, streaming_mode=False):
+                start = self.find_html_start_position(text)
+                text = text[:start] + "```html\n" + text[start:] + "\n```"
+            outputs.append(unescape(text))
+        return outputs
+
+    def _flush(self) -> StreamingResult:
+        # Only the carried-over backslash and the new chunk are in the buffer
+        self.buffer = unescape(self.buffer)
+        if self.buffer.endswith("\\"):
+            output = self.buffer[:-1]
+            self.buffer = "\\"
+            return StreamingResult(output, False)
+        output = self.buffer
+        self.buffer = ""
+        return StreamingResult(output, False)
 
     def process_streaming_chunk(self, chunk: str) -> StreamingResult:
         if not self.html_detected and self.chunk_count >= self.MAX_BUFFER_CHUNKS:
@@ -128,32 +159,10 @@ class HTMLDetector:
                 return StreamingResult(output, True)
             else:
                 # 未检测到HTML，提取可以安全输出的部分
-                self.buffer = (
-                    self.buffer.replace("\\n", "\n")
-                    .replace('\\"', '"')
-                    .replace("\\'", "'")
-                )
-                if self.buffer.endswith("\\"):
-                    output = self.buffer[:-1]
-                    self.buffer = "\\"
-                    return StreamingResult(output, False)
-                else:
-                    output = self.buffer
-                    self.buffer = ""
-                    return StreamingResult(output, False)
+                return self._flush()
         else:
             self.buffer += chunk
-            self.buffer = (
-                self.buffer.replace("\\n", "\n").replace('\\"', '"').replace("\\'", "'")
-            )
-            if self.buffer.endswith("\\"):
-                output = self.buffer[:-1]
-                self.buffer = "\\"
-                return StreamingResult(output, False)
-            else:
-                output = self.buffer
-                self.buffer = ""
-                return StreamingResult(output, False)
+            return self._flush()
 
     def finalize_stream(self) -> str:
         if not self.streaming_mode:
@@ -292,3 +301,13 @@ if __name__ == "__main__":
         print(f"  Test Result: {status}\n")
 
     print("Non-streaming tests complete!")
+    print("=== Batch HTML Processing ===")
+    contents = [test["content"] for test in test_cases]
+    for test, is_html, output in zip(
+        test_cases,
+        non_stream_detector.classify_batch(contents),
+        non_stream_detector.process_batch(contents),
+        strict=True,
+    ):
+        print(f"{test['name']}: {is_html}")
+        print(f"  {output[:60]!r}")
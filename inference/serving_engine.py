@@ -0,0 +1,473 @@
+"""
+A continuous-batching generation engine, serving GLM-4.1V / GLM-4.5V to several users.
+
+`ServingEngine.submit(messages)` queues a conversation and returns a request, which
+streams the response text when iterated and is cancelled with `request.cancel()`.
+A single background thread owns the model:
+- requests wait in an admission queue (`max_queue_size`, beyond which `submit` raises
+  `EngineOverloadedError`) until one of the `max_batch_size` batch slots is free;
+- an admitted request is prefilled on its own (images and videos included), then its KV
+  cache joins the running batch, left-padded to the batch length;
+- every decode step runs one forward pass for all the active requests, whatever their
+  lengths and start times; finished and cancelled requests leave the batch right away,
+  freeing their slot for the next queued request.
+
+Decode steps pass the multimodal rope positions of each row explicitly, so rows with
+different media and prompt lengths can share a step.
+
+Self-check on CPU, comparing batched and one-at-a-time greedy outputs:
+    python serving_engine.py --tiny_random --num_requests 8 --max_batch_size 8
+"""
+
+import argparse
+import queue
+import threading
+import time
+
+import torch
+import torch.nn.functional as F
+from transformers import (
+    DynamicCache,
+    LogitsProcessorList,
+    RepetitionPenaltyLogitsProcessor,
+    TemperatureLogitsWarper,
+    TextIteratorStreamer,
+    TopKLogitsWarper,
+    TopPLogitsWarper,
+)
+
+
+class EngineOverloadedError(RuntimeError):
+    pass
+
+
+class GenerationRequest:
+    """One conversation being served; iterate it for the response text."""
+
+    def __init__(
+        self,
+        inputs,
+        streamer,
+        max_new_tokens,
+        temperature,
+        top_p,
+        top_k,
+        repetition_penalty,
+    ):
+        self.inputs = inputs
+        self.streamer = streamer
+        self.max_new_tokens = max_new_tokens
+        self.do_sample = temperature > 0
+        self.logits_processor = LogitsProcessorList()
+        if repetition_penalty != 1.0:
+            self.logits_processor.append(
+                RepetitionPenaltyLogitsProcessor(repetition_penalty)
+            )
+        if self.do_sample:
+            self.logits_processor.append(TemperatureLogitsWarper(temperature))
+            if top_k > 0:
+                self.logits_processor.append(TopKLogitsWarper(top_k))
+            if top_p < 1.0:
+                self.logits_processor.append(TopPLogitsWarper(top_p))
+
+        self.prompt_ids = inputs["input_ids"][0]
+        self.output_ids = []
+        self.next_position = None
+        self.finish_reason = None  # stop, length, cancelled or error
+        self.error = None
+        self._cancelled = threading.Event()
+        self._done = threading.Event()
+        self.submit_time = time.perf_counter()
+        self.first_token_time = None
+        self.end_time = None
+
+    @property
+    def num_prompt_tokens(self):
+        return len(self.prompt_ids)
+
+    def cancel(self):
+        """Stop generating; the text streamed so far is kept."""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def __iter__(self):
+        yield from self.streamer
+        if self.error is not None:
+            raise self.error
+
+    def result(self, timeout=None):
+        """Wait for the request to finish and return the generated token ids."""
+        if not self._done.wait(timeout):
+            raise TimeoutError("Generation did not finish in time")
+        if self.error is not None:
+            raise self.error
+        return self.output_ids
+
+
+def cache_layers(cache):
+    """The (key, value) tensors of each layer of a `DynamicCache`."""
+    if hasattr(cache, "layers"):
+        return [(layer.keys, layer.values) for layer in cache.layers]
+    return list(zip(cache.key_cache, cache.value_cache, strict=True))
+
+
+def build_cache(layers):
+    cache = DynamicCache()
+    for layer_idx, (keys, values) in enumerate(layers):
+        cache.update(keys, values, layer_idx)
+    return cache
+
+
+class ServingEngine:
+    def __init__(self, model, processor, max_batch_size=8, max_queue_size=64):
+        self.model = model
+        self.processor = processor
+        self.max_batch_size = max_batch_size
+        eos_token_id = model.generation_config.eos_token_id
+        if isinstance(eos_token_id, int):
+            eos_token_id = [eos_token_id]
+        self.eos_token_ids = set(eos_token_id or [])
+
+        self._queue = queue.Queue(max_queue_size)
+        # Batch state, only touched by the engine thread; rows follow `_active`
+        self._active = []
+        self._cache = None
+        self._attention_mask = None
+        self._positions = None
+        self._last_tokens = None
+
+        self.stats = {
+            "requests": 0,
+            "completed": 0,
+            "cancelled": 0,
+            "failed": 0,
+            "prompt_tokens": 0,
+            "generated_tokens": 0,
+            "decode_steps": 0,
+            "decode_rows": 0,
+            "ttft_sum": 0.0,
+            "ttft_count": 0,
+        }
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    @property
+    def num_active(self):
+        return len(self._active)
+
+    @property
+    def num_queued(self):
+        return self._queue.qsize()
+
+    def submit(
+        self,
+        messages,
+        max_new_tokens=8192,
+        temperature=1.0,
+        top_p=1.0,
+        top_k=0,
+        repetition_penalty=1.0,
+        skip_special_tokens=False,
+    ):
+        """Queue a conversation, preprocessing it on the calling thread."""
+        inputs = self.processor.apply_chat_template(
+            messages,
+            tokenize=True,
+            add_generation_prompt=True,
+            return_dict=True,
+            return_tensors="pt",
+        ).to(self.model.device)
+        inputs.pop("token_type_ids", None)
+        streamer = TextIteratorStreamer(
+            self.processor.tokenizer, skip_special_tokens=skip_special_tokens
+        )
+        request = GenerationRequest(
+            inputs,
+            streamer,
+            max_new_tokens=max_new_tokens,
+            temperature=temperature,
+            top_p=top_p,
+            top_k=top_k,
+            repetition_penalty=repetition_penalty,
+        )
+        try:
+            self._queue.put_nowait(request)
+        except queue.Full:
+            raise EngineOverloadedError(
+                f"{self._queue.maxsize} requests are already waiting"
+            ) from None
+        return request
+
+    def shutdown(self):
+        self._stopped.set()
+        self._thread.join()
+
+    @torch.inference_mode()
+    def _loop(self):
+        while not self._stopped.is_set():
+            # This thread is the only one generating, it must outlive any failure
+            try:
+                self._admit()
+                if self._active:
+                    self._step()
+            except Exception as e:
+                for request in self._active:
+                    request.error = e
+                    self._finish(request, "error")
+                self._keep([])
+        for request in self._active:
+            self._finish(request, "cancelled")
+        while not self._queue.empty():
+            self._finish(self._queue.get_nowait(), "cancelled")
+
+    def _admit(self):
+        while len(self._active) < self.max_batch_size:
+            try:
+                # Wait for work when idle, only pick up what is there otherwise
+                request = self._queue.get(block=not self._active, timeout=0.05)
+            except queue.Empty:
+                return
+            self.stats["requests"] += 1
+            if request.cancelled:
+                self._finish(request, "cancelled")
+                continue
+            try:
+                layers, token = self._prefill(request)
+                if not self._emit(request, token):
+                    self._join(request, layers, token)
+            except Exception as e:
+                # `_join` only updates the batch once it cannot fail anymore
+                request.error = e
+                self._finish(request, "error")
+
+    def _prefill(self, request):
+        cache = DynamicCache()
+        outputs = self.model(
+            **request.inputs, past_key_values=cache, use_cache=True, logits_to_keep=1
+        )
+        # The next position follows the largest multimodal rope position of the prompt
+        rope_delta = 0
+        if getattr(outputs, "rope_deltas", None) is not None:
+            rope_delta = int(outputs.rope_deltas.view(-1)[0])
+        request.next_position = request.num_prompt_tokens + rope_delta
+        self.stats["prompt_tokens"] += request.num_prompt_tokens
+        return cache_layers(cache), self._sample(request, outputs.logits[:, -1])
+
+    def _join(self, request, layers, token):
+        length = layers[0][0].shape[2]
+        attention_mask = torch.ones(
+            (1, length), dtype=torch.long, device=self.model.device
+        )
+        position = torch.tensor([request.next_position], device=self.model.device)
+        last_token = torch.tensor([token], device=self.model.device)
+        if not self._active:
+            self._cache = build_cache(layers)
+            self._active = [request]
+            self._attention_mask = attention_mask
+            self._positions = position
+            self._last_tokens = last_token
+            return
+
+        batch_length = self._attention_mask.shape[1]
+        total = max(batch_length, length)
+        batch_layers = cache_layers(self._cache)
+        cache = build_cache(
+            [
+                (
+                    torch.cat(
+                        [
+                            F.pad(batch_keys, (0, 0, total - batch_length, 0)),
+                            F.pad(keys, (0, 0, total - length, 0)),
+                        ]
+                    ),
+                    torch.cat(
+                        [
+                            F.pad(batch_values, (0, 0, total - batch_length, 0)),
+                            F.pad(values, (0, 0, total - length, 0)),
+                        ]
+                    ),
+                )
+                for (batch_keys, batch_values), (keys, values) in zip(
+                    batch_layers, layers, strict=True
+                )
+            ]
+        )
+        attention_mask = torch.cat(
+            [
+                F.pad(self._attention_mask, (total - batch_length, 0)),
+                F.pad(attention_mask, (total - length, 0)),
+            ]
+        )
+        positions = torch.cat([self._positions, position])
+        last_tokens = torch.cat([self._last_tokens, last_token])
+        self._cache = cache
+        self._attention_mask = attention_mask
+        self._positions = positions
+        self._last_tokens = last_tokens
+        self._active.append(request)
+
+    def _keep(self, rows):
+        """Shrink the batch to `rows`, dropping the padding no remaining row needs."""
+        if not rows:
+            self._active = []
+            self._cache = None
+            return
+        index = torch.tensor(rows, device=self.model.device)
+        attention_mask = self._attention_mask[index]
+        start = int(attention_mask.any(dim=0).int().argmax())
+        self._cache = build_cache(
+            [
+                (
+                    keys[index.to(keys.device), :, start:],
+                    values[index.to(values.device), :, start:],
+                )
+                for keys, values in cache_layers(self._cache)
+            ]
+        )
+        self._attention_mask = attention_mask[:, start:]
+        self._positions = self._positions[index]
+        self._last_tokens = self._last_tokens[index]
+        self._active = [self._active[row] for row in rows]
+
+    def _step(self):
+        rows = [
+            idx for idx, request in enumerate(self._active) if not request.cancelled
+        ]
+        for request in self._active:
+            if request.cancelled:
+                self._finish(request, "cancelled")
+        if len(rows) < len(self._active):
+            self._keep(rows)
+            if not self._active:
+                return
+
+        batch_size = len(self._active)
+        cache_length = self._attention_mask.shape[1]
+        self._attention_mask = F.pad(self._attention_mask, (0, 1), value=1)
+        outputs = self.model(
+            input_ids=self._last_tokens[:, None],
+            attention_mask=self._attention_mask,
+            position_ids=self._positions.view(1, batch_size, 1).expand(3, -1, -1),
+            past_key_values=self._cache,
+            cache_position=torch.tensor([cache_length], device=self.model.device),
+            use_cache=True,
+        )
+        self._positions = self._positions + 1
+        self.stats["decode_steps"] += 1
+        self.stats["decode_rows"] += batch_size
+
+        rows = []
+        for row, request in enumerate(self._active):
+            token = self._sample(request, outputs.logits[row : row + 1, -1])
+            self._last_tokens[row] = token
+            if not self._emit(request, token):
+                rows.append(row)
+        if len(rows) < batch_size:
+            self._keep(rows)
+
+    def _sample(self, request, logits):
+        input_ids = torch.cat(
+            [
+                request.prompt_ids,
+                torch.tensor(request.output_ids, dtype=request.prompt_ids.dtype).to(
+                    request.prompt_ids.device
+                ),
+            ]
+        )
+        scores = request.logits_processor(input_ids[None], logits.float())
+        if request.do_sample:
+            return int(torch.multinomial(scores.softmax(dim=-1), num_samples=1))
+        return int(scores.argmax(dim=-1))
+
+    def _emit(self, request, token):
+        """Hand a generated token to its request; True once the request is done."""
+        if request.first_token_time is None:
+            request.first_token_time = time.perf_counter()
+            self.stats["ttft_sum"] += request.first_token_time - request.submit_time
+            self.stats["ttft_count"] += 1
+        self.stats["generated_tokens"] += 1
+        if token in self.eos_token_ids:
+            self._finish(request, "stop")
+            return True
+        request.output_ids.append(token)
+        request.streamer.put(torch.tensor([token]))
+        if len(request.output_ids) >= request.max_new_tokens:
+            self._finish(request, "length")
+            return True
+        return False
+
+    def _finish(self, request, reason):
+        if request._done.is_set():
+            return
+        request.finish_reason = reason
+        request.end_time = time.perf_counter()
+        try:
+            request.streamer.end()
+        except Exception:
+            # The text still held by the streamer is lost, but its iterator must stop
+            request.streamer.on_finalized_text("", stream_end=True)
+        request._done.set()
+        key = {"cancelled": "cancelled", "error": "failed"}.get(reason, "completed")
+        self.stats[key] += 1
+
+
+def self_check(model, processor, num_requests, max_batch_size, max_new_tokens):
+    prompts = [
+        f"Write {i + 1} sentences about the number {i + 1}."
+        for i in range(num_requests)
+    ]
+    results = {}
+    for batch_size in sorted({1, max_batch_size}):
+        engine = ServingEngine(model, processor, max_batch_size=batch_size)
+        start = time.perf_counter()
+        requests = [
+            engine.submit(
+                [{"role": "user", "content": [{"type": "text", "text": prompt}]}],
+                max_new_tokens=max_new_tokens,
+                temperature=0,
+            )
+            for prompt in prompts
+        ]
+        outputs = [request.result() for request in requests]
+        elapsed = time.perf_counter() - start
+        engine.shutdown()
+        num_tokens = sum(len(output) for output in outputs)
+        mean_batch = engine.stats["decode_rows"] / max(1, engine.stats["decode_steps"])
+        print(
+            f"max_batch_size={batch_size}: {num_tokens} tokens in {elapsed:.2f}s, "
+            f"{num_tokens / elapsed:.1f} tokens/s, mean decode batch {mean_batch:.1f}"
+        )
+        results[batch_size] = outputs
+    if len(results) > 1:
+        same = sum(a == b for a, b in zip(*results.values(), strict=True))
+        print(f"{same}/{num_requests} batched outputs identical to unbatched ones")
+
+
+if __name__ == "__main__":
+    from trans_infer_bench import RobustInference
+
+    parser = argparse.ArgumentParser(description="Serving engine self-check")
+    parser.add_argument(
+        "--model_path", type=str, default="zai-org/GLM-4.1V-9B-Thinking"
+    )
+    parser.add_argument("--tiny_random", action="store_true")
+    parser.add_argument("--num_requests", type=int, default=8)
+    parser.add_argument("--max_batch_size", type=int, default=8)
+    parser.add_argument("--max_new_tokens", type=int, default=32)
+    args = parser.parse_args()
+
+    if args.tiny_random:
+        runner = RobustInference.tiny_random(args.model_path)
+    else:
+        runner = RobustInference(args.model_path)
+    self_check(
+        runner.model,
+        runner.processor,
+        args.num_requests,
+        args.max_batch_size,
+        args.max_new_tokens,
+    )
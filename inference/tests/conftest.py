@@ -0,0 +1,40 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# The inference scripts import each other as top-level modules
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+@pytest.fixture(scope="session")
+def tiny_runner():
+    """
+    `RobustInference.tiny_random` on the GLM-4.1V configuration, built here rather than
+    downloaded; only the processor of `GLMV_TEST_MODEL_PATH` has to be available.
+    """
+    torch = pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+    from trans_infer_bench import RobustInference
+
+    config = transformers.Glm4vConfig(
+        text_config={
+            "vocab_size": 151552,
+            "hidden_size": 4096,
+            "num_attention_heads": 32,
+            "num_key_value_heads": 2,
+            "partial_rotary_factor": 0.5,
+            "rope_scaling": {"rope_type": "default", "mrope_section": [8, 12, 12]},
+            "eos_token_id": [151329, 151336, 151338],
+            "pad_token_id": 151329,
+        },
+    )
+    model_path = os.environ.get("GLMV_TEST_MODEL_PATH", "zai-org/GLM-4.1V-9B-Thinking")
+    try:
+        runner = RobustInference.tiny_random(model_path, config=config)
+    except OSError as e:
+        pytest.skip(f"The processor of {model_path} is not available: {e}")
+    # In double precision, padding and batching never flip a greedy choice
+    runner.model.to(torch.float64)
+    return runner
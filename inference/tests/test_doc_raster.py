@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from doc_raster import DocumentRasterizer  # noqa: E402
+
+
+def _make_pdf(path, num_pages):
+    with fitz.open() as doc:
+        for i in range(num_pages):
+            doc.new_page(width=200, height=100).insert_text((20, 50), f"page {i}")
+        doc.save(path)
+    return path
+
+
+def test_session_pages_outlive_eviction(tmp_path):
+    rasterizer = DocumentRasterizer(tmp_path / "cache", dpi=72, num_workers=1)
+    try:
+        pdf_path = _make_pdf(tmp_path / "doc.pdf", 3)
+        cached = rasterizer.pages(pdf_path)
+        pages = rasterizer.pages(pdf_path, out_dir=tmp_path / "session")
+        assert len(pages) == 3
+        assert all(page.startswith(os.fspath(tmp_path / "session")) for page in pages)
+
+        # Another upload pushes the document out of the cache
+        rasterizer.max_cache_bytes = 0
+        rasterizer.pages(_make_pdf(tmp_path / "other.pdf", 1))
+        assert not any(map(os.path.exists, cached))
+        assert all(os.path.getsize(page) > 0 for page in pages)
+    finally:
+        rasterizer.shutdown()
@@ -0,0 +1,82 @@
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+PROMPTS = [
+    "Describe a sunset.",
+    "What is 12 times 7?",
+    "Name three rivers in Europe and say which one is the longest.",
+    "Hi",
+]
+FIRST_MAX_TOKENS = 8
+FORCE_MAX_TOKENS = 4
+
+
+def _conversation(prompt):
+    return [{"role": "user", "content": [{"type": "text", "text": prompt}]}]
+
+
+def _set_eos(monkeypatch, runner, token_ids):
+    monkeypatch.setattr(runner.model.generation_config, "eos_token_id", token_ids)
+    monkeypatch.setattr(runner, "eos_token_ids", set(token_ids or []))
+
+
+def _pick_stop_token(runner, conversations):
+    """A token some first rounds emit early on and another one never does."""
+    outputs = []
+    for conversation in conversations:
+        inputs = runner._apply_chat_template([conversation])
+        generated_ids = runner.model.generate(
+            **inputs, max_new_tokens=FIRST_MAX_TOKENS, do_sample=False
+        )
+        outputs.append(generated_ids[0, inputs["input_ids"].shape[1] :].tolist())
+    for output in outputs:
+        for token in output[: FIRST_MAX_TOKENS - 1]:
+            if any(token not in other for other in outputs):
+                return token
+    pytest.fail(f"The first rounds all emit the same tokens: {outputs}")
+
+
+def test_generate_batch_matches_single_generation(tiny_runner, monkeypatch):
+    conversations = [_conversation(prompt) for prompt in PROMPTS]
+    # The random model never stops by itself: end some rows early with a token they emit
+    _set_eos(monkeypatch, tiny_runner, None)
+    stop_token = _pick_stop_token(tiny_runner, conversations)
+    _set_eos(monkeypatch, tiny_runner, [stop_token])
+
+    expected = []
+    for conversation in conversations:
+        result = tiny_runner.generate_with_force_completion(
+            conversation,
+            first_max_tokens=FIRST_MAX_TOKENS,
+            force_max_tokens=FORCE_MAX_TOKENS,
+            do_sample=False,
+        )
+        result.pop("reused_cache_length", None)
+        expected.append(result)
+    truncated = [
+        idx
+        for idx, result in enumerate(expected)
+        if result["reason"] == "force_completion_success"
+    ]
+    assert 0 < len(truncated) < len(conversations)
+
+    batch_sizes = []
+    generate = tiny_runner.model.generate
+
+    def counting_generate(**kwargs):
+        batch_sizes.append(kwargs["input_ids"].shape[0])
+        return generate(**kwargs)
+
+    monkeypatch.setattr(tiny_runner.model, "generate", counting_generate)
+    results = tiny_runner.generate_batch(
+        conversations,
+        first_max_tokens=FIRST_MAX_TOKENS,
+        force_max_tokens=FORCE_MAX_TOKENS,
+        do_sample=False,
+    )
+
+    assert results == expected
+    # Only the truncated conversations are generated again
+    assert batch_sizes == [len(conversations), len(truncated)]
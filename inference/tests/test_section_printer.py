@@ -0,0 +1,26 @@
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from trans_infer_cli import SectionPrinter  # noqa: E402
+
+RESPONSE = "<think>a < b, so x<y</think><answer>yes</answer><|user|>"
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7])
+def test_section_printer(capsys, chunk_size):
+    printer = SectionPrinter()
+    for start in range(0, len(RESPONSE), chunk_size):
+        printer.write(RESPONSE[start : start + chunk_size])
+    printer.close()
+    assert capsys.readouterr().out == "\n[Thinking]\na < b, so x<y\n\n[Answer]\nyes\n\n"
+
+
+def test_section_printer_only_holds_back_tag_prefixes(capsys):
+    printer = SectionPrinter()
+    printer.write("<think>if a < b then")
+    assert capsys.readouterr().out == "\n[Thinking]\nif a < b then"
+    printer.write(" done</ans")
+    assert capsys.readouterr().out == " done"
+    assert printer.pending == "</ans"
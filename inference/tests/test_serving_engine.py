@@ -0,0 +1,144 @@
+import time
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from serving_engine import ServingEngine  # noqa: E402
+
+PROMPTS = [
+    "Hi",
+    "What is 12 times 7?",
+    "Describe a sunset over the sea in a few words.",
+    "Name three rivers in Europe, then say which one of them is the longest and why.",
+]
+
+
+def _conversation(prompt):
+    return [{"role": "user", "content": [{"type": "text", "text": prompt}]}]
+
+
+def _reference(runner, prompt, max_new_tokens):
+    """Greedy output of the conversation generated on its own, without the EOS token."""
+    inputs = runner._apply_chat_template([_conversation(prompt)])
+    generated_ids = runner.model.generate(
+        **inputs, max_new_tokens=max_new_tokens, do_sample=False
+    )
+    output_ids = generated_ids[0, inputs["input_ids"].shape[1] :].tolist()
+    for idx, token_id in enumerate(output_ids):
+        if token_id in runner.eos_token_ids:
+            return output_ids[:idx]
+    return output_ids
+
+
+def _wait_for_tokens(request, num_tokens, timeout=60):
+    deadline = time.monotonic() + timeout
+    while len(request.output_ids) < num_tokens:
+        assert request.finish_reason is None and time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+@pytest.fixture
+def make_engine(tiny_runner):
+    engines = []
+
+    def make_engine(max_batch_size):
+        engine = ServingEngine(
+            tiny_runner.model, tiny_runner.processor, max_batch_size=max_batch_size
+        )
+        engines.append(engine)
+        return engine
+
+    yield make_engine
+    for engine in engines:
+        engine.shutdown()
+
+
+def test_batched_outputs_match_single_generation(tiny_runner, make_engine):
+    # Rows leave the batch at different steps
+    max_new_tokens = [6, 16, 10, 20]
+    expected = [
+        _reference(tiny_runner, prompt, n)
+        for prompt, n in zip(PROMPTS, max_new_tokens, strict=True)
+    ]
+
+    engine = make_engine(max_batch_size=len(PROMPTS))
+    requests = [
+        engine.submit(_conversation(prompt), max_new_tokens=n, temperature=0)
+        for prompt, n in zip(PROMPTS, max_new_tokens, strict=True)
+    ]
+    assert [request.result(timeout=60) for request in requests] == expected
+    assert engine.stats["decode_rows"] > engine.stats["decode_steps"]
+
+
+def test_request_joins_a_longer_running_batch(tiny_runner, make_engine):
+    long_prompt, short_prompt = PROMPTS[3], PROMPTS[0]
+    expected = [
+        _reference(tiny_runner, long_prompt, 64),
+        _reference(tiny_runner, short_prompt, 8),
+    ]
+
+    engine = make_engine(max_batch_size=2)
+    running = engine.submit(
+        _conversation(long_prompt), max_new_tokens=64, temperature=0
+    )
+    _wait_for_tokens(running, 8)
+    # Shorter than the running row, so its cache is left-padded to the batch length
+    joining = engine.submit(
+        _conversation(short_prompt), max_new_tokens=8, temperature=0
+    )
+    assert [running.result(timeout=60), joining.result(timeout=60)] == expected
+    assert joining.end_time < running.end_time
+
+
+def test_cancel_in_the_middle_of_a_batch(tiny_runner, make_engine):
+    max_new_tokens = 48
+    expected = [
+        _reference(tiny_runner, prompt, max_new_tokens) for prompt in PROMPTS[1:]
+    ]
+
+    engine = make_engine(max_batch_size=3)
+    first, middle, last = (
+        engine.submit(
+            _conversation(prompt), max_new_tokens=max_new_tokens, temperature=0
+        )
+        for prompt in PROMPTS[1:]
+    )
+    _wait_for_tokens(middle, 4)
+    middle.cancel()
+
+    assert first.result(timeout=60) == expected[0]
+    assert last.result(timeout=60) == expected[2]
+    middle.result(timeout=60)
+    assert middle.finish_reason == "cancelled"
+    assert middle.output_ids == expected[1][: len(middle.output_ids)]
+    assert len(middle.output_ids) < max_new_tokens
+    assert engine.stats["cancelled"] == 1
+
+
+def test_engine_survives_failures(tiny_runner, make_engine, monkeypatch):
+    expected = _reference(tiny_runner, PROMPTS[1], 8)
+
+    engine = make_engine(max_batch_size=2)
+    running = engine.submit(_conversation(PROMPTS[1]), max_new_tokens=8, temperature=0)
+    _wait_for_tokens(running, 2)
+    join = engine._join
+
+    def failing_join(request, layers, token):
+        raise RuntimeError("out of memory")
+
+    monkeypatch.setattr(engine, "_join", failing_join)
+    failed = engine.submit(_conversation(PROMPTS[0]), max_new_tokens=8, temperature=0)
+    with pytest.raises(RuntimeError, match="out of memory"):
+        failed.result(timeout=60)
+    # The iterator of a failed request stops, then raises the error
+    with pytest.raises(RuntimeError, match="out of memory"):
+        list(failed)
+    monkeypatch.setattr(engine, "_join", join)
+
+    # The batch it tried to join is left as it was, and the engine keeps serving
+    assert running.result(timeout=60) == expected
+    after = engine.submit(_conversation(PROMPTS[1]), max_new_tokens=8, temperature=0)
+    assert after.result(timeout=60) == expected
+    assert engine.stats["failed"] == 1
@@ -0,0 +1,46 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from trans_infer_bench import ThinkBudgetLogitsProcessor  # noqa: E402
+
+THINK_END, ANSWER_START, EOS, PAD = 5, 6, 8, 9
+
+
+def _step(processor, input_ids):
+    scores = processor(input_ids, torch.zeros(input_ids.shape[0], 10))
+    return scores.argmax(dim=-1).tolist(), torch.isinf(scores).any(dim=-1).tolist()
+
+
+def test_think_budget_forces_the_answer():
+    processor = ThinkBudgetLogitsProcessor(
+        THINK_END, ANSWER_START, think_budget=2, eos_token_ids=[EOS]
+    )
+    input_ids = torch.tensor([[1, 2, 3]])
+    for token in (1, 1):
+        _step(processor, input_ids)
+        input_ids = torch.cat([input_ids, torch.tensor([[token]])], dim=1)
+    assert _step(processor, input_ids) == ([THINK_END], [True])
+    input_ids = torch.cat([input_ids, torch.tensor([[THINK_END]])], dim=1)
+    assert _step(processor, input_ids) == ([ANSWER_START], [True])
+    assert processor.budget_reached.tolist() == [True]
+
+
+def test_think_budget_skips_finished_rows():
+    processor = ThinkBudgetLogitsProcessor(
+        THINK_END,
+        ANSWER_START,
+        think_budget=2,
+        soft_budget_ratio=0.5,
+        eos_token_ids=[EOS],
+    )
+    # The first row stops at once, then is padded while the second one thinks on
+    input_ids = torch.tensor([[1, 2, 3], [1, 2, 3]])
+    for tokens in ([EOS, 1], [PAD, 1]):
+        _step(processor, input_ids)
+        input_ids = torch.cat([input_ids, torch.tensor(tokens)[:, None]], dim=1)
+    scores = processor(input_ids, torch.zeros(2, 10))
+    assert not torch.isinf(scores[0]).any() and not scores[0].any()
+    assert scores[1].argmax() == THINK_END
+    assert processor.budget_reached.tolist() == [False, True]
@@ -6,30 +6,146 @@ reasoning outputs such as `<think>...</think><answer>...</answer>`.
 Core features:
 - Automatically detects whether the model output includes a complete reasoning block.
 - If the model reaches the `first_max_tokens` limit without emitting `</think>` or `<answer>`,
-  it forcefully appends `</think><answer>` and re-generates to ensure complete output.
+  it forcefully appends `</think><answer>` and re-generates to ensure complete output. The second
+  round reuses the KV cache of the first one, so only the forced tokens are prefilled.
 - Accepts video input via `video_url`, pointing to a local video file to simulate real multi-modal inputs.
+- `generate_batch` runs several conversations together (left-padded), then forces the completion of
+  the truncated ones only, in a second and smaller batch.
+- `generate_with_think_budget` bounds the thinking length in a single generation pass instead: a
+  `ThinkBudgetLogitsProcessor` counts the thinking tokens while decoding and forces `</think><answer>`
+  once the (per-sample) budget is spent, optionally making `</think>` more likely as it approaches.
+- With `visual_cache_dir`, the processed video (sampled frames, pixel values) is cached on disk by
+  `visual_cache.VisualInputCache`, so repeated runs on the same video skip the video preprocessing.
+- `RobustInference.tiny_random` builds a small random-weight model that runs on CPU, to smoke test
+  the generation logic without a GPU.
 - Designed for the Hugging Face `transformers` inference pipeline. If using `vLLM`, similar logic must be adapted manually
   to support forced continuation and special token handling across generation rounds.
 
 Arguments:
 - `--model_path`: Path to the model. Defaults to `THUDM/GLM-4.1V-9B-Thinking`.
 - `--video_path`: Path to the input video file (required).
-- `--prompt`: Text prompt for the model (required).
+- `--prompt`: Text prompt(s) for the model (required); several prompts about the video are run as one batch.
 - `--first_max_tokens` / `--force_max_tokens`: Maximum tokens for initial generation and forced continuation.
 - `--temperature`: Generation temperature (default: 0.1 for stability).
+- `--think_budget`: Generate in a single pass with at most this many thinking tokens, then
+  `--soft_budget_ratio` / `--soft_budget_bias` to favor `</think>` from that fraction of the budget on.
+- `--visual_cache_dir`: Directory of the processed visual inputs cache (disabled by default).
+- `--tiny_random`: Use a tiny random-weight model on CPU instead of the pretrained weights.
 """
 
 import argparse
 
 import torch
-from transformers import AutoProcessor, Glm4vForConditionalGeneration
+from transformers import (
+    AutoConfig,
+    AutoProcessor,
+    Glm4vForConditionalGeneration,
+    LogitsProcessor,
+    LogitsProcessorList,
+)
+from visual_cache import VisualInputCache
+
+
+class ThinkBudgetLogitsProcessor(LogitsProcessor):
+    """
+    Caps the number of thinking tokens of each row: once `think_budget` tokens were
+    generated without `</think>`, the next two tokens are forced to `</think><answer>`.
+
+    With `soft_budget_ratio`, the logit of `</think>` is raised linearly from that
+    fraction of the budget on, up to `soft_budget_bias` when the budget is reached,
+    so the model tends to close its reasoning by itself.
+
+    Rows that already ended with one of `eos_token_ids` are only padded by `generate`,
+    so they are left alone and never count as having reached the budget.
+
+    An instance tracks the state of one `generate` call, create one per call.
+    """
+
+    def __init__(
+        self,
+        think_end_id,
+        answer_start_id,
+        think_budget,
+        soft_budget_ratio=None,
+        soft_budget_bias=5.0,
+        eos_token_ids=(),
+    ):
+        self.think_end_id = think_end_id
+        self.answer_start_id = answer_start_id
+        self.think_budget = think_budget
+        self.soft_budget_ratio = soft_budget_ratio
+        self.soft_budget_bias = soft_budget_bias
+        self.eos_token_ids = list(eos_token_ids)
+        self.prompt_length = None
+
+    def __call__(self, input_ids, scores):
+        batch_size, length = input_ids.shape
+        if self.prompt_length is None:
+            # First step: every row is the (left-padded) prompt
+            self.prompt_length = length
+            self.budgets = torch.as_tensor(
+                self.think_budget, dtype=torch.long, device=input_ids.device
+            ).expand(batch_size)
+            self.closed = torch.zeros(
+                batch_size, dtype=torch.bool, device=input_ids.device
+            )
+            self.forced = torch.zeros_like(self.closed)
+            self.budget_reached = torch.zeros_like(self.closed)
+            self.finished = torch.zeros_like(self.closed)
+            self.eos_ids = torch.tensor(
+                self.eos_token_ids, dtype=torch.long, device=input_ids.device
+            )
+        else:
+            last_token = input_ids[:, -1]
+            self.finished |= torch.isin(last_token, self.eos_ids)
+            force_answer = self.forced & (last_token == self.think_end_id)
+            self.forced &= ~force_answer
+            self.closed |= last_token == self.think_end_id
+            scores = self._force(scores, force_answer, self.answer_start_id)
+
+        num_thinking = length - self.prompt_length
+        force_think_end = (
+            ~self.closed
+            & ~self.forced
+            & ~self.finished
+            & (num_thinking >= self.budgets)
+        )
+        self.forced |= force_think_end
+        self.budget_reached |= force_think_end
+
+        if self.soft_budget_ratio is not None:
+            soft_start = self.budgets * self.soft_budget_ratio
+            progress = (num_thinking - soft_start) / (self.budgets - soft_start).clamp(
+                min=1
+            )
+            bias = self.soft_budget_bias * progress.clamp(0.0, 1.0)
+            bias = torch.where(
+                self.closed | self.finished, torch.zeros_like(bias), bias
+            )
+            scores[:, self.think_end_id] += bias.to(scores.dtype)
+
+        return self._force(scores, force_think_end, self.think_end_id)
+
+    @staticmethod
+    def _force(scores, rows, token_id):
+        if not rows.any():
+            return scores
+        scores[rows] = -float("inf")
+        scores[rows, token_id] = 0.0
+        return scores
 
 
 class RobustInference:
-    def __init__(self, model_path):
+    def __init__(self, model_path, model=None, visual_cache_dir=None):
         self.model_path = model_path
 
         self.processor = AutoProcessor.from_pretrained(model_path)
+        self.visual_cache = None
+        if visual_cache_dir is not None:
+            self.visual_cache = VisualInputCache(visual_cache_dir)
+            self.visual_cache.wrap(self.processor)
+        # Batched generation appends to the right, so prompts are padded on the left
+        self.processor.tokenizer.padding_side = "left"
         self.special_tokens = {
             "think_start": self.processor.tokenizer.convert_tokens_to_ids("<think>"),
             "think_end": self.processor.tokenizer.convert_tokens_to_ids("</think>"),
@@ -37,11 +153,48 @@ class RobustInference:
             "answer_end": self.processor.tokenizer.convert_tokens_to_ids("</answer>"),
         }
 
-        self.model = Glm4vForConditionalGeneration.from_pretrained(
-            pretrained_model_name_or_path=model_path,
-            torch_dtype=torch.bfloat16,
-            device_map="auto",
-        )
+        if model is None:
+            model = Glm4vForConditionalGeneration.from_pretrained(
+                pretrained_model_name_or_path=model_path,
+                torch_dtype=torch.bfloat16,
+                device_map="auto",
+            )
+        self.model = model
+
+        eos_token_id = self.model.generation_config.eos_token_id
+        if isinstance(eos_token_id, int):
+            eos_token_id = [eos_token_id]
+        self.eos_token_ids = set(eos_token_id or [])
+
+    @classmethod
+    def tiny_random(cls, model_path, seed=0, config=None, **kwargs):
+        """
+        Two-layer model with random weights, on CPU, sharing the processor of `model_path`.
+        The outputs are gibberish, but it exercises the same code paths as the real model.
+        `config` replaces the configuration of `model_path`, which is then shrunk too.
+        """
+        if config is None:
+            config = AutoConfig.from_pretrained(model_path)
+        text_config = config.text_config
+        vision_config = config.vision_config
+        # Keep the head sizes, which the (m)rope layouts depend on
+        text_head_dim = text_config.hidden_size // text_config.num_attention_heads
+        text_config.num_hidden_layers = 2
+        text_config.num_attention_heads = 2
+        text_config.num_key_value_heads = 1
+        text_config.head_dim = text_head_dim
+        text_config.hidden_size = 2 * text_head_dim
+        text_config.intermediate_size = 4 * text_head_dim
+        vision_head_dim = vision_config.hidden_size // vision_config.num_heads
+        vision_config.depth = 2
+        vision_config.num_heads = 2
+        vision_config.hidden_size = 2 * vision_head_dim
+        vision_config.intermediate_size = 4 * vision_head_dim
+        vision_config.out_hidden_size = text_config.hidden_size
+
+        torch.manual_seed(seed)
+        model = Glm4vForConditionalGeneration(config).to(torch.float32).eval()
+        return cls(model_path, model=model, **kwargs)
 
     def generate_with_force_completion(
         self,
@@ -62,14 +215,15 @@ class RobustInference:
         inputs.pop("token_type_ids", None)
         input_length = inputs["input_ids"].shape[1]
 
-        first_generated_ids = self.model.generate(
+        first_generation = self.model.generate(
             **inputs,
             max_new_tokens=first_max_tokens,
             do_sample=do_sample,
             temperature=temperature,
+            return_dict_in_generate=True,
         )
 
-        first_output_ids = first_generated_ids[0][input_length:]
+        first_output_ids = first_generation.sequences[0][input_length:]
 
         needs_completion = self._check_needs_completion_by_tokens(
             first_output_ids, first_max_tokens
@@ -92,18 +246,20 @@ class RobustInference:
             inputs["input_ids"], first_output_ids
         )
 
-        force_inputs = {
-            "input_ids": force_input_ids.to(self.model.device),
-            "attention_mask": torch.ones_like(force_input_ids).to(self.model.device),
-        }
-
-        if "pixel_values" in inputs:
-            force_inputs["pixel_values"] = inputs["pixel_values"]
-        if "video_metadata" in inputs:
-            force_inputs["video_metadata"] = inputs["video_metadata"]
+        # The cache holds the prompt and every generated token but the last one, so
+        # `generate` only feeds that token and the forced ones. The visual inputs are
+        # passed along for the rope index, they are not encoded again past prefill.
+        past_key_values = first_generation.past_key_values
+        reused_cache_length = past_key_values.get_seq_length()
+        force_inputs = dict(inputs)
+        force_inputs["input_ids"] = force_input_ids.to(self.model.device)
+        force_inputs["attention_mask"] = torch.ones_like(force_input_ids).to(
+            self.model.device
+        )
 
         second_generated_ids = self.model.generate(
             **force_inputs,
+            past_key_values=past_key_values,
             max_new_tokens=force_max_tokens,
             do_sample=do_sample,
             temperature=temperature,
@@ -129,9 +285,199 @@ class RobustInference:
             "first_generation_length": len(first_output_ids),
             "second_generation_length": len(second_output_ids),
             "total_generation_length": len(complete_output_ids),
+            "reused_cache_length": reused_cache_length,
             "generation_rounds": 2,
         }
 
+    def generate_batch(
+        self,
+        messages_list,
+        first_max_tokens=8192,
+        force_max_tokens=8192,
+        temperature=0.1,
+        do_sample=True,
+    ):
+        """
+        Batched `generate_with_force_completion`: one result per conversation of
+        `messages_list`, in order. The truncated conversations are completed together
+        in a second batch, re-prefilled as their KV caches are interleaved with the
+        complete ones in the first batch.
+        """
+        inputs = self._apply_chat_template(messages_list)
+        input_length = inputs["input_ids"].shape[1]
+        first_generated_ids = self.model.generate(
+            **inputs,
+            max_new_tokens=first_max_tokens,
+            do_sample=do_sample,
+            temperature=temperature,
+        )
+
+        results = [None] * len(messages_list)
+        first_outputs = []
+        truncated = []
+        for idx, (generated_ids, attention_mask) in enumerate(
+            zip(first_generated_ids, inputs["attention_mask"])
+        ):
+            first_output_ids = self._trim_generated(generated_ids[input_length:])
+            first_outputs.append(first_output_ids)
+            if self._check_needs_completion_by_tokens(
+                first_output_ids, first_max_tokens
+            ):
+                truncated.append(idx)
+                continue
+            results[idx] = {
+                "output_text": self.processor.decode(
+                    first_output_ids, skip_special_tokens=False
+                ),
+                "complete": True,
+                "reason": "first_generation_complete",
+                "input_length": int(attention_mask.sum()),
+                "first_generation_length": len(first_output_ids),
+                "generation_rounds": 1,
+            }
+
+        if not truncated:
+            return results
+
+        force_inputs = self._apply_chat_template([messages_list[i] for i in truncated])
+        prompts = [
+            input_ids[attention_mask.bool()]
+            for input_ids, attention_mask in zip(
+                force_inputs["input_ids"], force_inputs["attention_mask"]
+            )
+        ]
+        force_rows = [
+            self._prepare_force_input(prompt.unsqueeze(0), first_outputs[idx])[0]
+            for prompt, idx in zip(prompts, truncated)
+        ]
+        force_inputs["input_ids"], force_inputs["attention_mask"] = self._left_pad(
+            force_rows
+        )
+        force_length = force_inputs["input_ids"].shape[1]
+        second_generated_ids = self.model.generate(
+            **force_inputs,
+            max_new_tokens=force_max_tokens,
+            do_sample=do_sample,
+            temperature=temperature,
+        )
+
+        for idx, prompt, force_row, generated_ids in zip(
+            truncated, prompts, force_rows, second_generated_ids
+        ):
+            first_output_ids = first_outputs[idx]
+            second_output_ids = self._trim_generated(generated_ids[force_length:])
+            added_tokens = force_row[len(prompt) + len(first_output_ids) :]
+            complete_output_ids = torch.cat(
+                [first_output_ids, added_tokens, second_output_ids], dim=0
+            )
+            results[idx] = {
+                "output_text": self.processor.decode(
+                    complete_output_ids, skip_special_tokens=False
+                ),
+                "complete": (
+                    self.special_tokens["answer_end"] in complete_output_ids.tolist()
+                ),
+                "reason": "force_completion_success",
+                "input_length": len(prompt),
+                "first_generation_length": len(first_output_ids),
+                "second_generation_length": len(second_output_ids),
+                "total_generation_length": len(complete_output_ids),
+                "generation_rounds": 2,
+            }
+        return results
+
+    def generate_with_think_budget(
+        self,
+        messages_list,
+        think_budget,
+        max_new_tokens=8192,
+        soft_budget_ratio=None,
+        soft_budget_bias=5.0,
+        temperature=0.1,
+        do_sample=True,
+    ):
+        """
+        Single-pass alternative to the forced completion: `think_budget` (an int, or one
+        per conversation) bounds the thinking tokens, and `max_new_tokens` the whole
+        output. See `ThinkBudgetLogitsProcessor`.
+        """
+        inputs = self._apply_chat_template(messages_list)
+        input_length = inputs["input_ids"].shape[1]
+        think_budget_processor = ThinkBudgetLogitsProcessor(
+            self.special_tokens["think_end"],
+            self.special_tokens["answer_start"],
+            think_budget,
+            soft_budget_ratio=soft_budget_ratio,
+            soft_budget_bias=soft_budget_bias,
+            eos_token_ids=self.eos_token_ids,
+        )
+        generated_ids = self.model.generate(
+            **inputs,
+            max_new_tokens=max_new_tokens,
+            do_sample=do_sample,
+            temperature=temperature,
+            logits_processor=LogitsProcessorList([think_budget_processor]),
+        )
+
+        results = []
+        for idx, (row, attention_mask) in enumerate(
+            zip(generated_ids, inputs["attention_mask"])
+        ):
+            output_ids = self._trim_generated(row[input_length:])
+            token_list = output_ids.tolist()
+            budget_reached = bool(think_budget_processor.budget_reached[idx])
+            results.append(
+                {
+                    "output_text": self.processor.decode(
+                        output_ids, skip_special_tokens=False
+                    ),
+                    "complete": self.special_tokens["answer_end"] in token_list,
+                    "reason": (
+                        "think_budget_reached" if budget_reached else "think_completed"
+                    ),
+                    "input_length": int(attention_mask.sum()),
+                    "thinking_length": (
+                        token_list.index(self.special_tokens["think_end"])
+                        if self.special_tokens["think_end"] in token_list
+                        else len(token_list)
+                    ),
+                    "total_generation_length": len(token_list),
+                    "generation_rounds": 1,
+                }
+            )
+        return results
+
+    def _apply_chat_template(self, messages):
+        inputs = self.processor.apply_chat_template(
+            messages,
+            tokenize=True,
+            add_generation_prompt=True,
+            return_dict=True,
+            return_tensors="pt",
+            padding=True,
+        ).to(self.model.device)
+        inputs.pop("token_type_ids", None)
+        return inputs
+
+    def _trim_generated(self, output_ids):
+        # Finished rows of a batch are padded after their end-of-sequence token
+        for idx, token_id in enumerate(output_ids.tolist()):
+            if token_id in self.eos_token_ids:
+                return output_ids[: idx + 1]
+        return output_ids
+
+    def _left_pad(self, rows):
+        max_length = max(len(row) for row in rows)
+        pad_token_id = self.processor.tokenizer.pad_token_id
+        input_ids = torch.full(
+            (len(rows), max_length), pad_token_id, dtype=rows[0].dtype
+        )
+        attention_mask = torch.zeros((len(rows), max_length), dtype=torch.long)
+        for idx, row in enumerate(rows):
+            input_ids[idx, max_length - len(row) :] = row
+            attention_mask[idx, max_length - len(row) :] = 1
+        return input_ids.to(self.model.device), attention_mask.to(self.model.device)
+
     def _check_needs_completion_by_tokens(self, output_token_ids, max_tokens):
         token_list = output_token_ids.tolist()
 
@@ -182,6 +528,23 @@ class RobustInference:
         return force_input_ids
 
 
+def print_result(result):
+    print("=" * 50)
+    print("Inference Results:")
+    print(f"Complete: {result['complete']}")
+    print(f"Reason: {result['reason']}")
+    print(f"Generation rounds: {result['generation_rounds']}")
+    print(f"Input length: {result['input_length']}")
+    if "thinking_length" in result:
+        print(f"Thinking length: {result['thinking_length']}")
+    if "first_generation_length" in result:
+        print(f"First generation length: {result['first_generation_length']}")
+    if "second_generation_length" in result:
+        print(f"Second generation length: {result['second_generation_length']}")
+    print("=" * 50)
+    print(result["output_text"])
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Video inference script")
     parser.add_argument(
@@ -200,44 +563,100 @@ if __name__ == "__main__":
     parser.add_argument(
         "--temperature", type=float, default=0.1, help="Generation temperature"
     )
-    parser.add_argument("--prompt", type=str, required=True, help="Prompt text")
+    parser.add_argument(
+        "--prompt", type=str, nargs="+", required=True, help="Prompt text(s)"
+    )
+    parser.add_argument(
+        "--think_budget",
+        type=int,
+        default=None,
+        help="Single-pass generation with at most this many thinking tokens",
+    )
+    parser.add_argument(
+        "--soft_budget_ratio",
+        type=float,
+        default=None,
+        help="Fraction of the think budget from which `</think>` is favored",
+    )
+    parser.add_argument(
+        "--soft_budget_bias",
+        type=float,
+        default=5.0,
+        help="Logit bias of `</think>` when the think budget is reached",
+    )
+    parser.add_argument(
+        "--tiny_random",
+        action="store_true",
+        help="Use a tiny random-weight model on CPU",
+    )
+    parser.add_argument(
+        "--visual_cache_dir",
+        type=str,
+        default=None,
+        help="Cache the processed video in this directory",
+    )
 
     args = parser.parse_args()
 
-    runner = RobustInference(args.model_path)
+    if args.tiny_random:
+        runner = RobustInference.tiny_random(
+            args.model_path, visual_cache_dir=args.visual_cache_dir
+        )
+    else:
+        runner = RobustInference(
+            args.model_path, visual_cache_dir=args.visual_cache_dir
+        )
 
-    messages = [
-        {
-            "role": "user",
-            "content": [
-                {
-                    "type": "video",
-                    "url": args.video_path,
-                },
-                {
-                    "type": "text",
-                    "text": args.prompt,
-                },
-            ],
-        }
+    messages_list = [
+        [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "video",
+                        "url": args.video_path,
+                    },
+                    {
+                        "type": "text",
+                        "text": prompt,
+                    },
+                ],
+            }
+        ]
+        for prompt in args.prompt
     ]
 
-    result = runner.generate_with_force_completion(
-        messages=messages,
-        first_max_tokens=args.first_max_tokens,
-        force_max_tokens=args.force_max_tokens,
-        temperature=args.temperature,
-    )
+    if args.think_budget is not None:
+        results = runner.generate_with_think_budget(
+            messages_list,
+            args.think_budget,
+            max_new_tokens=args.first_max_tokens + args.force_max_tokens,
+            soft_budget_ratio=args.soft_budget_ratio,
+            soft_budget_bias=args.soft_budget_bias,
+            temperature=args.temperature,
+        )
+    elif len(messages_list) == 1:
+        results = [
+            runner.generate_with_force_completion(
+                messages=messages_list[0],
+                first_max_tokens=args.first_max_tokens,
+                force_max_tokens=args.force_max_tokens,
+                temperature=args.temperature,
+            )
+        ]
+    else:
+        results = runner.generate_batch(
+            messages_list,
+            first_max_tokens=args.first_max_tokens,
+            force_max_tokens=args.force_max_tokens,
+            temperature=args.temperature,
+        )
 
-    print("=" * 50)
-    print("Inference Results:")
-    print(f"Complete: {result['complete']}")
-    print(f"Reason: {result['reason']}")
-    print(f"Generation rounds: {result['generation_rounds']}")
-    print(f"Input length: {result['input_length']}")
-    if "first_generation_length" in result:
-        print(f"First generation length: {result['first_generation_length']}")
-    if "second_generation_length" in result:
-        print(f"Second generation length: {result['second_generation_length']}")
-    print("=" * 50)
-    print(result["output_text"])
+    for result in results:
+        print_result(result)
+
+    if runner.visual_cache is not None:
+        print(
+            f"Visual input cache: {runner.visual_cache.hits} hits, "
+            f"{runner.visual_cache.misses} misses"
+        )
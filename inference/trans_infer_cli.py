@@ -10,24 +10,42 @@ Examples:
     python trans_infer_cli.py --image_paths /path/to/img1.jpg /path/to/img2.png /path/to/img3.png
     # Chat with single video
     python trans_infer_cli.py --video_path /path/to/video.mp4
+    # Cache the processed media, so restarting a chat on the same video skips its preprocessing
+    python trans_infer_cli.py --video_path /path/to/video.mp4 --visual_cache_dir ~/.cache/glmv_visual_inputs
     # Custom generation parameters
     python trans_infer_cli.py --temperature 0.8 --top_k 5 --max_tokens 4096
+    # Keep at most 32k tokens of the conversation in the KV cache
+    python trans_infer_cli.py --video_path /path/to/video.mp4 --max_cache_tokens 32768
 
 Notes:
     - Media files are loaded once at startup and persist throughout the conversation
     - Type 'exit' to quit the chat
     - Chat with images and video is NOT allowed
     - The model will remember the conversation history and can reference uploaded media in subsequent turns
+    - Responses are streamed, the thinking and the answer being printed as separate sections, and
+      each turn reports its time to first token, prefill and decode times, tokens/sec and peak memory
+    - Type '/undo' to drop the last exchange, '/clear' to start over with the same media
+    - The KV cache of the conversation is kept across turns: a new turn only prefills its own tokens,
+      the media of the first turn are neither processed nor prefilled again. It is cropped back to the
+      longest prompt the new history still starts with when the history is edited, and evicted (oldest
+      prompts kept first) beyond `--max_cache_tokens`
 """
 
 import argparse
 import re
+import resource
+import threading
+import time
 
+import torch
 from transformers import (
     AutoProcessor,
+    DynamicCache,
     Glm4vForConditionalGeneration,
     Glm4vMoeForConditionalGeneration,
+    TextIteratorStreamer,
 )
+from visual_cache import VisualInputCache
 
 
 def build_content(image_paths, video_path, text):
@@ -41,6 +59,220 @@ def build_content(image_paths, video_path, text):
     return content
 
 
+def media_of(messages):
+    return [
+        (item["type"], item.get("url") or item.get("path"))
+        for message in messages
+        if isinstance(message["content"], list)
+        for item in message["content"]
+        if item["type"] in ("image", "video")
+    ]
+
+
+class PrefixCache:
+    """
+    KV cache of a conversation, reused by the next turn when its prompt extends a cached one.
+
+    Only the prompts are kept: the history keeps the answer of each turn without its thinking,
+    so the tokens generated for a turn are never a prefix of the next prompt and are cropped.
+    """
+
+    def __init__(self, max_tokens=None):
+        self.max_tokens = max_tokens
+        self.reset()
+
+    def reset(self):
+        self.past_key_values = None
+        self.input_ids = None
+        self.media = None
+        # (rendered prompt, number of tokens) of the cached prompts, shortest first
+        self.checkpoints = []
+
+    def prepare(self, processor, messages, device):
+        """
+        Inputs of `model.generate` for `messages`, with the cache to pass as `past_key_values`.
+        """
+        text = processor.apply_chat_template(
+            messages, tokenize=False, add_generation_prompt=True
+        )
+        media = media_of(messages)
+        # Media can only be processed in the first forward pass of `generate`, so
+        # they must all be in the cached prefix already
+        checkpoint = None
+        if self.past_key_values is not None and media == self.media:
+            while self.checkpoints and not text.startswith(self.checkpoints[-1][0]):
+                self.checkpoints.pop()
+            checkpoint = self.checkpoints[-1] if self.checkpoints else None
+
+        if checkpoint is None:
+            self.reset()
+            inputs = processor.apply_chat_template(
+                messages,
+                tokenize=True,
+                add_generation_prompt=True,
+                return_dict=True,
+                return_tensors="pt",
+            ).to(device)
+            inputs.pop("token_type_ids", None)
+            self.past_key_values = DynamicCache()
+            self.media = media
+        else:
+            prompt, num_tokens = checkpoint
+            suffix_ids = processor.tokenizer(
+                text[len(prompt) :], add_special_tokens=False, return_tensors="pt"
+            ).input_ids.to(device)
+            input_ids = torch.cat(
+                [self.input_ids[:, :num_tokens].to(device), suffix_ids], dim=1
+            )
+            # At least one token must be fed to get the logits of the next one
+            self.past_key_values.crop(min(num_tokens, input_ids.shape[1] - 1))
+            inputs = {
+                "input_ids": input_ids,
+                "attention_mask": torch.ones_like(input_ids),
+            }
+        self.input_ids = inputs["input_ids"]
+        if not self.checkpoints or self.checkpoints[-1][0] != text:
+            self.checkpoints.append((text, self.input_ids.shape[1]))
+        return inputs, self.past_key_values
+
+    def commit(self):
+        """Drop the generated tokens, then evict prompts beyond `max_tokens`."""
+        if self.max_tokens is not None:
+            while self.checkpoints and self.checkpoints[-1][1] > self.max_tokens:
+                self.checkpoints.pop()
+        if not self.checkpoints:
+            self.reset()
+            return
+        self.past_key_values.crop(self.checkpoints[-1][1])
+
+    @property
+    def num_tokens(self):
+        if self.past_key_values is None:
+            return 0
+        return self.past_key_values.get_seq_length()
+
+
+class TimedStreamer(TextIteratorStreamer):
+    """`TextIteratorStreamer` that also records when the generated tokens come out."""
+
+    def __init__(self, tokenizer, **kwargs):
+        super().__init__(tokenizer, skip_prompt=True, **kwargs)
+        self.start_time = time.perf_counter()
+        self.first_token_time = None
+        self.end_time = None
+        self.num_tokens = 0
+
+    def put(self, value):
+        if not self.next_tokens_are_prompt:
+            if self.first_token_time is None:
+                self.first_token_time = time.perf_counter()
+            self.num_tokens += value.numel()
+        super().put(value)
+
+    def end(self):
+        self.end_time = time.perf_counter()
+        super().end()
+
+
+class SectionPrinter:
+    """Prints streamed text under [Thinking] and [Answer] headers instead of the raw tags."""
+
+    HEADERS = {
+        "<think>": "\n[Thinking]\n",
+        "</think>": "\n",
+        "<answer>": "\n[Answer]\n",
+        "</answer>": "\n",
+    }
+    TAG = re.compile("|".join(re.escape(tag) for tag in HEADERS))
+    MAX_TAG_LENGTH = max(len(tag) for tag in HEADERS)
+
+    def __init__(self):
+        self.pending = ""
+        self.done = False
+
+    def write(self, text):
+        self.pending += text
+        # Keep what could be the start of a tag until the next chunk
+        cut = len(self.pending) - self._tag_prefix_length(self.pending)
+        self._print(self.pending[:cut])
+        self.pending = self.pending[cut:]
+
+    def _tag_prefix_length(self, text):
+        """Length of the longest end of `text` that is the start of a tag."""
+        for length in range(min(len(text), self.MAX_TAG_LENGTH - 1), 0, -1):
+            tail = text[-length:]
+            if any(tag.startswith(tail) for tag in self.HEADERS):
+                return length
+        return 0
+
+    def close(self):
+        self._print(self.pending)
+        self.pending = ""
+        print(flush=True)
+
+    def _print(self, text):
+        for part in re.split(f"({self.TAG.pattern})", text):
+            if self.done or not part:
+                continue
+            # Anything after the answer is the end-of-turn token
+            self.done = part == "</answer>"
+            print(self.HEADERS.get(part, part), end="", flush=True)
+
+
+def peak_memory():
+    if torch.cuda.is_available():
+        return torch.cuda.max_memory_allocated()
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def stream_generate(model, processor, inputs, past_key_values, **generate_kwargs):
+    """Run `generate` on a background thread, printing the response as it comes."""
+    streamer = TimedStreamer(processor.tokenizer, skip_special_tokens=False)
+    result = {}
+
+    def target():
+        try:
+            result["output"] = model.generate(
+                **inputs,
+                past_key_values=past_key_values,
+                streamer=streamer,
+                **generate_kwargs,
+            )
+        except BaseException as e:
+            result["error"] = e
+            streamer.end()
+
+    if torch.cuda.is_available():
+        torch.cuda.reset_peak_memory_stats()
+    thread = threading.Thread(target=target)
+    thread.start()
+    printer = SectionPrinter()
+    print("Assistant:", end="", flush=True)
+    for text in streamer:
+        printer.write(text)
+    printer.close()
+    thread.join()
+    if "error" in result:
+        raise result["error"]
+    return result["output"], streamer
+
+
+def print_stats(streamer, num_prompt_tokens, num_cached_tokens):
+    ttft = streamer.first_token_time - streamer.start_time
+    decode_time = streamer.end_time - streamer.first_token_time
+    num_decoded = streamer.num_tokens - 1
+    tokens_per_sec = num_decoded / decode_time if decode_time > 0 else float("nan")
+    print(
+        f"[ttft {ttft:.2f}s"
+        f" | prefill {num_prompt_tokens - num_cached_tokens} tokens"
+        f" ({num_cached_tokens} cached) in {ttft:.2f}s"
+        f" | decode {num_decoded} tokens in {decode_time:.2f}s"
+        f", {tokens_per_sec:.1f} tokens/s"
+        f" | peak memory {peak_memory() / (1 << 30):.2f} GiB]"
+    )
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument(
@@ -53,9 +285,13 @@ def main():
     parser.add_argument("--repetition_penalty", type=float, default=1.1)
     parser.add_argument("--top_p", type=float, default=0.00001)
     parser.add_argument("--top_k", type=int, default=1)
+    parser.add_argument("--visual_cache_dir", type=str, default=None)
+    parser.add_argument("--max_cache_tokens", type=int, default=None)
 
     args = parser.parse_args()
     processor = AutoProcessor.from_pretrained(args.model_path)
+    if args.visual_cache_dir is not None:
+        VisualInputCache(args.visual_cache_dir).wrap(processor)
     if "GLM-4.5V" in args.model_path:
         model = Glm4vMoeForConditionalGeneration.from_pretrained(
             args.model_path, torch_dtype="auto", device_map="auto"
@@ -67,6 +303,7 @@ def main():
 
     messages = []
     first_turn = True
+    cache = PrefixCache(args.max_cache_tokens)
     if args.image_paths is not None and args.video_path is not None:
         raise ValueError(
             "Chat with images and video is NOT allowed. Please use either --image_paths or --video_path, not both."
@@ -76,22 +313,27 @@ def main():
         question = input("\nUser: ").strip()
         if question.lower() == "exit":
             break
+        if question == "/clear":
+            messages = []
+            first_turn = True
+            continue
+        if question == "/undo":
+            messages = messages[:-2]
+            first_turn = not messages
+            continue
         if first_turn:
             content = build_content(args.image_paths, args.video_path, question)
             first_turn = False
         else:
             content = [{"type": "text", "text": question}]
         messages.append({"role": "user", "content": content})
-        inputs = processor.apply_chat_template(
-            messages,
-            tokenize=True,
-            add_generation_prompt=True,
-            return_dict=True,
-            return_tensors="pt",
-        ).to(model.device)
-        inputs.pop("token_type_ids", None)
-        output = model.generate(
-            **inputs,
+        inputs, past_key_values = cache.prepare(processor, messages, model.device)
+        num_cached_tokens = cache.num_tokens
+        output, streamer = stream_generate(
+            model,
+            processor,
+            inputs,
+            past_key_values,
             max_new_tokens=args.max_tokens,
             repetition_penalty=args.repetition_penalty,
             do_sample=args.temperature > 0,
@@ -102,12 +344,13 @@ def main():
         raw = processor.decode(
             output[0][inputs["input_ids"].shape[1] : -1], skip_special_tokens=False
         )
+        cache.commit()
         match = re.search(r"<answer>(.*?)</answer>", raw, re.DOTALL)
         answer = match.group(1).strip() if match else ""
         messages.append(
             {"role": "assistant", "content": [{"type": "text", "text": answer}]}
         )
-        print(f"Assistant: {raw}")
+        print_stats(streamer, inputs["input_ids"].shape[1], num_cached_tokens)
 
 
 if __name__ == "__main__":
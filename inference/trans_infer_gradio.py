@@ -16,32 +16,41 @@ Examples:
 Notes:
     - Supports up to 10 images or 1 video / PPT / PDF per conversation
     - Cannot mix videos with images or documents in the same message
-    - PPT and PDF files are automatically converted to images before processing
+    - PPT and PDF files are automatically converted to images before processing; pages are
+      rendered in parallel, within the `--doc_visual_tokens` budget, and cached by content
+      in `--doc_cache_dir`, so re-uploading a document is free; each session links the
+      pages it uses into a directory of its own, removed on 'Clear' or when it ends
     - Uploaded media persists throughout the conversation and can be referenced later
     - System prompt can be customized per session
-    - Click 'Clear' to reset conversation history
+    - Click 'Clear' to reset conversation history, which also stops the running generation
+      of this session only
+    - Sessions share one `serving_engine.ServingEngine`, which batches the decode steps of up
+      to `--max_batch_size` concurrent generations and queues up to `--max_queue_size` more.
+      The engine thread owns the GPU for the lifetime of the app, so the demo needs a
+      dedicated GPU: ZeroGPU Spaces, which only lend a GPU to `@spaces.GPU` calls, are not
+      supported
     - The 'Thinking' process is displayed in collapsible sections when available
+    - Responses are rendered incrementally and pushed to the browser at most every
+      `--stream_interval_ms` milliseconds or `--stream_tokens` streamed chunks
 """
 
 import argparse
 import copy
 import os
 import re
-import subprocess
+import shutil
 import tempfile
-import threading
 import time
 from pathlib import Path
 
-import fitz
 import gradio as gr
-import spaces
 import torch
+from doc_raster import DocumentRasterizer
+from serving_engine import EngineOverloadedError, ServingEngine
 from transformers import (
     AutoProcessor,
     Glm4vForConditionalGeneration,
     Glm4vMoeForConditionalGeneration,
-    TextIteratorStreamer,
 )
 
 parser = argparse.ArgumentParser()
@@ -54,17 +63,71 @@ parser.add_argument(
 parser.add_argument("--server_port", type=int, default=7860, help="Use Port")
 parser.add_argument("--share", action="store_true", help="Enable gradio sharing")
 parser.add_argument("--mcp_server", action="store_true", help="Enable mcp service")
+parser.add_argument(
+    "--stream_interval_ms",
+    type=float,
+    default=50,
+    help="Minimum time between two streamed updates",
+)
+parser.add_argument(
+    "--stream_tokens",
+    type=int,
+    default=32,
+    help="Push an update after this many streamed chunks, even within the interval",
+)
+parser.add_argument(
+    "--doc_cache_dir",
+    type=str,
+    default=os.path.join(tempfile.gettempdir(), "glmv_doc_pages"),
+    help="Cache of the rendered PDF/PPT pages",
+)
+parser.add_argument(
+    "--doc_cache_gb", type=float, default=2.0, help="Disk budget of the page cache"
+)
+parser.add_argument(
+    "--doc_visual_tokens",
+    type=int,
+    default=16384,
+    help="Visual-token budget of the pages of one document",
+)
+parser.add_argument(
+    "--doc_workers", type=int, default=None, help="Page rendering processes"
+)
+parser.add_argument(
+    "--max_batch_size", type=int, default=8, help="Generations decoded together"
+)
+parser.add_argument(
+    "--max_queue_size",
+    type=int,
+    default=64,
+    help="Generations waiting for a batch slot, beyond which requests are rejected",
+)
 args = parser.parse_args()
 
 MODEL_PATH = "zai-org/GLM-4.1V-9B-Thinking"
-stop_generation = False
 processor = None
 model = None
+rasterizer = None
+engine = None
+# Per-session links to the rendered pages, which the chat history refers to on every turn
+SESSIONS_DIR = Path(tempfile.gettempdir()) / "glmv_sessions"
 
 
 def load_model():
-    global processor, model
+    global processor, model, rasterizer, engine
     processor = AutoProcessor.from_pretrained(MODEL_PATH)
+    # Pages larger than the image processor allows would be downscaled anyway
+    try:
+        max_pixels = processor.image_processor.size["longest_edge"]
+    except (AttributeError, KeyError, TypeError):
+        max_pixels = None
+    rasterizer = DocumentRasterizer(
+        args.doc_cache_dir,
+        max_cache_bytes=int(args.doc_cache_gb * (1 << 30)),
+        max_pixels=max_pixels,
+        max_visual_tokens=args.doc_visual_tokens,
+        num_workers=args.doc_workers,
+    )
     if "GLM-4.5V" in MODEL_PATH:
         model = Glm4vMoeForConditionalGeneration.from_pretrained(
             MODEL_PATH, torch_dtype="auto", device_map="auto"
@@ -73,6 +136,116 @@ def load_model():
         model = Glm4vForConditionalGeneration.from_pretrained(
             MODEL_PATH, torch_dtype="auto", device_map="auto"
         )
+    engine = ServingEngine(
+        model,
+        processor,
+        max_batch_size=args.max_batch_size,
+        max_queue_size=args.max_queue_size,
+    )
+
+
+THINK_OPEN = (
+    "<details open><summary style='cursor:pointer;font-weight:bold;color:#bbbbbb;'>💭 Thinking</summary>"
+    "<div style='color:#cccccc;line-height:1.4;padding:10px;border-left:3px solid #666;margin:5px 0;background-color:rgba(128,128,128,0.1);'>"
+)
+THINK_CLOSE = "</div></details>"
+
+
+class StreamRenderer:
+    """
+    Renders a streamed response as the chat HTML, with the thinking in a collapsible section.
+
+    Parser state is kept across chunks, so each chunk is only scanned once, instead of
+    re-parsing the whole response for every token. The thinking and the answer are also
+    converted as they stream in: a render only appends the parts added since the last one.
+    """
+
+    TAGS = ("<think>", "</think>", "<answer>", "</answer>")
+    TAG = re.compile(r"(</?think>|</?answer>)")
+    MAX_TAG_LENGTH = max(len(tag) for tag in TAGS)
+
+    def __init__(self):
+        self.pending = ""
+        self.state = "start"  # start, think, between, answer, done
+        self.start_parts = []
+        # Rendered so far, and the parts rendered since the last `render`
+        self.think_html = ""
+        self.think_parts = []
+        # Trailing whitespace, only rendered once more thinking follows
+        self.think_space = ""
+        self.think_closed = False
+        self.answer_html = ""
+        self.answer_parts = []
+
+    def feed(self, text):
+        self.pending += text
+        # Keep what could be the start of a tag until the next chunk
+        cut = len(self.pending) - self._tag_prefix_length(self.pending)
+        self._consume(self.pending[:cut])
+        self.pending = self.pending[cut:]
+
+    def _tag_prefix_length(self, text):
+        """Length of the longest end of `text` that is the start of a tag."""
+        for length in range(min(len(text), self.MAX_TAG_LENGTH - 1), 0, -1):
+            tail = text[-length:]
+            if any(tag.startswith(tail) for tag in self.TAGS):
+                return length
+        return 0
+
+    def close(self):
+        self._consume(self.pending)
+        self.pending = ""
+
+    def _consume(self, text):
+        for part in self.TAG.split(text):
+            if not part:
+                continue
+            if part == "<think>" and self.state == "start":
+                self.state = "think"
+            elif part == "</think>" and self.state == "think":
+                self.think_closed = True
+                self.state = "between"
+            elif part == "<answer>" and self.state in ("start", "think", "between"):
+                self.state = "answer"
+            elif part == "</answer>" and self.state == "answer":
+                self.answer_html = self._flush(self.answer_html, self.answer_parts)
+                self.answer_html = self.answer_html.rstrip()
+                self.state = "done"
+            elif self.state == "start":
+                self.start_parts.append(part)
+            elif self.state == "think":
+                self._add_think(part)
+            elif self.state == "answer":
+                if not self.answer_html and not self.answer_parts:
+                    part = part.lstrip()
+                if part:
+                    self.answer_parts.append(part)
+
+    def _add_think(self, part):
+        text = self.think_space + part
+        if not self.think_html and not self.think_parts:
+            text = text.lstrip()
+        body = text.rstrip()
+        self.think_space = text[len(body) :]
+        if body:
+            self.think_parts.append(body.replace("\n", "<br>"))
+
+    @staticmethod
+    def _flush(html, parts):
+        if parts:
+            html += "".join(parts)
+            parts.clear()
+        return html
+
+    def render(self):
+        if self.state == "start":
+            return re.sub(r"<[^>]+>", "", "".join(self.start_parts)).strip()
+        self.think_html = self._flush(self.think_html, self.think_parts)
+        self.answer_html = self._flush(self.answer_html, self.answer_parts)
+        think_html = ""
+        if self.think_closed or self.state == "think":
+            think_html = THINK_OPEN + self.think_html + THINK_CLOSE
+        return think_html + self.answer_html
 
 
 class GLM4VModel:
@@ -85,37 +258,8 @@ class GLM4VModel:
     def _wrap_text(self, t):
         return [{"type": "text", "text": t}]
 
-    def _pdf_to_imgs(self, pdf_path):
-        doc = fitz.open(pdf_path)
-        imgs = []
-        for i in range(doc.page_count):
-            pix = doc.load_page(i).get_pixmap(dpi=180)
-            img_p = os.path.join(
-                tempfile.gettempdir(), f"{Path(pdf_path).stem}_{i}.png"
-            )
-            pix.save(img_p)
-            imgs.append(img_p)
-        doc.close()
-        return imgs
-
-    def _ppt_to_imgs(self, ppt_path):
-        tmp = tempfile.mkdtemp()
-        subprocess.run(
-            [
-                "libreoffice",
-                "--headless",
-                "--convert-to",
-                "pdf",
-                "--outdir",
-                tmp,
-                ppt_path,
-            ],
-            check=True,
-        )
-        pdf_path = os.path.join(tmp, Path(ppt_path).stem + ".pdf")
-        return self._pdf_to_imgs(pdf_path)
-
-    def _files_to_content(self, media):
+    def _iter_files_to_content(self, media, pages_dir=None):
+        """Yield the content built so far and a progress message, once per document page."""
         out = []
         for f in media or []:
             ext = Path(f.name).suffix.lower()
@@ -133,47 +277,13 @@ class GLM4VModel:
                 out.append({"type": "video", "url": f.name})
             elif ext in [".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tiff", ".webp"]:
                 out.append({"type": "image", "url": f.name})
-            elif ext in [".ppt", ".pptx"]:
-                for p in self._ppt_to_imgs(f.name):
-                    out.append({"type": "image", "url": p})
-            elif ext == ".pdf":
-                for p in self._pdf_to_imgs(f.name):
+            elif ext in [".ppt", ".pptx", ".pdf"]:
+                name = Path(f.name).name
+                yield out, f"Converting {name}..."
+                for i, p in enumerate(rasterizer.iter_pages(f.name, pages_dir)):
                     out.append({"type": "image", "url": p})
-        return out
-
-    def _stream_fragment(self, buf: str) -> str:
-        think_html = ""
-        if "<think>" in buf:
-            if "</think>" in buf:
-                seg = re.search(r"<think>(.*?)</think>", buf, re.DOTALL)
-                if seg:
-                    think_html = (
-                        "<details open><summary style='cursor:pointer;font-weight:bold;color:#bbbbbb;'>💭 Thinking</summary>"
-                        "<div style='color:#cccccc;line-height:1.4;padding:10px;border-left:3px solid #666;margin:5px 0;background-color:rgba(128,128,128,0.1);'>"
-                        + seg.group(1).strip().replace("\n", "<br>")
-                        + "</div></details>"
-                    )
-            else:
-                part = buf.split("<think>", 1)[1]
-                think_html = (
-                    "<details open><summary style='cursor:pointer;font-weight:bold;color:#bbbbbb;'>💭 Thinking</summary>"
-                    "<div style='color:#cccccc;line-height:1.4;padding:10px;border-left:3px solid #666;margin:5px 0;background-color:rgba(128,128,128,0.1);'>"
-                    + part.replace("\n", "<br>")
-                    + "</div></details>"
-                )
-
-        answer_html = ""
-        if "<answer>" in buf:
-            if "</answer>" in buf:
-                seg = re.search(r"<answer>(.*?)</answer>", buf, re.DOTALL)
-                if seg:
-                    answer_html = seg.group(1).strip()
-            else:
-                answer_html = buf.split("<answer>", 1)[1]
-
-        if not think_html and not answer_html:
-            return self._strip_html(buf)
-        return think_html + answer_html
+                    yield out, f"Rendered page {i + 1} of {name}"
+        yield out, None
 
     def _build_messages(self, raw_hist, sys_prompt):
         msgs = []
@@ -197,44 +307,33 @@ class GLM4VModel:
                 msgs.append({"role": "assistant", "content": self._wrap_text(clean)})
         return msgs
 
-    @spaces.GPU(duration=240)
     def stream_generate(self, raw_hist, sys_prompt):
-        global stop_generation, processor, model
-        stop_generation = False
         msgs = self._build_messages(raw_hist, sys_prompt)
-        inputs = processor.apply_chat_template(
+        request = engine.submit(
             msgs,
-            tokenize=True,
-            add_generation_prompt=True,
-            return_dict=True,
-            return_tensors="pt",
-        ).to(model.device)
-        inputs.pop("token_type_ids", None)
-        streamer = TextIteratorStreamer(
-            processor.tokenizer, skip_prompt=True, skip_special_tokens=False
-        )
-        gen_args = dict(
-            inputs,
             max_new_tokens=8192,
             repetition_penalty=1.1,
-            do_sample=True,
             top_k=2,
-            temperature=None,
             top_p=1e-5,
-            streamer=streamer,
         )
-
-        generation_thread = threading.Thread(target=model.generate, kwargs=gen_args)
-        generation_thread.start()
-
-        buf = ""
-        for tok in streamer:
-            if stop_generation:
-                break
-            buf += tok
-            yield self._stream_fragment(buf)
-
-        generation_thread.join()
+        try:
+            renderer = StreamRenderer()
+            interval = args.stream_interval_ms / 1000
+            last_yield = time.perf_counter()
+            num_chunks = 0
+            for tok in request:
+                renderer.feed(tok)
+                num_chunks += 1
+                now = time.perf_counter()
+                if num_chunks >= args.stream_tokens or now - last_yield >= interval:
+                    yield renderer.render()
+                    last_yield = now
+                    num_chunks = 0
+            renderer.close()
+            yield renderer.render()
+        finally:
+            # No-op once finished, stops it when the session is cleared or gone
+            request.cancel()
 
 
 def format_display_content(content):
@@ -301,10 +400,15 @@ def check_files(files):
     return True, ""
 
 
-def chat(files, msg, raw_hist, sys_prompt):
-    global stop_generation
-    stop_generation = False
+def session_dir(request):
+    return SESSIONS_DIR / (request.session_hash or "default")
 
+
+def remove_session_pages(request: gr.Request):
+    shutil.rmtree(session_dir(request), ignore_errors=True)
+
+
+def chat(files, msg, raw_hist, sys_prompt, request: gr.Request):
     ok, err = check_files(files)
     if not ok:
         raw_hist.append({"role": "assistant", "content": err})
@@ -312,7 +416,16 @@ def chat(files, msg, raw_hist, sys_prompt):
         yield display_hist, copy.deepcopy(raw_hist), None, ""
         return
 
-    payload = glm4v._files_to_content(files) if files else None
+    payload = None
+    if files:
+        pending = create_display_history(raw_hist or [])
+        for content, status in glm4v._iter_files_to_content(
+            files, session_dir(request)
+        ):
+            payload = content
+            if status is not None:
+                progress = {"role": "assistant", "content": status}
+                yield pending + [progress], copy.deepcopy(raw_hist), None, ""
     if msg.strip():
         if payload is None:
             payload = glm4v._wrap_text(msg.strip())
@@ -330,21 +443,23 @@ def chat(files, msg, raw_hist, sys_prompt):
     display_hist = create_display_history(raw_hist)
     yield display_hist, copy.deepcopy(raw_hist), None, ""
 
-    for chunk in glm4v.stream_generate(raw_hist[:-1], sys_prompt):
-        if stop_generation:
-            break
-        place["content"] = chunk
-        display_hist = create_display_history(raw_hist)
-        yield display_hist, copy.deepcopy(raw_hist), None, ""
+    stream = glm4v.stream_generate(raw_hist[:-1], sys_prompt)
+    try:
+        for chunk in stream:
+            place["content"] = chunk
+            display_hist = create_display_history(raw_hist)
+            yield display_hist, copy.deepcopy(raw_hist), None, ""
+    except EngineOverloadedError:
+        place["content"] = "The server is busy, please try again later."
+    finally:
+        stream.close()
 
     display_hist = create_display_history(raw_hist)
     yield display_hist, copy.deepcopy(raw_hist), None, ""
 
 
-def reset():
-    global stop_generation
-    stop_generation = True
-    time.sleep(0.1)
+def reset(request: gr.Request):
+    remove_session_pages(request)
     return [], [], None, ""
 
 
@@ -391,13 +506,19 @@ with demo:
             )
             sys = gr.Textbox(label="⚙️ System Prompt", lines=6)
 
-    gr.on(
+    chat_event = gr.on(
         triggers=[send.click, textbox.submit],
         fn=chat,
         inputs=[up, textbox, raw_history, sys],
         outputs=[chatbox, raw_history, up, textbox],
+        # The engine batches and queues the generations itself; Gradio would otherwise
+        # run a single chat at a time
+        concurrency_limit=args.max_batch_size + args.max_queue_size,
+    )
+    clear.click(
+        reset, outputs=[chatbox, raw_history, up, textbox], cancels=[chat_event]
     )
-    clear.click(reset, outputs=[chatbox, raw_history, up, textbox])
+    demo.unload(remove_session_pages)
 
 if __name__ == "__main__":
     demo.launch(
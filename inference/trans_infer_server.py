@@ -0,0 +1,375 @@
+"""
+An OpenAI-compatible chat completions server for GLM-4.1V-9B-Thinking and GLM-4.5V,
+on the `transformers` inference path.
+
+Concurrent requests are batched by `serving_engine.ServingEngine`, so the GUI agents of
+`examples/gui-agent` and the LLM judges of `glmv_reward` can run against a local model:
+
+    python trans_infer_server.py --model_path zai-org/GLM-4.1V-9B-Thinking --port 8000
+    # GUI agent
+    python gui_agent_41v.py --api_url http://127.0.0.1:8000/v1 ...
+    # glmv_reward judges
+    llm_judge_url: ["http://127.0.0.1:8000/v1/chat/completions"]
+
+Endpoints:
+    - `POST /v1/chat/completions`: text, `image_url` (URLs, paths and base64 data
+      URLs) and `video_url` contents, or `image_url` pointing at a video file;
+      `stream: true` answers with server-sent events. Besides the OpenAI parameters
+      (`max_tokens`, `temperature`, `top_p`, `stop`), `top_k`, `repetition_penalty` and
+      `skip_special_tokens` (default true, as in vLLM) are accepted
+    - `GET /v1/models`: the served model
+    - `GET /metrics`: Prometheus metrics of the server and of the batching engine
+
+Arguments:
+    - `--max_batch_size` / `--max_queue_size`: Concurrent generations decoded together,
+      and requests waiting for a batch slot (beyond which requests get HTTP 429)
+    - `--visual_cache_dir`: Cache the processed images and videos on disk
+    - `--api_key`: Require this bearer token
+    - `--tiny_random`: Serve a tiny random-weight model on CPU, to test clients
+"""
+
+import argparse
+import base64
+import io
+import json
+import os
+import threading
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from PIL import Image
+from serving_engine import EngineOverloadedError, ServingEngine
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from transformers import (
+    AutoProcessor,
+    Glm4vForConditionalGeneration,
+    Glm4vMoeForConditionalGeneration,
+)
+from visual_cache import VisualInputCache
+
+VIDEO_SUFFIXES = (".mp4", ".avi", ".mkv", ".mov", ".wmv", ".flv", ".webm", ".m4v")
+
+
+class APIError(Exception):
+    def __init__(self, status_code, message, error_type="invalid_request_error"):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+        self.error_type = error_type
+
+
+def convert_media(url, kind):
+    if url.startswith("data:"):
+        if kind == "video":
+            raise APIError(400, "Videos should be given by path or URL, not inlined")
+        data = base64.b64decode(url.split(",", 1)[1])
+        return {"type": "image", "image": Image.open(io.BytesIO(data))}
+    if url.startswith("file://"):
+        url = url[len("file://") :]
+    if kind == "image" and url.lower().endswith(VIDEO_SUFFIXES):
+        kind = "video"
+    return {"type": kind, "url": url}
+
+
+def convert_messages(messages):
+    """OpenAI chat messages to the content format of the processor chat template."""
+    converted = []
+    for message in messages:
+        content = message.get("content") or ""
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        items = []
+        for item in content:
+            if item.get("type") == "text":
+                items.append({"type": "text", "text": item["text"]})
+            elif item.get("type") in ("image_url", "video_url"):
+                url = item[item["type"]]
+                url = url["url"] if isinstance(url, dict) else url
+                items.append(convert_media(url, item["type"].split("_")[0]))
+            else:
+                raise APIError(400, f"Unsupported content type {item.get('type')!r}")
+        converted.append({"role": message["role"], "content": items})
+    return converted
+
+
+def stream_text(request, stop):
+    """Text deltas of a generation, cut before the first stop string."""
+    held = ""
+    keep = max((len(s) for s in stop), default=1) - 1
+    for text in request:
+        held += text
+        positions = [held.find(s) for s in stop if s in held]
+        if positions:
+            request.cancel()
+            yield held[: min(positions)], "stop"
+            return
+        # A stop string may start in the held back tail
+        if len(held) > keep:
+            yield held[: len(held) - keep], None
+            held = held[len(held) - keep :]
+    yield held, "length" if request.finish_reason == "length" else "stop"
+
+
+class ChatServer:
+    def __init__(self, engine, model_name, api_key=None):
+        self.engine = engine
+        self.model_name = model_name
+        self.api_key = api_key
+        self.http_requests = {}
+        self._lock = threading.Lock()
+        self.app = FastAPI()
+        self.app.post("/v1/chat/completions")(self.chat_completions)
+        self.app.get("/v1/models")(self.models)
+        self.app.get("/metrics")(self.metrics)
+
+    def _count(self, status_code):
+        with self._lock:
+            self.http_requests[status_code] = self.http_requests.get(status_code, 0) + 1
+
+    def _error(self, e):
+        self._count(e.status_code)
+        return JSONResponse(
+            {"error": {"message": e.message, "type": e.error_type, "code": None}},
+            status_code=e.status_code,
+        )
+
+    def _check_auth(self, http_request):
+        if self.api_key is None:
+            return
+        if http_request.headers.get("authorization") != f"Bearer {self.api_key}":
+            raise APIError(401, "Invalid API key", "authentication_error")
+
+    async def models(self):
+        return {
+            "object": "list",
+            "data": [{"id": self.model_name, "object": "model", "owned_by": "local"}],
+        }
+
+    async def chat_completions(self, http_request: Request):
+        try:
+            self._check_auth(http_request)
+            try:
+                body = await http_request.json()
+            except json.JSONDecodeError:
+                raise APIError(400, "The request body is not valid JSON") from None
+            if body.get("n", 1) != 1:
+                raise APIError(400, "Only n=1 is supported")
+            stop = body.get("stop") or []
+            stop = [stop] if isinstance(stop, str) else stop
+            temperature = body.get("temperature")
+            try:
+                # Media loading and preprocessing would block the event loop
+                request = await run_in_threadpool(
+                    self.engine.submit,
+                    convert_messages(body.get("messages") or []),
+                    max_new_tokens=body.get("max_completion_tokens")
+                    or body.get("max_tokens")
+                    or 8192,
+                    temperature=1.0 if temperature is None else temperature,
+                    top_p=body.get("top_p") or 1.0,
+                    top_k=body.get("top_k") or 0,
+                    repetition_penalty=body.get("repetition_penalty") or 1.0,
+                    skip_special_tokens=body.get("skip_special_tokens", True),
+                )
+            except EngineOverloadedError as e:
+                raise APIError(429, str(e), "rate_limit_error") from None
+            except (KeyError, TypeError, ValueError, OSError) as e:
+                raise APIError(400, f"Invalid request: {e}") from None
+        except APIError as e:
+            return self._error(e)
+
+        self._count(200)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        if body.get("stream"):
+            include_usage = (body.get("stream_options") or {}).get("include_usage")
+            return StreamingResponse(
+                self._stream(request, stop, completion_id, created, include_usage),
+                media_type="text/event-stream",
+            )
+
+        chunks = []
+        finish_reason = "stop"
+        try:
+            async for text, reason in iterate_in_threadpool(stream_text(request, stop)):
+                chunks.append(text)
+                finish_reason = reason or finish_reason
+        finally:
+            request.cancel()
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": self.model_name,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(chunks)},
+                    "finish_reason": finish_reason,
+                }
+            ],
+            "usage": self._usage(request),
+        }
+
+    async def _stream(self, request, stop, completion_id, created, include_usage):
+        def event(delta, finish_reason=None, usage=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": self.model_name,
+                "choices": [
+                    {"index": 0, "delta": delta, "finish_reason": finish_reason}
+                ],
+            }
+            if usage is not None:
+                chunk["choices"] = []
+                chunk["usage"] = usage
+            return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+
+        # The client going away closes this generator, which cancels the generation
+        try:
+            yield event({"role": "assistant", "content": ""})
+            async for text, finish_reason in iterate_in_threadpool(
+                stream_text(request, stop)
+            ):
+                if text:
+                    yield event({"content": text})
+                if finish_reason is not None:
+                    yield event({}, finish_reason)
+            if include_usage:
+                yield event({}, usage=self._usage(request))
+            yield "data: [DONE]\n\n"
+        finally:
+            request.cancel()
+
+    def _usage(self, request):
+        return {
+            "prompt_tokens": request.num_prompt_tokens,
+            "completion_tokens": len(request.output_ids),
+            "total_tokens": request.num_prompt_tokens + len(request.output_ids),
+        }
+
+    async def metrics(self):
+        stats = dict(self.engine.stats)
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP glmv_server_{name} {help_text}")
+            lines.append(f"# TYPE glmv_server_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"glmv_server_{name}{labels} {value}")
+
+        with self._lock:
+            http_requests = sorted(self.http_requests.items())
+        metric(
+            "http_requests_total",
+            "counter",
+            "Chat completion requests by HTTP status.",
+            [(f'{{status="{status}"}}', count) for status, count in http_requests],
+        )
+        metric(
+            "generations_total",
+            "counter",
+            "Generations by outcome.",
+            [
+                (f'{{outcome="{outcome}"}}', stats[outcome])
+                for outcome in ("completed", "cancelled", "failed")
+            ],
+        )
+        metric(
+            "prompt_tokens_total",
+            "counter",
+            "Prefilled tokens.",
+            [("", stats["prompt_tokens"])],
+        )
+        metric(
+            "generation_tokens_total",
+            "counter",
+            "Generated tokens.",
+            [("", stats["generated_tokens"])],
+        )
+        metric(
+            "decode_steps_total",
+            "counter",
+            "Batched decode steps.",
+            [("", stats["decode_steps"])],
+        )
+        metric(
+            "decode_rows_total",
+            "counter",
+            "Rows of the decode steps; over decode_steps_total, the mean batch size.",
+            [("", stats["decode_rows"])],
+        )
+        metric(
+            "time_to_first_token_seconds",
+            "summary",
+            "Time from submission to the first generated token.",
+            [("_sum", stats["ttft_sum"]), ("_count", stats["ttft_count"])],
+        )
+        metric(
+            "active_generations",
+            "gauge",
+            "Generations in the running batch.",
+            [("", self.engine.num_active)],
+        )
+        metric(
+            "queued_generations",
+            "gauge",
+            "Generations waiting for a batch slot.",
+            [("", self.engine.num_queued)],
+        )
+        return PlainTextResponse("\n".join(lines) + "\n")
+
+
+def load(args):
+    if args.tiny_random:
+        from trans_infer_bench import RobustInference
+
+        runner = RobustInference.tiny_random(args.model_path)
+        model, processor = runner.model, runner.processor
+    else:
+        processor = AutoProcessor.from_pretrained(args.model_path)
+        if "GLM-4.5V" in args.model_path:
+            model_cls = Glm4vMoeForConditionalGeneration
+        else:
+            model_cls = Glm4vForConditionalGeneration
+        model = model_cls.from_pretrained(
+            args.model_path, torch_dtype="auto", device_map="auto"
+        )
+    if args.visual_cache_dir is not None:
+        VisualInputCache(args.visual_cache_dir).wrap(processor)
+    return model, processor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI-compatible chat server")
+    parser.add_argument(
+        "--model_path", type=str, default="zai-org/GLM-4.1V-9B-Thinking"
+    )
+    parser.add_argument("--served_model_name", type=str, default=None)
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max_batch_size", type=int, default=8)
+    parser.add_argument("--max_queue_size", type=int, default=64)
+    parser.add_argument("--visual_cache_dir", type=str, default=None)
+    parser.add_argument("--api_key", type=str, default=None)
+    parser.add_argument("--tiny_random", action="store_true")
+    args = parser.parse_args()
+
+    model, processor = load(args)
+    engine = ServingEngine(
+        model,
+        processor,
+        max_batch_size=args.max_batch_size,
+        max_queue_size=args.max_queue_size,
+    )
+    server = ChatServer(
+        engine,
+        args.served_model_name or os.path.basename(args.model_path.rstrip("/")),
+        api_key=args.api_key,
+    )
+    uvicorn.run(server.app, host=args.host, port=args.port)
@@ -0,0 +1,176 @@
+"""
+A disk cache of processed visual inputs for the `transformers` inference scripts.
+
+`processor.apply_chat_template(..., tokenize=True)` hands the images and videos of the
+conversation to the image and video processors of the model, which decode the media,
+sample the frames, resize them and compute the pixel values on every call. When several
+prompts are asked about the same media, `VisualInputCache.wrap(processor)` makes them
+compute it once: the outputs of the visual processors (pixel values, grid sizes and
+`video_metadata`) are stored in safetensors files keyed by the content hash of the media
+and the processor settings, and loaded back through a memory map on the next call. The
+text side (chat template, placeholder expansion, tokenization) still runs every time.
+
+Usage:
+    processor = AutoProcessor.from_pretrained(model_path)
+    VisualInputCache("~/.cache/glmv_visual_inputs").wrap(processor)
+"""
+
+import dataclasses
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+import torch
+from safetensors import safe_open
+from safetensors.torch import save_file
+from transformers import BatchFeature
+
+try:
+    from transformers.video_utils import VideoMetadata
+except ImportError:  # older transformers, metadata is kept as plain dicts
+    VideoMetadata = None
+
+
+class VisualInputCache:
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir).expanduser()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._file_hashes = {}
+        self._lock = threading.Lock()
+
+    def wrap(self, processor):
+        """Route the image and video processors of `processor` through the cache."""
+        for name in ("image_processor", "video_processor"):
+            inner = getattr(processor, name, None)
+            if inner is not None and not isinstance(inner, _CachedVisualProcessor):
+                setattr(processor, name, _CachedVisualProcessor(inner, self, name))
+        return processor
+
+    def media_hash(self, item):
+        """Content hash of one image or video, None if it cannot be hashed."""
+        if isinstance(item, (str, os.PathLike)):
+            path = Path(item)
+            if not path.is_file():
+                # URLs and the like, identified by name only
+                return hashlib.sha256(os.fspath(item).encode("utf-8")).hexdigest()
+            stat = path.stat()
+            key = (os.fspath(path.resolve()), stat.st_size, stat.st_mtime_ns)
+            with self._lock:
+                digest = self._file_hashes.get(key)
+            if digest is None:
+                sha256 = hashlib.sha256()
+                with open(path, "rb") as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b""):
+                        sha256.update(chunk)
+                digest = sha256.hexdigest()
+                with self._lock:
+                    self._file_hashes[key] = digest
+            return digest
+        if hasattr(item, "tobytes") and hasattr(item, "mode"):  # PIL image
+            sha256 = hashlib.sha256(f"{item.mode}{item.size}".encode("utf-8"))
+            sha256.update(item.tobytes())
+            return sha256.hexdigest()
+        if isinstance(item, (np.ndarray, torch.Tensor)):
+            array = np.ascontiguousarray(
+                item.cpu().numpy() if isinstance(item, torch.Tensor) else item
+            )
+            sha256 = hashlib.sha256(f"{array.dtype}{array.shape}".encode("utf-8"))
+            sha256.update(array.data)
+            return sha256.hexdigest()
+        if isinstance(item, (list, tuple)):  # a video given as frames
+            hashes = [self.media_hash(frame) for frame in item]
+            if any(h is None for h in hashes):
+                return None
+            return hashlib.sha256("".join(hashes).encode("utf-8")).hexdigest()
+        return None
+
+    def load(self, key):
+        path = self.cache_dir / key[:2] / f"{key}.safetensors"
+        if not path.is_file():
+            return None
+        with safe_open(os.fspath(path), framework="pt") as f:
+            data = {name: f.get_tensor(name) for name in f.keys()}
+            extra = json.loads(f.metadata().get("extra", "{}"))
+        if "video_metadata" in extra:
+            data["video_metadata"] = [
+                VideoMetadata(**metadata) if VideoMetadata is not None else metadata
+                for metadata in extra["video_metadata"]
+            ]
+        return data
+
+    def save(self, key, outputs):
+        tensors = {}
+        extra = {}
+        for name, value in outputs.items():
+            if isinstance(value, torch.Tensor):
+                tensors[name] = value.detach().cpu().contiguous()
+            elif name == "video_metadata":
+                extra[name] = [_to_jsonable(metadata) for metadata in value]
+            else:
+                # Unknown outputs cannot be restored, do not cache
+                return
+        path = self.cache_dir / key[:2] / f"{key}.safetensors"
+        path.parent.mkdir(exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        save_file(tensors, os.fspath(tmp_path), metadata={"extra": json.dumps(extra)})
+        tmp_path.replace(path)
+
+
+def _to_jsonable(value):
+    if dataclasses.is_dataclass(value):
+        value = dataclasses.asdict(value)
+    if isinstance(value, dict):
+        return {key: _to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_jsonable(item) for item in value]
+    if isinstance(value, (np.ndarray, torch.Tensor)):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class _CachedVisualProcessor:
+    def __init__(self, inner, cache, name):
+        self.inner = inner
+        self.cache = cache
+        self.name = name
+        # Outputs depend on the processor settings (resolution, frame sampling, ...)
+        self.config_hash = hashlib.sha256(
+            inner.to_json_string().encode("utf-8")
+        ).hexdigest()
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+    def __call__(self, *args, **kwargs):
+        media = kwargs.get("videos", kwargs.get("images", args[0] if args else None))
+        items = media if isinstance(media, (list, tuple)) else [media]
+        hashes = [self.cache.media_hash(item) for item in items]
+        options = {k: v for k, v in kwargs.items() if k not in ("images", "videos")}
+        try:
+            options_repr = json.dumps(_to_jsonable(options), sort_keys=True)
+        except TypeError:
+            options_repr = None
+        if media is None or options_repr is None or any(h is None for h in hashes):
+            return self.inner(*args, **kwargs)
+
+        key = hashlib.sha256(
+            "\n".join([self.name, self.config_hash, options_repr, *hashes]).encode(
+                "utf-8"
+            )
+        ).hexdigest()
+        data = self.cache.load(key)
+        if data is not None:
+            self.cache.hits += 1
+            return BatchFeature(data=data)
+
+        self.cache.misses += 1
+        outputs = self.inner(*args, **kwargs)
+        self.cache.save(key, outputs)
+        return outputs